@@ -0,0 +1,52 @@
+"""Test clips for the benchmarks, generated with GStreamer so no media files need to be checked in."""
+
+from pathlib import Path
+
+import gi
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+
+# Encoder chains to generate test clips with, the first one that is available is used
+CLIP_FORMATS = [
+    ("x264enc tune=zerolatency ! h264parse", "avenc_aac", "mp4mux", "mp4"),
+    ("x264enc tune=zerolatency ! h264parse", "lamemp3enc", "mp4mux", "mp4"),
+    ("jpegenc", "audioconvert", "avimux", "avi"),
+]
+
+FRAMERATE = 25
+
+
+def generate_clips(
+        directory: Path, count: int, seconds: float, name: str = "clip", first_number: int = 1
+) -> list[Path]:
+    """Generate short clips with a video and an audio stream (files without audio can't be played at the moment).
+    Gst must be initialized. Raises RuntimeError if a clip can't be encoded."""
+    video_enc, audio_enc, mux, extension = next(
+        f
+        for f in CLIP_FORMATS
+        if all(
+            Gst.ElementFactory.find(part.split()[0]) is not None
+            for part in (f[0].split("!")[0], f[1], f[2])
+        )
+    )
+
+    clips = []
+    for number in range(first_number, first_number + count):
+        path = directory / f"{number}_{name}.{extension}"
+        pipeline = Gst.parse_launch(
+            f"videotestsrc num-buffers={int(seconds * FRAMERATE)} pattern={number % 20} "
+            f"! video/x-raw,width=640,height=360,framerate={FRAMERATE}/1 ! {video_enc} ! {mux} name=mux "
+            f"! filesink name=sink "
+            f"audiotestsrc num-buffers={int(seconds * 44100 / 1024)} ! audioconvert ! {audio_enc} ! mux."
+        )
+        pipeline.get_by_name("sink").set_property("location", str(path))
+        pipeline.set_state(Gst.State.PLAYING)
+        msg = pipeline.get_bus().timed_pop_filtered(
+            Gst.CLOCK_TIME_NONE, Gst.MessageType.EOS | Gst.MessageType.ERROR
+        )
+        pipeline.set_state(Gst.State.NULL)
+        if msg.type == Gst.MessageType.ERROR:
+            raise RuntimeError(f"Could not generate {path}: {msg.parse_error()[1]}")
+        clips.append(path)
+    return clips
@@ -0,0 +1,124 @@
+"""Compare the CPU load of looping a short clip with playbin3 (decoding on every pass) against replaying it from a
+decoded frame ring.
+
+Runs headless with fakesinks that sync to the clock, so both variants render in real time:
+
+    uv run benchmarks/frame_ring_cpu.py /path/to/short_clip.mp4 --slots 4 --seconds 20
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import gi
+import psutil
+
+gi.require_version("Gst", "1.0")
+from gi.repository import GLib, Gst  # noqa: E402
+
+from theatris_rpo.frame_ring import FrameRing, FrameRingDecoder, FrameRingFeeder  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def make_playbin3_pipeline(path: Path) -> Gst.Element:
+    pipeline = Gst.ElementFactory.make("playbin3")
+    pipeline.set_property("uri", path.as_uri())
+    sink = Gst.ElementFactory.make("fakesink")
+    sink.set_property("sync", True)
+    pipeline.set_property("video-sink", sink)
+    pipeline.set_property("audio-sink", Gst.ElementFactory.make("fakesink"))
+
+    def on_eos(bus, msg):
+        pipeline.seek_simple(
+            Gst.Format.TIME, Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT, 0
+        )
+
+    bus = pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message::eos", on_eos)
+    return pipeline
+
+
+def make_frame_ring_pipeline(ring: FrameRing) -> Gst.Element:
+    pipeline = Gst.parse_launch("appsrc name=src ! fakesink sync=true")
+    feeder = FrameRingFeeder(ring, lambda: True)
+    feeder.attach(pipeline.get_by_name("src"))
+    pipeline.feeder = feeder  # keep it alive as long as the pipeline
+    return pipeline
+
+
+def decode_ring(path: Path, budget_bytes: int) -> FrameRing | None:
+    loop = GLib.MainLoop()
+    result = {}
+
+    def on_done(_, ring):
+        result["ring"] = ring
+        loop.quit()
+
+    FrameRingDecoder(path, budget_bytes, on_done).start()
+    loop.run()
+    return result["ring"]
+
+
+def measure_cpu(pipelines: list[Gst.Element], seconds: float) -> dict:
+    process = psutil.Process()
+    for p in pipelines:
+        p.set_state(Gst.State.PLAYING)
+
+    # Let the pipelines settle before measuring
+    loop = GLib.MainLoop()
+    GLib.timeout_add(1000, loop.quit)
+    loop.run()
+
+    cpu_before = process.cpu_times()
+    wall_before = GLib.get_monotonic_time()
+    GLib.timeout_add(int(seconds * 1000), loop.quit)
+    loop.run()
+    cpu_after = process.cpu_times()
+    wall = (GLib.get_monotonic_time() - wall_before) / 1e6
+
+    for p in pipelines:
+        p.set_state(Gst.State.NULL)
+
+    cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    return {
+        "cpu_seconds": cpu,
+        "wall_seconds": wall,
+        "cpu_percent": 100.0 * cpu / wall,
+        "rss_bytes": process.memory_info().rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--budget-mb", type=int, default=1024)
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    results = {"file": str(args.file), "slots": args.slots}
+
+    results["playbin3"] = measure_cpu(
+        [make_playbin3_pipeline(args.file) for _ in range(args.slots)], args.seconds
+    )
+
+    ring = decode_ring(args.file, args.budget_mb * 1024 * 1024)
+    if ring is None:
+        results["frame_ring"] = "clip exceeds budget or could not be decoded"
+    else:
+        results["frame_ring_bytes"] = ring.size_bytes
+        results["frame_ring"] = measure_cpu(
+            [make_frame_ring_pipeline(ring) for _ in range(args.slots)], args.seconds
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
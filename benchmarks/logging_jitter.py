@@ -0,0 +1,193 @@
+"""Compares the fade jitter with logging off, with the usual (blocking) debug logging and with non-blocking logging
+(--non-blocking-logging), while the log goes to a slow console.
+
+A clip loops on the first slot of every output, and clips are cued with a fade-in on the second slot, again and again,
+so the slots log every fade step. The console is simulated by a stream that takes --write-ms for every write, like a
+serial console or a busy journald. Measured are:
+
+- fade jitter: how much later than scheduled the updates that step the fades ran on the main loop
+- cue latency: the cue until the first frame of the clip reached the sink
+- log lines: how many lines reached the console
+
+Every mode runs in a fresh interpreter, with its own logging configuration.
+
+    uv run benchmarks/logging_jitter.py --cues 20 --write-ms 2 --results logging_jitter.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import gi
+
+gi.require_version("GLib", "2.0")
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+
+from clips import generate_clips  # noqa: E402
+from theatris_rpo.config import config, Conf  # noqa: E402
+from theatris_rpo.cue import CueAction, CueOp  # noqa: E402
+from theatris_rpo.log_pipeline import configure_logging, stop_logging  # noqa: E402
+from theatris_rpo.slot_flag import SlotFlag  # noqa: E402
+from theatris_rpo.video_machine import VideoMachine  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "blocking", "non_blocking")
+LOOP_FILE = 1
+CUE_FILES = (2, 3)
+
+
+class SlowStream:
+    """Stands in for a slow console: Every write takes write_ms"""
+
+    def __init__(self, write_ms: float):
+        self._write_seconds = write_ms / 1000.0
+        self._devnull = open(os.devnull, "w")
+        self.lines = 0
+
+    def write(self, text: str):
+        time.sleep(self._write_seconds)
+        self.lines += text.count("\n")
+        self._devnull.write(text)
+
+    def flush(self):
+        self._devnull.flush()
+
+
+async def wait_for_cue(vm: VideoMachine, output: int, previous: float | None, timeout: float = 10.0) -> float:
+    """Latency of the cue on the second slot, once it differs from the one before the cue"""
+    deadline = time.monotonic() + timeout
+    while True:
+        latency = vm.outputs[output].video_slots[1].last_cue_latency
+        if latency is not None and latency != previous:
+            return latency
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"No first frame on output {output}")
+        await asyncio.sleep(0.001)
+
+
+async def measure(vm: VideoMachine, args, results: dict):
+    try:
+        outputs = sorted(vm.outputs)
+        for output in outputs:
+            vm.set_slot_config(output, 0, SlotFlag.LOOPING, True)
+            vm.play_video(output, 0, LOOP_FILE)
+            vm.set_slot_config(output, 1, SlotFlag.FADE_IN_TIME_SECONDS, args.fade_seconds)
+            vm.set_slot_config(output, 1, SlotFlag.FADE_OUT_TIME_SECONDS, args.fade_seconds)
+        await asyncio.sleep(1.0)
+
+        vm.main_loop_lag(reset=True)
+        latencies = []
+        for i in range(args.cues):
+            previous = {o: vm.outputs[o].video_slots[1].last_cue_latency for o in outputs}
+            vm.cue([CueOp(CueAction.PLAY, o, 1, CUE_FILES[i % len(CUE_FILES)]) for o in outputs])
+            for output in outputs:
+                latencies.append(await wait_for_cue(vm, output, previous[output]))
+            await asyncio.sleep(args.fade_seconds + 0.2)
+            vm.cue([CueOp(CueAction.STOP, o, 1) for o in outputs])
+            await asyncio.sleep(0.3)
+
+        _, jitter_mean_ms, jitter_max_ms = vm.main_loop_lag()
+        results["cue_latency_ms"] = statistics.median(latencies) * 1000.0
+        results["fade_jitter_mean_ms"] = jitter_mean_ms
+        results["fade_jitter_max_ms"] = jitter_max_ms
+    except Exception:
+        logger.exception("Measurement failed")
+        results["failed"] = True
+    finally:
+        vm.stop()
+
+
+def run(args):
+    """Measure one mode (in a subprocess, see compare())"""
+    stream = SlowStream(args.write_ms)
+    configure_logging(
+        logging.WARNING if args.mode == "off" else logging.DEBUG,
+        non_blocking=args.mode == "non_blocking",
+        rate_limit_per_second=config[Conf.LOG_RATE_LIMIT_PER_SECOND] if args.mode == "non_blocking" else 0.0,
+        rate_limit_burst=config[Conf.LOG_RATE_LIMIT_BURST],
+        stream=stream,
+    )
+    config[Conf.HEADLESS] = True
+
+    results: dict = {"mode": args.mode}
+    vm = VideoMachine(str(args.media_dir), with_interfaces=False)
+    vm.when_ready(lambda: vm.asyncio_loop.create_task(measure(vm, args, results)))
+    vm.start()
+    # Counted once the queued records are written
+    stop_logging()
+    results["log_lines"] = stream.lines
+    args.results.write_text(json.dumps(results))
+
+
+def compare(args):
+    Gst.init(None)
+    report = {}
+    with tempfile.TemporaryDirectory(prefix="theatris_logging_") as media_dir:
+        generate_clips(Path(media_dir), 1, args.clip_seconds, "loop_clip")
+        generate_clips(Path(media_dir), len(CUE_FILES), args.clip_seconds, "cue_clip", first_number=CUE_FILES[0])
+        for mode in MODES:
+            results_path = Path(media_dir) / f"{mode}.json"
+            subprocess.run(
+                [
+                    sys.executable, __file__, "run",
+                    "--mode", mode,
+                    "--media-dir", media_dir,
+                    "--results", str(results_path),
+                    "--cues", str(args.cues),
+                    "--fade-seconds", str(args.fade_seconds),
+                    "--write-ms", str(args.write_ms),
+                ],
+                cwd=Path(__file__).parent,
+                check=False,
+            )
+            report[mode] = json.loads(results_path.read_text()) if results_path.exists() else {"failed": True}
+
+    for mode, results in report.items():
+        if results.get("failed"):
+            logger.error("%-12s failed", mode)
+            continue
+        logger.info(
+            "%-12s fade jitter %5.2f ms (max %6.2f)   cue latency %6.1f ms   %6d log lines",
+            mode,
+            results["fade_jitter_mean_ms"],
+            results["fade_jitter_max_ms"],
+            results["cue_latency_ms"],
+            results["log_lines"],
+        )
+    if args.results:
+        args.results.write_text(json.dumps(report, indent=2))
+    if any(results.get("failed") for results in report.values()):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="compare", choices=("compare", "run"))
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--media-dir", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--cues", type=int, default=20)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--fade-seconds", type=float, default=0.5)
+    parser.add_argument("--write-ms", type=float, default=2.0, help="Time the simulated console takes per write")
+    parser.add_argument("--results", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,113 @@
+"""Compare registration time and dispatch throughput of mapping every slot address separately (as OscInterface did
+before) against the parametric slot command router, for small and large slot topologies.
+
+    uv run benchmarks/osc_dispatch.py --topologies 2x2 8x32 --messages 20000
+
+Registering every address separately gets slow quickly: pythonoscquery's OSCAddressSpace.add_node() searches the whole
+tree for every path segment and appends existing containers again, so the tree (and every search) keeps growing. At 8x32
+it does not finish in reasonable time, so that variant is skipped above --per-address-max-slots.
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+
+import pythonoscquery.pythonosc_callback_wrapper
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonoscquery.shared.osc_access import OSCAccess
+from pythonoscquery.shared.osc_address_space import OSCAddressSpace
+from pythonoscquery.shared.osc_path_node import OSCPathNode
+
+from theatris_rpo.osc_router import RoutingDispatcher
+
+# The slot commands of OscInterface: name, access, value
+SLOT_COMMANDS = [
+    ("stop", OSCAccess.NO_VALUE, None),
+    ("play_by_number", OSCAccess.WRITEONLY_VALUE, [1, False]),
+    ("preload", OSCAccess.WRITEONLY_VALUE, 1),
+    ("play_test", OSCAccess.NO_VALUE, None),
+    ("set_alpha", OSCAccess.WRITEONLY_VALUE, 100.0),
+    ("pause", OSCAccess.NO_VALUE, None),
+    ("cfg_set_full_alpha_when_starting", OSCAccess.WRITEONLY_VALUE, False),
+    ("cfg_set_loop", OSCAccess.WRITEONLY_VALUE, False),
+    ("cfg_set_frame_cache", OSCAccess.WRITEONLY_VALUE, False),
+]
+
+
+def handler(address, fixed_args, *values):
+    return None
+
+
+def register_per_address(outputs: int, slots: int) -> Dispatcher:
+    dispatcher = Dispatcher()
+    address_space = OSCAddressSpace()
+    for name, access, value in SLOT_COMMANDS:
+        for output in range(outputs):
+            for slot in range(slots):
+                pythonoscquery.pythonosc_callback_wrapper.map_node(
+                    OSCPathNode(f"/output{output}/slot{slot}/{name}", access=access, value=value),
+                    dispatcher,
+                    handler,
+                    address_space,
+                    output,
+                    slot,
+                )
+    return dispatcher
+
+
+def register_routed(outputs: int, slots: int) -> Dispatcher:
+    dispatcher = RoutingDispatcher()
+    address_space = OSCAddressSpace()
+    for name, access, value in SLOT_COMMANDS:
+        dispatcher.map_slot_command(name, handler, access, "{output} {slot}", value)
+    dispatcher.add_slots((output, slot) for output in range(outputs) for slot in range(slots))
+    dispatcher.advertise_slot_commands(address_space)
+    return dispatcher
+
+
+def measure(register, outputs: int, slots: int, messages: int) -> dict:
+    started = time.perf_counter()
+    dispatcher = register(outputs, slots)
+    registration = time.perf_counter() - started
+
+    rnd = random.Random(1)
+    datagrams = []
+    for _ in range(256):
+        builder = OscMessageBuilder(f"/output{rnd.randrange(outputs)}/slot{rnd.randrange(slots)}/set_alpha")
+        builder.add_arg(0.5)
+        datagrams.append(builder.build().dgram)
+
+    started = time.perf_counter()
+    for i in range(messages):
+        dispatcher.call_handlers_for_packet(datagrams[i % len(datagrams)], ("127.0.0.1", 9000))
+    throughput = messages / (time.perf_counter() - started)
+
+    return {"registration_seconds": registration, "messages_per_second": throughput}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topologies", nargs="+", default=["2x2", "8x32"], help="outputs x slots")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--per-address-max-slots", type=int, default=32, help="Skip the old variant above this")
+    args = parser.parse_args()
+
+    # The per-address variant logs every call on debug level, keep that out of the measurement
+    logging.disable(logging.DEBUG)
+
+    results = {}
+    for topology in args.topologies:
+        outputs, slots = (int(n) for n in topology.split("x"))
+        for name, register in (("per_address", register_per_address), ("routed", register_routed)):
+            if register is register_per_address and outputs * slots > args.per_address_max_slots:
+                results[f"{topology}_{name}"] = "skipped"
+                continue
+            results[f"{topology}_{name}"] = measure(register, outputs, slots, args.messages)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""OSC load generator and session replay: Measures how the OSC interface copes with realistic or hostile control traffic.
+
+    # Flood a local instance (started on loopback with headless test outputs and generated clips)
+    uv run benchmarks/osc_load.py flood --spawn --rate 2000 --seconds 10
+
+    # Record a session from a control desk through a proxy, then replay it with its original timing
+    uv run benchmarks/osc_load.py record --listen 9100 --target 127.0.0.1:9000 --session show.jsonl
+    uv run benchmarks/osc_load.py replay --spawn --session show.jsonl
+
+Loss is the difference between the commands sent and the commands the instance ran (from /commands/latency). Reply
+latency is measured with /ping probes sent along with the traffic, main loop lag with /stats/main_loop_lag. With
+--max-loss, --max-reply-ms and --max-lag-ms, the tool exits with status 1 if a limit is exceeded, for regression tests.
+"""
+
+import argparse
+import base64
+import json
+import logging
+import queue
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterator
+
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.osc_packet import OscPacket, ParseError
+
+logger = logging.getLogger(__name__)
+
+HOST = "127.0.0.1"
+PROBE_INTERVAL_SECONDS = 0.05
+# Time for queued and scheduled commands to finish after the traffic ended
+SETTLE_SECONDS = 1.0
+QUERY_TIMEOUT_SECONDS = 2.0
+STARTUP_TIMEOUT_SECONDS = 60.0
+
+SLOT_ADDRESS = re.compile(r"^/output\d+/slot\d+/(\w+)$")
+OUTPUT_COMMAND_ADDRESS = re.compile(r"^/output\d+/(stop_all|crossfade)$")
+
+
+def command_name(address: str) -> str | None:
+    """Name under which the instance counts the command (see OscInterface), None for addresses that are not counted"""
+    if match := SLOT_ADDRESS.match(address):
+        return match.group(1)
+    if match := OUTPUT_COMMAND_ADDRESS.match(address):
+        return f"output/{match.group(1)}"
+    if address in ("/cue", "/go", "/back", "/goto", "/stop_all", "/rescan_media", "/media/memory_cache",
+                   "/media/prefetch", "/cue_list/load"):
+        return address[1:]
+    return None
+
+
+def packet_commands(data: bytes) -> list[str]:
+    """Counted command names of all messages in a packet"""
+    try:
+        messages = OscPacket(data).messages
+    except ParseError:
+        return []
+    return [name for m in messages if (name := command_name(m.message.address)) is not None]
+
+
+def build(address: str, *args) -> bytes:
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+
+class Client:
+    """Sends packets to the instance and collects its replies on a receiver thread"""
+
+    def __init__(self, target: tuple[str, int]):
+        self._target = target
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((HOST, 0))
+        self._sock.settimeout(0.2)
+        self._replies: queue.Queue[OscMessage] = queue.Queue()
+        self._probes_sent: dict[int, float] = {}
+        self._probe_latencies: list[float] = []
+        self._error_replies = Counter()
+        self._next_probe = 0
+        self._running = True
+        self._receiver = threading.Thread(target=self._receive, daemon=True)
+        self._receiver.start()
+
+    def send(self, data: bytes):
+        self._sock.sendto(data, self._target)
+
+    def probe(self):
+        self._probes_sent[self._next_probe] = time.perf_counter()
+        self.send(build("/ping", self._next_probe))
+        self._next_probe += 1
+
+    def query(self, address: str, *args) -> list | None:
+        """Send a query and wait for its reply"""
+        while not self._replies.empty():
+            self._replies.get_nowait()
+        self.send(build(address, *args))
+        deadline = time.monotonic() + QUERY_TIMEOUT_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                reply = self._replies.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if reply.address == address:
+                return reply.params
+        return None
+
+    def wait_until_up(self, timeout: float):
+        """Wait until the player replies and its media files are registered"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            phases = self.query("/stats/startup")
+            if phases is not None and "media_ready" in phases:
+                return
+            time.sleep(0.05)
+        raise TimeoutError(f"No reply from {self._target} within {timeout} s")
+
+    def probe_results(self) -> tuple[list[float], int]:
+        """Latencies of the answered probes and the number of unanswered ones"""
+        return list(self._probe_latencies), len(self._probes_sent)
+
+    @property
+    def error_replies(self) -> Counter:
+        return Counter(self._error_replies)
+
+    def close(self):
+        self._running = False
+        self._receiver.join()
+        self._sock.close()
+
+    def _receive(self):
+        while self._running:
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            received_at = time.perf_counter()
+            if OscBundle.dgram_is_bundle(data):
+                continue
+            try:
+                message = OscMessage(data)
+            except ParseError:
+                continue
+            if message.address == "/ping":
+                sent_at = self._probes_sent.pop(message.params[0], None)
+                if sent_at is not None:
+                    self._probe_latencies.append(received_at - sent_at)
+            elif command_name(message.address) is not None:
+                # Commands only reply on failure
+                self._error_replies[message.address] += 1
+            else:
+                self._replies.put(message)
+
+
+def flood_traffic(args) -> Iterator[tuple[float, bytes]]:
+    """set_alpha and play_by_number messages to random slots, at a constant rate"""
+    rnd = random.Random(args.seed)
+    interval = 1.0 / args.rate
+    for i in range(int(args.rate * args.seconds)):
+        output, slot = rnd.randrange(args.outputs), rnd.randrange(args.slots)
+        if rnd.random() < args.play_share:
+            data = build(f"/output{output}/slot{slot}/play_by_number", rnd.choice(args.files), False)
+        else:
+            data = build(f"/output{output}/slot{slot}/set_alpha", rnd.random())
+        yield i * interval, data
+
+
+def replay_traffic(args) -> Iterator[tuple[float, bytes]]:
+    """Packets of a recorded session, at their original time offsets divided by --speed"""
+    with args.session.open() as f:
+        for line in f:
+            record = json.loads(line)
+            yield record["t"] / args.speed, base64.b64decode(record["packet"])
+
+
+def run_load(client: Client, traffic: Iterator[tuple[float, bytes]]) -> dict:
+    handled_before = handled_counts(client)
+    client.query("/stats/main_loop_lag", True)
+
+    sent = Counter()
+    started = time.perf_counter()
+    next_probe = started
+    late = []
+    for offset, data in traffic:
+        due = started + offset
+        while (now := time.perf_counter()) < due:
+            if now >= next_probe:
+                client.probe()
+                next_probe += PROBE_INTERVAL_SECONDS
+            time.sleep(min(due - now, 0.0005))
+        late.append(time.perf_counter() - due)
+        client.send(data)
+        sent.update(packet_commands(data))
+    duration = time.perf_counter() - started
+
+    time.sleep(SETTLE_SECONDS)
+    lag = client.query("/stats/main_loop_lag", False) or [0, 0.0, 0.0]
+    handled_after = handled_counts(client)
+
+    handled = Counter({n: handled_after[n] - handled_before[n] for n in sent})
+    lost = sum(sent.values()) - sum(handled.values())
+    latencies, unanswered = client.probe_results()
+    latencies_ms = sorted(latency * 1000.0 for latency in latencies)
+    return {
+        "duration_seconds": duration,
+        "sent": dict(sent),
+        "handled": dict(handled),
+        "lost": lost,
+        "loss_ratio": lost / max(1, sum(sent.values())),
+        "send_rate": sum(sent.values()) / duration if duration else 0.0,
+        "send_late_max_ms": max(late, default=0.0) * 1000.0,
+        "error_replies": dict(client.error_replies),
+        "probes_answered": len(latencies_ms),
+        "probes_lost": unanswered,
+        "reply_latency_ms": {
+            "p50": percentile(latencies_ms, 0.5),
+            "p95": percentile(latencies_ms, 0.95),
+            "max": max(latencies_ms, default=0.0),
+            "mean": statistics.fmean(latencies_ms) if latencies_ms else 0.0,
+        },
+        "main_loop_lag_ms": {"updates": lag[0], "mean": lag[1], "max": lag[2]},
+    }
+
+
+def handled_counts(client: Client) -> Counter:
+    stats = client.query("/commands/latency") or []
+    # name, count, mean, max
+    return Counter({stats[i]: stats[i + 1] for i in range(0, len(stats), 4)})
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def limit_violations(result: dict, args) -> list[str]:
+    violations = []
+    if args.max_loss is not None and result["loss_ratio"] > args.max_loss:
+        violations.append(f"loss {result['loss_ratio']:.3f} > {args.max_loss}")
+    if args.max_reply_ms is not None and result["reply_latency_ms"]["p95"] > args.max_reply_ms:
+        violations.append(f"p95 reply latency {result['reply_latency_ms']['p95']:.1f} ms > {args.max_reply_ms} ms")
+    if args.max_lag_ms is not None and result["main_loop_lag_ms"]["max"] > args.max_lag_ms:
+        violations.append(f"max main loop lag {result['main_loop_lag_ms']['max']:.1f} ms > {args.max_lag_ms} ms")
+    return violations
+
+
+def record(args):
+    """Forward packets from a control desk to the target and write them with their time offsets"""
+    listen = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    listen.bind(("0.0.0.0", args.listen))
+    upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = parse_target(args.target)
+    desk = None
+
+    def forward_replies():
+        while True:
+            data = upstream.recv(65536)
+            if desk is not None:
+                listen.sendto(data, desk)
+
+    threading.Thread(target=forward_replies, daemon=True).start()
+    logger.info("Recording packets to port %s into %s, stop with Ctrl-C", args.listen, args.session)
+    started = None
+    count = 0
+    with args.session.open("w") as f:
+        try:
+            while True:
+                data, desk = listen.recvfrom(65536)
+                now = time.perf_counter()
+                started = started or now
+                upstream.sendto(data, target)
+                f.write(json.dumps({"t": now - started, "packet": base64.b64encode(data).decode()}) + "\n")
+                count += 1
+        except KeyboardInterrupt:
+            pass
+    logger.info("Recorded %d packets", count)
+
+
+def serve(args):
+    """Run an instance on loopback with headless test outputs and generated clips (used by --spawn)"""
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+
+    from clips import generate_clips
+    from theatris_rpo.config import config, Conf
+    from theatris_rpo.video_machine import VideoMachine
+
+    Gst.init(None)
+    config[Conf.HEADLESS] = True
+    config[Conf.OSC_IP] = HOST
+    config[Conf.OSC_PORT] = args.port
+    config[Conf.OSC_TCP_PORT] = 0
+    with tempfile.TemporaryDirectory(prefix="theatris_load_") as media_dir:
+        generate_clips(Path(media_dir), args.clips, 2.0, "load_clip")
+        VideoMachine(media_dir).start()
+
+
+def spawn(port: int, clips: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, __file__, "serve", "--port", str(port), "--clips", str(clips)],
+        cwd=Path(__file__).parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def parse_target(target: str) -> tuple[str, int]:
+    host, port = target.rsplit(":", 1)
+    return host, int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def load_arguments(command):
+        command.add_argument("--target", default=f"{HOST}:9000", help="host:port of the instance")
+        command.add_argument("--spawn", action="store_true", help="Start a local instance on loopback first")
+        command.add_argument("--spawn-port", type=int, default=9200)
+        command.add_argument("--results", type=Path, help="Write the results as JSON")
+        command.add_argument("--max-loss", type=float, help="Fail if more than this fraction of commands is lost")
+        command.add_argument("--max-reply-ms", type=float, help="Fail if the p95 reply latency is higher")
+        command.add_argument("--max-lag-ms", type=float, help="Fail if the main loop lags more than this")
+
+    flood = commands.add_parser("flood", help="Send set_alpha/play_by_number traffic at a constant rate")
+    load_arguments(flood)
+    flood.add_argument("--rate", type=float, default=1000.0, help="Messages per second")
+    flood.add_argument("--seconds", type=float, default=10.0)
+    flood.add_argument("--play-share", type=float, default=0.02, help="Fraction of play_by_number messages")
+    flood.add_argument("--outputs", type=int, default=2)
+    flood.add_argument("--slots", type=int, default=2)
+    flood.add_argument("--files", type=int, nargs="+", default=[1, 2, 3])
+    flood.add_argument("--seed", type=int, default=1)
+
+    replay = commands.add_parser("replay", help="Replay a recorded session with its original timing")
+    load_arguments(replay)
+    replay.add_argument("--session", type=Path, required=True)
+    replay.add_argument("--speed", type=float, default=1.0, help="Time scale, 2.0 replays twice as fast")
+
+    record_parser = commands.add_parser("record", help="Record a session through a forwarding proxy")
+    record_parser.add_argument("--listen", type=int, default=9100)
+    record_parser.add_argument("--target", default=f"{HOST}:9000")
+    record_parser.add_argument("--session", type=Path, required=True)
+
+    serve_parser = commands.add_parser("serve", help=argparse.SUPPRESS)
+    serve_parser.add_argument("--port", type=int, default=9200)
+    serve_parser.add_argument("--clips", type=int, default=3)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)8s] %(message)s")
+
+    match args.command:
+        case "record":
+            record(args)
+            return
+        case "serve":
+            serve(args)
+            return
+
+    instance = None
+    target = parse_target(args.target)
+    if args.spawn:
+        clips = max(args.files) if args.command == "flood" else 3
+        instance = spawn(args.spawn_port, clips)
+        target = (HOST, args.spawn_port)
+
+    client = Client(target)
+    try:
+        client.wait_until_up(STARTUP_TIMEOUT_SECONDS if args.spawn else QUERY_TIMEOUT_SECONDS)
+        traffic = flood_traffic(args) if args.command == "flood" else replay_traffic(args)
+        result = run_load(client, traffic)
+    finally:
+        client.close()
+        if instance is not None:
+            instance.terminate()
+            instance.wait()
+
+    print(json.dumps(result, indent=2))
+    if args.results:
+        args.results.write_text(json.dumps(result, indent=2))
+
+    violations = limit_violations(result, args)
+    for violation in violations:
+        logger.error("Limit exceeded: %s", violation)
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Compare OSC over UDP (AsyncIOOSCUDPServer) with OSC 1.1 over TCP (OscTcpInterface) on loopback.
+
+    uv run benchmarks/osc_transport.py --messages 50000
+
+Both servers run on an asyncio loop in a background thread with the same dispatcher. The client sends set_alpha
+messages as fast as it can (one-way), then /ping requests that are answered (request/reply, pipelined). For UDP, lost
+messages and replies are counted; TCP delivers everything, in order.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+from pythonosc import slip
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+from pythonoscquery.shared.osc_access import OSCAccess
+
+from theatris_rpo.osc_router import RoutingDispatcher
+from theatris_rpo.osc_tcp_interface import OscTcpInterface
+
+HOST = "127.0.0.1"
+# Time to wait for stragglers after the last message was sent
+SETTLE_SECONDS = 1.0
+
+
+class Server:
+    def __init__(self):
+        self.handled = 0
+        self.last_handled_at = 0.0
+        self.dispatcher = RoutingDispatcher()
+        self.dispatcher.map_slot_command("set_alpha", self._count, OSCAccess.WRITEONLY_VALUE, "", 1.0)
+        self.dispatcher.add_slots([(0, 0), (0, 1), (1, 0), (1, 1)])
+        self.dispatcher.map("/ping", lambda address, number: (address, number))
+
+        self.loop = asyncio.new_event_loop()
+        self.udp_port = 0
+        self.tcp_port = 0
+        self._started = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._started.wait()
+
+    def _count(self, address, fixed_args, value):
+        self.handled += 1
+        self.last_handled_at = time.perf_counter()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        self._started.set()
+        self.loop.run_forever()
+
+    async def _start(self):
+        udp = AsyncIOOSCUDPServer((HOST, 0), self.dispatcher, self.loop)
+        transport, _ = await udp.create_serve_endpoint()
+        self.udp_port = transport.get_extra_info("sockname")[1]
+        tcp = OscTcpInterface(HOST, 0, None, self.dispatcher)
+        await tcp.async_start()
+        self.tcp_port = tcp._server.sockets[0].getsockname()[1]
+
+
+def message(address: str, arg) -> bytes:
+    builder = OscMessageBuilder(address)
+    builder.add_arg(arg)
+    return builder.build().dgram
+
+
+def wait_for(condition, timeout: float):
+    started = time.perf_counter()
+    while not condition() and time.perf_counter() - started < timeout:
+        time.sleep(0.001)
+
+
+def one_way_result(server: Server, count: int, started: float) -> dict:
+    elapsed = server.last_handled_at - started
+    return {"messages_per_second": server.handled / elapsed, "lost": count - server.handled}
+
+
+def udp_one_way(server: Server, count: int) -> dict:
+    datagram = message("/output0/slot1/set_alpha", 0.5)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.handled = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        sock.sendto(datagram, (HOST, server.udp_port))
+    wait_for(lambda: server.handled >= count, SETTLE_SECONDS)
+    return one_way_result(server, count, started)
+
+
+def tcp_one_way(server: Server, count: int) -> dict:
+    data = slip.encode(message("/output0/slot1/set_alpha", 0.5)) * count
+    sock = socket.create_connection((HOST, server.tcp_port))
+    server.handled = 0
+    started = time.perf_counter()
+    sock.sendall(data)
+    wait_for(lambda: server.handled >= count, 60.0)
+    sock.close()
+    return one_way_result(server, count, started)
+
+
+def udp_request_reply(server: Server, count: int) -> dict:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(SETTLE_SECONDS)
+    replies = 0
+
+    def receive():
+        nonlocal replies
+        try:
+            while replies < count:
+                sock.recv(65536)
+                replies += 1
+        except socket.timeout:
+            pass
+
+    receiver = threading.Thread(target=receive)
+    started = time.perf_counter()
+    receiver.start()
+    for n in range(count):
+        sock.sendto(message("/ping", n), (HOST, server.udp_port))
+    receiver.join()
+    elapsed = time.perf_counter() - started
+    if replies < count:
+        elapsed -= SETTLE_SECONDS
+    return {"replies_per_second": replies / elapsed, "lost_replies": count - replies}
+
+
+def tcp_request_reply(server: Server, count: int) -> dict:
+    sock = socket.create_connection((HOST, server.tcp_port))
+    reader = sock.makefile("rb")
+    in_order = True
+
+    def send():
+        sock.sendall(b"".join(slip.encode(message("/ping", n)) for n in range(count)))
+
+    started = time.perf_counter()
+    threading.Thread(target=send).start()
+    buffer = b""
+    replies = 0
+    while replies < count:
+        buffer += reader.read1(65536)
+        *frames, buffer = buffer.split(slip.END)
+        for frame in frames:
+            if frame:
+                in_order &= OscMessage(slip.decode(frame)).params == [replies]
+                replies += 1
+    elapsed = time.perf_counter() - started
+    sock.close()
+    return {"replies_per_second": replies / elapsed, "lost_replies": count - replies, "in_order": in_order}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args()
+
+    server = Server()
+    results = {
+        "udp_one_way": udp_one_way(server, args.messages),
+        "tcp_one_way": tcp_one_way(server, args.messages),
+        "udp_request_reply": udp_request_reply(server, args.messages),
+        "tcp_request_reply": tcp_request_reply(server, args.messages),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Compares the single process mode with one process per output (--output-processes) while both outputs are busy.
+
+Both outputs loop a clip on their first slot, and the main process is kept busy, as by a flood of OSC messages. Then
+clips are cued with a fade-in on the second slot of both outputs, again and again. Measured are:
+
+- cue latency: the cue until the first frame of the clip reached the sink
+- fade jitter: how much later than scheduled the updates that step the fades ran, on the main loop that runs the output
+
+Every mode runs in a fresh interpreter, the output processes must be forked before any thread is started.
+
+    uv run benchmarks/output_processes.py --cues 20 --busy-ms 8 --results output_processes.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import gi
+
+gi.require_version("GLib", "2.0")
+gi.require_version("Gst", "1.0")
+from gi.repository import GLib, Gst  # noqa: E402
+
+from clips import generate_clips  # noqa: E402
+from theatris_rpo.config import config, Conf  # noqa: E402
+from theatris_rpo.cue import CueAction, CueOp  # noqa: E402
+from theatris_rpo.slot_flag import SlotFlag  # noqa: E402
+from theatris_rpo.video_machine import VideoMachine  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+MODES = ("single", "processes")
+LOOP_FILE = 1
+CUE_FILES = (2, 3)
+
+
+def burn(milliseconds: float) -> bool:
+    """Keep the main loop busy, like a handler of many OSC messages"""
+    until = time.perf_counter() + milliseconds / 1000.0
+    while time.perf_counter() < until:
+        pass
+    return GLib.SOURCE_CONTINUE
+
+
+async def wait_for_cue(vm: VideoMachine, output: int, previous: float | None, timeout: float = 10.0) -> float:
+    """Latency of the cue on the second slot, once it differs from the one before the cue"""
+    deadline = time.monotonic() + timeout
+    while True:
+        latency = vm.outputs[output].video_slots[1].last_cue_latency
+        if latency is not None and latency != previous:
+            return latency
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"No first frame on output {output}")
+        await asyncio.sleep(0.001)
+
+
+def reset_fade_jitter(vm: VideoMachine):
+    vm.main_loop_lag(reset=True)
+    for output in vm.outputs.values():
+        if hasattr(output, "reset_loop_lag"):
+            output.reset_loop_lag()
+
+
+def fade_jitter(vm: VideoMachine, processes: bool) -> tuple[float, float]:
+    """Mean and max lateness (ms) of the updates of the main loops that run the outputs"""
+    if not processes:
+        _, mean_ms, max_ms = vm.main_loop_lag()
+        return mean_ms, max_ms
+    lags = [output.loop_lag for output in vm.outputs.values()]
+    return (
+        statistics.mean(lag.mean_seconds for lag in lags) * 1000.0,
+        max(lag.max_seconds for lag in lags) * 1000.0,
+    )
+
+
+async def measure(vm: VideoMachine, args, processes: bool, results: dict):
+    try:
+        outputs = sorted(vm.outputs)
+        for output in outputs:
+            vm.set_slot_config(output, 0, SlotFlag.LOOPING, True)
+            vm.play_video(output, 0, LOOP_FILE)
+            vm.set_slot_config(output, 1, SlotFlag.FADE_IN_TIME_SECONDS, args.fade_seconds)
+            vm.set_slot_config(output, 1, SlotFlag.FADE_OUT_TIME_SECONDS, args.fade_seconds)
+        await asyncio.sleep(1.0)
+
+        busy = GLib.timeout_add(args.busy_interval_ms, burn, args.busy_ms)
+        reset_fade_jitter(vm)
+        latencies = []
+        for i in range(args.cues):
+            previous = {o: vm.outputs[o].video_slots[1].last_cue_latency for o in outputs}
+            vm.cue([CueOp(CueAction.PLAY, o, 1, CUE_FILES[i % len(CUE_FILES)]) for o in outputs])
+            for output in outputs:
+                latencies.append(await wait_for_cue(vm, output, previous[output]))
+            await asyncio.sleep(args.fade_seconds + 0.2)
+            vm.cue([CueOp(CueAction.STOP, o, 1) for o in outputs])
+            await asyncio.sleep(0.3)
+        GLib.source_remove(busy)
+
+        jitter_mean_ms, jitter_max_ms = fade_jitter(vm, processes)
+        results["cue_latency_ms"] = statistics.median(latencies) * 1000.0
+        results["cue_latency_max_ms"] = max(latencies) * 1000.0
+        results["fade_jitter_mean_ms"] = jitter_mean_ms
+        results["fade_jitter_max_ms"] = jitter_max_ms
+    except Exception:
+        logger.exception("Measurement failed")
+        results["failed"] = True
+    finally:
+        vm.stop()
+
+
+def run(args):
+    """Measure one mode (in a subprocess, see compare())"""
+    processes = args.mode == "processes"
+    config[Conf.HEADLESS] = True
+    config[Conf.OUTPUT_PROCESSES] = processes
+
+    results: dict = {"mode": args.mode}
+    vm = VideoMachine(str(args.media_dir), with_interfaces=False)
+    vm.when_ready(lambda: vm.asyncio_loop.create_task(measure(vm, args, processes, results)))
+    vm.start()
+    args.results.write_text(json.dumps(results))
+
+
+def compare(args):
+    Gst.init(None)
+    report = {}
+    with tempfile.TemporaryDirectory(prefix="theatris_processes_") as media_dir:
+        generate_clips(Path(media_dir), 1, args.clip_seconds, "loop_clip")
+        generate_clips(Path(media_dir), len(CUE_FILES), args.clip_seconds, "cue_clip", first_number=CUE_FILES[0])
+        for mode in MODES:
+            results_path = Path(media_dir) / f"{mode}.json"
+            subprocess.run(
+                [
+                    sys.executable, __file__, "run",
+                    "--mode", mode,
+                    "--media-dir", media_dir,
+                    "--results", str(results_path),
+                    "--cues", str(args.cues),
+                    "--fade-seconds", str(args.fade_seconds),
+                    "--busy-ms", str(args.busy_ms),
+                    "--busy-interval-ms", str(args.busy_interval_ms),
+                ],
+                cwd=Path(__file__).parent,
+                check=False,
+            )
+            report[mode] = json.loads(results_path.read_text()) if results_path.exists() else {"failed": True}
+
+    for mode, results in report.items():
+        if results.get("failed"):
+            logger.error("%-10s failed", mode)
+            continue
+        logger.info(
+            "%-10s cue latency %6.1f ms (max %6.1f)   fade jitter %5.2f ms (max %6.2f)",
+            mode,
+            results["cue_latency_ms"],
+            results["cue_latency_max_ms"],
+            results["fade_jitter_mean_ms"],
+            results["fade_jitter_max_ms"],
+        )
+    if args.results:
+        args.results.write_text(json.dumps(report, indent=2))
+    if any(results.get("failed") for results in report.values()):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="compare", choices=("compare", "run"))
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--media-dir", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--cues", type=int, default=20)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--fade-seconds", type=float, default=0.5)
+    parser.add_argument("--busy-ms", type=float, default=8.0, help="Main process busy time per interval")
+    parser.add_argument("--busy-interval-ms", type=int, default=10)
+    parser.add_argument("--results", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,309 @@
+"""Headless benchmark suite for the playback core.
+
+Runs without KMS on test outputs with fakesinks (that sync to the clock, so playback runs in real time) and measures:
+
+- time to first frame: play() on an idle slot until the first frame reaches the sink
+- cue-to-cue latency: play() of another clip on a playing slot until its first frame reaches the sink
+- loop gap: longest frame interval across the loop point of a looping clip, minus the nominal frame interval
+- fade accuracy: actual duration of an auto fade-in on the main loop, minus the nominal duration
+- OSC dispatch throughput: messages per second through the dispatcher, without sockets
+- registry scan time for different numbers of files
+
+The results are written as JSON and compared against the baseline in benchmarks/baseline.json. Exits with status 1 on
+a regression. The checked in baseline has no results until one is recorded on the reference machine.
+
+    uv run benchmarks/run_benchmarks.py --results results.json
+    uv run benchmarks/run_benchmarks.py --save-baseline   # after a deliberate change, on the reference machine
+
+Timing depends heavily on the machine, so baselines are only comparable when recorded on the same (kind of) machine.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from ipaddress import IPv4Address
+from pathlib import Path
+from typing import Callable
+
+import gi
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+from pythonosc.osc_message_builder import OscMessageBuilder  # noqa: E402
+
+from clips import FRAMERATE, generate_clips  # noqa: E402
+from theatris_rpo.config import config, Conf  # noqa: E402
+from theatris_rpo.media_registry.media_registry import MediaRegistry  # noqa: E402
+from theatris_rpo.osc_interface import OscInterface  # noqa: E402
+from theatris_rpo.slot_flag import SlotFlag  # noqa: E402
+from theatris_rpo.slot_state import SlotState  # noqa: E402
+from theatris_rpo.video_machine import VideoMachine  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Alpha slope per second of the auto fade-in that is measured, it lasts 1 / FADE_SLOPE_PER_SECOND seconds
+FADE_SLOPE_PER_SECOND = 4.0
+# Largest value the slot writes to the alpha property of a plane
+FULL_ALPHA = int(1.0 * 65232.0)
+
+# Metrics where a higher value is better, all others are durations where lower is better
+HIGHER_IS_BETTER = {"osc_dispatch_messages_per_second"}
+
+
+class RecordingPlane:
+    """Stands in for a KMS plane and records when alpha values are committed"""
+
+    def __init__(self):
+        self.alpha_commits: list[tuple[float, int]] = []
+
+    def set_props(self, props: dict):
+        if "alpha" in props:
+            self.alpha_commits.append((time.monotonic(), props["alpha"]))
+
+
+async def wait_for(predicate: Callable[[], bool], timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out waiting for {what}")
+        await asyncio.sleep(0.001)
+
+
+async def wait_for_cue(slot, timeout: float = 10.0) -> float:
+    """Wait until the first frame after the last play() reached the sink, return the latency"""
+    await wait_for(lambda: slot.last_cue_latency is not None, timeout, f"first frame on {slot}")
+    return slot.last_cue_latency
+
+
+async def stop_slot(slot):
+    slot.stop()
+    await wait_for(lambda: slot.state is SlotState.DEACTIVATED, 5.0, f"{slot} to stop")
+
+
+async def bench_time_to_first_frame(vm: VideoMachine, repeats: int) -> list[float]:
+    slot = vm.outputs[0].video_slots[0]
+    values = []
+    for i in range(repeats):
+        vm.play_video(0, 0, 1 + i % 2, True)
+        values.append(await wait_for_cue(slot))
+        await asyncio.sleep(0.2)
+        await stop_slot(slot)
+    return values
+
+
+async def bench_cue_to_cue(vm: VideoMachine, repeats: int) -> list[float]:
+    slot = vm.outputs[0].video_slots[1]
+    values = []
+    vm.play_video(0, 1, 1)
+    await wait_for_cue(slot)
+    for i in range(repeats):
+        await asyncio.sleep(0.3)
+        vm.play_video(0, 1, 2 - i % 2)
+        values.append(await wait_for_cue(slot))
+    await stop_slot(slot)
+    return values
+
+
+async def bench_loop_gap(vm: VideoMachine, short_clip_number: int, passes: int, clip_seconds: float) -> float:
+    slot = vm.outputs[1].video_slots[0]
+    vm.set_slot_config(1, 0, SlotFlag.LOOPING, True)
+    vm.play_video(1, 0, short_clip_number, True)
+    await wait_for_cue(slot)
+
+    frame_times: list[float] = []
+
+    def on_buffer(pad, info):
+        frame_times.append(time.monotonic())
+        return Gst.PadProbeReturn.OK
+
+    pad = slot._pipeline.pad
+    probe_id = pad.add_probe(Gst.PadProbeType.BUFFER, on_buffer)
+    await asyncio.sleep(passes * clip_seconds + 0.5)
+    pad.remove_probe(probe_id)
+
+    vm.set_slot_config(1, 0, SlotFlag.LOOPING, False)
+    await stop_slot(slot)
+
+    intervals = [b - a for a, b in zip(frame_times, frame_times[1:])]
+    if not intervals:
+        raise RuntimeError("No frames observed while looping")
+    return max(intervals) - 1.0 / FRAMERATE
+
+
+async def bench_fade_accuracy(vm: VideoMachine, repeats: int) -> list[float]:
+    slot = vm.outputs[1].video_slots[1]
+    plane = RecordingPlane()
+    slot._plane = plane
+    vm.set_slot_config(1, 1, SlotFlag.FADE_IN_TIME_SECONDS, 1.0 / FADE_SLOPE_PER_SECOND)
+
+    values = []
+    for i in range(repeats):
+        slot._alpha = 0.0
+        plane.alpha_commits.clear()
+        vm.play_video(1, 1, 1, True)
+        await wait_for(lambda: slot.state is SlotState.ACTIVE, 5.0, f"fade on {slot}")
+
+        fading = [t for t, alpha in plane.alpha_commits if alpha > 0]
+        full = [t for t, alpha in plane.alpha_commits if alpha >= FULL_ALPHA]
+        values.append(full[0] - fading[0] - 1.0 / FADE_SLOPE_PER_SECOND)
+        await stop_slot(slot)
+
+    slot._plane = None
+    vm.set_slot_config(1, 1, SlotFlag.FADE_IN_TIME_SECONDS, 0.0)
+    return values
+
+
+def bench_osc_dispatch(vm: VideoMachine, messages: int) -> float:
+    """Feed datagrams directly into the dispatcher. Uses set_alpha, which takes no pipeline work."""
+    interface = OscInterface(IPv4Address("127.0.0.1"), 0, vm)
+    builder = OscMessageBuilder("/output0/slot0/set_alpha")
+    builder.add_arg(0.5)
+    datagram = builder.build().dgram
+
+    started = time.perf_counter()
+    for _ in range(messages):
+        interface.dispatcher.call_handlers_for_packet(datagram, ("127.0.0.1", 9000))
+    return messages / (time.perf_counter() - started)
+
+
+def bench_registry_scan(template: Path, counts: list[int]) -> dict[str, float]:
+    results = {}
+    for count in counts:
+        with tempfile.TemporaryDirectory(prefix="theatris_scan_") as directory:
+            for number in range(1, count + 1):
+                shutil.copy(template, Path(directory) / f"{number}_scan{template.suffix}")
+            registry = MediaRegistry(Path(directory))
+            started = time.perf_counter()
+            registry.scan_files()
+            results[f"registry_scan_{count}_files_seconds"] = time.perf_counter() - started
+    return results
+
+
+async def run_playback_benchmarks(vm: VideoMachine, args, results: dict):
+    try:
+        ttff = await bench_time_to_first_frame(vm, args.repeats)
+        results["time_to_first_frame_seconds"] = statistics.median(ttff)
+        results["time_to_first_frame_max_seconds"] = max(ttff)
+        # The first cue after boot pays for everything the warm-up missed
+        results["first_cue_seconds"] = ttff[0]
+        if len(ttff) > 1:
+            results["first_cue_excess_seconds"] = ttff[0] - statistics.median(ttff[1:])
+
+        cue = await bench_cue_to_cue(vm, args.repeats)
+        results["cue_to_cue_seconds"] = statistics.median(cue)
+        results["cue_to_cue_max_seconds"] = max(cue)
+
+        results["loop_gap_seconds"] = await bench_loop_gap(vm, 3, args.loop_passes, args.short_clip_seconds)
+
+        fade = await bench_fade_accuracy(vm, args.repeats)
+        results["fade_error_seconds"] = statistics.median(fade)
+        results["fade_error_max_seconds"] = max(fade, key=abs)
+
+        results["osc_dispatch_messages_per_second"] = bench_osc_dispatch(vm, args.osc_messages)
+    except Exception:
+        logger.exception("Benchmark failed")
+        results["failed"] = True
+    finally:
+        vm.stop()
+
+
+def compare(results: dict, baseline: dict, tolerance: float, absolute: float) -> list[str]:
+    """Returns a description of every metric that got worse than the baseline beyond the tolerance"""
+    regressions = []
+    for metric, reference in baseline.get("results", {}).items():
+        value = results.get(metric)
+        if value is None or isinstance(value, bool):
+            continue
+        if metric in HIGHER_IS_BETTER:
+            worse = value < reference * (1.0 - tolerance)
+        else:
+            # Errors can be negative, compare their magnitude
+            worse = abs(value) > abs(reference) * (1.0 + tolerance) + absolute
+        if worse:
+            regressions.append(f"{metric}: {value:.4f} (baseline {reference:.4f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--clip-seconds", type=float, default=4.0)
+    parser.add_argument("--short-clip-seconds", type=float, default=1.0)
+    parser.add_argument("--loop-passes", type=int, default=4)
+    parser.add_argument("--osc-messages", type=int, default=20000)
+    parser.add_argument("--scan-counts", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument(
+        "--no-warm-up", action="store_true", help="Skip the boot warm-up, to compare the first cue against it"
+    )
+    parser.add_argument("--results", type=Path, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument(
+        "--absolute-tolerance-ms", type=float, default=5.0, help="Allowed absolute regression of durations"
+    )
+    args = parser.parse_args()
+
+    Gst.init(None)
+    config[Conf.HEADLESS] = True
+    config[Conf.WARM_UP] = not args.no_warm_up
+
+    results: dict = {}
+    with tempfile.TemporaryDirectory(prefix="theatris_bench_") as media_dir:
+        clips = generate_clips(Path(media_dir), 2, args.clip_seconds, "bench_clip")
+        generate_clips(Path(media_dir), 1, args.short_clip_seconds, "bench_loop", first_number=3)
+
+        results.update(bench_registry_scan(clips[0], args.scan_counts))
+
+        vm = VideoMachine(media_dir, with_interfaces=False)
+        vm.when_ready(lambda: vm.asyncio_loop.create_task(run_playback_benchmarks(vm, args, results)))
+        vm.start()
+
+    report = {
+        "machine": {
+            "node": platform.node(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "gstreamer": Gst.version_string(),
+        },
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    logger.info("Results: %s", json.dumps(results, indent=2))
+    if args.results:
+        args.results.write_text(json.dumps(report, indent=2))
+
+    if results.get("failed"):
+        sys.exit(1)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        logger.info("Saved baseline to %s", args.baseline)
+        return
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if not baseline.get("results"):
+        logger.warning("No baseline results in %s, run with --save-baseline to record them", args.baseline)
+        return
+
+    regressions = compare(results, baseline, args.tolerance, args.absolute_tolerance_ms / 1000.0)
+    if regressions:
+        logger.error("Regressions against baseline:\n  %s", "\n  ".join(regressions))
+        sys.exit(1)
+    logger.info("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
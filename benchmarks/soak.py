@@ -0,0 +1,218 @@
+"""Soak and leak harness: Runs a random cue workload on a headless VideoMachine and watches resource usage.
+
+The machine uses test outputs with fakesinks and short clips that are generated at start. While a seeded random
+workload plays, stops, pauses, preloads and fades clips on all slots, the harness samples the RSS, the number of open
+file descriptors, GObject instance counts of GStreamer types and the number of GLib sources on the main context.
+
+Exits with status 1 if any of these grows without bound, i.e. it keeps growing after the warm-up phase.
+
+    uv run benchmarks/soak.py --minutes 60 --report soak.json
+"""
+
+import os
+
+# Must be set before the GObject type system is initialized, otherwise instance counts are not tracked
+os.environ.setdefault("GOBJECT_DEBUG", "instance-count")
+
+import argparse  # noqa: E402
+import gc  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+import gi  # noqa: E402
+import psutil  # noqa: E402
+
+gi.require_version("GLib", "2.0")
+gi.require_version("GObject", "2.0")
+gi.require_version("Gst", "1.0")
+from gi.repository import GLib, GObject, Gst  # noqa: E402
+
+from clips import generate_clips  # noqa: E402
+from theatris_rpo.config import config, Conf  # noqa: E402
+from theatris_rpo.slot_flag import SlotFlag  # noqa: E402
+from theatris_rpo.video_machine import VideoMachine  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+TRACKED_GST_TYPES = [
+    "GstPipeline",
+    "GstPlayBin3",
+    "GstBin",
+    "GstBus",
+    "GstFakeSink",
+    "GstAppSrc",
+    "GstGhostPad",
+    "GstPad",
+]
+
+# Allowed growth between the first and the last third of the samples after warm-up: (absolute, relative)
+TOLERANCES = {
+    "rss_bytes": (16 * 1024 * 1024, 0.05),
+    "open_fds": (4, 0.0),
+    "glib_sources": (8, 0.0),
+    "py_pipelines": (4, 0.0),
+}
+GOBJECT_TOLERANCE = (8, 0.05)
+
+class GLibSourceCounter:
+    """Counts the sources attached to the default main context.
+
+    GLib has no API to list sources, but source IDs are handed out in increasing order. Every sample checks the
+    sources that were alive at the last sample and all IDs that were handed out since.
+    """
+
+    def __init__(self):
+        self._live: set[int] = set()
+        self._scanned_up_to = 0
+
+    def count(self) -> int:
+        context = GLib.MainContext.default()
+        newest = GLib.idle_add(lambda: GLib.SOURCE_REMOVE)
+        GLib.source_remove(newest)
+
+        candidates = self._live | set(range(self._scanned_up_to + 1, newest))
+        self._live = {
+            i for i in candidates if context.find_source_by_id(i) is not None
+        }
+        self._scanned_up_to = newest
+        return len(self._live)
+
+
+class SoakHarness:
+    def __init__(self, vm: VideoMachine, file_numbers: list[int], seed: int):
+        self._vm = vm
+        self._file_numbers = file_numbers
+        self._random = random.Random(seed)
+        self._process = psutil.Process()
+        self._sources = GLibSourceCounter()
+        self._started = time.monotonic()
+        self.samples: list[dict] = []
+        self.cues = 0
+
+    def cue(self) -> bool:
+        output = self._random.choice(list(self._vm.outputs.keys()))
+        slot = self._random.randrange(len(self._vm.outputs[output].video_slots))
+        number = self._random.choice(self._file_numbers)
+
+        action = self._random.choices(
+            ["play", "stop", "pause", "alpha", "loop", "preload", "stop_all"],
+            weights=[8, 4, 1, 3, 1, 2, 1],
+        )[0]
+        match action:
+            case "play":
+                self._vm.play_video(output, slot, number, self._random.random() < 0.3)
+            case "stop":
+                self._vm.stop_playout(output, slot)
+            case "pause":
+                self._vm.pause_video(output, slot)
+            case "alpha":
+                self._vm.set_alpha(output, slot, self._random.random())
+            case "loop":
+                self._vm.set_slot_config(
+                    output, slot, SlotFlag.LOOPING, self._random.random() < 0.5
+                )
+            case "preload":
+                self._vm.preload_video(output, slot, number)
+            case "stop_all":
+                self._vm.stop_playout(output)
+        self.cues += 1
+
+        GLib.timeout_add(self._random.randint(100, 1000), self.cue)
+        return GLib.SOURCE_REMOVE
+
+    def sample(self) -> bool:
+        gc.collect()
+        sample = {
+            "t": time.monotonic() - self._started,
+            "cues": self.cues,
+            "rss_bytes": self._process.memory_info().rss,
+            "open_fds": self._process.num_fds(),
+            "glib_sources": self._sources.count(),
+            "py_pipelines": sum(
+                1 for o in gc.get_objects() if isinstance(o, Gst.Pipeline)
+            ),
+        }
+        for type_name in TRACKED_GST_TYPES:
+            gtype = GObject.type_from_name(type_name)
+            if gtype:
+                sample[f"gobject_{type_name}"] = GObject.type_get_instance_count(gtype)
+        self.samples.append(sample)
+        logger.info("Sample: %s", sample)
+        return GLib.SOURCE_CONTINUE
+
+
+def grows_without_bound(values: list[float], absolute: float, relative: float) -> bool:
+    """True if the values keep growing: The last third is (beyond tolerance) above the first third, and the middle
+    third lies in between, i.e. the growth did not level off."""
+    if len(values) < 6:
+        return False
+    third = len(values) // 3
+    first = statistics.median(values[:third])
+    middle = statistics.median(values[third:-third])
+    last = statistics.median(values[-third:])
+    return last > first + absolute + relative * first and first <= middle <= last
+
+
+def evaluate(samples: list[dict], warmup_fraction: float) -> dict[str, bool]:
+    """Returns a verdict per metric, True means it leaks"""
+    samples = samples[int(len(samples) * warmup_fraction):]
+    verdicts = {}
+    for metric in samples[0].keys() if samples else []:
+        if metric in ("t", "cues"):
+            continue
+        absolute, relative = TOLERANCES.get(metric, GOBJECT_TOLERANCE)
+        values = [s[metric] for s in samples if metric in s]
+        verdicts[metric] = grows_without_bound(values, absolute, relative)
+    return verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--sample-seconds", type=float, default=10.0)
+    parser.add_argument("--warmup-fraction", type=float, default=0.25)
+    parser.add_argument("--clips", type=int, default=6)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", type=Path, help="Write all samples and verdicts as JSON")
+    args = parser.parse_args()
+
+    Gst.init(None)
+    config[Conf.HEADLESS] = True
+
+    with tempfile.TemporaryDirectory(prefix="theatris_soak_") as media_dir:
+        clips = generate_clips(
+            Path(media_dir), args.clips, args.clip_seconds, "soak_clip"
+        )
+        logger.info("Generated %d clips in %s", len(clips), media_dir)
+
+        vm = VideoMachine(media_dir, with_interfaces=False)
+        harness = SoakHarness(vm, list(range(1, len(clips) + 1)), args.seed)
+
+        vm.when_ready(lambda: GLib.timeout_add(500, harness.cue))
+        GLib.timeout_add(int(args.sample_seconds * 1000), harness.sample)
+        GLib.timeout_add(int(args.minutes * 60 * 1000), vm.stop)
+        vm.start()
+
+    verdicts = evaluate(harness.samples, args.warmup_fraction)
+    leaks = [metric for metric, leaking in verdicts.items() if leaking]
+
+    report = {"cues": harness.cues, "verdicts": verdicts, "samples": harness.samples}
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2))
+
+    if leaks:
+        logger.error("Unbounded growth detected: %s", ", ".join(leaks))
+        sys.exit(1)
+    logger.info("No unbounded growth detected after %d cues", harness.cues)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
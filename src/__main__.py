@@ -1,11 +1,13 @@
 #
 import argparse
-import logging, logging.handlers
-import sys
+import logging
 
 import gi
 
+# Imported first: The startup phases are timed from here
+from theatris_rpo.startup import startup_report
 from theatris_rpo.config import config, Conf
+from theatris_rpo.log_pipeline import configure_logging
 from theatris_rpo.video_machine import VideoMachine
 
 logger = logging.getLogger(__name__)
@@ -15,14 +17,7 @@ gi.require_version("GObject", "2.0")
 gi.require_version("Gst", "1.0")
 
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="[%(asctime)s.%(msecs)03d][%(name)s] [%(levelname)8s] - %(message)s",
-    datefmt="%H:%M:%S",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+configure_logging(logging.DEBUG)
 
 
 if __name__ == "__main__":
@@ -59,15 +54,212 @@ if __name__ == "__main__":
             "--start-with",
             help="Start playing this file number directly after start-up",
         )
+        parser.add_argument(
+            "--fake-kms",
+            action="store_true",
+            help="Use simulated KMS outputs (planes, alpha, vblank) instead of test outputs when not on a raspberry pi",
+        )
+        parser.add_argument(
+            "--memory-cache-budget-mb",
+            type=int,
+            default=config[Conf.MEMORY_CACHE_BUDGET_BYTES] // (1024 * 1024),
+            help="Total memory that may be used to hold media files in RAM (0 disables the memory cache)",
+        )
+        parser.add_argument(
+            "--memory-cache-threshold-mb",
+            type=int,
+            default=config[Conf.MEMORY_CACHE_FILE_SIZE_THRESHOLD_BYTES] // (1024 * 1024),
+            help="Hold all media files up to this size in RAM, e.g. short loops (0: only files pinned via OSC)",
+        )
+        parser.add_argument(
+            "--frame-ring-budget-mb",
+            type=int,
+            default=config[Conf.FRAME_RING_BUDGET_BYTES] // (1024 * 1024),
+            help="Total memory for decoded frames of short loops (slots with cfg_set_frame_cache, 0 disables it)",
+        )
+        parser.add_argument(
+            "--frame-ring-clip-max-mb",
+            type=int,
+            default=config[Conf.FRAME_RING_CLIP_MAX_BYTES] // (1024 * 1024),
+            help="Larger clips are decoded regularly, so one cannot take the whole frame ring budget (0: no limit)",
+        )
+        parser.add_argument(
+            "--prefetch-bandwidth-mb",
+            type=int,
+            default=config[Conf.PREFETCH_BANDWIDTH_BYTES_PER_SECOND] // (1024 * 1024),
+            help="Read rate (MB/s) for warming upcoming files, so playing slots are not starved (0: unlimited)",
+        )
+        parser.add_argument(
+            "--mirror-dir",
+            help="Keep a local copy of the media files in this directory and play from it when available",
+        )
+        parser.add_argument(
+            "--mirror-budget-mb",
+            type=int,
+            default=config[Conf.MIRROR_BUDGET_BYTES] // (1024 * 1024),
+            help="Disk space for the local mirror, least recently cued files are evicted first",
+        )
+        parser.add_argument(
+            "--mirror-bandwidth-mb",
+            type=int,
+            default=config[Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND] // (1024 * 1024),
+            help="Read rate (MB/s) for copying files into the local mirror (0: unlimited)",
+        )
+        parser.add_argument(
+            "--feedback-rate-hz",
+            type=float,
+            default=config[Conf.FEEDBACK_RATE_HZ],
+            help="Rate at which position and alpha are sent to feedback subscribers (0: every update)",
+        )
+        parser.add_argument(
+            "--osc-ip",
+            default=config[Conf.OSC_IP],
+            help="Address to serve OSC and OSCQuery on (default: address of eth0, loopback if there is none)",
+        )
+        parser.add_argument(
+            "--osc-port",
+            type=int,
+            default=config[Conf.OSC_PORT],
+            help="UDP port for OSC and TCP port for OSCQuery",
+        )
+        parser.add_argument(
+            "--osc-tcp-port",
+            type=int,
+            default=config[Conf.OSC_TCP_PORT],
+            help="Port for OSC over TCP with SLIP framing (0: disabled)",
+        )
+        parser.add_argument(
+            "--show-file",
+            help="Cue list to load at start-up (JSON, relative to BASE_DIR), driven by /go, /back and /goto",
+        )
+        parser.add_argument(
+            "--cue-look-ahead",
+            type=int,
+            default=config[Conf.CUE_LIST_LOOK_AHEAD],
+            help="Number of upcoming cues whose files are warmed ahead of time",
+        )
+        parser.add_argument(
+            "--no-warm-up",
+            action="store_true",
+            help="Do not load the plugin features and preroll a throwaway pipeline per output at boot",
+        )
+        parser.add_argument(
+            "--skip-registry-update",
+            action="store_true",
+            help="Trust the cached GStreamer plugin registry instead of checking all plugin files at start-up "
+                 "(delete the cache after installing plugins)",
+        )
+        parser.add_argument(
+            "--output-processes",
+            action="store_true",
+            help="Run every output in a process of its own, so the outputs use separate cores",
+        )
+        parser.add_argument(
+            "--stall-timeout-ms",
+            type=int,
+            default=config[Conf.STALL_TIMEOUT_MS],
+            help="Rebuild the pipeline of a playing slot that got no new frame for this long (0: disabled)",
+        )
+        parser.add_argument(
+            "--stall-retries",
+            type=int,
+            default=config[Conf.STALL_RETRIES],
+            help="Pipeline rebuilds per stall before the slot is deactivated",
+        )
+        parser.add_argument(
+            "--stall-backoff-ms",
+            type=int,
+            default=config[Conf.STALL_BACKOFF_MS],
+            help="Extra time a rebuilt pipeline gets to show a frame, doubled with every attempt",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=config[Conf.METRICS_PORT],
+            help="HTTP port to serve /metrics in the Prometheus text format on (0: disabled)",
+        )
+        parser.add_argument(
+            "--trace-dir",
+            default=config[Conf.TRACE_DIR],
+            help="Directory for trace captures started via /trace/start",
+        )
+        parser.add_argument(
+            "--trace-max-seconds",
+            type=float,
+            default=config[Conf.TRACE_MAX_SECONDS],
+            help="Longest trace capture",
+        )
+        parser.add_argument(
+            "--trace-max-mb",
+            type=int,
+            default=config[Conf.TRACE_MAX_BYTES] // (1024 * 1024),
+            help="Largest trace capture (uncompressed), the newest %d captures are kept" % config[Conf.TRACE_KEEP_FILES],
+        )
+        parser.add_argument(
+            "--non-blocking-logging",
+            action="store_true",
+            help="Write the log on a thread of its own and rate-limit debug and info lines per call site, so a slow "
+                 "console or journald does not delay fades",
+        )
+        parser.add_argument(
+            "--log-rate-limit",
+            type=float,
+            default=config[Conf.LOG_RATE_LIMIT_PER_SECOND],
+            help="With --non-blocking-logging: Debug and info lines per call site and second (0: no limit)",
+        )
 
         return parser
 
     parser = init_argparse()
     args = parser.parse_args()
 
+    config[Conf.FAKE_KMS] = args.fake_kms and not is_raspi_5
+    config[Conf.MEMORY_CACHE_BUDGET_BYTES] = args.memory_cache_budget_mb * 1024 * 1024
+    config[Conf.MEMORY_CACHE_FILE_SIZE_THRESHOLD_BYTES] = (
+        args.memory_cache_threshold_mb * 1024 * 1024
+    )
+
+    config[Conf.FRAME_RING_BUDGET_BYTES] = args.frame_ring_budget_mb * 1024 * 1024
+    config[Conf.FRAME_RING_CLIP_MAX_BYTES] = args.frame_ring_clip_max_mb * 1024 * 1024
+    config[Conf.PREFETCH_BANDWIDTH_BYTES_PER_SECOND] = (
+        args.prefetch_bandwidth_mb * 1024 * 1024
+    )
+    config[Conf.MIRROR_DIR] = args.mirror_dir
+    config[Conf.MIRROR_BUDGET_BYTES] = args.mirror_budget_mb * 1024 * 1024
+    config[Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND] = (
+        args.mirror_bandwidth_mb * 1024 * 1024
+    )
+    config[Conf.FEEDBACK_RATE_HZ] = args.feedback_rate_hz
+    config[Conf.OSC_IP] = args.osc_ip
+    config[Conf.OSC_PORT] = args.osc_port
+    config[Conf.OSC_TCP_PORT] = args.osc_tcp_port
+    config[Conf.SHOW_FILE] = args.show_file
+    config[Conf.CUE_LIST_LOOK_AHEAD] = args.cue_look_ahead
+    config[Conf.WARM_UP] = not args.no_warm_up
+    config[Conf.GST_REGISTRY_UPDATE] = not args.skip_registry_update
+    config[Conf.OUTPUT_PROCESSES] = args.output_processes
+    config[Conf.STALL_TIMEOUT_MS] = args.stall_timeout_ms
+    config[Conf.STALL_RETRIES] = args.stall_retries
+    config[Conf.STALL_BACKOFF_MS] = args.stall_backoff_ms
+    config[Conf.METRICS_PORT] = args.metrics_port
+    config[Conf.TRACE_DIR] = args.trace_dir
+    config[Conf.TRACE_MAX_SECONDS] = args.trace_max_seconds
+    config[Conf.TRACE_MAX_BYTES] = args.trace_max_mb * 1024 * 1024
+    config[Conf.LOG_NON_BLOCKING] = args.non_blocking_logging
+    config[Conf.LOG_RATE_LIMIT_PER_SECOND] = args.log_rate_limit
+
+    if config[Conf.LOG_NON_BLOCKING]:
+        configure_logging(
+            logging.DEBUG,
+            non_blocking=True,
+            rate_limit_per_second=config[Conf.LOG_RATE_LIMIT_PER_SECOND],
+            rate_limit_burst=config[Conf.LOG_RATE_LIMIT_BURST],
+        )
+
     start_number = None
-    if "start_with" in args:
+    if args.start_with is not None:
         start_number = int(args.start_with)
 
+    startup_report.record("imports", startup_report.origin)
     vm = VideoMachine(args.base_dir, start_number)
     vm.start()
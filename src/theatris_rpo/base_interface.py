@@ -12,6 +12,10 @@ class BaseInterface(abc.ABC):
     def stop(self):
         pass
 
+    def update(self, dt: float):
+        """Called on every update of the video machine, after the outputs were updated"""
+        pass
+
     @abc.abstractmethod
     def send_heartbeat(self, beat_state: bool):
         pass
@@ -0,0 +1,195 @@
+import enum
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from gi.repository import GLib
+
+from theatris_rpo.pipeline_executor import MainContextExecutor
+
+logger = logging.getLogger(__name__)
+
+# Queued commands run for at most this long per main loop iteration, then fades, frames and OSC input get their turn
+TIME_BUDGET_SECONDS = 0.004
+
+
+class Lane(enum.IntEnum):
+    CUE = 0  # play, stop, alpha, ...: run right away, while the message is dispatched
+    NORMAL = 1  # e.g. preload: queued, runs before maintenance
+    MAINTENANCE = 2  # e.g. rescan: queued, runs when nothing else is waiting
+
+
+@dataclass
+class CommandStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def add(self, latency: float):
+        self.count += 1
+        self.total_seconds += latency
+        self.max_seconds = max(self.max_seconds, latency)
+
+
+@dataclass
+class _Command:
+    name: str
+    fn: Callable
+    args: tuple
+    on_done: Callable[[Any], None] | None
+    submitted_at: float
+    client: Any
+    sequence: int
+
+
+class CommandExecutor:
+    """Runs commands by priority, so slow operations never hold up cues.
+
+    Commands of the cue lane run immediately. Other commands are queued per lane and run from an idle source of the
+    main loop, highest lane first and only for a limited time per iteration. As idle sources have the lowest priority,
+    timers (fades, updates) and incoming messages are always handled first. Work that would block the main loop (e.g.
+    scanning the media directory) is run in the background, its result is handed back on the main loop.
+
+    Commands of one client are never reordered: A queued command waits behind queued maintenance commands of the same
+    client, and before a cue command of a client runs, its queued commands are run (see run_queued()).
+
+    The latency of every command (from submitting until it finished) is recorded per command name.
+    """
+
+    def __init__(self, time_budget_seconds: float = TIME_BUDGET_SECONDS):
+        self._time_budget = time_budget_seconds
+        self._queues: dict[Lane, deque[_Command]] = {
+            Lane.NORMAL: deque(),
+            Lane.MAINTENANCE: deque(),
+        }
+        self._drain_source: int | None = None
+        self._sequence = itertools.count()
+        self._current: _Command | None = None
+        self._background = MainContextExecutor(max_workers=1, name="maintenance")
+        self._background_pending = 0
+        self._stats: dict[str, CommandStats] = {}
+
+    @property
+    def stats(self) -> dict[str, CommandStats]:
+        return dict(self._stats)
+
+    def submit(
+            self,
+            lane: Lane,
+            name: str,
+            fn: Callable,
+            *args,
+            on_done: Callable[[Any], None] | None = None,
+            client: Any = None,
+    ) -> Any:
+        """Run fn(*args) in the given lane. Returns the result for the cue lane, None for queued commands, which pass
+        their result to on_done.
+
+        Args:
+            client: Who sent the command (e.g. the address of an OSC client), None if its order does not matter
+        """
+        command = _Command(name, fn, args, on_done, time.monotonic(), client, next(self._sequence))
+        if lane is Lane.CUE:
+            self.run_queued(client)
+            return self._run(command)
+
+        if lane is Lane.NORMAL and client is not None and self._has_queued(Lane.MAINTENANCE, client):
+            lane = Lane.MAINTENANCE
+        self._queues[lane].append(command)
+        if self._drain_source is None:
+            self._drain_source = GLib.idle_add(self._drain)
+        return None
+
+    def run_in_background(
+            self,
+            name: str,
+            fn: Callable,
+            *args,
+            on_done: Callable[[Any], None] | None = None,
+    ):
+        """Run fn(*args) on a worker thread, on_done gets the result on the main loop (None if fn raised)"""
+        submitted_at = time.monotonic()
+        self._background_pending += 1
+
+        def done(result):
+            self._background_pending -= 1
+            self._record(name, submitted_at)
+            if on_done is not None:
+                on_done(result)
+
+        self._background.submit(fn, *args, on_done=done)
+
+    @property
+    def current_client(self) -> Any:
+        """The client of the command that is running, e.g. to reply to it from a background task the command started"""
+        return self._current.client if self._current is not None else None
+
+    def run_queued(self, client: Any):
+        """Run the queued commands of the client now, in the order they were submitted"""
+        if client is None or not any(self._has_queued(lane, client) for lane in self._queues):
+            return
+        commands = []
+        for lane, queue in self._queues.items():
+            commands += [c for c in queue if c.client == client]
+            self._queues[lane] = deque(c for c in queue if c.client != client)
+        for command in sorted(commands, key=lambda c: c.sequence):
+            self._run(command)
+
+    def _has_queued(self, lane: Lane, client: Any) -> bool:
+        return any(c.client == client for c in self._queues[lane])
+
+    def queue_depths(self) -> list[int]:
+        """Number of waiting normal and maintenance commands and of running background tasks"""
+        return [
+            len(self._queues[Lane.NORMAL]),
+            len(self._queues[Lane.MAINTENANCE]),
+            self._background_pending,
+        ]
+
+    def latency_stats(self) -> list:
+        """Flat list of command name, count, mean and max latency (ms)"""
+        result = []
+        for name, stats in sorted(self._stats.items()):
+            result += [name, stats.count, stats.mean_seconds * 1000.0, stats.max_seconds * 1000.0]
+        return result
+
+    def _drain(self) -> bool:
+        deadline = time.monotonic() + self._time_budget
+        while True:
+            command = self._next()
+            if command is None:
+                self._drain_source = None
+                return GLib.SOURCE_REMOVE
+            self._run(command)
+            if time.monotonic() >= deadline:
+                return GLib.SOURCE_CONTINUE
+
+    def _next(self) -> _Command | None:
+        for lane in (Lane.NORMAL, Lane.MAINTENANCE):
+            if self._queues[lane]:
+                return self._queues[lane].popleft()
+        return None
+
+    def _run(self, command: _Command) -> Any:
+        previous, self._current = self._current, command
+        try:
+            result = command.fn(*command.args)
+        except Exception:
+            logger.exception("Command %s failed", command.name)
+            result = None
+        finally:
+            self._current = previous
+        self._record(command.name, command.submitted_at)
+        if command.on_done is not None:
+            command.on_done(result)
+        return result
+
+    def _record(self, name: str, submitted_at: float):
+        self._stats.setdefault(name, CommandStats()).add(time.monotonic() - submitted_at)
@@ -1,15 +1,101 @@
 import enum
+import tempfile
+from pathlib import Path
 from typing import Any
 
 
 class Conf(enum.Enum):
     IS_RASPI_5 = enum.auto()
+    HEADLESS = enum.auto()
+    FAKE_KMS = enum.auto()
+    MEMORY_CACHE_BUDGET_BYTES = enum.auto()
+    MEMORY_CACHE_FILE_SIZE_THRESHOLD_BYTES = enum.auto()
+    FRAME_RING_BUDGET_BYTES = enum.auto()
+    FRAME_RING_CLIP_MAX_BYTES = enum.auto()
+    PREFETCH_HEAD_BYTES = enum.auto()
+    PREFETCH_BANDWIDTH_BYTES_PER_SECOND = enum.auto()
+    MIRROR_DIR = enum.auto()
+    MIRROR_BUDGET_BYTES = enum.auto()
+    MIRROR_BANDWIDTH_BYTES_PER_SECOND = enum.auto()
+    FEEDBACK_RATE_HZ = enum.auto()
+    OSC_IP = enum.auto()
+    OSC_PORT = enum.auto()
+    OSC_TCP_PORT = enum.auto()
+    SHOW_FILE = enum.auto()
+    CUE_LIST_LOOK_AHEAD = enum.auto()
+    WARM_UP = enum.auto()
+    GST_REGISTRY_UPDATE = enum.auto()
+    OUTPUT_PROCESSES = enum.auto()
+    STALL_TIMEOUT_MS = enum.auto()
+    STALL_RETRIES = enum.auto()
+    STALL_BACKOFF_MS = enum.auto()
+    METRICS_PORT = enum.auto()
+    TRACE_DIR = enum.auto()
+    TRACE_MAX_SECONDS = enum.auto()
+    TRACE_MAX_BYTES = enum.auto()
+    TRACE_KEEP_FILES = enum.auto()
+    LOG_NON_BLOCKING = enum.auto()
+    LOG_RATE_LIMIT_PER_SECOND = enum.auto()
+    LOG_RATE_LIMIT_BURST = enum.auto()
 
 
 class Config:
     def __init__(self):
         self._values = {
             Conf.IS_RASPI_5: False,
+            # Render into fakesinks instead of a window, e.g. for soak tests and benchmarks
+            Conf.HEADLESS: False,
+            # Drive HDMI outputs through the simulated KMS backend (fake_kms) when not on a raspberry pi
+            Conf.FAKE_KMS: False,
+            Conf.MEMORY_CACHE_BUDGET_BYTES: 512 * 1024 * 1024,
+            # 0: Only files that are explicitly pinned are held in memory
+            Conf.MEMORY_CACHE_FILE_SIZE_THRESHOLD_BYTES: 0,
+            # Decoded frames are large (a 1080p frame is about 3 MB), so only a few seconds fit
+            Conf.FRAME_RING_BUDGET_BYTES: 1024 * 1024 * 1024,
+            # A single clip may take at most this much of it (per output process: of its share), 0: all of it
+            Conf.FRAME_RING_CLIP_MAX_BYTES: 256 * 1024 * 1024,
+            Conf.PREFETCH_HEAD_BYTES: 32 * 1024 * 1024,
+            Conf.PREFETCH_BANDWIDTH_BYTES_PER_SECOND: 20 * 1024 * 1024,
+            # None: No local mirror, play directly from the media directory
+            Conf.MIRROR_DIR: None,
+            Conf.MIRROR_BUDGET_BYTES: 16 * 1024 * 1024 * 1024,
+            Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND: 10 * 1024 * 1024,
+            # Continuous feedback values (position, alpha while fading) are sent at most this often, state changes right away
+            Conf.FEEDBACK_RATE_HZ: 10.0,
+            # None: The address of eth0, loopback if there is none
+            Conf.OSC_IP: None,
+            # UDP port for OSC and TCP port for OSCQuery
+            Conf.OSC_PORT: 9000,
+            # OSC 1.1 (SLIP framed) over TCP, in addition to UDP on port 9000. 0: disabled
+            Conf.OSC_TCP_PORT: 9001,
+            # Cue list loaded at start-up (JSON, relative to the media directory). None: load one via /cue_list/load
+            Conf.SHOW_FILE: None,
+            # Upcoming cues whose files are warmed, the slots of the first one are preloaded
+            Conf.CUE_LIST_LOOK_AHEAD: 2,
+            # Load the plugin features and preroll a throwaway pipeline per output at boot, so the first cue is not slower
+            Conf.WARM_UP: True,
+            # False: Trust the cached plugin registry instead of checking every plugin file at Gst.init()
+            Conf.GST_REGISTRY_UPDATE: True,
+            # Run every output with its slots in a process of its own, the main process keeps the interfaces and media
+            Conf.OUTPUT_PROCESSES: False,
+            # A playing slot without a new frame for this long is considered stalled and its pipeline rebuilt. 0: disabled
+            Conf.STALL_TIMEOUT_MS: 2000,
+            # Rebuilds per stall before the slot is deactivated
+            Conf.STALL_RETRIES: 3,
+            # Extra time the rebuilt pipeline gets to show a frame, doubled with every attempt
+            Conf.STALL_BACKOFF_MS: 500,
+            # HTTP port for the metrics in the Prometheus text format (on the OSC address). 0: disabled
+            Conf.METRICS_PORT: 9002,
+            # Trace captures (/trace/start) are written here, at most this long and large, older ones are deleted
+            Conf.TRACE_DIR: Path(tempfile.gettempdir()) / "theatris_rpo_traces",
+            Conf.TRACE_MAX_SECONDS: 60.0,
+            Conf.TRACE_MAX_BYTES: 32 * 1024 * 1024,
+            Conf.TRACE_KEEP_FILES: 8,
+            # Write the log on a thread of its own, the callers only enqueue the records
+            Conf.LOG_NON_BLOCKING: False,
+            # With non-blocking logging: Records below WARNING per call site and second (and burst). 0: no limit
+            Conf.LOG_RATE_LIMIT_PER_SECOND: 10.0,
+            Conf.LOG_RATE_LIMIT_BURST: 20,
         }
 
     @property
@@ -0,0 +1,176 @@
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from gi.repository import GLib
+from returns.result import Result, Success, Failure
+
+from theatris_rpo.cue import POLL_INTERVAL_MS, READY_TIMEOUT_SECONDS, ROLLING_TIMEOUT_SECONDS
+from theatris_rpo.slot_state import SlotState
+
+if TYPE_CHECKING:
+    from theatris_rpo.video_slot import VideoSlot
+
+logger = logging.getLogger(__name__)
+
+# How long to wait for the first frame of the rolling incoming clip before fading anyway
+FIRST_FRAME_TIMEOUT_SECONDS = 0.5
+
+# z positions, the incoming clip is blended over the outgoing one
+OUTGOING_Z_POS = 1
+INCOMING_Z_POS = 2
+
+
+class FadeTimeline:
+    """Progress of a fade, derived from the monotonic clock instead of summed up update intervals, so late or skipped
+    updates do not stretch the fade"""
+
+    def __init__(self, seconds: float):
+        self._seconds = seconds
+        self._started_at: float | None = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._started_at is not None
+
+    def start(self, at: float):
+        self._started_at = at
+
+    def progress(self, now: float) -> float:
+        """0.0 before and at the start, 1.0 from the end on"""
+        if self._started_at is None:
+            return 0.0
+        if self._seconds <= 0.0:
+            return 1.0
+        return min(1.0, max(0.0, (now - self._started_at) / self._seconds))
+
+
+class Crossfade:
+    """Crossfades from the clip playing on one slot to a file on another slot of the same output.
+
+    The incoming file is prerolled first, then started blanked at alpha 0 above the outgoing slot. Its alpha ramp
+    starts when the first frame after the start reaches the sink, not when the command arrived, so the clip never fades
+    in before it is there. The ramp is computed on every update from the timeline, and both slots are changed in the
+    same plane commit. With coverage blending the incoming alpha ramp alone blends over the outgoing clip; that slot
+    keeps its alpha underneath (fading it as well would darken the middle of the fade) and is cut and stopped in the
+    commit that makes the incoming clip opaque.
+    """
+
+    def __init__(
+            self,
+            from_slot: "VideoSlot",
+            to_slot: "VideoSlot",
+            file_path: Path,
+            memory_buffer: Any | None,
+            seconds: float,
+    ):
+        self._from = from_slot
+        self._to = to_slot
+        self._file_path = file_path
+        self._memory_buffer = memory_buffer
+        self._timeline = FadeTimeline(seconds)
+        self._deadline = 0.0
+        self._rolled = False
+        self._rolling_at: float | None = None
+        self._done = False
+
+    @property
+    def is_done(self) -> bool:
+        return self._done
+
+    def involves(self, slot: "VideoSlot") -> bool:
+        return slot is self._from or slot is self._to
+
+    def start(self) -> Result[None, str]:
+        to = self._to
+        if to.is_active:
+            return Failure(f"Slot {to.id} on output {to.output.id} is active, cannot crossfade to it")
+        if not (to.is_preloaded and to.current_file_path == self._file_path):
+            match to.preload(self._file_path, self._memory_buffer):
+                case Failure(msg):
+                    return Failure(msg)
+
+        self._from.set_crossfading(True)
+        to.set_crossfading(True)
+        self._deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        if to.is_prerolled:
+            self._roll()
+        else:
+            GLib.timeout_add(POLL_INTERVAL_MS, self._poll)
+        return Success(None)
+
+    def update(self, now: float):
+        """Called on every update of the output"""
+        if self._done:
+            return
+        if not self._rolled:
+            if not self._to.is_preloaded:
+                logger.info("%s was stopped, crossfade cancelled", self._to)
+                self._finish()
+            return
+        if self._to.state not in (SlotState.ACTIVATING, SlotState.ACTIVE):
+            logger.info("%s was stopped, crossfade cancelled", self._to)
+            self._finish()
+            return
+        if self._rolling_at is None:
+            if now > self._deadline:
+                logger.warning("Crossfade: %s did not roll in time, cancelled", self._to)
+                self._finish()
+            return
+        if not self._timeline.is_started:
+            if now - self._rolling_at < FIRST_FRAME_TIMEOUT_SECONDS:
+                return
+            logger.warning("%s: No frame after %.1f s, fading anyway", self._to, FIRST_FRAME_TIMEOUT_SECONDS)
+            self._timeline.start(now)
+
+        progress = self._timeline.progress(now)
+        with self._to.output.deferred_plane_commits():
+            self._to.set_alpha(progress)
+            if progress >= 1.0:
+                if self._from.is_active:
+                    self._from.set_alpha(0.0)
+                    self._from.stop()
+                self._finish()
+
+    def _poll(self) -> bool:
+        if self._done:
+            return GLib.SOURCE_REMOVE
+        if self._to.is_prerolled:
+            self._roll()
+            return GLib.SOURCE_REMOVE
+        if time.monotonic() > self._deadline:
+            logger.warning("Crossfade: %s did not preroll in time, starting anyway", self._to)
+            self._roll()
+            return GLib.SOURCE_REMOVE
+        return GLib.SOURCE_CONTINUE
+
+    def _roll(self):
+        with self._to.output.deferred_plane_commits():
+            self._from.set_z_pos(OUTGOING_Z_POS)
+            match self._to.play(on_rolling=self._on_rolling):
+                case Failure(msg):
+                    logger.warning("Crossfade: %s", msg)
+                    self._finish()
+                    return
+            self._to.set_z_pos(INCOMING_Z_POS)
+        self._rolled = True
+        self._deadline = time.monotonic() + ROLLING_TIMEOUT_SECONDS
+
+    def _on_rolling(self):
+        if self._done:
+            return
+        self._rolling_at = time.monotonic()
+        with self._to.output.deferred_plane_commits():
+            self._to.set_alpha(0.0)
+            self._to.unblank()
+        self._to.on_next_frame(self._on_first_frame)
+
+    def _on_first_frame(self, frame_time: float):
+        if not self._timeline.is_started:
+            self._timeline.start(frame_time)
+
+    def _finish(self):
+        self._done = True
+        self._from.set_crossfading(False)
+        self._to.set_crossfading(False)
@@ -0,0 +1,215 @@
+import enum
+import logging
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from gi.repository import GLib
+from returns.result import Result, Success, Failure
+
+from theatris_rpo.gst_pipeline import StartClock
+
+if TYPE_CHECKING:
+    from theatris_rpo.video_slot import VideoSlot
+
+logger = logging.getLogger(__name__)
+
+# How long to wait for the pipelines of a cue to preroll before starting anyway
+READY_TIMEOUT_SECONDS = 2.0
+# Time between starting the pipelines of a cue and their (shared) first frame
+START_LATENCY_SECONDS = 0.05
+# How long after go() to wait for all clips of a cue to roll before unblanking the ones that do
+ROLLING_TIMEOUT_SECONDS = 2.0
+POLL_INTERVAL_MS = 5
+
+
+class CueAction(enum.Enum):
+    PLAY = "play"  # file number
+    STOP = "stop"
+    PAUSE = "pause"
+    ALPHA = "alpha"  # alpha value 0..1
+
+
+# Number of arguments following output and slot
+CUE_ACTION_ARITY = {
+    CueAction.PLAY: 1,
+    CueAction.STOP: 0,
+    CueAction.PAUSE: 0,
+    CueAction.ALPHA: 1,
+}
+
+
+@dataclass(frozen=True)
+class CueOp:
+    action: CueAction
+    output: int
+    slot: int
+    value: int | float | None = None
+
+
+def parse_cue_args(args: list[Any]) -> Result[list[CueOp], str]:
+    """Parse a compact cue argument list, a sequence of 'action output slot [value]', e.g.
+    ["stop", 0, 0, "play", 0, 1, 12, "play", 1, 0, 13]"""
+    ops = []
+    i = 0
+    while i < len(args):
+        try:
+            action = CueAction(args[i])
+        except ValueError:
+            return Failure(f"Unknown cue action {args[i]!r} at argument {i}")
+
+        arity = CUE_ACTION_ARITY[action]
+        fields = args[i + 1: i + 3 + arity]
+        if len(fields) != 2 + arity or not all(isinstance(f, int) for f in fields[:2]):
+            return Failure(f"Expected output, slot and {arity} value(s) after {action.value!r} at argument {i}")
+
+        value = fields[2] if arity else None
+        match action:
+            case CueAction.PLAY if not isinstance(value, int):
+                return Failure(f"Expected a file number for 'play' at argument {i}")
+            case CueAction.ALPHA if not isinstance(value, (int, float)) or not 0.0 <= value <= 1.0:
+                return Failure(f"Expected an alpha value between 0 and 1 for 'alpha' at argument {i}")
+
+        ops.append(CueOp(action, fields[0], fields[1], value))
+        i += 3 + arity
+
+    if not ops:
+        return Failure("Empty cue")
+    return Success(ops)
+
+
+@dataclass
+class CueStep:
+    op: CueOp
+    slot: "VideoSlot"
+    file_path: Path | None = None
+    memory_buffer: Any | None = None
+
+
+class CueBatch:
+    """Applies the (already validated) steps of a cue together.
+
+    The files of all play steps are prerolled first. Once all are ready (or the ready timeout passed), every step is
+    applied in the same main loop iteration: plane changes are committed once per output, and the new pipelines start
+    on a shared clock, so their first frames appear on the same vblank. The new slots are unblanked together, too, or
+    the ones that rolled once the rolling timeout passed (e.g. because a pipeline failed).
+    """
+
+    def __init__(
+            self,
+            steps: list[CueStep],
+            on_started: Callable[[], None] | None = None,
+            on_ready: Callable[[], None] | None = None,
+    ):
+        """
+        Args:
+            on_started: Called once all clips of the cue are rolling (right after applying the steps if there are none)
+            on_ready: Called instead of applying the steps once all files are prerolled (or the ready timeout passed).
+                The caller applies them with go() then, e.g. together with the cues of other output processes.
+        """
+        self._steps = steps
+        self._on_started = on_started
+        self._on_ready = on_ready
+        self._plays = [s for s in steps if s.op.action is CueAction.PLAY]
+        self._outputs = list({id(s.slot.output): s.slot.output for s in steps}.values())
+        self._rolling: list["VideoSlot"] = []
+        self._deadline = 0.0
+        self._started = False
+        self._rolling_timeout: int | None = None
+
+    def start(self):
+        for step in self._plays:
+            slot = step.slot
+            if slot.is_preloaded and slot.current_file_path == step.file_path:
+                continue
+            match slot.preload(step.file_path, step.memory_buffer, replace_active=True):
+                case Failure(msg):
+                    logger.warning("Cue: %s", msg)
+
+        self._deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        if self._is_ready():
+            self._ready()
+        else:
+            GLib.timeout_add(POLL_INTERVAL_MS, self._poll)
+
+    def _is_ready(self) -> bool:
+        return all(s.slot.is_prerolled for s in self._plays)
+
+    def _poll(self) -> bool:
+        if self._is_ready():
+            self._ready()
+            return GLib.SOURCE_REMOVE
+        if time.monotonic() > self._deadline:
+            logger.warning("Cue: Not all files prerolled in time, starting anyway")
+            self._ready()
+            return GLib.SOURCE_REMOVE
+        return GLib.SOURCE_CONTINUE
+
+    def _ready(self):
+        if self._on_ready is not None:
+            self._on_ready()
+        else:
+            self.go()
+
+    def go(self, start_clock: StartClock | None = None):
+        """Apply the steps. The clips start on the given clock, START_LATENCY_SECONDS from now by default."""
+        if start_clock is None:
+            start_clock = StartClock.in_seconds(START_LATENCY_SECONDS)
+        with self._deferred_commits():
+            for step in self._steps:
+                slot = step.slot
+                match step.op.action:
+                    case CueAction.PLAY:
+                        slot.play(start_clock, on_rolling=lambda s=slot: self._on_rolling(s))
+                    case CueAction.STOP:
+                        match slot.stop():
+                            case Success(_) if not slot.is_auto_faded:
+                                # Cut in the same commit, instead of on the next update
+                                slot.blank()
+                    case CueAction.PAUSE:
+                        slot.pause()
+                    case CueAction.ALPHA:
+                        slot.set_alpha(step.op.value)
+        logger.info("Cue with %d steps started", len(self._steps))
+        if not self._plays:
+            self._started = True
+            if self._on_started is not None:
+                self._on_started()
+        elif not self._started:
+            self._rolling_timeout = GLib.timeout_add(int(ROLLING_TIMEOUT_SECONDS * 1000), self._on_rolling_timeout)
+
+    def _on_rolling(self, slot: "VideoSlot"):
+        if self._started:
+            # Rolled after the timeout, the others are shown already
+            slot.unblank()
+            return
+        self._rolling.append(slot)
+        if len(self._rolling) == len(self._plays):
+            self._show_rolling()
+
+    def _on_rolling_timeout(self) -> bool:
+        self._rolling_timeout = None
+        if not self._started:
+            missing = [str(s.slot) for s in self._plays if s.slot not in self._rolling]
+            logger.warning("Cue: %s not rolling in time, showing the others", ", ".join(missing))
+            self._show_rolling()
+        return GLib.SOURCE_REMOVE
+
+    def _show_rolling(self):
+        self._started = True
+        if self._rolling_timeout is not None:
+            GLib.source_remove(self._rolling_timeout)
+            self._rolling_timeout = None
+        with self._deferred_commits():
+            for rolling in self._rolling:
+                rolling.unblank()
+        if self._on_started is not None:
+            self._on_started()
+
+    def _deferred_commits(self) -> ExitStack:
+        stack = ExitStack()
+        for output in self._outputs:
+            stack.enter_context(output.deferred_plane_commits())
+        return stack
@@ -0,0 +1,298 @@
+import enum
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from returns.result import Result, Success, Failure
+
+from theatris_rpo.command_executor import CommandStats
+from theatris_rpo.cue import CueAction, CueOp, READY_TIMEOUT_SECONDS
+from theatris_rpo.slot_flag import SlotFlag
+
+if TYPE_CHECKING:
+    from theatris_rpo.video_machine import VideoMachine
+
+logger = logging.getLogger(__name__)
+
+# Reserved slots that could not be prepared yet (e.g. still fading out) are checked again this often
+PREPARE_INTERVAL_SECONDS = 0.25
+
+# Reported instead of a cue number when there is no current or standby cue
+NO_CUE = -1.0
+
+
+class StepAction(enum.Enum):
+    PLAY = "play"
+    STOP = "stop"
+
+
+@dataclass(frozen=True)
+class ShowStep:
+    action: StepAction
+    output: int
+    slot: int
+    file: int | None = None
+    fade_in: float = 0.0
+    fade_out: float = 0.0
+    loop: bool = False
+
+
+@dataclass(frozen=True)
+class ShowCue:
+    number: float
+    name: str
+    steps: tuple[ShowStep, ...]
+
+    @property
+    def plays(self) -> list[ShowStep]:
+        return [s for s in self.steps if s.action is StepAction.PLAY]
+
+
+def _parse_step(data: Any, where: str) -> Result[ShowStep, str]:
+    if not isinstance(data, dict):
+        return Failure(f"{where}: Expected an object")
+    try:
+        action = StepAction(data.get("action", "play"))
+    except ValueError:
+        return Failure(f"{where}: Unknown action {data.get('action')!r}")
+
+    output, slot, file = data.get("output"), data.get("slot"), data.get("file")
+    if not isinstance(output, int) or not isinstance(slot, int):
+        return Failure(f"{where}: Expected output and slot numbers")
+    if action is StepAction.PLAY and not isinstance(file, int):
+        return Failure(f"{where}: Expected a file number to play")
+
+    fade_in, fade_out = data.get("fade_in", 0.0), data.get("fade_out", 0.0)
+    if not all(isinstance(t, (int, float)) and t >= 0.0 for t in (fade_in, fade_out)):
+        return Failure(f"{where}: Fade times must be seconds >= 0")
+    loop = data.get("loop", False)
+    if not isinstance(loop, bool):
+        return Failure(f"{where}: 'loop' must be true or false")
+
+    return Success(ShowStep(action, output, slot, file, float(fade_in), float(fade_out), loop))
+
+
+def parse_show(data: Any) -> Result[list[ShowCue], str]:
+    """Parse the content of a show file:
+
+        {"cues": [
+            {"number": 1, "name": "Preshow", "steps": [{"file": 1, "output": 0, "slot": 0, "loop": true}]},
+            {"number": 2, "steps": [
+                {"action": "stop", "output": 0, "slot": 0},
+                {"file": 2, "output": 0, "slot": 1, "fade_in": 0.5}
+            ]}
+        ]}
+
+    Cue numbers are optional (the position in the list by default) and must ascend. Steps play a file (with fade and
+    loop settings for the slot) or stop a slot (fading out for its fade_out seconds if given).
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("cues"), list):
+        return Failure("Expected an object with a list of cues")
+
+    cues = []
+    for i, cue_data in enumerate(data["cues"]):
+        where = f"Cue at position {i + 1}"
+        if not isinstance(cue_data, dict) or not isinstance(cue_data.get("steps"), list):
+            return Failure(f"{where}: Expected an object with a list of steps")
+        number = cue_data.get("number", i + 1)
+        if not isinstance(number, (int, float)) or isinstance(number, bool):
+            return Failure(f"{where}: Cue number must be a number")
+        if cues and number <= cues[-1].number:
+            return Failure(f"{where}: Cue number {number} does not ascend")
+        if not cue_data["steps"]:
+            return Failure(f"{where}: Cue has no steps")
+
+        steps = []
+        slots = set()
+        for j, step_data in enumerate(cue_data["steps"]):
+            match _parse_step(step_data, f"{where}, step {j + 1}"):
+                case Failure(msg):
+                    return Failure(msg)
+                case Success(step):
+                    pass
+            if (step.output, step.slot) in slots:
+                return Failure(f"{where}: Slot {step.slot} on output {step.output} is used twice")
+            slots.add((step.output, step.slot))
+            steps.append(step)
+
+        cues.append(ShowCue(float(number), str(cue_data.get("name", "")), tuple(steps)))
+
+    return Success(cues)
+
+
+def load_show(path: Path) -> Result[list[ShowCue], str]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        return Failure(f"Could not read show file {path}: {e}")
+    return parse_show(data).alt(lambda msg: f"{path}: {msg}")
+
+
+class CueListEngine:
+    """Runs a show: a list of cues that are executed one after the other with GO, or jumped to with BACK and GOTO.
+
+    Since the engine knows which cues come next, it prepares them while the current cue is running. The slots of the
+    cue on standby are reserved and their files preloaded (prerolled) as soon as the slots are idle, so the next GO
+    only has to start pipelines that are already waiting at their first frame. Slots that are still playing cannot be
+    prepared, a show should therefore alternate slots between consecutive cues. The files of the cues after it are
+    warmed (prefetched into the page cache). Preparing starts once a cue is running, so it does not compete with it.
+
+    The execution time of every cue (from GO until all its clips are rolling) is recorded.
+    """
+
+    def __init__(self, vm: "VideoMachine", look_ahead: int = 2):
+        """
+        Args:
+            look_ahead: Number of upcoming cues (including the one on standby) whose files are warmed
+        """
+        self._vm = vm
+        self._look_ahead = look_ahead
+        self._cues: list[ShowCue] = []
+        self._current: int | None = None
+        self._standby = 0
+        self._reserved: dict[tuple[int, int], ShowStep] = {}
+        self._prepared: set[tuple[int, int]] = set()
+        self._prepare_after = 0.0
+        self._execution = CommandStats()
+        self._last_execution: float | None = None
+
+    @property
+    def cues(self) -> list[ShowCue]:
+        return list(self._cues)
+
+    @property
+    def current_number(self) -> float:
+        return NO_CUE if self._current is None else self._cues[self._current].number
+
+    @property
+    def standby_number(self) -> float:
+        return self._cues[self._standby].number if self._standby < len(self._cues) else NO_CUE
+
+    @property
+    def last_execution_ms(self) -> float:
+        return 0.0 if self._last_execution is None else self._last_execution * 1000.0
+
+    def load(self, path: Path) -> Result[None, str]:
+        match load_show(path):
+            case Failure(msg):
+                logger.error(msg)
+                return Failure(msg)
+            case Success(cues):
+                pass
+        self._cues = cues
+        self._current = None
+        self._standby = 0
+        logger.info("Loaded show %s with %d cues", path, len(cues))
+        self._plan()
+        self._prepare()
+        return Success(None)
+
+    def go(self) -> Result[None, str]:
+        if self._standby >= len(self._cues):
+            return Failure("No cue on standby, the end of the cue list is reached")
+        return self._execute(self._standby)
+
+    def back(self) -> Result[None, str]:
+        if not self._current:
+            return Failure("No cue before the current one")
+        return self._execute(self._current - 1)
+
+    def goto(self, number: float) -> Result[None, str]:
+        for index, cue in enumerate(self._cues):
+            if cue.number == number:
+                return self._execute(index)
+        return Failure(f"No cue with number {number}")
+
+    def status(self) -> list[float | int]:
+        """Current and standby cue number, number of cues, last, mean and max execution time (ms), reserved and
+        prepared slots"""
+        return [
+            self.current_number,
+            self.standby_number,
+            len(self._cues),
+            self.last_execution_ms,
+            self._execution.mean_seconds * 1000.0,
+            self._execution.max_seconds * 1000.0,
+            len(self._reserved),
+            len(self._prepared),
+        ]
+
+    def update(self, dt: float):
+        now = time.monotonic()
+        if self._reserved.keys() - self._prepared and now >= self._prepare_after:
+            self._prepare_after = now + PREPARE_INTERVAL_SECONDS
+            self._prepare_slots()
+
+    def _execute(self, index: int) -> Result[None, str]:
+        cue = self._cues[index]
+        go_at = time.monotonic()
+        ops = []
+        slot_config = {}
+        for step in cue.steps:
+            if step.action is StepAction.STOP:
+                ops.append(CueOp(CueAction.STOP, step.output, step.slot))
+                if step.fade_out > 0.0:
+                    # Otherwise the slot fades out as set by the step that played it
+                    slot_config[(step.output, step.slot)] = {SlotFlag.FADE_OUT_TIME_SECONDS: step.fade_out}
+                continue
+            ops.append(CueOp(CueAction.PLAY, step.output, step.slot, step.file))
+            slot_config[(step.output, step.slot)] = {
+                SlotFlag.LOOPING: step.loop,
+                SlotFlag.FADE_IN_TIME_SECONDS: step.fade_in,
+                SlotFlag.FADE_OUT_TIME_SECONDS: step.fade_out,
+            }
+
+        # Moved before the cue is applied, as on_started may be called right away (e.g. for cues that only stop)
+        previous = self._current, self._standby
+        self._current, self._standby = index, index + 1
+        self._plan()
+        # Hold back preparing the next cue until this one is running
+        self._prepare_after = go_at + READY_TIMEOUT_SECONDS
+
+        match self._vm.cue(ops, slot_config, on_started=lambda: self._on_started(cue, go_at)):
+            case Failure(msg):
+                self._current, self._standby = previous
+                self._plan()
+                self._prepare_after = 0.0
+                return Failure(f"Cue {cue.number:g}: {msg}")
+        return Success(None)
+
+    def _on_started(self, cue: ShowCue, go_at: float):
+        self._last_execution = time.monotonic() - go_at
+        self._execution.add(self._last_execution)
+        logger.info("Cue %g %s executed in %.1f ms", cue.number, cue.name, self._last_execution * 1000.0)
+        self._prepare()
+
+    def _plan(self):
+        """Reserve the slots of the standby cue"""
+        self._reserved = {}
+        self._prepared = set()
+        if self._standby < len(self._cues):
+            self._reserved = {(s.output, s.slot): s for s in self._cues[self._standby].plays}
+
+    def _prepare(self):
+        self._prepare_after = 0.0
+        self._prepare_slots()
+        upcoming = self._cues[self._standby + 1: self._standby + self._look_ahead]
+        numbers = sorted({s.file for cue in upcoming for s in cue.plays})
+        if numbers:
+            match self._vm.prefetch_media(numbers):
+                case Failure(msg):
+                    logger.warning("Cue list: %s", msg)
+
+    def _prepare_slots(self):
+        for key, step in self._reserved.items():
+            if key in self._prepared:
+                continue
+            match self._vm.prepare_slot(step.output, step.slot, step.file):
+                case Success(True):
+                    self._prepared.add(key)
+                case Success(False):
+                    logger.debug("Cue list: Slot %d on output %d is busy, preparing it later", step.slot, step.output)
+                case Failure(msg):
+                    # Not retried, the cue will fail with the same message on GO
+                    self._prepared.add(key)
+                    logger.warning("Cue list: %s", msg)
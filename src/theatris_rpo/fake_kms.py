@@ -0,0 +1,245 @@
+"""Simulated KMS backend with the subset of the pykms API that theatris_rpo uses.
+
+Lets the output and slot code that normally only runs on the Raspberry Pi (planes, alpha, zpos) run on any machine,
+e.g. to test, profile or benchmark it end to end. The recent property commits are recorded with a timestamp and the
+virtual vblank at which they would have become visible.
+"""
+
+import collections
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Overlay planes per CRTC, the Raspberry Pi 5 has plenty
+OVERLAY_PLANES_PER_CRTC = 8
+
+# Commits kept by default, a long run (e.g. a benchmark fading for minutes) must not grow without bound
+MAX_RECORDED_COMMITS = 10000
+
+
+@dataclass(frozen=True)
+class VideoMode:
+    hdisplay: int = 1920
+    vdisplay: int = 1080
+    vrefresh: int = 60
+
+    @property
+    def clock(self) -> int:
+        """Pixel clock in kHz, without blanking intervals"""
+        return self.hdisplay * self.vdisplay * self.vrefresh // 1000
+
+
+@dataclass(frozen=True)
+class CommitRecord:
+    requested_at: float  # time.monotonic()
+    vblank: int  # number of the virtual vblank that latched the commit
+    vblank_at: float  # time.monotonic() of that vblank
+    object_type: str
+    object_id: int
+    props: dict[str, Any]
+
+
+@dataclass
+class FakeConnectorConfig:
+    name: str
+    connected: bool = True
+    mode: VideoMode = field(default_factory=VideoMode)
+
+
+DEFAULT_CONNECTORS = [
+    FakeConnectorConfig("HDMI-A-1"),
+    FakeConnectorConfig("HDMI-A-2"),
+]
+
+
+class DrmObject:
+    object_type = "object"
+
+    def __init__(self, card: "Card", idx: int):
+        self._card = card
+        self.id = card.next_object_id()
+        self.idx = idx
+        self._props: dict[str, Any] = {}
+
+    @property
+    def card(self) -> "Card":
+        return self._card
+
+    def get_prop_value(self, name: str) -> Any:
+        return self._props.get(name, 0)
+
+    def set_prop(self, name: str, value: Any):
+        self.set_props({name: value})
+
+    def set_props(self, props: dict[str, Any]):
+        """Commit the properties, like pykms this blocks until the commit is latched if the card blocks commits"""
+        req = AtomicReq(self._card)
+        req.add(self, props)
+        req.commit_sync()
+
+    def _apply(self, props: dict[str, Any]):
+        self._props.update(props)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.id})"
+
+
+class Connector(DrmObject):
+    object_type = "connector"
+
+    def __init__(self, card: "Card", idx: int, cfg: FakeConnectorConfig):
+        super().__init__(card, idx)
+        self.fullname = cfg.name
+        self.connected = cfg.connected
+        self._mode = cfg.mode
+
+    def get_default_mode(self) -> VideoMode:
+        return self._mode
+
+
+class Crtc(DrmObject):
+    object_type = "crtc"
+
+    def __init__(self, card: "Card", idx: int, mode: VideoMode):
+        super().__init__(card, idx)
+        self.mode = mode
+
+
+class Plane(DrmObject):
+    object_type = "plane"
+
+    def __init__(self, card: "Card", idx: int, crtc: Crtc, primary: bool):
+        super().__init__(card, idx)
+        self.crtc = crtc
+        self.primary = primary
+        self._props = {"alpha": 0xFFFF, "zpos": 0, "pixel blend mode": 0}
+
+
+class AtomicReq:
+    """Collects property changes of several objects and applies them in one commit"""
+
+    def __init__(self, card: "Card"):
+        self._card = card
+        self._changes: list[tuple[DrmObject, dict[str, Any]]] = []
+
+    def add(self, obj: DrmObject, props_or_name: dict[str, Any] | str, value: Any = None):
+        if isinstance(props_or_name, str):
+            props_or_name = {props_or_name: value}
+        self._changes.append((obj, dict(props_or_name)))
+
+    def test(self, allow_modeset: bool = False) -> int:
+        return 0
+
+    def commit(self, allow_modeset: bool = False) -> int:
+        """Non-blocking commit, latched at the next virtual vblank"""
+        self._card.commit(self._changes, blocking=False)
+        return 0
+
+    def commit_sync(self, allow_modeset: bool = False) -> int:
+        self._card.commit(self._changes, blocking=self._card.blocking_commits)
+        return 0
+
+
+class Card:
+    """Simulated DRM device with a virtual vblank clock.
+
+    Args:
+        connectors: Connectors (and their modes) the card provides
+        blocking_commits: Block synchronous commits until the next vblank, as the real device does. Disable it to
+            record commits without the waiting, e.g. in unit tests.
+        max_recorded_commits: Keep only the most recent commits, 0: record none
+    """
+
+    def __init__(
+            self,
+            connectors: list[FakeConnectorConfig] | None = None,
+            blocking_commits: bool = True,
+            max_recorded_commits: int = MAX_RECORDED_COMMITS,
+    ):
+        self.fd = -1  # there is no device to hand to kmssink
+        self.has_atomic = True
+        self.blocking_commits = blocking_commits
+
+        self._ids = itertools.count(100)
+        self._epoch = time.monotonic()
+        self._lock = threading.Lock()
+        self._commits: collections.deque[CommitRecord] = collections.deque(maxlen=max_recorded_commits)
+
+        self.connectors: list[Connector] = []
+        self.crtcs: list[Crtc] = []
+        self.planes: list[Plane] = []
+        for idx, cfg in enumerate(connectors or DEFAULT_CONNECTORS):
+            self.connectors.append(Connector(self, idx, cfg))
+            crtc = Crtc(self, idx, cfg.mode)
+            self.crtcs.append(crtc)
+            self.planes.append(Plane(self, len(self.planes), crtc, primary=True))
+            for _ in range(OVERLAY_PLANES_PER_CRTC):
+                self.planes.append(Plane(self, len(self.planes), crtc, primary=False))
+
+        self._refresh = max(cfg.mode.vrefresh for cfg in connectors or DEFAULT_CONNECTORS)
+
+    @property
+    def commits(self) -> list[CommitRecord]:
+        """The recorded commits, oldest first"""
+        with self._lock:
+            return list(self._commits)
+
+    def clear_commits(self):
+        with self._lock:
+            self._commits.clear()
+
+    def next_object_id(self) -> int:
+        return next(self._ids)
+
+    def vblank_period(self) -> float:
+        return 1.0 / self._refresh
+
+    def next_vblank(self, now: float | None = None) -> tuple[int, float]:
+        """Number and time of the first virtual vblank after now"""
+        now = time.monotonic() if now is None else now
+        number = int((now - self._epoch) / self.vblank_period()) + 1
+        return number, self._epoch + number * self.vblank_period()
+
+    def commit(self, changes: list[tuple[DrmObject, dict[str, Any]]], blocking: bool):
+        requested_at = time.monotonic()
+        vblank, vblank_at = self.next_vblank(requested_at)
+        with self._lock:
+            for obj, props in changes:
+                obj._apply(props)
+                self._commits.append(
+                    CommitRecord(requested_at, vblank, vblank_at, obj.object_type, obj.id, props)
+                )
+        if blocking:
+            time.sleep(max(0.0, vblank_at - time.monotonic()))
+
+
+class ResourceManager:
+    def __init__(self, card: Card):
+        self._card = card
+        self._reserved: set[int] = set()
+
+    def reserve_connector(self, name: str = "") -> Connector | None:
+        return self._reserve(
+            c for c in self._card.connectors if not name or c.fullname == name
+        )
+
+    def reserve_crtc(self, connector: Connector) -> Crtc | None:
+        return self._reserve([self._card.crtcs[connector.idx]])
+
+    def reserve_primary_plane(self, crtc: Crtc) -> Plane | None:
+        return self._reserve(p for p in self._card.planes if p.crtc is crtc and p.primary)
+
+    def reserve_overlay_plane(self, crtc: Crtc) -> Plane | None:
+        return self._reserve(p for p in self._card.planes if p.crtc is crtc and not p.primary)
+
+    def _reserve(self, candidates):
+        for obj in candidates:
+            if obj.id not in self._reserved:
+                self._reserved.add(obj.id)
+                return obj
+        return None
@@ -0,0 +1,175 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+from pythonosc.osc_bundle_builder import OscBundleBuilder, IMMEDIATELY
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonoscquery.shared.osc_access import OSCAccess
+from pythonoscquery.shared.osc_address_space import OSCAddressSpace
+from pythonoscquery.shared.osc_path_node import OSCPathNode
+
+if TYPE_CHECKING:
+    from theatris_rpo.video_machine import VideoMachine
+
+logger = logging.getLogger(__name__)
+
+# Keep packets below the usual MTU, so they are not fragmented
+MAX_PACKET_BYTES = 1400
+BUNDLE_HEADER_BYTES = 16  # "#bundle" and the timetag
+
+_UNSENT = object()
+
+ClientAddress = tuple[str, int]
+
+
+@dataclass(frozen=True)
+class FeedbackValue:
+    address: str
+    value: Any
+    continuous: bool  # changes all the time (e.g. position), sent at a limited rate
+
+
+def machine_state(vm: "VideoMachine", include_continuous: bool = True) -> Iterator[FeedbackValue]:
+    """Current values of all feedback addresses. Continuous values are comparatively expensive (position queries the
+    pipeline), they can be left out when they would not be sent anyway."""
+    for output in vm.outputs.values():
+        yield FeedbackValue(f"/output{output.id}/is_connected", output.is_connected, False)
+        for slot in output.video_slots:
+            prefix = f"/output{output.id}/slot{slot.id}"
+            source = slot.current_file_path.name if slot.current_file_path else ""
+            yield FeedbackValue(f"{prefix}/state", slot.state.name.lower(), False)
+            yield FeedbackValue(f"{prefix}/is_playing", slot.is_active and not slot.is_paused, False)
+            yield FeedbackValue(f"{prefix}/is_loop_active", slot.is_looping, False)
+            yield FeedbackValue(f"{prefix}/is_stalled", slot.is_stalled, False)
+            yield FeedbackValue(f"{prefix}/current_source", source, False)
+            if include_continuous:
+                yield FeedbackValue(f"{prefix}/alpha", round(slot.alpha, 3), True)
+                yield FeedbackValue(f"{prefix}/current_elapsed_time", round(slot.position, 2), True)
+    yield FeedbackValue("/cue_list/current", vm.cue_list.current_number, False)
+    yield FeedbackValue("/cue_list/standby", vm.cue_list.standby_number, False)
+    yield FeedbackValue("/cue_list/last_execution_ms", round(vm.cue_list.last_execution_ms, 1), False)
+
+
+def advertise_feedback_nodes(address_space: OSCAddressSpace, values: Iterable[FeedbackValue]):
+    """Add read-only nodes for the feedback addresses to the address space, for OSCQuery"""
+    # Index the containers once, add_node() would search the whole tree for every segment
+    containers = {n.full_path: n for n in address_space.root_node if n.is_container}
+    for item in values:
+        node = OSCPathNode(item.address, access=OSCAccess.READONLY_VALUE, value=[item.value])
+        parent = containers.get(item.address.rsplit("/", 1)[0])
+        if parent is not None:
+            parent.add_child(node)
+        else:
+            address_space.add_node(node)
+            containers = {n.full_path: n for n in address_space.root_node if n.is_container}
+    type(address_space).number_of_nodes.fget.cache_clear()
+
+
+class FeedbackPublisher:
+    """Pushes state changes to subscribed OSC clients.
+
+    Once per tick, the state is compared with what was sent last. Discrete changes (state, source, ...) go out in the
+    same tick, continuous values (position, alpha while fading) at most at the configured rate. All changes of a tick
+    are encoded once, as bundles, and the same packets are sent to every subscriber. New subscribers get the full state
+    on their first tick. Listeners get the same changes as values, e.g. for streaming them via OSCQuery.
+    """
+
+    def __init__(
+            self,
+            state: Callable[[bool], Iterator[FeedbackValue]],
+            send: Callable[[bytes, ClientAddress], None],
+            continuous_rate_hz: float,
+    ):
+        self._state = state
+        self._send = send
+        self._continuous_interval = 1.0 / continuous_rate_hz if continuous_rate_hz > 0 else 0.0
+
+        self._subscribers: set[ClientAddress] = set()
+        self._new_subscribers: set[ClientAddress] = set()
+        self._listeners: list[Callable[[list[FeedbackValue]], None]] = []
+        self._sent: dict[str, Any] = {}
+        self._continuous_sent_at = 0.0
+
+    @property
+    def subscribers(self) -> set[ClientAddress]:
+        return set(self._subscribers)
+
+    def subscribe(self, client: ClientAddress):
+        if client not in self._subscribers:
+            self._new_subscribers.add(client)
+        self._subscribers.add(client)
+        logger.info("Feedback subscriber %s:%s added", *client)
+
+    def add_listener(self, listener: Callable[[list[FeedbackValue]], None]):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, client: ClientAddress):
+        self._subscribers.discard(client)
+        self._new_subscribers.discard(client)
+        logger.info("Feedback subscriber %s:%s removed", *client)
+
+    def tick(self):
+        if not self._subscribers and not self._listeners:
+            return
+
+        now = time.monotonic()
+        send_continuous = (
+            now - self._continuous_sent_at >= self._continuous_interval
+            or bool(self._new_subscribers)
+        )
+
+        snapshot = list(self._state(send_continuous))
+        changes = []
+        for item in snapshot:
+            if self._sent.get(item.address, _UNSENT) == item.value:
+                continue
+            changes.append(item)
+            self._sent[item.address] = item.value
+
+        if any(item.continuous for item in changes):
+            self._continuous_sent_at = now
+
+        if changes:
+            for listener in self._listeners:
+                listener(changes)
+
+        if self._new_subscribers:
+            new, self._new_subscribers = self._new_subscribers, set()
+            for packet in self._packets(snapshot):
+                for client in new:
+                    self._send_to(packet, client)
+            if not changes:
+                return
+            existing = self._subscribers - new
+        else:
+            existing = self._subscribers
+
+        for packet in self._packets(changes):
+            for client in existing:
+                self._send_to(packet, client)
+
+    def _send_to(self, packet: bytes, client: ClientAddress):
+        try:
+            self._send(packet, client)
+        except OSError as e:
+            logger.warning("Could not send feedback to %s:%s: %s", *client, e)
+
+    @staticmethod
+    def _packets(items: list[FeedbackValue]) -> Iterator[bytes]:
+        """Encode the values as bundles that each fit into one datagram"""
+        bundle = OscBundleBuilder(IMMEDIATELY)
+        size = BUNDLE_HEADER_BYTES
+        for item in items:
+            builder = OscMessageBuilder(item.address)
+            builder.add_arg(item.value)
+            message = builder.build()
+            element_size = 4 + message.size  # each element is prefixed with its size
+            if size + element_size > MAX_PACKET_BYTES and size > BUNDLE_HEADER_BYTES:
+                yield bundle.build().dgram
+                bundle = OscBundleBuilder(IMMEDIATELY)
+                size = BUNDLE_HEADER_BYTES
+            bundle.add_content(message)
+            size += element_size
+        if size > BUNDLE_HEADER_BYTES:
+            yield bundle.build().dgram
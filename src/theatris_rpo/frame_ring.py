@@ -0,0 +1,266 @@
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import gi
+
+gi.require_version("Gst", "1.0")
+gi.require_version("GstApp", "1.0")
+from gi.repository import Gst, GstApp  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Frame rate assumed for a clip whose buffers and caps tell none, e.g. a single still frame
+DEFAULT_FRAMERATE = 25
+
+
+class FrameRing:
+    """All decoded frames of a short clip, with timestamps relative to the first frame."""
+
+    def __init__(self, caps: Gst.Caps, frames: list[Gst.Buffer]):
+        self._caps = caps
+        self._frames = frames
+        self._pts = [f.pts for f in frames]
+        self._size_bytes = sum(f.get_size() for f in frames)
+
+        last = frames[-1]
+        frame_duration = last.duration
+        if frame_duration == Gst.CLOCK_TIME_NONE or frame_duration <= 0:
+            frame_duration = (last.pts - frames[0].pts) // max(1, len(frames) - 1)
+        if frame_duration <= 0:
+            # A single frame without a duration, a pass must not be empty (it is looped and seeked modulo)
+            frame_duration = self._caps_frame_duration(caps)
+        self._duration = last.pts + frame_duration
+
+    @property
+    def caps(self) -> Gst.Caps:
+        return self._caps
+
+    @property
+    def frames(self) -> list[Gst.Buffer]:
+        return self._frames
+
+    @property
+    def duration(self) -> int:
+        """Duration of one pass through the ring in nanoseconds"""
+        return self._duration
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    @staticmethod
+    def _caps_frame_duration(caps: Gst.Caps) -> int:
+        structure = caps.get_structure(0) if caps is not None and caps.get_size() > 0 else None
+        if structure is not None:
+            ok, numerator, denominator = structure.get_fraction("framerate")
+            if ok and numerator > 0:
+                return Gst.SECOND * denominator // numerator
+        return Gst.SECOND // DEFAULT_FRAMERATE
+
+    def index_at(self, position: int) -> int:
+        """Index of the frame that is shown at the given position (nanoseconds) within one pass"""
+        return max(0, bisect.bisect_right(self._pts, position) - 1)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self._frames)} frames, {self._duration / Gst.SECOND:.2f}s, {self._size_bytes} bytes)"
+
+
+class FrameRingDecoder:
+    """Decode a file once into a FrameRing. Runs in GStreamer's streaming threads, the result is delivered on the
+    GLib main loop. Delivers None if the clip exceeds the given size limit or can't be decoded."""
+
+    def __init__(
+            self,
+            path: Path,
+            budget_bytes: int,
+            on_done: Callable[[Path, FrameRing | None], None],
+    ):
+        self._path = path
+        self._budget_bytes = budget_bytes
+        self._on_done = on_done
+
+        self._caps = None
+        self._frames: list[Gst.Buffer] = []
+        self._first_pts = None
+        self._size_bytes = 0
+        self._too_large = False
+        self._finished = False
+
+        self._pipeline = Gst.parse_launch(
+            'filesrc name=src ! decodebin ! video/x-raw ! appsink name=sink sync=false emit-signals=true'
+        )
+        self._pipeline.get_by_name("src").set_property("location", str(path))
+        self._pipeline.get_by_name("sink").connect("new-sample", self._on_new_sample)
+
+        self._bus = self._pipeline.get_bus()
+        self._bus.add_signal_watch()
+        self._bus.connect("message::eos", self._on_eos)
+        self._bus.connect("message::error", self._on_error)
+
+    def start(self):
+        logger.debug("Decoding %s into frame ring", self._path)
+        self._pipeline.set_state(Gst.State.PLAYING)
+
+    def _on_new_sample(self, sink: GstApp.AppSink) -> Gst.FlowReturn:
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        if self._caps is None:
+            self._caps = sample.get_caps()
+
+        # The decoder's buffer pool is small, the frames must be copied out of it to hold all of them
+        buffer = sample.get_buffer().copy_deep()
+        self._size_bytes += buffer.get_size()
+        if self._size_bytes > self._budget_bytes:
+            self._too_large = True
+            self._frames.clear()
+            return Gst.FlowReturn.EOS
+
+        if self._first_pts is None:
+            self._first_pts = buffer.pts
+        buffer.pts -= self._first_pts
+        buffer.dts = Gst.CLOCK_TIME_NONE
+        self._frames.append(buffer)
+        return Gst.FlowReturn.OK
+
+    def _on_eos(self, bus, msg):
+        if self._too_large:
+            logger.info(
+                "%s exceeds the frame ring limit of %d bytes per clip, using regular decoding",
+                self._path,
+                self._budget_bytes,
+            )
+            self._finish(None)
+            return
+        if not self._frames:
+            self._finish(None)
+            return
+        self._finish(FrameRing(self._caps, self._frames))
+
+    def _on_error(self, bus, msg):
+        if self._too_large:
+            # Returning EOS from the appsink might surface as an error, this is expected
+            self._on_eos(bus, msg)
+            return
+        error = msg.parse_error()
+        logger.error("Could not decode %s into frame ring: %s", self._path, error[1])
+        self._finish(None)
+
+    def _finish(self, ring: FrameRing | None):
+        if self._finished:
+            return
+        self._finished = True
+        self._bus.remove_signal_watch()
+        self._pipeline.set_state(Gst.State.NULL)
+        self._on_done(self._path, ring)
+
+
+class FrameRingCache:
+    """Holds decoded frame rings of short clips within a total memory budget (LRU eviction).
+
+    Clips are decoded in the background on the first lookup. Clips larger than clip_max_bytes are remembered, so they
+    are not decoded again and the caller falls back to regular decoding for them. The limit keeps one long clip from
+    evicting all the short loops the cache is meant for. 0: up to the whole budget
+    """
+
+    def __init__(self, budget_bytes: int, clip_max_bytes: int = 0):
+        self._budget_bytes = budget_bytes
+        self._clip_max_bytes = min(clip_max_bytes, budget_bytes) if clip_max_bytes > 0 else budget_bytes
+        self._rings: OrderedDict[Path, FrameRing] = OrderedDict()
+        self._decoding: dict[Path, FrameRingDecoder] = {}
+        self._rejected: set[Path] = set()
+        self._used_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def lookup(self, path: Path) -> FrameRing | None:
+        """Return the frame ring of the file, or None if the file must be decoded regularly (for now)."""
+        if self._budget_bytes <= 0:
+            return None
+        with self._lock:
+            ring = self._rings.get(path)
+            if ring is not None:
+                self._rings.move_to_end(path)
+                return ring
+            if path in self._rejected or path in self._decoding:
+                return None
+
+        decoder = FrameRingDecoder(path, self._clip_max_bytes, self._on_decoded)
+        with self._lock:
+            self._decoding[path] = decoder
+        decoder.start()
+        return None
+
+    def retain(self, paths):
+        paths = set(paths)
+        with self._lock:
+            for path in list(self._rings.keys()):
+                if path not in paths:
+                    self._used_bytes -= self._rings.pop(path).size_bytes
+            self._rejected &= paths
+
+    def _on_decoded(self, path: Path, ring: FrameRing | None):
+        with self._lock:
+            self._decoding.pop(path, None)
+            if ring is None:
+                self._rejected.add(path)
+                return
+            while self._rings and self._used_bytes + ring.size_bytes > self._budget_bytes:
+                evicted_path, evicted = self._rings.popitem(last=False)
+                self._used_bytes -= evicted.size_bytes
+                logger.debug("Evicted frame ring of %s", evicted_path)
+            self._rings[path] = ring
+            self._used_bytes += ring.size_bytes
+        logger.info("Frame ring of %s ready: %s", path, ring)
+
+
+class FrameRingFeeder:
+    """Feed the frames of a ring into an appsrc with continuous timestamps, so the clip loops without a gap."""
+
+    def __init__(self, ring: FrameRing, is_looping: Callable[[], bool]):
+        self._ring = ring
+        self._is_looping = is_looping
+        self._index = 0
+        self._base = 0
+        self._eos = False
+
+    def attach(self, source: GstApp.AppSrc):
+        source.set_property("format", Gst.Format.TIME)
+        source.set_property("stream-type", GstApp.AppStreamType.SEEKABLE)
+        source.set_property("caps", self._ring.caps)
+        source.set_property("max-bytes", 2 * self._ring.frames[0].get_size())
+        source.connect("need-data", self._on_need_data)
+        source.connect("seek-data", self._on_seek_data)
+
+    def _on_need_data(self, source, length):
+        """Called from the streaming thread."""
+        if self._eos:
+            source.emit("end-of-stream")
+            return
+
+        frame = self._ring.frames[self._index]
+        buffer = frame.copy()  # shares the frame's memory, only the metadata is copied
+        buffer.pts = self._base + frame.pts
+        source.emit("push-buffer", buffer)
+
+        self._index += 1
+        if self._index >= len(self._ring.frames):
+            if self._is_looping():
+                self._index = 0
+                self._base += self._ring.duration
+            else:
+                self._eos = True
+
+    def _on_seek_data(self, source, position) -> bool:
+        in_pass = position % self._ring.duration
+        self._index = self._ring.index_at(in_pass)
+        self._base = position - in_pass
+        self._eos = False
+        return True
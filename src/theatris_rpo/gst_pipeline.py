@@ -1,11 +1,19 @@
+import collections
 import logging
 import pathlib
+import time
 from abc import abstractmethod, ABC
+from dataclasses import dataclass
 from typing import TYPE_CHECKING, Callable
 
-from gi.repository import Gst, GLib
+import gi
+
+gi.require_version("GstApp", "1.0")
+from gi.repository import Gst, GstApp, GLib  # noqa: E402
 
 from theatris_rpo.config import config, Conf
+from theatris_rpo.frame_ring import FrameRing, FrameRingFeeder
+from theatris_rpo.pipeline_executor import pipeline_executor
 
 if TYPE_CHECKING:
     from theatris_rpo.video_slot import VideoSlot
@@ -13,6 +21,21 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class StartClock:
+    """Clock and base time shared by pipelines that are started together, so their first frames are rendered at the
+    same moment"""
+
+    clock: Gst.Clock
+    base_time: int
+
+    @classmethod
+    def in_seconds(cls, latency_seconds: float) -> "StartClock":
+        """Running time 0 lies latency_seconds ahead, which must be enough to get all pipelines to playing"""
+        clock = Gst.SystemClock.obtain()
+        return cls(clock, clock.get_time() + int(latency_seconds * Gst.SECOND))
+
+
 class BasePipeline(ABC):
     def __init__(self, slot: "VideoSlot"):
         self._slot = slot
@@ -22,6 +45,17 @@ class BasePipeline(ABC):
         self._gst_state_new = None
         self._gst_state_pending = None
 
+        self._bus = None
+        self._bus_handler_ids = []
+        self._torn_down = False
+        self._uses_start_clock = False
+
+        self._frame_count = 0
+        self._last_frame_time: float | None = None
+        self._last_frame_pts: int | None = None
+        # Appended to on the main context and drained on the streaming thread, append() and popleft() are atomic
+        self._frame_callbacks: collections.deque[Callable[[float], None]] = collections.deque()
+
         self._sink = Gst.Bin.new("sink")
         if config[Conf.IS_RASPI_5]:
             self._kmssink = Gst.ElementFactory.make("kmssink", "kmssink")
@@ -50,18 +84,25 @@ class BasePipeline(ABC):
             self._sink.add_pad(self.ghostpad)
 
         else:
-            self._autovideosink = Gst.ElementFactory.make(
-                "autovideosink", "autovideosink"
-            )
-            self._sink.add(self._autovideosink)
+            if config[Conf.HEADLESS]:
+                self._videosink = Gst.ElementFactory.make("fakesink", "fakesink")
+                self._videosink.set_property("sync", True)
+            else:
+                self._videosink = Gst.ElementFactory.make(
+                    "autovideosink", "autovideosink"
+                )
+            self._sink.add(self._videosink)
 
-            self.pad = self._autovideosink.get_static_pad("sink")
+            self.pad = self._videosink.get_static_pad("sink")
             self.ghostpad = Gst.GhostPad.new("sink", self.pad)
             self.ghostpad.set_active(True)
             self._sink.add_pad(self.ghostpad)
 
         self._build_pipeline()
 
+        # Observe every frame that reaches the sink
+        self.pad.add_probe(Gst.PadProbeType.BUFFER, self._on_frame_probe)
+
         if config[Conf.IS_RASPI_5]:
             try:
                 display_width = self.slot.output.width
@@ -82,19 +123,99 @@ class BasePipeline(ABC):
             if slot.plane:
                 self._kmssink.set_property("plane-id", slot.plane.id)
 
-        # Create bus and connect several handlers
-        self._bus = self._pipeline.get_bus()
-        self._bus.add_signal_watch()
-        self._bus.connect("message::state-changed", self._on_state_changed)
-        self._bus.connect("message::eos", self._on_eos)
-        self._bus.connect("message::error", self._on_error)
-
     @property
     def slot(self):
         return self._slot
 
+    @property
+    def gst_pipeline(self) -> Gst.Pipeline:
+        return self._pipeline
+
+    @property
+    def frame_count(self) -> int:
+        """Number of frames that reached the sink"""
+        return self._frame_count
+
+    @property
+    def last_frame_time(self) -> float | None:
+        """time.monotonic() when the last frame reached the sink"""
+        return self._last_frame_time
+
+    @property
+    def dropped_frames(self) -> int:
+        """Frames the sink dropped because they were too late, see the stats of GstBaseSink"""
+        sink = self._kmssink if config[Conf.IS_RASPI_5] else self._videosink
+        if isinstance(sink, Gst.Bin):
+            # autovideosink wraps the actual sink, which exists once the pipeline was started
+            if sink.get_children_count() == 0:
+                return 0
+            sink = sink.get_child_by_index(0)
+        ok, dropped = sink.get_property("stats").get_uint64("dropped")
+        return dropped if ok else 0
+
+    @property
+    def last_frame_position(self) -> float | None:
+        """Timestamp (seconds) of the last frame that reached the sink, still known when the pipeline hangs or failed"""
+        if self._last_frame_pts is None:
+            return None
+        return self._last_frame_pts / Gst.SECOND
+
+    @property
+    def position(self) -> float | None:
+        """Playback position in seconds, None if unknown (e.g. not prerolled yet)"""
+        ok, position = self._pipeline.query_position(Gst.Format.TIME)
+        if not ok or position < 0:
+            return None
+        return position / Gst.SECOND
+
+    def on_next_frame(self, callback: Callable[[float], None]):
+        """Call back once (on the main context) when the next frame reaches the sink, with its monotonic arrival
+        time. Note that the first frame of a prerolled pipeline already arrived while prerolling."""
+        self._frame_callbacks.append(callback)
+
+    def _on_frame_probe(self, pad, info) -> Gst.PadProbeReturn:
+        """Called from the streaming thread for every buffer. Keep this cheap."""
+        now = time.monotonic()
+        self._frame_count += 1
+        self._last_frame_time = now
+        pts = info.get_buffer().pts
+        if pts != Gst.CLOCK_TIME_NONE:
+            self._last_frame_pts = pts
+        # Only this thread takes callbacks out, one appended meanwhile is taken now or with the next frame
+        while self._frame_callbacks:
+            GLib.idle_add(self._frame_callbacks.popleft(), now)
+        return Gst.PadProbeReturn.OK
+
+    def attach_bus(self):
+        """Connect the bus handlers. Must be called on the main context, the signal watch is attached to it."""
+        self._bus = self._pipeline.get_bus()
+        self._bus.add_signal_watch()
+        self._bus_handler_ids = [
+            self._bus.connect("message::state-changed", self._on_state_changed),
+            self._bus.connect("message::eos", self._on_eos),
+            self._bus.connect("message::error", self._on_error),
+        ]
+
+    def detach_bus(self):
+        """Remove the signal watch and handlers again, otherwise they keep the pipeline alive."""
+        if self._bus is None:
+            return
+        for handler_id in self._bus_handler_ids:
+            self._bus.disconnect(handler_id)
+        self._bus_handler_ids = []
+        self._bus.remove_signal_watch()
+        self._bus = None
+
+    def teardown(self):
+        """Set the pipeline to NULL. This may block for a while, so call it from a worker thread (after detach_bus()
+        has been called on the main context)."""
+        self._torn_down = True
+        self._pipeline.set_state(Gst.State.NULL)
+
     @abstractmethod
-    def set_source_file(self, file_path: pathlib.Path):
+    def set_source_file(
+            self, file_path: pathlib.Path, memory_buffer: Gst.Buffer | None = None
+    ):
         raise NotImplementedError
 
     def _on_eos(self, bus, msg):
@@ -144,9 +265,13 @@ class BasePipeline(ABC):
     def _transition_to_playing(self,
                                callback: Callable | None = None, ):
         """'Wait' (by polling) for the next required state to get the pipeline into playing state"""
-        _, state, _ = self._pipeline.get_state(
-            2000 * 1000 * 1000
-        )  # or: Gst.CLOCK_TIME_NONE to wait (and block!) indefinitely
+        if self._torn_down:
+            return
+        result, state, _ = self._pipeline.get_state(0)
+        if result == Gst.StateChangeReturn.ASYNC:
+            # Still changing state, check again later instead of blocking the main loop
+            GLib.timeout_add(20, self._transition_to_playing, callback)
+            return
         match state:
             case Gst.State.READY:
                 logger.debug("%s: (to playing) Setting to paused...", self)
@@ -156,6 +281,10 @@ class BasePipeline(ABC):
                 self._pipeline.set_state(Gst.State.PLAYING)
             case Gst.State.PLAYING:
                 logger.debug("%s: (to playing) is playing.", self)
+                if self._uses_start_clock:
+                    # Let the pipeline distribute the base time itself again, e.g. when resuming after pause
+                    self._pipeline.set_start_time(0)
+                    self._uses_start_clock = False
                 # Transition finished, inform interested parties
                 if callback:
                     callback()
@@ -176,9 +305,15 @@ class BasePipeline(ABC):
     ):
         """'Wait' (by polling) for the next required state to get the pipeline into paused state.
         Rewind (seek to 0) if flag is set."""
-        _, state, _ = self._pipeline.get_state(
-            2000 * 1000 * 1000
-        )  # or: Gst.CLOCK_TIME_NONE to wait (and block!) indefinitely
+        if self._torn_down:
+            return
+        result, state, _ = self._pipeline.get_state(0)
+        if result == Gst.StateChangeReturn.ASYNC:
+            # Still changing state, check again later instead of blocking the main loop
+            GLib.timeout_add(
+                20, self._transition_to_paused, rewind, callback, even_when_inactive
+            )
+            return
         match state:
             case Gst.State.PAUSED:
                 logger.debug("%s: (to paused) is paused.", self)
@@ -202,28 +337,58 @@ class BasePipeline(ABC):
             20, self._transition_to_paused, rewind, callback, even_when_inactive
         )
 
-    def roll(self, callback: Callable | None = None):
+    @property
+    def is_prerolled(self) -> bool:
+        """Paused with the first frame decoded, i.e. ready to start right away"""
+        _, state, pending = self._pipeline.get_state(0)
+        return state == Gst.State.PAUSED and pending == Gst.State.VOID_PENDING
+
+    def roll(
+            self,
+            callback: Callable | None = None,
+            start_clock: StartClock | None = None,
+    ):
         """Set the pipeline to playing via well-defined transitions.
-        This *will not* retrigger an already playing pipeline."""
+        This *will not* retrigger an already playing pipeline.
+
+        Args:
+            start_clock: Start on this clock and base time instead of as soon as possible
+        """
+        if start_clock is not None and not self._torn_down:
+            self._pipeline.use_clock(start_clock.clock)
+            self._pipeline.set_start_time(Gst.CLOCK_TIME_NONE)
+            self._pipeline.set_base_time(start_clock.base_time)
+            self._uses_start_clock = True
         self._transition_to_playing(callback=callback)
 
     def pause(self):
         """Stop playback, but don't blank or rewind."""
         self._transition_to_paused(rewind=False)
 
+    def preroll(self, callback: Callable | None = None):
+        """Bring a pipeline of an inactive slot to paused, so the first frame is decoded before playback starts."""
+        self._transition_to_paused(callback=callback, even_when_inactive=True)
+
     def stop(self):
         """Stop playback and rewind the stream."""
         self._transition_to_paused(rewind=True)
 
     def stop_immediately(self):
-        """Stop playback without transition."""
-        self._pipeline.set_state(Gst.State.NULL)
+        """Stop playback without transition. Setting the pipeline to NULL happens on a worker thread."""
+        self.detach_bus()
+        self._torn_down = True
+        pipeline_executor.submit(self.teardown)
 
     def rewind(self):
         """Seek to time 0, i.e. start of stream"""
-        dest_seek = 0
+        self.seek(0.0)
+
+    def seek(self, position_seconds: float):
+        """Seek to the key frame at (or before) the position, e.g. to continue after the pipeline was rebuilt"""
         self._pipeline.seek_simple(
-            Gst.Format.TIME, Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT, dest_seek
+            Gst.Format.TIME,
+            Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT,
+            int(position_seconds * Gst.SECOND),
         )
 
     def __repr__(self):
@@ -231,18 +396,62 @@ class BasePipeline(ABC):
 
 
 class VideoPipelinePlaybin3(BasePipeline):
+    APPSRC_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, slot: "VideoSlot"):
         self._playbin = Gst.ElementFactory.make("playbin3", "playbin")
+        self._memory_buffer: Gst.Buffer | None = None
+        self._memory_offset = 0
         super().__init__(slot)
 
     def _build_pipeline(self):
         self._pipeline.add(self._playbin)
         self._playbin.set_property("video-sink", self._sink)
+        if config[Conf.HEADLESS]:
+            self._playbin.set_property(
+                "audio-sink", Gst.ElementFactory.make("fakesink", "audiosink")
+            )
+        self._playbin.connect("source-setup", self._on_source_setup)
 
-    def set_source_file(self, srcFileName: pathlib.Path):
+    def set_source_file(
+            self, srcFileName: pathlib.Path, memory_buffer: Gst.Buffer | None = None
+    ):
+        self._memory_buffer = memory_buffer
+        if memory_buffer is not None:
+            # Feed the file content from memory, see _on_source_setup()
+            logger.debug("%s: Playing %s from memory", self, srcFileName)
+            self._playbin.set_property("uri", "appsrc://")
+            return
         file_name = "file://" + str(srcFileName)
         self._playbin.set_property("uri", file_name)
 
+    def _on_source_setup(self, playbin, source):
+        if self._memory_buffer is None:
+            return
+        source.set_property("format", Gst.Format.BYTES)
+        source.set_property("stream-type", GstApp.AppStreamType.RANDOM_ACCESS)
+        source.set_property("size", self._memory_buffer.get_size())
+        source.connect("need-data", self._on_appsrc_need_data)
+        source.connect("seek-data", self._on_appsrc_seek_data)
+
+    def _on_appsrc_need_data(self, source, length):
+        """Called from the streaming thread. Push a chunk that shares the memory of the cached buffer."""
+        total = self._memory_buffer.get_size()
+        if self._memory_offset >= total:
+            source.emit("end-of-stream")
+            return
+        size = min(max(length, self.APPSRC_CHUNK_SIZE), total - self._memory_offset)
+        chunk = self._memory_buffer.copy_region(
+            Gst.BufferCopyFlags.MEMORY, self._memory_offset, size
+        )
+        chunk.offset = self._memory_offset
+        self._memory_offset += size
+        source.emit("push-buffer", chunk)
+
+    def _on_appsrc_seek_data(self, source, offset) -> bool:
+        self._memory_offset = offset
+        return True
+
 
 class VideoPipelineDecodebin(BasePipeline):
     def __init__(self, slot: "VideoSlot"):
@@ -272,7 +481,9 @@ class VideoPipelineDecodebin(BasePipeline):
         if not self._capsfilter.link(self._sink):
             logger.error("Link Error: caps_filter -> sink")
 
-    def set_source_file(self, srcFileName: pathlib.Path):
+    def set_source_file(
+            self, srcFileName: pathlib.Path, memory_buffer: Gst.Buffer | None = None
+    ):
         self._source.set_property("location", str(srcFileName))
 
 
@@ -298,5 +509,30 @@ class VideoPipelineTestSrc(BasePipeline):
         if not self._source.link(self._sink):
             logger.error("Link Error: source -> sink")
 
-    def set_source_file(self, file_path: pathlib.Path):
+    def set_source_file(
+            self, file_path: pathlib.Path, memory_buffer: Gst.Buffer | None = None
+    ):
+        pass
+
+
+class VideoPipelineFrameRing(BasePipeline):
+    """Plays a clip from its already decoded frames, no decoder is involved."""
+
+    def __init__(self, slot: "VideoSlot", ring: FrameRing):
+        self._source = Gst.ElementFactory.make("appsrc")
+        self._feeder = FrameRingFeeder(ring, lambda: slot.is_looping)
+        super().__init__(slot)
+
+    def _build_pipeline(self):
+        self._pipeline.add(self._source)
+        self._pipeline.add(self._sink)
+
+        self._feeder.attach(self._source)
+
+        if not self._source.link(self._sink):
+            logger.error("Link Error: source -> sink")
+
+    def set_source_file(
+            self, file_path: pathlib.Path, memory_buffer: Gst.Buffer | None = None
+    ):
         pass
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import TextIO
+
+LOG_FORMAT = "[%(asctime)s.%(msecs)03d][%(name)s] [%(levelname)8s] - %(message)s"
+LOG_DATE_FORMAT = "%H:%M:%S"
+LOGGING_THREAD_NAME = "logging"
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most per_second records of a call site (file and line) through, with bursts of up to burst records, so a
+    debug line in a loop (e.g. every fade step) cannot flood the log. Records from WARNING up always pass. The next
+    record that passes tells how many were suppressed.
+
+    Runs on the calling threads, before a record is queued, without a lock: Concurrent records of the same call site
+    may be miscounted by one.
+    """
+
+    def __init__(self, per_second: float, burst: int, min_level: int = logging.WARNING):
+        super().__init__()
+        self._per_second = per_second
+        self._burst = float(burst)
+        self._min_level = min_level
+        # Per call site: tokens left, time of the last refill and suppressed records since the last one that passed
+        self._sites: dict[tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self._min_level:
+            return True
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        site = self._sites.get(key)
+        if site is None:
+            site = self._sites[key] = [self._burst, now, 0]
+        tokens = min(self._burst, site[0] + (now - site[1]) * self._per_second)
+        site[1] = now
+        if tokens < 1.0:
+            site[0] = tokens
+            site[2] += 1
+            return False
+        site[0] = tokens - 1.0
+        if site[2]:
+            record.msg = f"{record.msg} ({site[2]} similar suppressed)"
+            site[2] = 0
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Hands the record to the listener as it is: The message is formatted on the listener thread, not by the caller.
+    Only for a listener in the same process, arguments are formatted as they are when the listener gets to them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _NonBlockingLogging:
+    def __init__(self, handler: LazyQueueHandler, target: logging.Handler):
+        self.handler = handler
+        self.target = target
+        self.listener: logging.handlers.QueueListener | None = None
+
+    def start(self):
+        # A fresh queue, a forked process must not share the records left in the queue of its parent
+        self.handler.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self.listener._thread.name = LOGGING_THREAD_NAME
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+_non_blocking: _NonBlockingLogging | None = None
+
+
+def configure_logging(
+        level: int = logging.DEBUG,
+        non_blocking: bool = False,
+        rate_limit_per_second: float = 0.0,
+        rate_limit_burst: int = 20,
+        stream: TextIO | None = None,
+):
+    """Log to stdout (or the stream), replaces an earlier configuration.
+
+    non_blocking: The callers only enqueue the records, a thread formats and writes them, so a slow console or journald
+    does not hold up the main loop. Records still queued are written at exit, see stop_logging().
+
+    rate_limit_per_second: Limit the records per call site below WARNING, see RateLimitFilter. 0: no limit
+    """
+    global _non_blocking
+    stop_logging()
+
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+    handler: logging.Handler = target
+    if non_blocking:
+        handler = LazyQueueHandler(queue.SimpleQueue())
+        _non_blocking = _NonBlockingLogging(handler, target)
+        _non_blocking.start()
+    if rate_limit_per_second > 0.0:
+        handler.addFilter(RateLimitFilter(rate_limit_per_second, rate_limit_burst))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+def stop_logging():
+    """Write the records that are still queued and stop the thread of the non-blocking logging"""
+    global _non_blocking
+    if _non_blocking is not None:
+        _non_blocking.stop()
+        _non_blocking = None
+
+
+def _after_fork_in_child():
+    # The thread of the listener is not forked along, the output processes get one of their own
+    if _non_blocking is not None:
+        _non_blocking.start()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(stop_logging)
@@ -0,0 +1,246 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from theatris_rpo.media_registry.prefetch import throttle
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+META_SUFFIX = ".mirror.json"
+PARTIAL_SUFFIX = ".partial"
+
+# Priorities of the sync queue, lower is more urgent
+PRIORITY_CUED = 0
+PRIORITY_BACKGROUND = 1
+
+
+@dataclass
+class MirrorEntry:
+    size: int
+    mtime: float
+    sha256: str
+    last_cued: float = 0.0
+
+
+class LocalMirror:
+    """Mirror of the media share on local disk.
+
+    resolve() returns the local copy of a file if it is complete and still matches the source (size and mtime; the
+    checksum is verified when an existing mirror is adopted at start-up). Otherwise, it returns the source path and
+    queues the file for copying, so a slot never waits for a copy.
+
+    Files are copied by a background thread with limited bandwidth. Copies become visible by an atomic rename only
+    after they are complete. If the disk budget is exceeded, the least recently cued copies are evicted. Filling the
+    mirror in the background never evicts anything, only files that were actually cued may do so.
+    """
+
+    def __init__(
+            self,
+            base_dir: Path,
+            mirror_dir: Path,
+            budget_bytes: int,
+            bandwidth_bytes_per_second: int,
+    ):
+        self._base_dir = base_dir
+        self._mirror_dir = mirror_dir
+        self._budget_bytes = budget_bytes
+        self._bandwidth = bandwidth_bytes_per_second
+
+        self._entries: dict[Path, MirrorEntry] = {}  # by source path
+        self._pending: set[Path] = set()
+        self._used_bytes = 0
+        self._lock = threading.Lock()
+
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()  # keeps the queue FIFO within a priority
+        self._thread: threading.Thread | None = None
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def mirror_path(self, source: Path) -> Path:
+        return self._mirror_dir / source.relative_to(self._base_dir)
+
+    def adopt_existing(self, sources):
+        """Take over copies from a previous run that still match their source. Sources that are mirrored already are
+        skipped. Runs the checksum verification, so this should not be called on the main loop."""
+        for source in sources:
+            if self.is_mirrored(source):
+                continue
+            local = self.mirror_path(source)
+            meta = self._read_meta(local)
+            if meta is None or not local.exists():
+                continue
+            if not self._matches(source, local, meta) or self._sha256(local) != meta.sha256:
+                logger.info("Discarding outdated mirror copy %s", local)
+                self._remove_copy(local)
+                continue
+            self._add_entry(source, meta)
+
+    def resolve(self, source: Path, cued: bool = True) -> Path:
+        """Local copy of the source file if available, otherwise the source itself. Never blocks on copying."""
+        with self._lock:
+            entry = self._entries.get(source)
+        local = self.mirror_path(source)
+
+        if entry is not None:
+            if self._matches(source, local, entry):
+                if cued:
+                    entry.last_cued = time.time()
+                return local
+            logger.info("Mirror copy %s is outdated", local)
+            self._evict(source)
+
+        self.sync(source, PRIORITY_CUED if cued else PRIORITY_BACKGROUND)
+        return source
+
+    def sync(self, source: Path, priority: int = PRIORITY_BACKGROUND):
+        with self._lock:
+            if source in self._entries or source in self._pending:
+                return
+            self._pending.add(source)
+
+        self._queue.put((priority, next(self._sequence), source))
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="media mirror", daemon=True
+            )
+            self._thread.start()
+
+    def is_mirrored(self, source: Path) -> bool:
+        with self._lock:
+            return source in self._entries
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until all queued files are copied. Intended for tests and benchmarks."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            priority, _, source = self._queue.get()
+            try:
+                self._copy(source, may_evict=priority == PRIORITY_CUED)
+            except OSError as e:
+                logger.warning("Could not mirror %s: %s", source, e)
+            finally:
+                with self._lock:
+                    self._pending.discard(source)
+
+    def _copy(self, source: Path, may_evict: bool):
+        stat = source.stat()
+        if not self._make_room(stat.st_size, may_evict):
+            logger.debug("No room in mirror for %s", source)
+            return
+
+        local = self.mirror_path(source)
+        local.parent.mkdir(parents=True, exist_ok=True)
+        partial = local.with_name(local.name + PARTIAL_SUFFIX)
+
+        digest = hashlib.sha256()
+        started = time.monotonic()
+        copied = 0
+        with open(source, "rb") as src, open(partial, "wb") as dst:
+            while chunk := src.read(COPY_CHUNK_SIZE):
+                dst.write(chunk)
+                digest.update(chunk)
+                copied += len(chunk)
+                throttle(copied, started, self._bandwidth)
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        if copied != stat.st_size or source.stat().st_mtime != stat.st_mtime:
+            logger.warning("%s changed while mirroring, discarding copy", source)
+            partial.unlink(missing_ok=True)
+            return
+
+        os.utime(partial, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        entry = MirrorEntry(stat.st_size, partial.stat().st_mtime, digest.hexdigest())
+        self._write_meta(local, entry)
+        os.replace(partial, local)
+
+        self._add_entry(source, entry)
+        logger.info("Mirrored %s to %s", source, local)
+
+    def _add_entry(self, source: Path, entry: MirrorEntry):
+        with self._lock:
+            replaced = self._entries.get(source)
+            if replaced is not None:
+                self._used_bytes -= replaced.size
+            self._entries[source] = entry
+            self._used_bytes += entry.size
+
+    def _make_room(self, size: int, may_evict: bool) -> bool:
+        if size > self._budget_bytes:
+            return False
+        while True:
+            with self._lock:
+                if self._used_bytes + size <= self._budget_bytes:
+                    return True
+                if not may_evict or not self._entries:
+                    return False
+                source = min(self._entries, key=lambda s: self._entries[s].last_cued)
+            self._evict(source)
+
+    def _evict(self, source: Path):
+        with self._lock:
+            entry = self._entries.pop(source, None)
+            if entry is None:
+                return
+            self._used_bytes -= entry.size
+        # A slot that still plays the copy keeps its open file, removing it is safe
+        self._remove_copy(self.mirror_path(source))
+        logger.debug("Evicted mirror copy of %s", source)
+
+    @staticmethod
+    def _matches(source: Path, local: Path, entry: MirrorEntry) -> bool:
+        try:
+            source_stat = source.stat()
+            local_stat = local.stat()
+        except OSError:
+            return False
+        return (
+                source_stat.st_size == entry.size == local_stat.st_size
+                and source_stat.st_mtime == local_stat.st_mtime
+        )
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(COPY_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_meta(local: Path) -> MirrorEntry | None:
+        try:
+            with open(local.with_name(local.name + META_SUFFIX)) as f:
+                return MirrorEntry(**json.load(f))
+        except (OSError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(local: Path, entry: MirrorEntry):
+        with open(local.with_name(local.name + META_SUFFIX), "w") as f:
+            json.dump(asdict(entry), f)
+
+    @staticmethod
+    def _remove_copy(local: Path):
+        local.unlink(missing_ok=True)
+        local.with_name(local.name + META_SUFFIX).unlink(missing_ok=True)
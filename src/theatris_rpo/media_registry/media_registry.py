@@ -1,4 +1,5 @@
 import logging
+import threading
 from pathlib import Path
 from typing import Iterator
 
@@ -8,7 +9,18 @@ gi.require_version("GLib", "2.0")
 gi.require_version("GObject", "2.0")
 gi.require_version("Gst", "1.0")
 gi.require_version("GstPbutils", "1.0")
-from gi.repository import Gst, GstPbutils  # noqa: E402
+from gi.repository import GLib, Gst  # noqa: E402
+
+from theatris_rpo.config import config, Conf  # noqa: E402
+from theatris_rpo.media_registry.local_mirror import LocalMirror  # noqa: E402
+from theatris_rpo.media_registry.memory_cache import (  # noqa: E402
+    MediaMemoryCache,
+    read_file,
+)
+from theatris_rpo.media_registry.prefetch import (  # noqa: E402
+    MediaPrefetcher,
+    PrefetchState,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +36,32 @@ class MediaRegistry:
         self._base_dir: Path = base_dir
         self._files_by_number = dict()
         self._valid: bool = False
+        self._memory_cache = MediaMemoryCache(
+            config[Conf.MEMORY_CACHE_BUDGET_BYTES],
+            config[Conf.MEMORY_CACHE_FILE_SIZE_THRESHOLD_BYTES],
+            self._load_into_buffer,
+        )
+        self._prefetcher = MediaPrefetcher(
+            config[Conf.PREFETCH_HEAD_BYTES],
+            config[Conf.PREFETCH_BANDWIDTH_BYTES_PER_SECOND],
+        )
+        self._mirror: LocalMirror | None = None
+        if config[Conf.MIRROR_DIR]:
+            self._mirror = LocalMirror(
+                base_dir,
+                Path(config[Conf.MIRROR_DIR]),
+                config[Conf.MIRROR_BUDGET_BYTES],
+                config[Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND],
+            )
 
     @property
     def valid(self) -> bool:
         return self._valid
 
+    @property
+    def memory_cache(self) -> MediaMemoryCache:
+        return self._memory_cache
+
     @property
     def files_by_number(self) -> dict:
         return self._files_by_number
@@ -40,16 +73,25 @@ class MediaRegistry:
             logger.error(f"No file with number {number}")
 
     def scan_files(self):
+        files = self.discover_files()
+        if files is not None:
+            self.apply_files(files)
+
+    def discover_files(self) -> dict[int, Path] | None:
+        """Find the valid media files by number, None if the base directory is not usable. This is slow (every file is
+        inspected), but does not touch the registry, so it can run on a worker thread."""
         if not self._base_dir.exists():
             logger.error(f"Base directory {self._base_dir} does not exist")
-            return
+            return None
 
         if not self._base_dir.is_dir():
             logger.error(f"Base directory {self._base_dir} is not a directory")
-            return
+            return None
 
         Gst.init(None)
 
+        files_by_number = dict()
+
         for path in self._iterdir_recursive(self._base_dir):
             if not path.is_file():
                 continue
@@ -62,7 +104,7 @@ class MediaRegistry:
 
             number = int(parts[0])
 
-            if number in self._files_by_number.keys():
+            if number in files_by_number.keys():
                 logger.warning(LOG_MESSAGES["file_number_twice"] % path)
                 continue
 
@@ -70,16 +112,58 @@ class MediaRegistry:
                 logger.warning(LOG_MESSAGES["file_format_invalid"] % path)
                 continue
 
-            self._files_by_number[number] = path
+            files_by_number[number] = path
             logger.info(f"Added file {path} to media registry.")
 
+        return files_by_number
+
+    def apply_files(self, files_by_number: dict[int, Path]):
+        """Replace the registered files with the result of discover_files()"""
+        self._files_by_number = files_by_number
         self._valid = True
 
+        if self._mirror is not None:
+            threading.Thread(
+                target=self._fill_mirror,
+                args=(list(self._files_by_number.values()),),
+                name="media mirror fill",
+                daemon=True,
+            ).start()
+
     def rescan_files(self):
-        # clear existing registry
-        self._files_by_number = dict()
-        self._valid = False
-        self.scan_files()
+        self.apply_rescan(self.discover_files())
+
+    def apply_rescan(self, files_by_number: dict[int, Path] | None):
+        """Replace the registered files with a new result of discover_files() and drop cached data of removed files.
+        The registry is invalid if the scan failed."""
+        if files_by_number is None:
+            self._files_by_number = dict()
+            self._valid = False
+        else:
+            self.apply_files(files_by_number)
+        self._memory_cache.retain(self._files_by_number.values())
+        self._prefetcher.invalidate()
+
+    def playback_path(self, path: Path, current: Path | None = None) -> Path:
+        """The path that should be given to a pipeline: The local mirror copy of the file if one is available.
+
+        current: The path a slot already has for the file. A slot keeps the copy as long as it is still valid. A slot
+        that has the source keeps it (so its preroll stays valid) when the copy became available meanwhile. A slot with
+        an outdated or evicted copy goes back to the source.
+        """
+        if self._mirror is None:
+            return path
+        resolved = self._mirror.resolve(path)
+        if current is None or current == resolved or current not in (path, self._mirror.mirror_path(path)):
+            return resolved
+        return path
+
+    def pin_in_memory(self, number: int, on_off: bool) -> bool:
+        path = self.file_path(number)
+        if path is None:
+            return False
+        self._memory_cache.pin(path, on_off)
+        return True
 
     def _iterdir_recursive(self, path: Path) -> Iterator[Path]:
         if not path.is_dir():
@@ -90,8 +174,35 @@ class MediaRegistry:
             else:
                 yield p
 
+    def prefetch(self, number: int) -> bool:
+        """Warm the page cache for the head of the file, in the background."""
+        path = self.file_path(number)
+        if path is None:
+            return False
+        self._prefetcher.prefetch(path)
+        return True
+
+    def prefetch_state(self, number: int) -> PrefetchState:
+        path = self.file_path(number)
+        if path is None:
+            return PrefetchState.COLD
+        return self._prefetcher.state(path)
+
+    def _fill_mirror(self, paths: list[Path]):
+        self._mirror.adopt_existing(paths)
+        for path in paths:
+            self._mirror.sync(path)
+
+    @staticmethod
+    def _load_into_buffer(path: Path) -> Gst.Buffer:
+        """Wrap the file content once, so pipelines can share the memory without copying it again."""
+        return Gst.Buffer.new_wrapped_bytes(GLib.Bytes.new(read_file(path)))
+
     @staticmethod
     def _check_media_format(path: Path) -> bool:
+        # Only needed by the scan, which runs in the background
+        from gi.repository import GstPbutils
+
         discoverer = GstPbutils.Discoverer()
         logger.info(f"File {path} discovered data:")
         try:
@@ -0,0 +1,231 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class MemoryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    used_bytes: int = 0
+    budget_bytes: int = 0
+
+    def as_list(self) -> list[int]:
+        return [
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.entries,
+            self.used_bytes,
+            self.budget_bytes,
+        ]
+
+
+@dataclass
+class _Entry:
+    data: Any
+    size: int
+    mtime: float
+
+
+def read_file(path: Path) -> bytes:
+    """Default loader: read the whole (compressed) file into memory."""
+    chunks = []
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class MediaMemoryCache:
+    """Keeps the compressed content of selected media files in RAM, so looping them never touches the file system.
+
+    A file is cached if it was pinned explicitly or if it is not larger than the size threshold. Files are loaded in a
+    background thread on the first lookup (a miss), the following lookups are served from memory. The total size of all
+    cached files is bounded by the memory budget, the least recently used files are evicted first.
+    """
+
+    def __init__(
+            self,
+            budget_bytes: int,
+            size_threshold_bytes: int = 0,
+            loader: Callable[[Path], Any] = read_file,
+    ):
+        self._budget_bytes = budget_bytes
+        self._size_threshold_bytes = size_threshold_bytes
+        self._loader = loader
+
+        self._entries: OrderedDict[Path, _Entry] = OrderedDict()
+        self._pinned: set[Path] = set()
+        self._loading: set[Path] = set()
+        self._used_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._budget_bytes > 0
+
+    @property
+    def stats(self) -> MemoryCacheStats:
+        with self._lock:
+            return MemoryCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                used_bytes=self._used_bytes,
+                budget_bytes=self._budget_bytes,
+            )
+
+    def is_cached(self, path: Path) -> bool:
+        with self._lock:
+            return path in self._entries
+
+    def pin(self, path: Path, on_off: bool = True):
+        """Always keep this file in memory, regardless of the size threshold. Loading starts right away."""
+        with self._lock:
+            if on_off:
+                self._pinned.add(path)
+            else:
+                self._pinned.discard(path)
+                self._drop(path)
+        if on_off:
+            self._start_loading(path)
+
+    def lookup(self, path: Path) -> Any | None:
+        """Return the in-memory content of the file or None, if it should be played from the file system.
+
+        Eligible files that are not in memory yet are loaded in the background, the caller is never blocked.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self._hits += 1
+                return entry.data
+
+        if not self._is_eligible(path):
+            return None
+
+        with self._lock:
+            self._misses += 1
+
+        self._start_loading(path)
+        return None
+
+    def retain(self, paths):
+        """Drop all entries that are not in the given paths or whose files changed on disk."""
+        paths = set(paths)
+        with self._lock:
+            for path in list(self._entries.keys()):
+                if path not in paths or self._is_stale(path, self._entries[path]):
+                    self._drop(path)
+            self._pinned &= paths
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._used_bytes = 0
+
+    def _is_eligible(self, path: Path) -> bool:
+        if path in self._pinned:
+            return True
+        if self._size_threshold_bytes <= 0:
+            return False
+        try:
+            return path.stat().st_size <= self._size_threshold_bytes
+        except OSError:
+            return False
+
+    def _start_loading(self, path: Path):
+        with self._lock:
+            if path in self._entries or path in self._loading:
+                return
+            self._loading.add(path)
+            pinned = path in self._pinned
+
+        threading.Thread(
+            target=self._load, args=(path, pinned), name=f"memcache {path.name}", daemon=True
+        ).start()
+
+    def _load(self, path: Path, pinned: bool):
+        stat = data = None
+        cached = False
+        try:
+            stat = path.stat()
+            if stat.st_size > self._budget_bytes:
+                logger.warning(
+                    "File %s (%d bytes) exceeds the memory cache budget, not cached",
+                    path,
+                    stat.st_size,
+                )
+            else:
+                data = self._loader(path)
+        except OSError as e:
+            logger.error("Could not load %s into memory: %s", path, e)
+        finally:
+            # In one go, so a lookup never finds the path neither loading nor cached and loads it a second time
+            with self._lock:
+                self._loading.discard(path)
+                if data is not None:
+                    cached = self._insert(path, _Entry(data, stat.st_size, stat.st_mtime), pinned)
+
+        if cached:
+            logger.info("Loaded %s into memory cache (%d bytes)", path, stat.st_size)
+
+    def _insert(self, path: Path, entry: _Entry, pinned: bool) -> bool:
+        """Lock must be held."""
+        if pinned and path not in self._pinned:
+            logger.debug("%s was unpinned while loading, not cached", path)
+            return False
+        self._drop(path)
+        self._evict_for(entry.size)
+        if self._used_bytes + entry.size > self._budget_bytes:
+            logger.warning("No room for %s in the memory cache, the budget is taken by pinned files", path)
+            return False
+        self._entries[path] = entry
+        self._used_bytes += entry.size
+        return True
+
+    def _evict_for(self, size: int):
+        """Evict least recently used entries until the given size fits into the budget, pinned ones are kept. Lock
+        must be held."""
+        for path in list(self._entries):
+            if self._used_bytes + size <= self._budget_bytes:
+                break
+            if path in self._pinned:
+                continue
+            self._used_bytes -= self._entries.pop(path).size
+            self._evictions += 1
+            logger.debug("Evicted %s from memory cache", path)
+
+    def _drop(self, path: Path):
+        """Lock must be held."""
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._used_bytes -= entry.size
+
+    @staticmethod
+    def _is_stale(path: Path, entry: _Entry) -> bool:
+        try:
+            stat = path.stat()
+        except OSError:
+            return True
+        return stat.st_size != entry.size or stat.st_mtime != entry.mtime
@@ -0,0 +1,127 @@
+import enum
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def throttle(bytes_done: int, started: float, bytes_per_second: int):
+    """Sleep as long as needed to keep the average rate since 'started' (monotonic) within bytes_per_second."""
+    if bytes_per_second <= 0:
+        return
+    ahead = bytes_done / bytes_per_second - (time.monotonic() - started)
+    if ahead > 0:
+        time.sleep(ahead)
+
+
+class PrefetchState(enum.Enum):
+    COLD = enum.auto()
+    QUEUED = enum.auto()
+    WARMING = enum.auto()
+    WARM = enum.auto()
+
+
+class MediaPrefetcher:
+    """Pulls the head of media files into the page cache before they are cued, so the first seconds of playback don't
+    stutter on a cold (NFS) cache.
+
+    Files are read in a background thread, one after the other. The read rate is limited to the bandwidth budget, so
+    prefetching does not starve slots that are currently playing from the same share.
+    """
+
+    def __init__(self, head_bytes: int, bandwidth_bytes_per_second: int):
+        self._head_bytes = head_bytes
+        self._bandwidth = bandwidth_bytes_per_second
+
+        self._states: dict[Path, PrefetchState] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[Path] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def prefetch(self, path: Path):
+        """Queue the file for warming. Does nothing if the file is already warm or queued."""
+        with self._lock:
+            if self._states.get(path, PrefetchState.COLD) is not PrefetchState.COLD:
+                return
+            self._states[path] = PrefetchState.QUEUED
+
+        self._queue.put(path)
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="media prefetch", daemon=True
+            )
+            self._thread.start()
+
+    def state(self, path: Path) -> PrefetchState:
+        with self._lock:
+            return self._states.get(path, PrefetchState.COLD)
+
+    def invalidate(self, path: Path | None = None):
+        """Mark a file (or all files) as cold again, e.g. after a rescan."""
+        with self._lock:
+            if path is None:
+                self._states = {
+                    p: s
+                    for p, s in self._states.items()
+                    if s in (PrefetchState.QUEUED, PrefetchState.WARMING)
+                }
+            elif self._states.get(path) is PrefetchState.WARM:
+                del self._states[path]
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until all queued files are warm. Intended for tests and benchmarks."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not any(
+                        s in (PrefetchState.QUEUED, PrefetchState.WARMING)
+                        for s in self._states.values()
+                ):
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            with self._lock:
+                self._states[path] = PrefetchState.WARMING
+            try:
+                self._warm(path)
+            except OSError as e:
+                logger.warning("Could not prefetch %s: %s", path, e)
+                with self._lock:
+                    self._states.pop(path, None)
+                continue
+            with self._lock:
+                self._states[path] = PrefetchState.WARM
+            logger.debug("Prefetched %s", path)
+
+    def _warm(self, path: Path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = min(os.fstat(fd).st_size, self._head_bytes)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, size, os.POSIX_FADV_SEQUENTIAL)
+
+            started = time.monotonic()
+            offset = 0
+            while offset < size:
+                length = min(READ_CHUNK_SIZE, size - offset)
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+                # Actually read the data, WILLNEED is only a hint (and unthrottled readahead on its own)
+                read = len(os.pread(fd, length, offset))
+                if read == 0:
+                    break
+                offset += read
+                throttle(offset, started, self._bandwidth)
+        finally:
+            os.close(fd)
@@ -0,0 +1,352 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency buckets, from a frame (16 ms) to a slow cue
+LATENCY_BUCKETS = (0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = dict[str, str]
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """A metric family. Values are updated without locking, so only one thread should update a value (usually the main
+    loop). Rendering on another thread may see a value that is one update behind, which does not matter for scraping.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._default = None if label_names else self.labels()
+
+    def labels(self, *label_values) -> Any:
+        """The value for these label values, created on first use. Keep the result for the hot paths."""
+        value = self._values.get(label_values)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(label_values, self._new_value())
+        return value
+
+    def _new_value(self) -> Any:
+        raise NotImplementedError
+
+    def samples(self, extra_labels: Labels) -> Iterator[tuple[str, Labels, float]]:
+        """Name suffix, labels and value of every sample"""
+        for label_values, value in list(self._values.items()):
+            labels = dict(zip(self.label_names, map(str, label_values)))
+            labels.update(extra_labels)
+            yield from self._value_samples(labels, value)
+
+    def _value_samples(self, labels: Labels, value: Any) -> Iterator[tuple[str, Labels, float]]:
+        yield "", labels, value.value
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_values"] = dict(self._values)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_value(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_value(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            help_text: str,
+            label_names: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, label_names)
+
+    def _new_value(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _value_samples(self, labels: Labels, value: HistogramValue) -> Iterator[tuple[str, Labels, float]]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), list(value.counts)):
+            cumulative += count
+            yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield "_sum", labels, value.sum
+        yield "_count", labels, value.count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    @property
+    def metrics(self) -> list[Metric]:
+        return list(self._metrics.values())
+
+    def counter(self, name: str, help_text: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, label_names))
+
+    def histogram(
+            self,
+            name: str,
+            help_text: str,
+            label_names: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help_text, label_names, buckets))
+
+    def subset(self, names: Iterable[str]) -> "MetricsRegistry":
+        """A registry with some of the metrics (the same objects, not copies)"""
+        result = MetricsRegistry()
+        for name in names:
+            result._add(self._metrics[name])
+        return result
+
+    def _add(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is registered already")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self, others: Iterable[tuple["MetricsRegistry", Labels]] = ()) -> str:
+        """The metrics in the Prometheus text format. The metrics of the other registries (e.g. of other processes) are
+        added to the families of the same name, with the given labels."""
+        sources = [(self, {})] + list(others)
+        families: dict[str, list[tuple[Metric, Labels]]] = {}
+        for registry, labels in sources:
+            for metric in registry.metrics:
+                families.setdefault(metric.name, []).append((metric, labels))
+
+        lines = []
+        for name, members in families.items():
+            lines.append(f"# HELP {name} {_escape_help(members[0][0].help_text)}")
+            lines.append(f"# TYPE {name} {members[0][0].kind}")
+            for metric, extra_labels in members:
+                for suffix, labels, value in metric.samples(extra_labels):
+                    lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class SlotSampler:
+    """Frames reaching the sink and frames dropped by it per slot, sampled periodically (e.g. once per second) on the
+    main loop, so nothing is counted in the streaming threads"""
+
+    def __init__(self):
+        self._last: dict[tuple[int, int], tuple[int, int, int, float]] = {}
+
+    def sample(self, outputs: Iterable, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        for output in outputs:
+            for slot in output.video_slots:
+                key = (output.id, slot.id)
+                generation, frames, dropped = slot.frame_stats
+                last = self._last.get(key)
+                self._last[key] = (generation, frames, dropped, now)
+                if last is None:
+                    continue
+                last_generation, last_frames, last_dropped, last_time = last
+                if generation != last_generation:
+                    # The pipeline was replaced, its counts start at 0
+                    last_frames, last_dropped = 0, 0
+                new_frames = max(0, frames - last_frames)
+                slot_frames_total.labels(*key).inc(new_frames)
+                slot_dropped_frames_total.labels(*key).inc(max(0, dropped - last_dropped))
+                if now > last_time:
+                    slot_fps.labels(*key).set(new_frames / (now - last_time))
+
+
+def sample_processes(pids: dict[str, int]):
+    """Resident memory and CPU time of the processes, by name. Reads /proc only, safe to call from any thread."""
+    import psutil
+
+    for name, pid in pids.items():
+        try:
+            process = psutil.Process(pid)
+            rss = process.memory_info().rss
+            cpu = process.cpu_times()
+        except psutil.Error:
+            continue
+        process_resident_memory_bytes.labels(name).set(rss)
+        process_cpu_seconds_total.labels(name).value = cpu.user + cpu.system
+
+
+class MetricsServer:
+    """Serves the metrics on GET /metrics, from a thread of its own, so a scrape never holds up the main loop.
+
+    render is called on the server thread and must only read values.
+    """
+
+    def __init__(self, address: str, port: int, render: Callable[[], str]):
+        render_metrics = render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                try:
+                    body = render_metrics().encode()
+                except Exception:
+                    logger.exception("Could not render metrics")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics: " + format, *args)
+
+        self._server = ThreadingHTTPServer((str(address), port), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+        logger.info("Serving metrics on http://%s:%d/metrics", *self._server.server_address[:2])
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+
+metrics_registry = MetricsRegistry()
+
+cue_latency_seconds = metrics_registry.histogram(
+    "theatris_cue_latency_seconds", "Time from play until the first frame of the clip reached the sink"
+)
+main_loop_lag_seconds = metrics_registry.histogram(
+    "theatris_main_loop_lag_seconds", "How much later than scheduled the updates (fade steps) of the main loop ran"
+)
+slot_frames_total = metrics_registry.counter(
+    "theatris_slot_frames_total", "Frames that reached the sink of the slot", ("output", "slot")
+)
+slot_dropped_frames_total = metrics_registry.counter(
+    "theatris_slot_dropped_frames_total", "Frames the sink of the slot dropped because they were late", ("output", "slot")
+)
+slot_fps = metrics_registry.gauge(
+    "theatris_slot_fps", "Frames per second that reached the sink of the slot", ("output", "slot")
+)
+media_files = metrics_registry.gauge("theatris_media_files", "Files in the media registry")
+media_scan_seconds = metrics_registry.gauge(
+    "theatris_media_scan_seconds", "Duration of the last scan of the media directory"
+)
+osc_messages_total = metrics_registry.counter(
+    "theatris_osc_messages_total",
+    "Received OSC messages by command, /outputX/slotX stands for all outputs and slots",
+    ("command",),
+)
+process_resident_memory_bytes = metrics_registry.gauge(
+    "process_resident_memory_bytes", "Resident memory of the process", ("process",)
+)
+process_cpu_seconds_total = metrics_registry.counter(
+    "process_cpu_seconds_total", "User and system CPU time of the process", ("process",)
+)
@@ -1,13 +1,13 @@
 import asyncio
 import logging
+import re
 import socket
 import time
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable
 
 import pythonoscquery.pythonosc_callback_wrapper
 from pythonosc.dispatcher import Dispatcher
 from pythonosc.osc_server import AsyncIOOSCUDPServer
-from pythonoscquery.osc_query_service import OSCQueryService
 from pythonoscquery.shared.osc_access import OSCAccess
 from pythonoscquery.shared.osc_address_space import OSCAddressSpace
 from pythonoscquery.shared.osc_path_node import OSCPathNode
@@ -15,13 +15,22 @@ from pythonoscquery.shared.oscquery_spec import OSCQueryAttribute
 from returns.result import Success, Failure
 
 from theatris_rpo.base_interface import BaseInterface, AsyncOscInterfaceMixin
+from theatris_rpo.command_executor import Lane
+from theatris_rpo.config import config, Conf
+from theatris_rpo.cue import CueAction, parse_cue_args
+from theatris_rpo.feedback import FeedbackPublisher, FeedbackValue, advertise_feedback_nodes, machine_state
+from theatris_rpo.osc_scheduler import ScheduledDispatcher
+from theatris_rpo.oscquery_streaming import StreamingOSCQueryService
 from theatris_rpo.slot_flag import SlotFlag
+from theatris_rpo.startup import startup_report
 
 if TYPE_CHECKING:
     from theatris_rpo.video_machine import VideoMachine
 
 logger = logging.getLogger(__name__)
 
+PLAY_BY_NUMBER_ADDRESS = re.compile(r"^/output(\d+)/slot(\d+)/play_by_number$")
+
 
 class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
     def __init__(self, ip_address, port, video_machine: "VideoMachine"):
@@ -36,7 +45,16 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
 
         self._address_space = OSCAddressSpace()
 
-        self._dispatcher = Dispatcher()
+        # Bundles with a future timetag are executed when due, play commands are prerolled ahead of time
+        self._dispatcher = ScheduledDispatcher(prepare=self._prepare_scheduled)
+        self._dispatcher.set_default_reply_sender(self._send_datagram)
+
+        # State changes are pushed to subscribed clients, through the socket of the OSC server
+        self._feedback = FeedbackPublisher(
+            lambda include_continuous: machine_state(self._video_machine, include_continuous),
+            self._send_datagram,
+            config[Conf.FEEDBACK_RATE_HZ],
+        )
 
         #####
         ## Sending
@@ -54,6 +72,32 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
         ## Receiving
         #####
 
+        # /feedback/subscribe and /feedback/unsubscribe need the address of the sender
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/feedback/subscribe",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Send state changes of all outputs and slots to the sender's address on this port",
+                value=8000,
+            ),
+            self._dispatcher,
+            self._handler_feedback_subscribe,
+            self._address_space,
+            needs_reply_address=True,
+        )
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/feedback/unsubscribe",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Stop sending state changes to the sender's address on this port",
+                value=8000,
+            ),
+            self._dispatcher,
+            self._handler_feedback_unsubscribe,
+            self._address_space,
+            needs_reply_address=True,
+        )
+
         # /rescan_media
         pythonoscquery.pythonosc_callback_wrapper.map_node(
             OSCPathNode(
@@ -62,7 +106,253 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
                 description=f"Rescan media directory",
             ),
             self._dispatcher,
-            self._handler_rescan_media,
+            self._command(Lane.MAINTENANCE, "rescan_media", self._handler_rescan_media),
+            self._address_space,
+        )
+
+        # /media/memory_cache
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/media/memory_cache",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Keep file (by its number) in memory, so playback does not access the file system",
+                value=[1, True],  # number of file, on/off
+            ),
+            self._dispatcher,
+            self._command(Lane.MAINTENANCE, "media/memory_cache", self._handler_media_memory_cache),
+            self._address_space,
+        )
+
+        # /media/memory_cache_stats
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/media/memory_cache_stats",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with hits, misses, evictions, entries, used bytes and budget bytes of the memory cache",
+            ),
+            self._dispatcher,
+            self._handler_media_memory_cache_stats,
+            self._address_space,
+        )
+
+        # /media/prefetch and /media/prefetch_status take a variable number of file numbers. Therefore, they are not
+        # type-checked by the OSCQuery callback wrapper, but mapped directly.
+        self._address_space.add_node(
+            OSCPathNode(
+                "/media/prefetch",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description="Pull the head of the given files (by number, one or more) into the page cache",
+                value=[1],
+            )
+        )
+        self._dispatcher.map(
+            "/media/prefetch",
+            self._command(Lane.MAINTENANCE, "media/prefetch", self._handler_media_prefetch),
+        )
+
+        self._address_space.add_node(
+            OSCPathNode(
+                "/media/prefetch_status",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description="Reply with file number and warm/cold status for the given files (all files if none given)",
+                value=[1],
+            )
+        )
+        self._dispatcher.map(
+            "/media/prefetch_status", self._handler_media_prefetch_status
+        )
+
+        # /cue takes a variable number of arguments, it is mapped directly like /media/prefetch
+        self._address_space.add_node(
+            OSCPathNode(
+                "/cue",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description="Apply several slot operations at once, as a list of 'action output slot [value]' with the actions play (file number), stop, pause and alpha (0..1)",
+                value=["play", 0, 0, 1],
+            )
+        )
+        self._dispatcher.map("/cue", self._command(Lane.CUE, "cue", self._handler_cue))
+
+        # /go, /back
+        for name, callback, description in [
+            ("go", self._handler_go, "Execute the cue on standby of the cue list"),
+            ("back", self._handler_back, "Execute the cue before the current one of the cue list"),
+        ]:
+            pythonoscquery.pythonosc_callback_wrapper.map_node(
+                OSCPathNode(f"/{name}", access=OSCAccess.NO_VALUE, description=description),
+                self._dispatcher,
+                self._command(Lane.CUE, name, callback),
+                self._address_space,
+            )
+
+        # /goto accepts integer and float cue numbers, it is mapped directly like /cue
+        self._address_space.add_node(
+            OSCPathNode(
+                "/goto",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description="Execute the cue with this number of the cue list",
+                value=1.0,
+            )
+        )
+        self._dispatcher.map("/goto", self._command(Lane.CUE, "goto", self._handler_goto))
+
+        # /cue_list/load
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/cue_list/load",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Load a show file (JSON, relative to the media directory) into the cue list",
+                value="show.json",
+            ),
+            self._dispatcher,
+            self._command(Lane.MAINTENANCE, "cue_list/load", self._handler_cue_list_load),
+            self._address_space,
+        )
+
+        # /cue_list/status
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/cue_list/status",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with current and standby cue number (-1: none), number of cues, last, mean and max execution time (ms), reserved and prepared slots",
+            ),
+            self._dispatcher,
+            self._handler_cue_list_status,
+            self._address_space,
+        )
+
+        # /scheduler/lateness
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/scheduler/lateness",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with pending count, report count and last, mean and max lateness (ms) of commands sent in timed bundles",
+            ),
+            self._dispatcher,
+            self._handler_scheduler_lateness,
+            self._address_space,
+        )
+
+        # /commands/queue_depth
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/commands/queue_depth",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with the number of waiting normal and maintenance commands and of running background tasks",
+            ),
+            self._dispatcher,
+            self._handler_commands_queue_depth,
+            self._address_space,
+        )
+
+        # /commands/latency
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/commands/latency",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with name, count and mean and max latency (ms) of every command",
+            ),
+            self._dispatcher,
+            self._handler_commands_latency,
+            self._address_space,
+        )
+
+        # /ping
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/ping",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Reply with the given number, e.g. to measure the round trip time",
+                value=0,
+            ),
+            self._dispatcher,
+            self._handler_ping,
+            self._address_space,
+        )
+
+        # /stats/main_loop_lag
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/stats/main_loop_lag",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Reply with number of updates and mean and max delay (ms) of the main loop updates, optionally reset afterwards",
+                value=False,  # reset
+            ),
+            self._dispatcher,
+            self._handler_stats_main_loop_lag,
+            self._address_space,
+        )
+
+        # /stats/startup
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/stats/startup",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with name, start and duration (ms since process start) of each startup phase so far",
+            ),
+            self._dispatcher,
+            self._handler_stats_startup,
+            self._address_space,
+        )
+
+        # /stats/cue_latency
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/stats/cue_latency",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with the latency (ms) of the first cue after boot and count, mean and max latency (ms) of the cues after it",
+            ),
+            self._dispatcher,
+            self._handler_stats_cue_latency,
+            self._address_space,
+        )
+
+        # /stats/stalls
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/stats/stalls",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with the number of stalled slots and how many recovered, followed by output, slot, reason, frozen (ms), recovery (ms, -1 if none) and attempts of the last ones",
+            ),
+            self._dispatcher,
+            self._handler_stats_stalls,
+            self._address_space,
+        )
+
+        # /trace/start
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/trace/start",
+                access=OSCAccess.WRITEONLY_VALUE,
+                description=f"Record the buffer flow of the slot pipelines for the given seconds (bounded by --trace-max-seconds and --trace-max-mb). Reply with the trace files",
+                value=10.0,  # seconds
+            ),
+            self._dispatcher,
+            self._handler_trace_start,
+            self._address_space,
+        )
+
+        # /trace/stop
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/trace/stop",
+                access=OSCAccess.NO_VALUE,
+                description=f"Stop the trace capture early. Reply with the trace files",
+            ),
+            self._dispatcher,
+            self._handler_trace_stop,
+            self._address_space,
+        )
+
+        # /trace/status
+        pythonoscquery.pythonosc_callback_wrapper.map_node(
+            OSCPathNode(
+                f"/trace/status",
+                access=OSCAccess.NO_VALUE,
+                description=f"Reply with running, file, records and bytes of the last trace capture (per output process)",
+            ),
+            self._dispatcher,
+            self._handler_trace_status,
             self._address_space,
         )
 
@@ -74,7 +364,7 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
                 description=f"Stop all playing slots on all outputs",
             ),
             self._dispatcher,
-            self._handler_stop,
+            self._command(Lane.CUE, "stop_all", self._handler_stop),
             self._address_space,
         )
 
@@ -87,134 +377,71 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
                     description=f"Stop all playing slots on output {output.id}",
                 ),
                 self._dispatcher,
-                self._handler_stop,
+                self._command(Lane.CUE, "output/stop_all", self._handler_stop),
                 self._address_space,
                 output.id,
             )
 
-        # /outputX/slotY/stop
-        for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/stop",
-                        access=OSCAccess.NO_VALUE,
-                        description=f"Stop video on slot {slot.id} on output {output.id}",
-                    ),
-                    self._dispatcher,
-                    self._handler_stop,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
-
-        # /outputX/slotY/play_by_number
-        for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/play_by_number",
-                        access=OSCAccess.WRITEONLY_VALUE,
-                        description=f"Play file by its number on slot {slot.id} on output {output.id}",
-                        value=[
-                            1,
-                            False,
-                        ],  # number of file, restart when this file is already playing
-                    ),
-                    self._dispatcher,
-                    self._handler_play_by_number,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
-
-        # /outputX/slotY/play_test
-        for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/play_test",
-                        access=OSCAccess.NO_VALUE,
-                        description=f"Play a test sequence on slot {slot.id} on output {output.id}",
-                    ),
-                    self._dispatcher,
-                    self._handler_play_test,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
-
-        # /outputX/slotY/set_alpha
-        for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/set_alpha",
-                        access=OSCAccess.WRITEONLY_VALUE,
-                        description=f"Set alpha value on slot {slot.id} on output {output.id}",
-                        value=100.0,
-                    ),
-                    self._dispatcher,
-                    self._handler_set_alpha,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
-
-        # /outputX/slotY/pause
-        for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/pause",
-                        access=OSCAccess.NO_VALUE,
-                        description=f"Play a test sequence on slot {slot.id} on output {output.id}",
-                    ),
-                    self._dispatcher,
-                    self._handler_pause,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
-
-        # /outputX/slotY/cfg_set_full_alpha_when_starting
+        # /outputX/crossfade
         for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/cfg_set_full_alpha_when_starting",
-                        access=OSCAccess.WRITEONLY_VALUE,
-                        description=f"Set alpha value to 1.0 when starting playback on slot {slot.id} on output {output.id}",
-                        value=False,
-                    ),
-                    self._dispatcher,
-                    self._handler_cfg_set_alpha_to_full_at_start,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
-
-        # /outputX/slotY/cfg_set_loop
-        for output in self._video_machine.outputs.values():
-            for slot in output.video_slots:
-                pythonoscquery.pythonosc_callback_wrapper.map_node(
-                    OSCPathNode(
-                        f"/output{output.id}/slot{slot.id}/cfg_set_loop",
-                        access=OSCAccess.WRITEONLY_VALUE,
-                        description=f"Set alpha value to 1.0 when starting playback on slot {slot.id} on output {output.id}",
-                        value=False,
-                    ),
-                    self._dispatcher,
-                    self._handler_cfg_set_looping,
-                    self._address_space,
-                    output.id,
-                    slot.id,
-                )
+            pythonoscquery.pythonosc_callback_wrapper.map_node(
+                OSCPathNode(
+                    f"/output{output.id}/crossfade",
+                    access=OSCAccess.WRITEONLY_VALUE,
+                    description=f"Crossfade on output {output.id} from a slot to a file (by its number) on another slot, in seconds",
+                    value=[0, 1, 1, 1.0],  # from slot, to slot, number of file, seconds
+                ),
+                self._dispatcher,
+                self._command(Lane.CUE, "output/crossfade", self._handler_crossfade),
+                self._address_space,
+                output.id,
+            )
+
+        # /outputX/slotY/<command> are routed by parsing the address, instead of mapping every slot separately.
+        # Configuration stays in the cue lane, so it is applied before a play command that follows it.
+        for name, lane, callback, access, value, description in [
+            ("stop", Lane.CUE, self._handler_stop, OSCAccess.NO_VALUE, None,
+             "Stop video on slot {slot} on output {output}"),
+            # number of file, restart when this file is already playing
+            ("play_by_number", Lane.CUE, self._handler_play_by_number, OSCAccess.WRITEONLY_VALUE, [1, False],
+             "Play file by its number on slot {slot} on output {output}"),
+            ("preload", Lane.NORMAL, self._handler_preload, OSCAccess.WRITEONLY_VALUE, 1,
+             "Prepare file (by its number) for instant playback on slot {slot} on output {output}"),
+            ("play_test", Lane.CUE, self._handler_play_test, OSCAccess.NO_VALUE, None,
+             "Play a test sequence on slot {slot} on output {output}"),
+            ("set_alpha", Lane.CUE, self._handler_set_alpha, OSCAccess.WRITEONLY_VALUE, 100.0,
+             "Set alpha value on slot {slot} on output {output}"),
+            ("pause", Lane.CUE, self._handler_pause, OSCAccess.NO_VALUE, None,
+             "Play a test sequence on slot {slot} on output {output}"),
+            ("cfg_set_full_alpha_when_starting", Lane.CUE, self._handler_cfg_set_alpha_to_full_at_start,
+             OSCAccess.WRITEONLY_VALUE, False,
+             "Set alpha value to 1.0 when starting playback on slot {slot} on output {output}"),
+            ("cfg_set_loop", Lane.CUE, self._handler_cfg_set_looping, OSCAccess.WRITEONLY_VALUE, False,
+             "Set alpha value to 1.0 when starting playback on slot {slot} on output {output}"),
+            ("cfg_set_frame_cache", Lane.CUE, self._handler_cfg_set_frame_cache, OSCAccess.WRITEONLY_VALUE, False,
+             "Play short clips from decoded frames held in memory on slot {slot} on output {output}"),
+        ]:  # fmt: skip
+            self._dispatcher.map_slot_command(
+                name, self._command(lane, name, callback), access, description, value
+            )
+
+        self._dispatcher.add_slots(
+            (output.id, slot.id)
+            for output in self._video_machine.outputs.values()
+            for slot in output.video_slots
+        )
+        self._dispatcher.advertise_slot_commands(self._address_space)
+        # The feedback values can be read (and listened to) via OSCQuery as well
+        advertise_feedback_nodes(self._address_space, machine_state(self._video_machine))
 
         self._dispatcher.set_default_handler(self._handler_default)
 
         self._oscquery_server = None
 
+    @property
+    def dispatcher(self) -> Dispatcher:
+        return self._dispatcher
+
     async def async_start(self):
         server = AsyncIOOSCUDPServer(
             (self._ip, self._port),
@@ -222,31 +449,47 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
             asyncio.get_event_loop(),  # type: ignore
         )
         self._transport, self._protocol = await server.create_serve_endpoint()
+        startup_report.mark("osc_listening")
 
         logger.info("Started OSC server")
 
     def sync_start(self):
-        self._oscquery_server = OSCQueryService(
+        self._oscquery_server = StreamingOSCQueryService(
             self._address_space,
             f"theatris_rpo_{socket.gethostname()}",
             self._port,
             self._port,
             self._ip,
+            self._video_machine.asyncio_loop,
         )
+        self._feedback.add_listener(self._publish_to_oscquery)
         logger.info("Started OSCquery server")
 
     def stop(self):
-        self._transport.close()
+        if self._transport is not None:
+            self._transport.close()
+
+    def update(self, dt: float):
+        self._feedback.tick()
+
+    def _send_datagram(self, data: bytes, client: tuple[str, int]):
+        if self._transport is not None and not self._transport.is_closing():
+            self._transport.sendto(data, client)
 
     def send_heartbeat(self, beat_state: bool):
+        if self._oscquery_server is not None:
+            self._oscquery_server.publish("/heartbeat", beat_state)
+            return
         hbn = self._address_space.find_node("/heartbeat")
         if hbn:
-            hbn.attributes[OSCQueryAttribute.VALUE] = [
-                beat_state
-            ]  # TODO: Once python-oscquery supports updating of node values, change this
+            hbn.attributes[OSCQueryAttribute.VALUE] = [beat_state]
+
+    def _publish_to_oscquery(self, changes: list[FeedbackValue]):
+        for item in changes:
+            self._oscquery_server.publish(item.address, item.value)
 
     def _handler_default(self, address, *args):
-        logger.debug(f"{address}: {args}")
+        logger.debug("%s: %s", address, args)
         return "/", f"{args} at {time.ctime()} from {self._video_machine}"
 
     def _handler_play(self, address, *args):
@@ -254,7 +497,7 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
         This might be required for speed (instant playback), but at the moment
         it looks like setting the file source each time playback is started is also
         fast enough."""
-        logger.debug(f"{address}: {args}")
+        logger.debug("%s: %s", address, args)
         self._video_machine.play_video(args[0], args[1])
 
     def _handler_play_by_number(
@@ -272,6 +515,17 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
                 return address, msg
         return None
 
+    def _handler_preload(self, address, args: list[int], number: int):
+        output: int | None = self._assign_fixed_arg(0, args)
+        slot: int | None = self._assign_fixed_arg(1, args)
+
+        match self._video_machine.preload_video(output, slot, number):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
     def _handler_play_test(self, address, args: list[int]):
         output: int | None = self._assign_fixed_arg(0, args)
         slot: int | None = self._assign_fixed_arg(1, args)
@@ -294,6 +548,18 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
                 return address, msg
         return None
 
+    def _handler_crossfade(
+            self, address, args: list[int], from_slot: int, to_slot: int, number: int, seconds: float
+    ):
+        output: int | None = self._assign_fixed_arg(0, args)
+
+        match self._video_machine.crossfade(output, from_slot, to_slot, number, seconds):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
     def _handler_set_alpha(self, address, args: list[int], alpha_value: float):
         output: int | None = self._assign_fixed_arg(0, args)
         slot: int | None = self._assign_fixed_arg(1, args)
@@ -344,14 +610,196 @@ class OscInterface(BaseInterface, AsyncOscInterfaceMixin):
                 return address, msg
         return None
 
+    def _handler_cfg_set_frame_cache(self, address, args: list[int], on_off: bool):
+        output: int | None = self._assign_fixed_arg(0, args)
+        slot: int | None = self._assign_fixed_arg(1, args)
+
+        match self._video_machine.set_slot_config(
+            output, slot, SlotFlag.DECODED_FRAME_CACHE, on_off
+        ):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
     def _handler_rescan_media(self, address):
-        match self._video_machine.rescan_media():
+        # Scanning inspects every file, which takes a while. It runs in the background and replies when it failed.
+        client = self._video_machine.commands.current_client
+
+        def on_done(result):
+            match result:
+                case Failure(msg):
+                    self._reply_later(client, (address, msg))
+
+        self._video_machine.rescan_media_in_background(on_done)
+        return None
+
+    def _handler_media_memory_cache(self, address, number: int, on_off: bool):
+        match self._video_machine.set_memory_cache_pinned(number, on_off):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_media_memory_cache_stats(self, address):
+        return address, self._video_machine.memory_cache_stats()
+
+    def _handler_cue(self, address, *args):
+        match parse_cue_args(list(args)).bind(self._video_machine.cue):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_go(self, address):
+        match self._video_machine.cue_list.go():
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_back(self, address):
+        match self._video_machine.cue_list.back():
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_goto(self, address, *args):
+        if len(args) != 1 or not isinstance(args[0], (int, float)):
+            return address, "Expected a cue number"
+
+        match self._video_machine.cue_list.goto(args[0]):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_cue_list_load(self, address, show_file: str):
+        match self._video_machine.load_show(show_file):
+            case Success():
+                return None
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_cue_list_status(self, address):
+        return address, self._video_machine.cue_list.status()
+
+    def _handler_feedback_subscribe(self, client_address, address, port: int):
+        self._feedback.subscribe((client_address[0], port))
+
+    def _handler_feedback_unsubscribe(self, client_address, address, port: int):
+        self._feedback.unsubscribe((client_address[0], port))
+
+    def _handler_commands_queue_depth(self, address):
+        return address, self._video_machine.commands.queue_depths()
+
+    def _handler_commands_latency(self, address):
+        return address, self._video_machine.commands.latency_stats()
+
+    @staticmethod
+    def _handler_ping(address, number: int):
+        return address, number
+
+    def _handler_stats_main_loop_lag(self, address, reset: bool):
+        return address, self._video_machine.main_loop_lag(reset)
+
+    def _handler_stats_startup(self, address):
+        return address, self._video_machine.startup_phases()
+
+    def _handler_stats_cue_latency(self, address):
+        return address, self._video_machine.cue_latency()
+
+    def _handler_stats_stalls(self, address):
+        return address, self._video_machine.stalls()
+
+    def _handler_trace_start(self, address, seconds: float):
+        match self._video_machine.start_trace(seconds):
+            case Success(paths):
+                return address, paths
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_trace_stop(self, address):
+        match self._video_machine.stop_trace():
+            case Success(paths):
+                return address, paths
+            case Failure(msg):
+                return address, msg
+        return None
+
+    def _handler_trace_status(self, address):
+        return address, self._video_machine.trace_status()
+
+    def _handler_scheduler_lateness(self, address):
+        return address, self._dispatcher.lateness_stats()
+
+    def _prepare_scheduled(self, address: str, args: list):
+        """Preroll the files of play commands that are scheduled in a bundle, so they start on time"""
+        plays = []
+        if address == "/cue":
+            match parse_cue_args(args):
+                case Success(ops):
+                    plays = [(op.output, op.slot, op.value) for op in ops if op.action is CueAction.PLAY]
+        else:
+            address_match = PLAY_BY_NUMBER_ADDRESS.match(address)
+            if address_match is not None and args and isinstance(args[0], int):
+                plays = [(int(address_match.group(1)), int(address_match.group(2)), args[0])]
+
+        for output, slot, number in plays:
+            match self._video_machine.preload_video(output, slot, number):
+                case Failure(msg):
+                    logger.info("Could not preroll scheduled %s: %s", address, msg)
+
+    def _handler_media_prefetch(self, address, *numbers):
+        if not numbers or not all(isinstance(n, int) for n in numbers):
+            return address, "Expected one or more file numbers (int)"
+
+        match self._video_machine.prefetch_media(list(numbers)):
             case Success():
                 return None
             case Failure(msg):
                 return address, msg
         return None
 
+    def _handler_media_prefetch_status(self, address, *numbers):
+        if not all(isinstance(n, int) for n in numbers):
+            return address, "Expected file numbers (int)"
+        return address, self._video_machine.prefetch_status(list(numbers))
+
+    def _command(self, lane: Lane, name: str, handler: Callable) -> Callable:
+        """Run the handler through the command executor. Handlers in the cue lane run right away and reply as usual.
+        Queued handlers run later and reply to the client once they ran."""
+
+        def submit(*args):
+            client = self._dispatcher.client_address
+            return self._video_machine.commands.submit(
+                lane,
+                name,
+                handler,
+                *args,
+                on_done=None if lane is Lane.CUE else lambda result: self._reply_later(client, result),
+                client=client,
+            )
+
+        return submit
+
+    def _reply_later(self, client: tuple[str, int] | None, result):
+        if result is None:
+            return
+        if client is None:
+            logger.warning("%s: %s", *result)
+            return
+        self._dispatcher.reply(client, result)
+
     @staticmethod
     def _assign_fixed_arg(pos: int, args: list[Any]) -> Any | None:
         try:
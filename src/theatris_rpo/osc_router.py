@@ -0,0 +1,188 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Generator, Iterable, Tuple
+
+from pythonosc.dispatcher import Dispatcher, Handler
+from pythonosc.osc_message_builder import build_msg
+from pythonoscquery.shared.osc_access import OSCAccess
+from pythonoscquery.shared.osc_address_space import OSCAddressSpace
+from pythonoscquery.shared.osc_path_node import OSCPathNode
+
+logger = logging.getLogger(__name__)
+
+SLOT_ADDRESS = re.compile(r"^/output(\d+)/slot(\d+)/(\w+)$")
+OSC_PATTERN_CHARS = re.compile(r"[*?\[\]{}]")
+
+
+@dataclass
+class SlotCommand:
+    name: str
+    callback: Callable
+    node: OSCPathNode  # type template for validating the arguments
+    description: str  # may contain {output} and {slot}
+
+
+def _pattern_to_regex(address_pattern: str) -> re.Pattern:
+    """Same translation of OSC address patterns as python-osc's dispatcher"""
+    pattern = re.escape(address_pattern).replace("\\?", "\\w?")
+    pattern = pattern.replace("\\*", "[\\w|\\+]*")
+    return re.compile(f"{pattern}$")
+
+
+class RoutingDispatcher(Dispatcher):
+    """Dispatcher that finds handlers by table lookup instead of matching every mapped address.
+
+    Commands that exist for every slot (/outputN/slotM/<command>) are registered once with map_slot_command(). The
+    address is parsed once and its handler is kept in a table, so neither registration nor dispatch grows with the
+    number of slots. Regular addresses are looked up directly in the map. Only address patterns with OSC wildcards
+    take the slow path that matches all addresses.
+
+    Results of handlers that run later than their message (e.g. queued commands) can be sent to the client with reply(),
+    through the sender of its connection (see set_reply_sender()) or else as a datagram by the default sender.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._slot_commands: dict[str, SlotCommand] = {}
+        self._slots: set[tuple[int, int]] = set()
+        self._routed: dict[str, Handler] = {}
+        self._reply_senders: dict[Tuple[str, int], Callable[[bytes], None]] = {}
+        self._send_datagram: Callable[[bytes, Tuple[str, int]], None] | None = None
+
+    def set_reply_sender(self, client_address: Tuple[str, int], send: Callable[[bytes], None] | None):
+        """Send the replies to the client with send (e.g. to its TCP connection), None: back to the default sender"""
+        if send is None:
+            self._reply_senders.pop(client_address, None)
+        else:
+            self._reply_senders[client_address] = send
+
+    def set_default_reply_sender(self, send_datagram: Callable[[bytes, Tuple[str, int]], None]):
+        self._send_datagram = send_datagram
+
+    def reply(self, client_address: Tuple[str, int], result: Any):
+        """Send a handler result (address and values) to the client, like the server does with immediate results"""
+        if not isinstance(result, tuple):
+            result = [result]
+        data = build_msg(result[0], result[1:]).dgram
+        send = self._reply_senders.get(client_address)
+        if send is not None:
+            send(data)
+        elif self._send_datagram is not None:
+            self._send_datagram(data, client_address)
+
+    def map_slot_command(
+            self,
+            name: str,
+            callback: Callable,
+            access: OSCAccess,
+            description: str,
+            value=None,
+    ):
+        """Map a command for all slots. The callback gets [output, slot] as fixed arguments, the OSC arguments are
+        type-checked against value like map_node() does."""
+        node = OSCPathNode(f"/slot_command/{name}", access=access, value=value)
+        self._slot_commands[name] = SlotCommand(name, callback, node, description)
+        self._routed.clear()
+
+    def add_slots(self, slots: Iterable[tuple[int, int]]):
+        """Make the slot commands available for these (output, slot) pairs"""
+        self._slots.update(slots)
+        self._routed.clear()
+
+    def advertise_slot_commands(self, address_space: OSCAddressSpace):
+        """Add nodes for all slot commands to the address space, for OSCQuery.
+
+        Building the subtrees directly avoids OSCAddressSpace.add_node(), which searches the whole tree for every
+        segment of every added node."""
+        for output in sorted({o for o, _ in self._slots}):
+            output_path = f"/output{output}"
+            output_node = address_space.find_node(output_path)
+            if output_node is None:
+                output_node = OSCPathNode(output_path)
+                address_space.add_node(output_node)
+
+            for slot in sorted(s for o, s in self._slots if o == output):
+                slot_node = OSCPathNode(f"{output_path}/slot{slot}")
+                for command in self._slot_commands.values():
+                    slot_node.add_child(
+                        OSCPathNode(
+                            f"{output_path}/slot{slot}/{command.name}",
+                            access=command.node.access,
+                            value=command.node.value,
+                            description=command.description.format(output=output, slot=slot),
+                        )
+                    )
+                output_node.add_child(slot_node)
+
+        type(address_space).number_of_nodes.fget.cache_clear()
+
+    def handlers_for_address(
+            self, address_pattern: str
+    ) -> Generator[Handler, None, None]:
+        if OSC_PATTERN_CHARS.search(address_pattern):
+            yield from self._handlers_for_pattern(address_pattern)
+            return
+
+        handlers = self._map.get(address_pattern)
+        if handlers:
+            yield from handlers
+            return
+
+        handler = self._route(address_pattern)
+        if handler is not None:
+            yield handler
+            return
+
+        if self._default_handler:
+            yield self._default_handler
+
+    def _route(self, address: str) -> Handler | None:
+        handler = self._routed.get(address)
+        if handler is not None:
+            return handler
+
+        address_match = SLOT_ADDRESS.match(address)
+        if address_match is None:
+            return None
+        output, slot, name = int(address_match.group(1)), int(address_match.group(2)), address_match.group(3)
+        command = self._slot_commands.get(name)
+        if command is None or (output, slot) not in self._slots:
+            return None
+
+        handler = Handler(self._type_checked(command), [output, slot])
+        self._routed[address] = handler
+        return handler
+
+    @staticmethod
+    def _type_checked(command: SlotCommand) -> Callable:
+        """Like pythonoscquery's OSCCallbackWrapper, without its per-message debug formatting"""
+
+        def callback(address: str, fixed_args: list, *values):
+            try:
+                values = command.node.validate_values(list(values))
+            except TypeError as e:
+                logger.error("%s: %s", address, e)
+                return None
+            return command.callback(address, fixed_args, *values)
+
+        return callback
+
+    def _handlers_for_pattern(self, address_pattern: str) -> Generator[Handler, None, None]:
+        regex = _pattern_to_regex(address_pattern)
+        matched = False
+
+        for address, handlers in self._map.items():
+            if regex.match(address):
+                yield from handlers
+                matched = True
+
+        for output, slot in sorted(self._slots):
+            for name in self._slot_commands:
+                address = f"/output{output}/slot{slot}/{name}"
+                if regex.match(address):
+                    yield self._route(address)
+                    matched = True
+
+        if not matched and self._default_handler:
+            yield self._default_handler
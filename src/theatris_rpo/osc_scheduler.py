@@ -0,0 +1,187 @@
+import logging
+import re
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Tuple, List
+
+from gi.repository import GLib
+from pythonosc import osc_packet
+from pythonosc.dispatcher import Handler
+from pythonosc.osc_message import OscMessage
+
+from theatris_rpo.metrics import CounterValue, osc_messages_total
+from theatris_rpo.osc_router import OSC_PATTERN_CHARS, RoutingDispatcher
+
+logger = logging.getLogger(__name__)
+
+# Scheduled commands are prepared (e.g. prerolled) this long before they are due
+PREROLL_LEAD_SECONDS = 1.0
+
+# The main loop timers have millisecond resolution, a command that fires earlier than this is re-armed
+EARLY_TOLERANCE_SECONDS = 0.0005
+
+# Output and slot numbers are left out of the command names of the message counts, to keep their number small
+OUTPUT_SLOT_NUMBERS = re.compile(r"/(output|slot)\d+")
+
+
+@dataclass(frozen=True)
+class ScheduleReport:
+    address: str
+    lateness: float  # seconds the command ran after its timetag
+
+
+class ScheduledDispatcher(RoutingDispatcher):
+    """Dispatcher that honours the timetags of OSC bundles.
+
+    python-osc sleeps until a bundle is due, which would block the main loop. Instead, messages with a future timetag
+    are queued on the GLib main loop and run when they are due. Shortly before that, the prepare callback is called
+    with the address and arguments, so slow work like prerolling a pipeline can be done in advance and the command
+    itself takes effect on time. How late each scheduled command actually ran is kept for reporting.
+
+    Messages that are due (or have no timetag) are dispatched immediately, as before.
+    """
+
+    def __init__(
+            self,
+            prepare: Callable[[str, list], None] | None = None,
+            preroll_lead_seconds: float = PREROLL_LEAD_SECONDS,
+            max_reports: int = 256,
+    ):
+        super().__init__()
+        self._prepare = prepare
+        self._preroll_lead = preroll_lead_seconds
+        self._reports: deque[ScheduleReport] = deque(maxlen=max_reports)
+        self._pending = 0
+        self._message_counts: dict[str, CounterValue] = {}
+        self._client_address: Tuple[str, int] | None = None
+
+    @property
+    def client_address(self) -> Tuple[str, int] | None:
+        """The client whose message is being handled, None outside of the handlers"""
+        return self._client_address
+
+    @property
+    def reports(self) -> list[ScheduleReport]:
+        """Most recent scheduled commands, oldest first"""
+        return list(self._reports)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def lateness_stats(self) -> list[float]:
+        """Number of pending commands, number of reports and last, mean and max lateness in milliseconds"""
+        lateness = [r.lateness * 1000.0 for r in self._reports]
+        if not lateness:
+            return [self._pending, 0, 0.0, 0.0, 0.0]
+        return [
+            self._pending,
+            len(lateness),
+            lateness[-1],
+            statistics.fmean(lateness),
+            max(lateness),
+        ]
+
+    def call_handlers_for_packet(
+            self, data: bytes, client_address: Tuple[str, int]
+    ) -> List:
+        results = []
+        try:
+            packet = osc_packet.OscPacket(data)
+        except osc_packet.ParseError:
+            return results
+
+        now = time.time()
+        for timed_msg in packet.messages:
+            handlers = list(self.handlers_for_address(timed_msg.message.address))
+            self._count_message(timed_msg.message.address, handlers)
+            if not handlers:
+                continue
+
+            delay = timed_msg.time - now
+            if delay <= 0.0:
+                results.extend(self._invoke(handlers, client_address, timed_msg.message))
+            else:
+                self._schedule(handlers, client_address, timed_msg.message, delay)
+        return results
+
+    def _count_message(self, address: str, handlers: list[Handler]):
+        count = self._message_counts.get(address)
+        if count is None:
+            # Unknown addresses and patterns are not kept, there is no limit to them
+            if not handlers or handlers == [self._default_handler]:
+                osc_messages_total.labels("unknown").inc()
+                return
+            if OSC_PATTERN_CHARS.search(address):
+                osc_messages_total.labels("pattern").inc()
+                return
+            count = osc_messages_total.labels(OUTPUT_SLOT_NUMBERS.sub(r"/\1X", address))
+            self._message_counts[address] = count
+        count.inc()
+
+    def _schedule(
+            self,
+            handlers: list[Handler],
+            client_address: Tuple[str, int],
+            message: OscMessage,
+            delay: float,
+    ):
+        due = time.monotonic() + delay
+        self._pending += 1
+        logger.debug("Scheduled %s in %.3f s", message.address, delay)
+
+        if self._prepare is not None:
+            lead = delay - self._preroll_lead
+            if lead <= 0.0:
+                self._run_prepare(message)
+            else:
+                GLib.timeout_add(int(lead * 1000.0), self._run_prepare, message)
+
+        GLib.timeout_add(
+            int(delay * 1000.0), self._fire, handlers, client_address, message, due
+        )
+
+    def _run_prepare(self, message: OscMessage) -> bool:
+        try:
+            self._prepare(message.address, message.params)
+        except Exception:
+            logger.exception("Could not prepare scheduled %s", message.address)
+        return GLib.SOURCE_REMOVE
+
+    def _fire(
+            self,
+            handlers: list[Handler],
+            client_address: Tuple[str, int],
+            message: OscMessage,
+            due: float,
+    ) -> bool:
+        early = due - time.monotonic()
+        if early > EARLY_TOLERANCE_SECONDS:
+            GLib.timeout_add(int(early * 1000.0), self._fire, handlers, client_address, message, due)
+            return GLib.SOURCE_REMOVE
+
+        lateness = time.monotonic() - due
+        self._pending -= 1
+        for result in self._invoke(handlers, client_address, message):
+            # There is no datagram to reply to anymore, at least make failures visible
+            logger.warning("Scheduled %s: %s", message.address, result)
+
+        self._reports.append(ScheduleReport(message.address, lateness))
+        logger.info("Scheduled %s ran %.2f ms late", message.address, lateness * 1000.0)
+        return GLib.SOURCE_REMOVE
+
+    def _invoke(
+            self, handlers: list[Handler], client_address: Tuple[str, int], message: OscMessage
+    ) -> list:
+        results = []
+        self._client_address = client_address
+        try:
+            for handler in handlers:
+                result = handler.invoke(client_address, message)
+                if result is not None:
+                    results.append(result)
+        finally:
+            self._client_address = None
+        return results
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from pythonosc import slip
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_message_builder import build_msg
+
+from theatris_rpo.base_interface import BaseInterface, AsyncOscInterfaceMixin
+from theatris_rpo.osc_router import RoutingDispatcher
+
+if TYPE_CHECKING:
+    from theatris_rpo.video_machine import VideoMachine
+
+logger = logging.getLogger(__name__)
+
+# Larger packets are a protocol error, the connection is closed
+MAX_PACKET_BYTES = 1024 * 1024
+
+
+def encode_replies(results: list) -> bytes:
+    """SLIP-encoded OSC messages for the handler results, like AsyncIOOSCUDPServer builds them"""
+    data = b""
+    for result in results:
+        if not isinstance(result, tuple):
+            result = [result]
+        data += slip.encode(build_msg(result[0], result[1:]).dgram)
+    return data
+
+
+class OscTcpInterface(BaseInterface, AsyncOscInterfaceMixin):
+    """OSC 1.1 over TCP, i.e. packets framed with double-ended SLIP.
+
+    Unlike UDP, nothing is dropped under load and replies of any size arrive complete. Every connection is served by
+    its own task on the asyncio loop (which runs on the GLib main loop), using the same dispatcher as the UDP interface.
+    Packets of a connection are dispatched in order and their replies are written in that order, so clients can
+    pipeline commands without waiting for each reply. Queued commands of the connection run before its next packet is
+    dispatched, their replies are written to the connection when they ran.
+    """
+
+    def __init__(self, ip_address, port, video_machine: "VideoMachine", dispatcher: Dispatcher):
+        super().__init__(video_machine)
+        self._ip = ip_address
+        self._port = port
+        self._dispatcher = dispatcher
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    async def async_start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self._ip, self._port, limit=MAX_PACKET_BYTES
+        )
+        logger.info("Started OSC TCP server on %s:%s", self._ip, self._port)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+
+    def send_heartbeat(self, beat_state: bool):
+        pass
+
+    async def _handle_connection(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        client_address = writer.get_extra_info("peername")[:2]
+        self._connections.add(writer)
+        logger.debug("OSC TCP client %s:%s connected", *client_address)
+        routing = self._dispatcher if isinstance(self._dispatcher, RoutingDispatcher) else None
+        if routing is not None:
+            routing.set_reply_sender(client_address, lambda data: writer.write(slip.encode(data)))
+        try:
+            while True:
+                # Double-ended SLIP: an END before and after every packet, i.e. empty packets in between
+                frame = await reader.readuntil(slip.END)
+                if len(frame) == 1:
+                    continue
+                try:
+                    packet = slip.decode(frame)
+                except slip.ProtocolError:
+                    logger.warning("OSC TCP client %s:%s: Invalid SLIP packet", *client_address)
+                    continue
+
+                if self._vm is not None:
+                    self._vm.commands.run_queued(client_address)
+                replies = encode_replies(
+                    self._dispatcher.call_handlers_for_packet(packet, client_address)
+                )
+                if replies:
+                    writer.write(replies)
+                    await writer.drain()
+        except asyncio.LimitOverrunError:
+            logger.warning("OSC TCP client %s:%s sent an oversized packet", *client_address)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if routing is not None:
+                routing.set_reply_sender(client_address, None)
+            self._connections.discard(writer)
+            writer.close()
+            logger.debug("OSC TCP client %s:%s disconnected", *client_address)
@@ -0,0 +1,331 @@
+import asyncio
+import atexit
+import base64
+import enum
+import hashlib
+import ipaddress
+import json
+import logging
+import socket
+import struct
+import threading
+from ipaddress import IPv4Address, IPv6Address
+from typing import Any
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonoscquery.osc_query_service import (
+    OSCQueryHTTPHandler,
+    OSCQueryHTTPServer,
+    OSCQueryService,
+)
+from pythonoscquery.shared.osc_address_space import OSCAddressSpace
+from pythonoscquery.shared.osc_host_info import OSCHostInfo
+from pythonoscquery.shared.osc_path_node import OSCPathNode
+from pythonoscquery.shared.oscquery_spec import OSCQueryAttribute
+from zeroconf import Zeroconf
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Clients only send short commands, anything larger is a protocol error
+MAX_INCOMING_FRAME_BYTES = 64 * 1024
+
+# A client that does not accept any data for this long is disconnected
+SEND_TIMEOUT_SECONDS = 10.0
+
+
+class Opcode(enum.IntEnum):
+    CONTINUATION = 0x0
+    TEXT = 0x1
+    BINARY = 0x2
+    CLOSE = 0x8
+    PING = 0x9
+    PONG = 0xA
+
+
+class WebSocketError(Exception):
+    pass
+
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept for the Sec-WebSocket-Key of a handshake (RFC 6455)"""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def encode_frame(opcode: Opcode, payload: bytes) -> bytes:
+    """Single, unmasked frame, as sent by servers"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[Opcode, bytes, bool]:
+    """Read one masked client frame, returns opcode, payload and the FIN flag"""
+    first, second = await reader.readexactly(2)
+    fin = bool(first & 0x80)
+    opcode = Opcode(first & 0x0F)
+    if not second & 0x80:
+        raise WebSocketError("Client frames must be masked")
+
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_INCOMING_FRAME_BYTES:
+        raise WebSocketError(f"Frame of {length} bytes is too large")
+
+    mask = await reader.readexactly(4)
+    payload = bytearray(await reader.readexactly(length))
+    for i in range(length):
+        payload[i] ^= mask[i % 4]
+    return opcode, bytes(payload), fin
+
+
+class ListenClient:
+    """A websocket client of the OSCQuery server that can LISTEN to value changes of nodes.
+
+    Value changes are handed over by offer(), which never blocks: each client has its own queue that holds at most the
+    newest value per path. While a client is slow, older values of a path are replaced instead of piling up, so a slow
+    client only gets fewer updates and neither stalls the main loop nor other clients.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._peer = writer.get_extra_info("peername")
+        self._listening: set[str] = set()
+        self._pending: dict[str, bytes] = {}
+        self._wakeup = asyncio.Event()
+        self._coalesced = 0
+
+    def is_listening(self, path: str) -> bool:
+        return path in self._listening
+
+    @property
+    def coalesced(self) -> int:
+        """Number of values that were replaced by a newer one before they could be sent"""
+        return self._coalesced
+
+    def offer(self, path: str, osc_message: bytes):
+        if path not in self._listening:
+            return
+        if path in self._pending:
+            self._coalesced += 1
+        self._pending[path] = osc_message
+        self._wakeup.set()
+
+    async def run(self):
+        logger.info("OSCQuery client %s connected", self._peer)
+        sender = asyncio.create_task(self._send_pending())
+        try:
+            await self._receive()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except WebSocketError as e:
+            logger.warning("OSCQuery client %s: %s", self._peer, e)
+        finally:
+            sender.cancel()
+            self._writer.close()
+            logger.info("OSCQuery client %s disconnected", self._peer)
+
+    async def _receive(self):
+        message = b""
+        while True:
+            opcode, payload, fin = await read_frame(self._reader)
+            match opcode:
+                case Opcode.CLOSE:
+                    self._writer.write(encode_frame(Opcode.CLOSE, payload[:2]))
+                    return
+                case Opcode.PING:
+                    self._writer.write(encode_frame(Opcode.PONG, payload))
+                case Opcode.TEXT | Opcode.CONTINUATION:
+                    message += payload
+                    if fin:
+                        self._handle_command(message)
+                        message = b""
+
+    def _handle_command(self, message: bytes):
+        try:
+            command = json.loads(message)
+            name, path = command["COMMAND"], command["DATA"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("OSCQuery client %s: Invalid command %r", self._peer, message)
+            return
+
+        match name:
+            case "LISTEN":
+                self._listening.add(path)
+            case "IGNORE":
+                self._listening.discard(path)
+                self._pending.pop(path, None)
+            case _:
+                logger.debug("OSCQuery client %s: Ignoring command %s", self._peer, name)
+
+    async def _send_pending(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                pending, self._pending = self._pending, {}
+                for osc_message in pending.values():
+                    self._writer.write(encode_frame(Opcode.BINARY, osc_message))
+                # Waits while the socket buffer is full, values offered meanwhile are coalesced
+                await asyncio.wait_for(self._writer.drain(), SEND_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, ConnectionError):
+            logger.warning("OSCQuery client %s does not accept data, disconnecting", self._peer)
+            self._writer.transport.abort()
+
+
+class StreamingOSCQueryHTTPHandler(OSCQueryHTTPHandler):
+    def do_GET(self) -> None:
+        if self.headers.get("Upgrade", "").lower() != "websocket":
+            super().do_GET()
+            return
+
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key:
+            self._respond(400, "Missing Sec-WebSocket-Key")
+            return
+
+        # Websocket clients expect an HTTP/1.1 status line, other responses stay HTTP/1.0 (without keep-alive)
+        self.protocol_version = "HTTP/1.1"
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept_key(key))
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.server.upgraded.add(self.request)
+
+
+class StreamingOSCQueryHTTPServer(OSCQueryHTTPServer):
+    """HTTP server of the OSCQuery service. Upgraded websocket connections are handed over to the asyncio loop."""
+
+    def __init__(self, *args, on_upgrade, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upgraded: set[socket.socket] = set()
+        self._on_upgrade = on_upgrade
+
+    def shutdown_request(self, request):
+        if request in self.upgraded:
+            self.upgraded.discard(request)
+            self._on_upgrade(socket.socket(fileno=request.detach()))
+            return
+        super().shutdown_request(request)
+
+
+class StreamingOSCQueryService(OSCQueryService):
+    """OSCQuery service with the LISTEN extension.
+
+    Clients open a websocket on the HTTP port and send LISTEN/IGNORE commands for node paths. Values passed to
+    publish() are stored as the node's VALUE (for HTTP queries) and streamed as OSC messages to the listening clients.
+    The websockets run on the given asyncio loop, i.e. on the main loop, publish() must be called from there, too.
+    """
+
+    def __init__(
+            self,
+            address_space: OSCAddressSpace,
+            server_name: str,
+            http_port: int,
+            osc_port: int,
+            osc_ip: IPv4Address | IPv6Address | str,
+            loop: asyncio.AbstractEventLoop,
+    ):
+        # Like OSCQueryService.__init__(), but with the streaming HTTP server
+        self._address_space = address_space
+        self.server_name = server_name
+        self.http_port = http_port
+        self.osc_port = osc_port
+        self.osc_ip = ipaddress.ip_address(osc_ip)
+
+        self._loop = loop
+        self._clients: set[ListenClient] = set()
+        self._nodes: dict[str, OSCPathNode] = {}
+
+        self.host_info = OSCHostInfo(
+            server_name,
+            {
+                "ACCESS": True,
+                "CLIPMODE": False,
+                "RANGE": False,
+                "TYPE": True,
+                "VALUE": True,
+                "LISTEN": True,
+            },
+            str(self.osc_ip),
+            self.osc_port,
+            "UDP",
+        )
+
+        zeroconf = Zeroconf(interfaces=[str(self.osc_ip)])
+        self._advertise_osc_query_service(zeroconf)
+        self._advertise_osc_service(zeroconf)
+        http_server = StreamingOSCQueryHTTPServer(
+            self._address_space,
+            self.host_info,
+            ("", self.http_port),
+            StreamingOSCQueryHTTPHandler,
+            on_upgrade=self._adopt_threadsafe,
+        )
+        http_thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+        http_thread.start()
+        logger.info(
+            f"Service started as {self.server_name} on {self.osc_ip}:{self.http_port}"
+        )
+
+        def cleanup():
+            zeroconf.unregister_all_services()
+            zeroconf.close()
+            http_server.shutdown()
+
+        atexit.register(cleanup)
+
+    @property
+    def clients(self) -> set[ListenClient]:
+        return set(self._clients)
+
+    def publish(self, path: str, value: Any):
+        node = self._node(path)
+        if node is not None:
+            with self._address_space.lock:
+                node.attributes[OSCQueryAttribute.VALUE] = [value]
+
+        if not any(c.is_listening(path) for c in self._clients):
+            return
+        # Encoded once for all clients
+        builder = OscMessageBuilder(path)
+        builder.add_arg(value)
+        osc_message = builder.build().dgram
+        for client in self._clients:
+            client.offer(path, osc_message)
+
+    def _node(self, path: str) -> OSCPathNode | None:
+        """Cached, since find_node() searches the whole tree"""
+        node = self._nodes.get(path)
+        if node is None:
+            node = self._address_space.find_node(path)
+            if node is not None:
+                self._nodes[path] = node
+        return node
+
+    def _adopt_threadsafe(self, sock: socket.socket):
+        """Called from the thread of the HTTP request"""
+        asyncio.run_coroutine_threadsafe(self._adopt(sock), self._loop)
+
+    async def _adopt(self, sock: socket.socket):
+        reader, writer = await asyncio.open_connection(sock=sock)
+        client = ListenClient(reader, writer)
+        self._clients.add(client)
+        try:
+            await client.run()
+        finally:
+            self._clients.discard(client)
@@ -0,0 +1,713 @@
+import itertools
+import logging
+import multiprocessing
+import pickle
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from gi.repository import GLib, Gst
+from returns.result import Result, Success, Failure
+
+from theatris_rpo.command_executor import CommandStats
+from theatris_rpo.config import config, Conf
+from theatris_rpo.cue import CueBatch, CueOp, CueStep, READY_TIMEOUT_SECONDS, START_LATENCY_SECONDS
+from theatris_rpo.frame_ring import FrameRingCache
+from theatris_rpo.gst_pipeline import StartClock
+from theatris_rpo.log_pipeline import LOGGING_THREAD_NAME, stop_logging
+from theatris_rpo.metrics import MetricsRegistry, SlotSampler, main_loop_lag_seconds, metrics_registry
+from theatris_rpo.pipeline_executor import pipeline_executor
+from theatris_rpo.slot_state import SlotState
+from theatris_rpo.trace_capture import trace_capture
+from theatris_rpo.warmup import CueLatencyStats, cue_latency_stats, load_plugin_features, warm_pipeline
+from theatris_rpo.watchdog import StallLog, stall_log
+
+if TYPE_CHECKING:
+    from theatris_rpo.video_output import BaseOutput
+    from theatris_rpo.video_slot import VideoSlot
+
+logger = logging.getLogger(__name__)
+
+# Methods of BaseOutput the coordinator may call in an output process
+OUTPUT_COMMANDS = frozenset(
+    {
+        "play_video",
+        "preload_video",
+        "crossfade",
+        "play_test",
+        "stop_all_video",
+        "stop_video",
+        "set_alpha",
+        "pause",
+        "set_slot_config",
+    }
+)
+
+UPDATE_INTERVAL_SECONDS = 0.016
+# How often an output process sends the state of its slots without being asked (e.g. position and alpha for feedback)
+SNAPSHOT_INTERVAL_SECONDS = 0.05
+CALL_TIMEOUT_SECONDS = 1.0
+STOP_TIMEOUT_SECONDS = 2.0
+MAX_MESSAGE_BYTES = 1024 * 1024
+METRICS_SAMPLE_INTERVAL_SECONDS = 1.0
+
+# Metrics that are collected in an output process and served by the coordinator
+OUTPUT_PROCESS_METRICS = (
+    "theatris_cue_latency_seconds",
+    "theatris_main_loop_lag_seconds",
+    "theatris_slot_frames_total",
+    "theatris_slot_dropped_frames_total",
+    "theatris_slot_fps",
+)
+
+
+def send(sock: socket.socket, message: tuple):
+    sock.send(pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+
+def receive(sock: socket.socket, flags: int = 0) -> tuple | None:
+    """The next message, None if the other side closed the socket"""
+    data = sock.recv(MAX_MESSAGE_BYTES, flags)
+    if not data:
+        return None
+    return pickle.loads(data)
+
+
+@dataclass(frozen=True)
+class SlotSnapshot:
+    """State of a slot in an output process, with the read-only properties of VideoSlot the coordinator uses"""
+
+    id: int
+    state: SlotState
+    is_active: bool
+    is_paused: bool
+    is_looping: bool
+    is_auto_faded: bool
+    is_preloaded: bool
+    is_prerolled: bool
+    is_crossfading: bool
+    is_stalled: bool
+    current_file_path: Path | None
+    alpha: float
+    position: float
+    last_cue_latency: float | None
+
+    @classmethod
+    def of(cls, slot: "VideoSlot") -> "SlotSnapshot":
+        return cls(
+            slot.id,
+            slot.state,
+            slot.is_active,
+            slot.is_paused,
+            slot.is_looping,
+            slot.is_auto_faded,
+            slot.is_preloaded,
+            slot.is_prerolled,
+            slot.is_crossfading,
+            slot.is_stalled,
+            slot.current_file_path,
+            slot.alpha,
+            slot.position,
+            slot.last_cue_latency,
+        )
+
+    @classmethod
+    def initial(cls, slot_id: int) -> "SlotSnapshot":
+        """A slot of a process that did not send its first snapshot yet"""
+        flags = (False,) * 8  # is_active ... is_stalled
+        return cls(slot_id, SlotState.UNINITIALIZED, *flags, None, 0.0, 0.0, None)
+
+
+@dataclass(frozen=True)
+class OutputSnapshot:
+    slots: tuple[SlotSnapshot, ...]
+    loop_lag: CommandStats  # how much later than scheduled the updates (i.e. fade steps) of the process ran
+    cue_latency: CueLatencyStats
+    stalls: StallLog
+    metrics: MetricsRegistry | None  # only if the metrics are served, see OUTPUT_PROCESS_METRICS
+
+
+class OutputWorker:
+    """Runs an output and its slots on the main loop of an output process and executes the coordinator's commands"""
+
+    def __init__(self, sock: socket.socket, output: "BaseOutput"):
+        self._sock = sock
+        self._output = output
+        self._mainloop = GLib.MainLoop()
+        self._cues: dict[int, CueBatch] = {}
+        self._loop_lag = CommandStats()
+        self._update_due: float | None = None
+        self._next_snapshot = 0.0
+        self._slot_sampler = SlotSampler()
+        self._next_sample = 0.0
+        self._metrics = metrics_registry.subset(OUTPUT_PROCESS_METRICS) if config[Conf.METRICS_PORT] else None
+        self._trace_cue: Any = -1  # cue number of the coordinator's cue list, for the markers of a trace
+
+    def run(self):
+        GLib.io_add_watch(
+            self._sock.fileno(),
+            GLib.PRIORITY_HIGH,
+            GLib.IOCondition.IN | GLib.IOCondition.HUP,
+            self._on_readable,
+        )
+        self._update()
+        self._mainloop.run()
+
+    def _on_readable(self, fd, condition) -> bool:
+        while True:
+            try:
+                message = receive(self._sock, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return GLib.SOURCE_CONTINUE
+            except OSError:
+                message = None
+            if message is None:
+                logger.info("Coordinator is gone, stopping %s", self._output)
+                self._mainloop.quit()
+                return GLib.SOURCE_REMOVE
+            self._handle(message)
+
+    def _handle(self, message: tuple):
+        match message:
+            case ("call", call_id, name, args):
+                ok, value = self._call(name, args)
+                self._send(("reply", call_id, ok, value, self._snapshot()))
+            case ("go", cue_id, base_time):
+                batch = self._cues.get(cue_id)
+                if batch is not None:
+                    batch.go(StartClock(Gst.SystemClock.obtain(), base_time))
+            case ("trace_cue", cue_number):
+                self._trace_cue = cue_number
+            case ("quit",):
+                self._mainloop.quit()
+            case _:
+                logger.warning("%s: Unknown message %r", self._output, message)
+
+    def _call(self, name: str, args: tuple) -> tuple[bool, Any]:
+        try:
+            if name == "cue":
+                result = self._prepare_cue(*args)
+            elif name == "reset_loop_lag":
+                self._loop_lag = CommandStats()
+                result = Success(None)
+            elif name == "warm_up":
+                # In the background, the slots are usable meanwhile
+                pipeline_executor.submit(warm_pipeline, *args)
+                result = Success(None)
+            elif name == "start_trace":
+                path, seconds, max_bytes, self._trace_cue = args
+                result = trace_capture.start(
+                    path, self._output.video_slots, seconds, max_bytes, lambda: self._trace_cue
+                )
+            elif name == "stop_trace":
+                result = trace_capture.stop()
+            elif name == "trace_status":
+                result = Success(trace_capture.status())
+            elif name in OUTPUT_COMMANDS:
+                result = getattr(self._output, name)(*args)
+            else:
+                return False, f"Unknown output command {name}"
+        except Exception as e:
+            logger.exception("%s: %s failed", self._output, name)
+            return False, str(e)
+
+        match result:
+            case Failure(msg):
+                return False, msg
+            case Success(value):
+                return True, value
+        return True, None
+
+    def _prepare_cue(self, cue_id: int, steps: list[tuple[CueOp, Path | None]]) -> Result[None, str]:
+        """Preroll the files of the cue's steps on this output, the coordinator starts them all with 'go'"""
+        cue_steps = [CueStep(op, self._output.video_slots[op.slot], file_path) for op, file_path in steps]
+        batch = CueBatch(
+            cue_steps,
+            on_started=lambda: self._on_cue_started(cue_id),
+            on_ready=lambda: self._send(("cue_ready", cue_id)),
+        )
+        self._cues[cue_id] = batch
+        batch.start()
+        return Success(None)
+
+    def _on_cue_started(self, cue_id: int):
+        self._cues.pop(cue_id, None)
+        self._send(("cue_started", cue_id))
+
+    def _snapshot(self) -> OutputSnapshot:
+        return OutputSnapshot(
+            tuple(SlotSnapshot.of(slot) for slot in self._output.video_slots),
+            self._loop_lag,
+            cue_latency_stats,
+            stall_log,
+            self._metrics,
+        )
+
+    def _send(self, message: tuple):
+        try:
+            send(self._sock, message)
+        except OSError:
+            logger.info("Coordinator is gone, stopping %s", self._output)
+            self._mainloop.quit()
+
+    def _update(self):
+        now = time.monotonic()
+        if self._update_due is not None:
+            lag = max(0.0, now - self._update_due)
+            self._loop_lag.add(lag)
+            main_loop_lag_seconds.observe(lag)
+        self._output.update(UPDATE_INTERVAL_SECONDS)
+        if now >= self._next_sample:
+            self._next_sample = now + METRICS_SAMPLE_INTERVAL_SECONDS
+            self._slot_sampler.sample([self._output], now)
+        if now >= self._next_snapshot:
+            self._next_snapshot = now + SNAPSHOT_INTERVAL_SECONDS
+            self._send(("snapshot", self._snapshot()))
+
+        self._update_due = time.monotonic() + UPDATE_INTERVAL_SECONDS
+        GLib.timeout_add(int(UPDATE_INTERVAL_SECONDS * 1000.0), self._update)
+
+
+def run_output_process(
+        sock: socket.socket,
+        coordinator_socks: list[socket.socket],
+        output: "BaseOutput",
+        slot_count: int,
+        frame_ring_budget_bytes: int,
+):
+    """Entry point of an output process"""
+    # Otherwise the coordinator's ends stay open here, and the processes would not notice when the coordinator is gone
+    for coordinator_sock in coordinator_socks:
+        coordinator_sock.close()
+
+    Gst.init(None)
+    if config[Conf.WARM_UP]:
+        load_plugin_features()
+
+    frame_ring_cache = FrameRingCache(frame_ring_budget_bytes, config[Conf.FRAME_RING_CLIP_MAX_BYTES])
+    for _ in range(slot_count):
+        output.add_video_slot(None, frame_ring_cache)
+
+    try:
+        OutputWorker(sock, output).run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # The process ends without running the atexit handlers
+        stop_logging()
+
+
+class RemoteOutput:
+    """Coordinator side of an output that runs in an output process. Commands are forwarded and wait for the reply,
+    the slots are the latest snapshots of the process. Memory buffers of the media cache stay in the coordinator, the
+    process plays the file itself."""
+
+    def __init__(
+            self,
+            output: "BaseOutput",
+            process: multiprocessing.Process,
+            sock: socket.socket,
+            on_event: Callable[[str, int, int], None],
+            slot_count: int,
+    ):
+        self._id = output.id
+        self._connector_name = output.connector_name
+        self._connected = output.is_connected
+        self._width = output.width
+        self._height = output.height
+
+        self._process = process
+        self._sock = sock
+        self._on_event = on_event
+        self._call_ids = itertools.count()
+        self._snapshot: OutputSnapshot | None = None
+        # The slots are known before the first snapshot, the interfaces map their addresses right away
+        self._initial_slots = tuple(SlotSnapshot.initial(slot_id) for slot_id in range(slot_count))
+        self._alive = True
+
+        GLib.io_add_watch(
+            sock.fileno(),
+            GLib.PRIORITY_HIGH,
+            GLib.IOCondition.IN | GLib.IOCondition.HUP,
+            self._on_readable,
+        )
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._id}) '{self._connector_name}' (pid {self._process.pid})"
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def connector_name(self):
+        return self._connector_name
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def process(self) -> multiprocessing.Process:
+        return self._process
+
+    @property
+    def video_slots(self) -> list[SlotSnapshot]:
+        return list(self._snapshot.slots if self._snapshot else self._initial_slots)
+
+    @property
+    def loop_lag(self) -> CommandStats:
+        """See OutputSnapshot"""
+        return self._snapshot.loop_lag if self._snapshot else CommandStats()
+
+    @property
+    def cue_latency(self) -> CueLatencyStats:
+        return self._snapshot.cue_latency if self._snapshot else CueLatencyStats()
+
+    @property
+    def stalls(self) -> StallLog:
+        return self._snapshot.stalls if self._snapshot else StallLog()
+
+    @property
+    def metrics(self) -> MetricsRegistry | None:
+        """Metrics of the process as of the latest snapshot"""
+        return self._snapshot.metrics if self._snapshot else None
+
+    def reset_loop_lag(self) -> Result[None, str]:
+        return self.call("reset_loop_lag")
+
+    def play_video(
+            self,
+            slot_number: int,
+            file_path: Path | None = None,
+            restart_if_already_playing: bool = False,
+            memory_buffer: Any | None = None,
+    ) -> Result[None, str]:
+        return self.call("play_video", slot_number, file_path, restart_if_already_playing)
+
+    def preload_video(
+            self, slot_number: int, file_path: Path, memory_buffer: Any | None = None
+    ) -> Result[None, str]:
+        return self.call("preload_video", slot_number, file_path)
+
+    def crossfade(
+            self,
+            from_slot_number: int,
+            to_slot_number: int,
+            file_path: Path,
+            seconds: float,
+            memory_buffer: Any | None = None,
+    ) -> Result[None, str]:
+        return self.call("crossfade", from_slot_number, to_slot_number, file_path, seconds)
+
+    def play_test(self, slot_number: int) -> Result[None, str]:
+        return self.call("play_test", slot_number)
+
+    def stop_all_video(self) -> Result[None, str]:
+        return self.call("stop_all_video")
+
+    def stop_video(self, slot_number: int) -> Result[None, str]:
+        return self.call("stop_video", slot_number)
+
+    def set_alpha(self, slot_number: int, factor: float) -> Result[None, str]:
+        return self.call("set_alpha", slot_number, factor)
+
+    def pause(self, slot_number: int) -> Result[None, str]:
+        return self.call("pause", slot_number)
+
+    def set_slot_config(self, slot_number: int, slot_flag, *args) -> Result[None, str]:
+        return self.call("set_slot_config", slot_number, slot_flag, *args)
+
+    def update(self, dt):
+        """The process updates its slots itself"""
+        pass
+
+    def call(self, name: str, *args) -> Result[Any, str]:
+        """Run a command in the process and wait for its result. Messages that arrive in the meantime are handled."""
+        if not self._alive:
+            return Failure(f"The process of output {self._id} is not running")
+
+        call_id = next(self._call_ids)
+        deadline = time.monotonic() + CALL_TIMEOUT_SECONDS
+        try:
+            send(self._sock, ("call", call_id, name, args))
+            while (remaining := deadline - time.monotonic()) > 0:
+                self._sock.settimeout(remaining)
+                message = receive(self._sock)
+                if message is None:
+                    self._lost()
+                    return Failure(f"The process of output {self._id} ended")
+                match message:
+                    case ("reply", reply_id, ok, value, snapshot) if reply_id == call_id:
+                        self._snapshot = snapshot
+                        return Success(value) if ok else Failure(value)
+                self._handle(message)
+        except socket.timeout:
+            pass
+        except OSError as e:
+            self._lost()
+            return Failure(f"The process of output {self._id} ended: {e}")
+        finally:
+            self._sock.settimeout(None)
+
+        msg = f"Output {self._id} did not reply to {name} within {CALL_TIMEOUT_SECONDS} s"
+        logger.error(msg)
+        return Failure(msg)
+
+    def go(self, cue_id: int, base_time: int):
+        """Start a prepared cue, see RemoteCue"""
+        try:
+            send(self._sock, ("go", cue_id, base_time))
+        except OSError:
+            self._lost()
+
+    def trace_cue(self, cue_number: Any):
+        """Tell the process the current cue number, which a running trace records"""
+        if not self._alive:
+            return
+        try:
+            send(self._sock, ("trace_cue", cue_number))
+        except OSError:
+            self._lost()
+
+    def stop(self):
+        """Ask the process to quit"""
+        if not self._alive:
+            return
+        try:
+            send(self._sock, ("quit",))
+        except OSError:
+            pass
+
+    def _on_readable(self, fd, condition) -> bool:
+        while True:
+            try:
+                message = receive(self._sock, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return GLib.SOURCE_CONTINUE
+            except OSError:
+                message = None
+            if message is None:
+                self._lost()
+                return GLib.SOURCE_REMOVE
+            self._handle(message)
+
+    def _handle(self, message: tuple):
+        match message:
+            case ("snapshot", snapshot):
+                self._snapshot = snapshot
+            case ("cue_ready" | "cue_started" as event, cue_id):
+                self._on_event(event, cue_id, self._id)
+            case ("reply", *_):
+                # Late reply to a call that timed out
+                pass
+            case _:
+                logger.warning("%s: Unknown message %r", self, message)
+
+    def _lost(self):
+        if not self._alive:
+            return
+        self._alive = False
+        self._process.join(0.1)
+        logger.error("The process of output %d ended (exit code %s)", self._id, self._process.exitcode)
+
+
+class RemoteCue:
+    """A cue whose steps run in several output processes. Every process prerolls the files of its steps; once all are
+    ready, they apply their steps on the same start clock, like a CueBatch does within one process. The Gstreamer system
+    clock is the monotonic clock of the machine, so a base time means the same moment in every process."""
+
+    def __init__(
+            self,
+            cue_id: int,
+            outputs: list[RemoteOutput],
+            on_started: Callable[[], None] | None,
+            on_done: Callable[[int], None],
+    ):
+        self._id = cue_id
+        self._outputs = {o.id: o for o in outputs}
+        self._pending_ready = set(self._outputs)
+        self._pending_started = set(self._outputs)
+        self._on_started = on_started
+        self._on_done = on_done
+        self._went = False
+        self._done = False
+
+    def start(self):
+        """Called after all outputs were asked to prepare their steps (some may be ready already)"""
+        if self._went:
+            return
+        if not self._pending_ready:
+            self._go()
+            return
+        # The processes give up waiting for their files after READY_TIMEOUT_SECONDS, this catches lost ones
+        GLib.timeout_add(int((READY_TIMEOUT_SECONDS + 0.5) * 1000.0), self._on_timeout)
+
+    def on_ready(self, output_id: int):
+        self._pending_ready.discard(output_id)
+        if not self._pending_ready and not self._went:
+            self._go()
+
+    def on_started(self, output_id: int):
+        self._pending_started.discard(output_id)
+        if not self._pending_started:
+            self._finish()
+
+    def drop(self, output_id: int):
+        """The output could not prepare its steps"""
+        self._outputs.pop(output_id, None)
+        self._pending_ready.discard(output_id)
+        self._pending_started.discard(output_id)
+
+    def _on_timeout(self) -> bool:
+        if not self._went:
+            logger.warning("Cue: Outputs %s did not get ready in time, starting anyway", sorted(self._pending_ready))
+            self._go()
+        return GLib.SOURCE_REMOVE
+
+    def _go(self):
+        self._went = True
+        start_clock = StartClock.in_seconds(START_LATENCY_SECONDS)
+        for output in self._outputs.values():
+            output.go(self._id, start_clock.base_time)
+        logger.info("Cue started on outputs %s", sorted(self._outputs))
+        if not self._pending_started:
+            self._finish()
+
+    def _finish(self):
+        if self._done:
+            return
+        self._done = True
+        self._on_done(self._id)
+        if self._on_started is not None:
+            self._on_started()
+
+
+class OutputProcesses:
+    """Runs every output with its slots in a child process with its own main loop, so the pipelines, fades and bus
+    handlers of the outputs do not compete with each other and with the OSC dispatch for the GIL and the main context.
+    The coordinator (this process) keeps the interfaces and the media registry.
+
+    The processes are forked before the coordinator started any thread or Gstreamer. They share the KMS file descriptor,
+    and with it the DRM master; the planes of their slots are reserved here first, so they do not pick the same ones.
+    Messages are pickled tuples on a SOCK_SEQPACKET socketpair per process.
+    """
+
+    def __init__(self, outputs: list["BaseOutput"], slot_count: int, frame_ring_budget_bytes: int):
+        # The thread of the non-blocking logging is restarted in the processes, see log_pipeline
+        threads = [t for t in threading.enumerate() if t.name != LOGGING_THREAD_NAME]
+        if len(threads) > 1:
+            logger.warning("Forking output processes while %d threads are running", len(threads))
+
+        for output in outputs:
+            output.reserve_planes(slot_count)
+
+        context = multiprocessing.get_context("fork")
+        coordinator_socks: list[socket.socket] = []
+        processes = []
+        for output in outputs:
+            coordinator_sock, process_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            coordinator_socks.append(coordinator_sock)
+            process = context.Process(
+                target=run_output_process,
+                args=(process_sock, coordinator_socks, output, slot_count, frame_ring_budget_bytes),
+                name=f"output {output.id}",
+                daemon=True,
+            )
+            process.start()
+            process_sock.close()
+            logger.info("Started process %d for output %s", process.pid, output)
+            processes.append(process)
+
+        # Only now, the processes must not inherit the watches of the coordinator's sockets
+        self._outputs = [
+            RemoteOutput(output, process, sock, self._on_event, slot_count)
+            for output, process, sock in zip(outputs, processes, coordinator_socks)
+        ]
+
+        self._cues: dict[int, RemoteCue] = {}
+        self._cue_ids = itertools.count()
+        self._trace_cue: Any = None
+
+    @property
+    def outputs(self) -> list[RemoteOutput]:
+        return self._outputs
+
+    def trace_cue(self, cue_number: Any):
+        """Pass the current cue number on to the processes when it changed"""
+        if cue_number == self._trace_cue:
+            return
+        self._trace_cue = cue_number
+        for output in self._outputs:
+            output.trace_cue(cue_number)
+
+    def cue(self, steps: list[CueStep], on_started: Callable[[], None] | None = None):
+        """Apply the (already validated) steps of a cue together, see RemoteCue"""
+        outputs = {o.id: o for o in self._outputs}
+        steps_by_output: dict[int, list[tuple[CueOp, Path | None]]] = {}
+        for step in steps:
+            steps_by_output.setdefault(step.op.output, []).append((step.op, step.file_path))
+
+        cue_id = next(self._cue_ids)
+        cue = RemoteCue(cue_id, [outputs[i] for i in steps_by_output], on_started, self._on_cue_done)
+        self._cues[cue_id] = cue
+        for output_id, output_steps in steps_by_output.items():
+            match outputs[output_id].call("cue", cue_id, output_steps):
+                case Failure(msg):
+                    logger.warning("Cue: %s", msg)
+                    cue.drop(output_id)
+        cue.start()
+
+    def warm_up(self, file_paths: list[Path]):
+        """Let every process preroll a throwaway pipeline, cycling through the files, see warm_pipeline()"""
+        if not file_paths:
+            return
+        for i, output in enumerate(self._outputs):
+            output.call("warm_up", file_paths[i % len(file_paths)])
+
+    def cue_latency(self) -> CueLatencyStats:
+        """Cue latencies of all processes, see CueLatencyStats.merge()"""
+        stats = CueLatencyStats()
+        for output in self._outputs:
+            stats.merge(output.cue_latency)
+        return stats
+
+    def stalls(self) -> StallLog:
+        """Stalls of the slots of all processes"""
+        log = StallLog()
+        for output in self._outputs:
+            log.merge(output.stalls)
+        return log
+
+    def stop(self):
+        for output in self._outputs:
+            output.stop()
+        for output in self._outputs:
+            output.process.join(STOP_TIMEOUT_SECONDS)
+            if output.process.is_alive():
+                logger.warning("The process of output %d did not stop, terminating it", output.id)
+                output.process.terminate()
+
+    def _on_event(self, event: str, cue_id: int, output_id: int):
+        cue = self._cues.get(cue_id)
+        if cue is None:
+            return
+        match event:
+            case "cue_ready":
+                cue.on_ready(output_id)
+            case "cue_started":
+                cue.on_started(output_id)
+
+    def _on_cue_done(self, cue_id: int):
+        self._cues.pop(cue_id, None)
@@ -0,0 +1,78 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from gi.repository import GLib
+
+logger = logging.getLogger(__name__)
+
+
+class MainContextExecutor:
+    """Runs blocking work (building pipelines, setting them to NULL) on worker threads and delivers the results on
+    the GLib main context, so the main loop keeps running fades and OSC handling meanwhile."""
+
+    def __init__(self, max_workers: int = 2, name: str = "pipeline"):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+
+    def submit(
+            self,
+            fn: Callable,
+            *args,
+            after: Future | None = None,
+            on_done: Callable[[Any], None] | None = None,
+    ) -> Future:
+        """Run fn(*args) on a worker thread.
+
+        Args:
+            after: Run only after this (earlier submitted) future has finished, to keep the order of work that
+                shares resources, e.g. tearing down a slot's old pipeline before its new one is built.
+            on_done: Called on the main context with the result of fn, or with None if fn raised.
+        """
+        future = self._executor.submit(self._run, fn, args, after)
+        if on_done is not None:
+            future.add_done_callback(
+                lambda f: GLib.idle_add(self._deliver, f, on_done)
+            )
+        return future
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _run(fn: Callable, args: tuple, after: Future | None):
+        if after is not None:
+            # The earlier future was submitted first and is therefore already running or done, this can't deadlock
+            try:
+                after.result()
+            except Exception:
+                pass
+        return fn(*args)
+
+    @staticmethod
+    def _deliver(future: Future, on_done: Callable[[Any], None]) -> bool:
+        try:
+            result = future.result()
+        except Exception:
+            logger.exception("Background pipeline work failed")
+            result = None
+        on_done(result)
+        return GLib.SOURCE_REMOVE
+
+
+def run_abandoned(fn: Callable, *args, timeout_seconds: float, name: str) -> threading.Thread:
+    """Run fn(*args) on a thread of its own that nobody waits for, e.g. setting a stalled pipeline to NULL, which may
+    never return. Logs an error on the main context if it did not finish within timeout_seconds."""
+    thread = threading.Thread(target=fn, args=args, name=name, daemon=True)
+    thread.start()
+
+    def check() -> bool:
+        if thread.is_alive():
+            logger.error("%s did not finish within %.1f s, abandoned", name, timeout_seconds)
+        return GLib.SOURCE_REMOVE
+
+    GLib.timeout_add(int(timeout_seconds * 1000), check)
+    return thread
+
+
+pipeline_executor = MainContextExecutor()
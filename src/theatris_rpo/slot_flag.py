@@ -7,3 +7,4 @@ class SlotFlag(enum.Enum):
     FADE_OUT_TIME_SECONDS = enum.auto()
     LOOPING = enum.auto()
     PUSH_OTHER_SLOTS_AT_START = enum.auto()
+    DECODED_FRAME_CACHE = enum.auto()
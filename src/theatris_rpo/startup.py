@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StartupPhase:
+    name: str
+    started_at: float
+    ended_at: float
+
+    @property
+    def seconds(self) -> float:
+        return self.ended_at - self.started_at
+
+
+class StartupReport:
+    """Timing of the startup phases, relative to the import of this module (i.e. close to the process start).
+
+    Phases may run concurrently on different threads, each one is recorded with its own start and end. Milestones
+    (e.g. the OSC server listening) are phases without duration.
+    """
+
+    def __init__(self):
+        self._origin = time.monotonic()
+        self._phases: list[StartupPhase] = []
+        self._lock = threading.Lock()
+
+    @property
+    def origin(self) -> float:
+        return self._origin
+
+    def has(self, name: str) -> bool:
+        with self._lock:
+            return any(p.name == name for p in self._phases)
+
+    @contextmanager
+    def phase(self, name: str):
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, started_at)
+
+    def record(self, name: str, started_at: float, ended_at: float | None = None):
+        phase = StartupPhase(name, started_at, time.monotonic() if ended_at is None else ended_at)
+        with self._lock:
+            self._phases.append(phase)
+        logger.debug("Startup: %s after %.1f ms", name, (phase.ended_at - self._origin) * 1000.0)
+
+    def mark(self, name: str):
+        now = time.monotonic()
+        self.record(name, now, now)
+
+    def as_list(self) -> list:
+        """Flat list of phase name, start and duration (ms), in the order the phases ended"""
+        result = []
+        with self._lock:
+            for phase in self._phases:
+                result += [phase.name, (phase.started_at - self._origin) * 1000.0, phase.seconds * 1000.0]
+        return result
+
+    def log(self):
+        with self._lock:
+            phases = list(self._phases)
+        lines = [
+            f"  {p.name:<24} {(p.started_at - self._origin) * 1000.0:8.1f} ms {p.seconds * 1000.0:+8.1f} ms"
+            for p in phases
+        ]
+        logger.info("Startup phases (start, duration):\n%s", "\n".join(lines))
+
+
+startup_report = StartupReport()
@@ -0,0 +1,370 @@
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import gi
+
+gi.require_version("Gst", "1.0")
+from gi.repository import GLib, Gst  # noqa: E402
+from returns.result import Result, Success, Failure  # noqa: E402
+
+if TYPE_CHECKING:
+    from theatris_rpo.gst_pipeline import BasePipeline
+    from theatris_rpo.video_slot import VideoSlot
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE_PATTERN = "trace-*.jsonl.gz"
+SAMPLE_INTERVAL_MS = 50
+# Buffers that entered an element and did not leave it (yet), per element. Demuxers and parsers do not pass buffers
+# through one to one, their entries are dropped.
+MAX_PENDING_BUFFERS = 64
+QUEUE_FACTORIES = ("queue", "queue2")
+
+_CLOSE = object()
+
+
+class TraceWriter:
+    """Writes records as gzipped JSON lines on a thread of its own, so the streaming threads only enqueue. Stops
+    accepting records once max_bytes (uncompressed) were written."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._records = 0
+        self._full = False
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._file = gzip.open(path, "wb", compresslevel=3)
+        self._thread = threading.Thread(target=self._run, name="trace writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def bytes_written(self) -> int:
+        return self._bytes
+
+    @property
+    def records(self) -> int:
+        return self._records
+
+    @property
+    def is_full(self) -> bool:
+        return self._full
+
+    def write(self, record: Any):
+        """Thread-safe, cheap"""
+        if not self._full:
+            self._queue.put(record)
+
+    def close(self):
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while (record := self._queue.get()) is not _CLOSE:
+                if self._full:
+                    continue
+                line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+                if self._bytes + len(line) > self._max_bytes:
+                    self._full = True
+                    logger.warning("Trace %s reached %d bytes, not recording more", self._path, self._max_bytes)
+                    continue
+                self._file.write(line)
+                self._bytes += len(line)
+                self._records += 1
+        finally:
+            self._file.close()
+
+
+def prune_traces(directory: Path, keep: int):
+    """Delete all but the newest keep trace files, which bounds the disk use of the captures"""
+    traces = sorted(directory.glob(TRACE_FILE_PATTERN), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in traces[keep:]:
+        logger.debug("Deleting old trace %s", path)
+        path.unlink(missing_ok=True)
+
+
+def _iterate(iterator: Gst.Iterator) -> list:
+    items = []
+    while True:
+        result, item = iterator.next()
+        if result == Gst.IteratorResult.OK:
+            items.append(item)
+        elif result == Gst.IteratorResult.RESYNC:
+            iterator.resync()
+            items = []
+        else:
+            return items
+
+
+class TraceCapture:
+    """Records the buffer flow of the slot pipelines for a bounded time window, to diagnose frame drops without
+    restarting with GST_TRACERS set. Pad probes stand in for the tracers, which can only be enabled before Gst.init():
+
+    - "b" (buffer): time, slot, element.pad, pts and size of every buffer at every pad
+    - "p" (proc-time): time, slot, element and how long a buffer took from its sink pad to its src pad
+    - "l" (latency): time, slot, sink and how late a buffer arrived at a sink, relative to its running time
+    - "q" (queue-level): time, slot, queue and its level in buffers, bytes and time, every 50 ms
+    - "m" (marker): time, slot, state and file, whenever they change; "c": time and cue number of the cue list
+
+    Times are microseconds since the capture started. The first line is a header with the active cue and slots.
+    Pipelines that are built while capturing (e.g. by a cue) are traced as well. Runs on the main loop of the process
+    that owns the slots.
+    """
+
+    def __init__(self):
+        self._writer: TraceWriter | None = None
+        self._last_writer: TraceWriter | None = None
+        self._started_at = 0.0
+        self._slots: list["VideoSlot"] = []
+        self._cue_number: Callable[[], Any] = lambda: -1
+        # Elements and pads are added on streaming threads, the probes and signals they get must not be added after
+        # stop() removed the others. Guards them, the queues and the writer (reentrant, watch() nests).
+        self._lock = threading.RLock()
+        self._probes: list[tuple[Gst.Pad, int]] = []
+        self._signals: list[tuple[Gst.Object, int]] = []
+        self._queues: list[tuple[str, Gst.Element]] = []
+        self._pending: dict[tuple[str, str], dict[int, float]] = {}
+        self._markers: dict[str, tuple] = {}
+        self._cue = None
+        self._sample_source: int | None = None
+        self._window_source: int | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._writer is not None
+
+    def status(self) -> list:
+        """Running, path of the last trace, records and bytes written"""
+        writer = self._writer or self._last_writer
+        if writer is None:
+            return [False, "", 0, 0]
+        return [self.is_running, str(writer.path), writer.records, writer.bytes_written]
+
+    def start(
+            self,
+            path: Path,
+            slots: list["VideoSlot"],
+            seconds: float,
+            max_bytes: int,
+            cue_number: Callable[[], Any] = lambda: -1,
+    ) -> Result[Path, str]:
+        if self.is_running:
+            return Failure(f"Already capturing to {self._writer.path}")
+        if seconds <= 0.0:
+            return Failure("The duration of a trace must be positive")
+        try:
+            self._writer = TraceWriter(path, max_bytes)
+        except OSError as e:
+            return Failure(f"Could not create trace {path}: {e}")
+
+        self._started_at = time.monotonic()
+        self._slots = slots
+        self._cue_number = cue_number
+        self._cue = cue_number()
+        self._writer.write(
+            {
+                "trace": 1,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "seconds": seconds,
+                "cue": self._cue,
+                "slots": [
+                    {
+                        "slot": self._label(slot),
+                        "state": slot.state.name.lower(),
+                        "file": slot.current_file_path.name if slot.current_file_path else "",
+                    }
+                    for slot in slots
+                ],
+            }
+        )
+        for slot in slots:
+            if slot.pipeline is not None:
+                self.watch(slot, slot.pipeline)
+
+        self._sample_source = GLib.timeout_add(SAMPLE_INTERVAL_MS, self._sample)
+        self._window_source = GLib.timeout_add(int(seconds * 1000.0), self._on_window_over)
+        logger.info("Capturing a trace of %.1f s to %s", seconds, path)
+        return Success(path)
+
+    def stop(self) -> Result[Path, str]:
+        if not self.is_running:
+            return Failure("No trace is being captured")
+        for source in (self._sample_source, self._window_source):
+            if source is not None:
+                GLib.source_remove(source)
+        self._sample_source = self._window_source = None
+        # The probes stop writing first, the writer is closed once they are gone
+        with self._lock:
+            writer, self._writer = self._writer, None
+            self._last_writer = writer
+            self._unwatch()
+        writer.close()
+        logger.info("Trace %s done, %d records, %d bytes", writer.path, writer.records, writer.bytes_written)
+        return Success(writer.path)
+
+    def watch(self, slot: "VideoSlot", pipeline: "BasePipeline"):
+        """Trace the pipeline of the slot, if a capture is running"""
+        with self._lock:
+            if not self.is_running:
+                return
+            label = self._label(slot)
+            gst_pipeline = pipeline.gst_pipeline
+            handler_id = gst_pipeline.connect("deep-element-added", self._on_element_added, label)
+            self._signals.append((gst_pipeline, handler_id))
+            for element in _iterate(gst_pipeline.iterate_recurse()):
+                self._watch_element(label, element)
+
+    @staticmethod
+    def _label(slot: "VideoSlot") -> str:
+        return f"{slot.output.id}/{slot.id}"
+
+    def _elapsed_us(self, now: float) -> int:
+        return int((now - self._started_at) * 1_000_000)
+
+    def _on_element_added(self, bin, sub_bin, element, label: str):
+        """Called on whatever thread adds the element, e.g. a streaming thread of decodebin3"""
+        with self._lock:
+            if self.is_running:
+                self._watch_element(label, element)
+
+    def _watch_element(self, label: str, element: Gst.Element):
+        """Lock must be held"""
+        if isinstance(element, Gst.Bin):
+            # Only the elements inside, a bin's ghost pads would record every buffer twice
+            return
+        factory = element.get_factory()
+        factory_name = factory.get_name() if factory else ""
+        is_sink = factory is not None and "Sink" in (factory.get_metadata("klass") or "")
+        if factory_name in QUEUE_FACTORIES:
+            self._queues.append((label, element))
+        self._signals.append((element, element.connect("pad-added", self._on_pad_added, label, is_sink)))
+        for pad in _iterate(element.iterate_pads()):
+            self._watch_pad(label, element, pad, is_sink)
+
+    def _on_pad_added(self, element, pad, label: str, is_sink: bool):
+        with self._lock:
+            if self.is_running:
+                self._watch_pad(label, element, pad, is_sink)
+
+    def _watch_pad(self, label: str, element: Gst.Element, pad: Gst.Pad, is_sink: bool):
+        """Lock must be held"""
+        is_src = pad.get_direction() == Gst.PadDirection.SRC
+        probe_id = pad.add_probe(
+            Gst.PadProbeType.BUFFER,
+            self._on_buffer,
+            label,
+            element,
+            f"{element.get_name()}.{pad.get_name()}",
+            is_src,
+            is_sink and not is_src,
+        )
+        self._probes.append((pad, probe_id))
+
+    def _on_buffer(self, pad, info, label, element, pad_path, is_src, at_sink) -> Gst.PadProbeReturn:
+        """Called from the streaming threads for every buffer while capturing"""
+        writer = self._writer
+        if writer is None:
+            return Gst.PadProbeReturn.OK
+        now = time.monotonic()
+        t = self._elapsed_us(now)
+        buffer = info.get_buffer()
+        pts = buffer.pts
+        has_pts = pts != Gst.CLOCK_TIME_NONE
+        writer.write(["b", t, label, pad_path, pts // 1000 if has_pts else -1, buffer.get_size()])
+
+        if has_pts:
+            key = (label, element.get_name())
+            if is_src:
+                entered = self._pending.get(key, {}).pop(pts, None)
+                if entered is not None:
+                    writer.write(["p", t, label, key[1], int((now - entered) * 1_000_000)])
+            else:
+                pending = self._pending.setdefault(key, {})
+                if len(pending) >= MAX_PENDING_BUFFERS:
+                    pending.clear()
+                pending[pts] = now
+
+        if at_sink and has_pts:
+            lateness = self._lateness(pad, element, pts)
+            if lateness is not None:
+                writer.write(["l", t, label, element.get_name(), lateness // 1000])
+        return Gst.PadProbeReturn.OK
+
+    @staticmethod
+    def _lateness(pad: Gst.Pad, element: Gst.Element, pts: int) -> int | None:
+        """Nanoseconds the buffer arrived after its running time (negative: early), None if there is no clock yet"""
+        clock = element.get_clock()
+        event = pad.get_sticky_event(Gst.EventType.SEGMENT, 0)
+        if clock is None or event is None:
+            return None
+        running_time = event.parse_segment().to_running_time(Gst.Format.TIME, pts)
+        if running_time == Gst.CLOCK_TIME_NONE:
+            return None
+        return clock.get_time() - element.get_base_time() - running_time
+
+    def _sample(self) -> bool:
+        writer = self._writer
+        if writer is None:
+            return GLib.SOURCE_REMOVE
+        if writer.is_full:
+            self._sample_source = None
+            self.stop()
+            return GLib.SOURCE_REMOVE
+        t = self._elapsed_us(time.monotonic())
+        with self._lock:
+            queues = list(self._queues)
+        for label, element in queues:
+            writer.write(
+                [
+                    "q",
+                    t,
+                    label,
+                    element.get_name(),
+                    element.get_property("current-level-buffers"),
+                    element.get_property("current-level-bytes"),
+                    element.get_property("current-level-time") // 1000,
+                ]
+            )
+        for slot in self._slots:
+            label = self._label(slot)
+            marker = (slot.state.name.lower(), slot.current_file_path.name if slot.current_file_path else "")
+            if self._markers.get(label) != marker:
+                self._markers[label] = marker
+                writer.write(["m", t, label, *marker])
+        cue = self._cue_number()
+        if cue != self._cue:
+            self._cue = cue
+            writer.write(["c", t, cue])
+        return GLib.SOURCE_CONTINUE
+
+    def _on_window_over(self) -> bool:
+        self._window_source = None
+        self.stop()
+        return GLib.SOURCE_REMOVE
+
+    def _unwatch(self):
+        """Lock must be held"""
+        for pad, probe_id in self._probes:
+            pad.remove_probe(probe_id)
+        for obj, handler_id in self._signals:
+            obj.disconnect(handler_id)
+        self._probes = []
+        self._signals = []
+        self._queues = []
+        self._pending = {}
+        self._markers = {}
+        self._slots = []
+
+
+trace_capture = TraceCapture()
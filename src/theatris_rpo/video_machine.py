@@ -1,11 +1,14 @@
 import asyncio
 import logging
+import os
 import socket
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from ipaddress import ip_address, IPv4Address
 from pathlib import Path
+from typing import Any, Callable
 
-import psutil
 from gi.events import GLibEventLoopPolicy  # type: ignore
 import gi
 
@@ -16,31 +19,150 @@ from returns.result import Result, Failure, Success
 from returns.pipeline import flow
 
 from theatris_rpo.base_interface import BaseInterface
+from theatris_rpo.command_executor import CommandExecutor, CommandStats
 from theatris_rpo.config import config, Conf
+from theatris_rpo.cue import CueAction, CueBatch, CueOp, CueStep
+from theatris_rpo.cue_list import CueListEngine
+from theatris_rpo.frame_ring import FrameRingCache
 from theatris_rpo.media_registry.media_registry import MediaRegistry
+from theatris_rpo.metrics import (
+    MetricsServer,
+    SlotSampler,
+    main_loop_lag_seconds,
+    media_files,
+    media_scan_seconds,
+    metrics_registry,
+    sample_processes,
+)
+from theatris_rpo.output_process import OutputProcesses
 from theatris_rpo.slot_flag import SlotFlag
+from theatris_rpo.startup import startup_report
+from theatris_rpo.trace_capture import prune_traces, trace_capture
 from theatris_rpo.video_output import BaseOutput, TestOutput, HDMIOutput
-from theatris_rpo.osc_interface import OscInterface
+from theatris_rpo.warmup import cue_latency_stats, load_plugin_features, warm_pipelines
+from theatris_rpo.watchdog import stall_log
 
 logger = logging.getLogger(__name__)
 
+SLOTS_PER_OUTPUT = 2
+
 
 class VideoMachine:
-    def __init__(self, media_file_path_str: str, start_number: int | None = None):
+    def __init__(
+            self,
+            media_file_path_str: str,
+            start_number: int | None = None,
+            with_interfaces: bool = True,
+    ):
+        """
+        Outputs, interfaces and the media scan are initialized concurrently: The media directory is scanned on a worker
+        thread and registered once the main loop runs, see when_ready().
+
+        Args:
+            with_interfaces: Set to False to drive the machine directly, without starting OSC servers (e.g. for soak
+                tests and benchmarks)
+        """
         self._start_number = start_number
+        self._exit_code = 0
 
         self._outputs: list[BaseOutput] = []
+        self._card = None
+
+        self._ready = False
+        self._ready_callbacks: list[Callable[[], None]] = []
+
+        # Commands from the interfaces run by priority, slow ones in the background
+        self._commands = CommandExecutor()
+
+        self._slot_sampler = SlotSampler()
+        self._metrics_server: MetricsServer | None = None
+
+        self._output_processes: OutputProcesses | None = None
+        if config[Conf.OUTPUT_PROCESSES]:
+            # Each output runs in a process of its own, forked before any thread or Gstreamer is started here
+            with startup_report.phase("outputs"):
+                self._create_outputs()
+                self._output_processes = OutputProcesses(
+                    self._outputs,
+                    SLOTS_PER_OUTPUT,
+                    config[Conf.FRAME_RING_BUDGET_BYTES] // len(self._outputs),
+                )
+                self._outputs = self._output_processes.outputs
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup") as pool:
+            # The OSC(Query) modules (zeroconf, http server) are imported while the outputs are set up
+            interface_classes = pool.submit(self._import_interfaces) if with_interfaces else None
+
+            # Initialize Gstreamer
+            if not config[Conf.GST_REGISTRY_UPDATE]:
+                os.environ.setdefault("GST_REGISTRY_UPDATE", "no")
+            with startup_report.phase("gst_init"):
+                Gst.init()
+            logger.debug("Gstreamer Version: %s", Gst.version())
+            if config[Conf.WARM_UP]:
+                pool.submit(self._load_plugin_features)
+
+            self._media_dir = Path(media_file_path_str)
+            self._media = MediaRegistry(self._media_dir)
+            scan_started_at = time.monotonic()
+            self._commands.run_in_background(
+                "startup_scan",
+                self._scan_media,
+                on_done=lambda files: self._on_media_scanned(files, scan_started_at),
+            )
+
+            self._frame_ring_cache = FrameRingCache(
+                config[Conf.FRAME_RING_BUDGET_BYTES], config[Conf.FRAME_RING_CLIP_MAX_BYTES]
+            )
+
+            if self._output_processes is None:
+                with startup_report.phase("outputs"):
+                    self._create_outputs()
+
+                # Create slots without loading a file. File can be set later.
+                for output in self._outputs:
+                    for _ in range(SLOTS_PER_OUTPUT):
+                        output.add_video_slot(None, self._frame_ring_cache)
+
+            # set up asyncio
+            policy = GLibEventLoopPolicy()
+            asyncio.set_event_loop_policy(policy)
+            self._asyncio_loop = policy.get_event_loop()
+
+            self._mainloop = GLib.MainLoop()
+
+            # How much later than scheduled the updates run, i.e. how busy the main loop is
+            self._main_loop_lag = CommandStats()
+            self._update_due: float | None = None
 
-        if config[Conf.IS_RASPI_5]:
-            # Create actual KMS outputs on raspberry pi
-            import kms
+            # Show cue list, driven by /go, /back and /goto. The show file is loaded once the media files are known.
+            self._cue_list = CueListEngine(self, config[Conf.CUE_LIST_LOOK_AHEAD])
+
+            self._interfaces: list[BaseInterface] = []
+
+            if interface_classes is not None:
+                with startup_report.phase("interfaces"):
+                    self._create_interfaces(*interface_classes.result())
+
+    def _create_outputs(self):
+        if config[Conf.IS_RASPI_5] or config[Conf.FAKE_KMS]:
+            # Create actual KMS outputs on raspberry pi, simulated ones otherwise
+            if config[Conf.IS_RASPI_5]:
+                import kms
+            else:
+                from theatris_rpo import fake_kms as kms
 
             self._card = kms.Card()
             self._res = kms.ResourceManager(self._card)
 
             self._outputs = [
-                HDMIOutput(self._res, self._card.fd, "HDMI-A-1"),
-                HDMIOutput(self._res, self._card.fd, "HDMI-A-2"),
+                HDMIOutput(
+                    self._res,
+                    self._card.fd,
+                    name,
+                    atomic_request=lambda: kms.AtomicReq(self._card),
+                )
+                for name in ("HDMI-A-1", "HDMI-A-2")
             ]
         else:
             self._outputs = [
@@ -48,80 +170,219 @@ class VideoMachine:
                 TestOutput("Test Output 2"),
             ]
 
-        # Initialize Gstreamer
-        Gst.init()
-        logger.debug("Gstreamer Version: %s", Gst.version())
+    @staticmethod
+    def _load_plugin_features():
+        with startup_report.phase("load_plugin_features"):
+            loaded = load_plugin_features()
+        logger.debug("Loaded plugin features %s", loaded)
 
-        self._media = MediaRegistry(Path(media_file_path_str))
-        self._media.scan_files()
-
-        if not self._media.valid:
-            logger.fatal("Could not scan media files. Aborting.")
-            sys.exit(1)
+    @staticmethod
+    def _import_interfaces() -> tuple[type, type]:
+        with startup_report.phase("import_interfaces"):
+            from theatris_rpo.osc_interface import OscInterface
+            from theatris_rpo.osc_tcp_interface import OscTcpInterface
+        return OscInterface, OscTcpInterface
 
-        # Create slots without loading a file. File can be set later.
-        self._outputs[0].add_video_slot(None)
-        self._outputs[0].add_video_slot(None)
-        self._outputs[1].add_video_slot(None)
-        self._outputs[1].add_video_slot(None)
+    def _create_interfaces(self, osc_interface_class: type, osc_tcp_interface_class: type):
+        # set up OSC interface
+        ip_address = config[Conf.OSC_IP] or self._eth0_address()
 
-        # set up asyncio
-        policy = GLibEventLoopPolicy()
-        asyncio.set_event_loop_policy(policy)
-        self._asyncio_loop = policy.get_event_loop()
+        if not ip_address:
+            logger.warning(
+                "No local IPV4 address found on any interface. Falling back to loopback 127.0.0.1"
+            )
+            ip_address = IPv4Address("127.0.0.1")
 
-        self._mainloop = GLib.MainLoop()
+        osc_interface = osc_interface_class(ip_address, config[Conf.OSC_PORT], self)
+        self._interfaces.append(osc_interface)
+        if config[Conf.OSC_TCP_PORT]:
+            # Same commands over TCP, sharing the dispatcher
+            self._interfaces.append(
+                osc_tcp_interface_class(ip_address, config[Conf.OSC_TCP_PORT], self, osc_interface.dispatcher)
+            )
 
-        self._interfaces: list[BaseInterface] = []
+        if config[Conf.METRICS_PORT]:
+            try:
+                self._metrics_server = MetricsServer(ip_address, config[Conf.METRICS_PORT], self.metrics_text)
+            except OSError as e:
+                logger.error("Could not serve metrics on port %s: %s", config[Conf.METRICS_PORT], e)
 
-        # set up OSC interface
+    @staticmethod
+    def _eth0_address() -> str | None:
+        import psutil
 
-        ip_address = None
         for interface, addrs in psutil.net_if_addrs().items():
             if interface == "eth0":
                 print(f"*** {interface}")
                 for addr in addrs:
                     if addr.family is socket.AF_INET:
-                        ip_address = addr.address
                         logger.debug(
                             f"Using {addr.address} for OSC and OSCQuery servers,"
                         )
-                        break
-
-        if not ip_address:
-            logger.warning(
-                "No local IPV4 address found on any interface. Falling back to loopback 127.0.0.1"
-            )
-            ip_address = IPv4Address("127.0.0.1")
-
-        self._interfaces.append(OscInterface(ip_address, 9000, self))
+                        return addr.address
+        return None
 
     @property
     def outputs(self) -> dict[int, BaseOutput]:
         return {o.id: o for o in self._outputs}
 
+    @property
+    def card(self):
+        """The (real or simulated) KMS card, None for test outputs"""
+        return self._card
+
+    @property
+    def commands(self) -> CommandExecutor:
+        return self._commands
+
+    @property
+    def cue_list(self) -> CueListEngine:
+        return self._cue_list
+
+    @property
+    def asyncio_loop(self) -> asyncio.AbstractEventLoop:
+        """The asyncio loop that runs on the GLib main loop once start() was called"""
+        return self._asyncio_loop
+
+    @property
+    def is_ready(self) -> bool:
+        """True once the media files are registered"""
+        return self._ready
+
+    def when_ready(self, callback: Callable[[], None]):
+        """Call back on the main loop once the media files are registered, right away if they already are"""
+        if self._ready:
+            callback()
+        else:
+            self._ready_callbacks.append(callback)
+
+    def startup_phases(self) -> list:
+        """See StartupReport.as_list()"""
+        return startup_report.as_list()
+
+    def cue_latency(self) -> list:
+        """See CueLatencyStats.as_list()"""
+        if self._output_processes is not None:
+            return self._output_processes.cue_latency().as_list()
+        return cue_latency_stats.as_list()
+
+    def stalls(self) -> list:
+        """See StallLog.as_list()"""
+        if self._output_processes is not None:
+            return self._output_processes.stalls().as_list()
+        return stall_log.as_list()
+
+    def start_trace(self, seconds: float) -> Result[list[str], str]:
+        """Capture a trace of the slot pipelines for a while (at most the configured maximum), see TraceCapture.
+        Returns the trace files, one per output process."""
+        seconds = min(seconds, config[Conf.TRACE_MAX_SECONDS])
+        directory = Path(config[Conf.TRACE_DIR])
+        processes = self._output_processes.outputs if self._output_processes is not None else []
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            prune_traces(directory, max(0, config[Conf.TRACE_KEEP_FILES] - max(1, len(processes))))
+        except OSError as e:
+            return Failure(f"Could not prepare trace directory {directory}: {e}")
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if not processes:
+            slots = [slot for output in self._outputs for slot in output.video_slots]
+            return trace_capture.start(
+                directory / f"trace-{stamp}.jsonl.gz",
+                slots,
+                seconds,
+                config[Conf.TRACE_MAX_BYTES],
+                lambda: self._cue_list.current_number,
+            ).map(lambda path: [str(path)])
+
+        paths = []
+        for output in processes:
+            path = directory / f"trace-{stamp}-output{output.id}.jsonl.gz"
+            match output.call(
+                "start_trace",
+                path,
+                seconds,
+                config[Conf.TRACE_MAX_BYTES] // len(processes),
+                self._cue_list.current_number,
+            ):
+                case Failure(msg):
+                    return Failure(msg)
+            paths.append(str(path))
+        return Success(paths)
+
+    def stop_trace(self) -> Result[list[str], str]:
+        """Stop the trace capture before its time is up"""
+        if self._output_processes is None:
+            return trace_capture.stop().map(lambda path: [str(path)])
+        paths = []
+        for output in self._output_processes.outputs:
+            match output.call("stop_trace"):
+                case Success(path):
+                    paths.append(str(path))
+                case Failure(msg):
+                    return Failure(msg)
+        return Success(paths)
+
+    def trace_status(self) -> list:
+        """See TraceCapture.status(), one after the other for the output processes"""
+        if self._output_processes is None:
+            return trace_capture.status()
+        status = []
+        for output in self._output_processes.outputs:
+            status += output.call("trace_status").value_or([])
+        return status
+
+    def metrics_text(self) -> str:
+        """Metrics of this process and of the output processes in the Prometheus text format. Called on the thread of
+        the metrics server, so only values are read."""
+        pids = {"main": os.getpid()}
+        others = []
+        if self._output_processes is not None:
+            for output in self._output_processes.outputs:
+                name = f"output{output.id}"
+                pids[name] = output.process.pid
+                if output.metrics is not None:
+                    others.append((output.metrics, {"process": name}))
+        sample_processes(pids)
+        return metrics_registry.render(others)
+
     def start(self):
         self._heartbeat()
         self._update()
 
         try:
             logger.debug("Starting interfaces")
+            if self._metrics_server is not None:
+                self._metrics_server.start()
             for interface in self._interfaces:
                 if hasattr(interface, "async_start"):
                     self._asyncio_loop.create_task(interface.async_start())
                 if hasattr(interface, "sync_start"):
                     interface.sync_start()
-            GLib.timeout_add(
-                int(3.0 * 1000.0), self._play_start_file, self._start_number
-            )
             logger.debug("Starting main loop")
+            GLib.idle_add(self._on_main_loop_running)
             self._mainloop.run()
 
         except KeyboardInterrupt:
             for interface in self._interfaces:
                 interface.stop()
+            if self._metrics_server is not None:
+                self._metrics_server.stop()
             logger.info("Stopped by keyboard interrupt")
 
+        if self._exit_code:
+            sys.exit(self._exit_code)
+
+    def stop(self):
+        """Stop the interfaces and leave the main loop, i.e. return from start()"""
+        for interface in self._interfaces:
+            interface.stop()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+        if self._output_processes is not None:
+            self._output_processes.stop()
+        self._mainloop.quit()
+
     def play_video(
             self,
             output_number: int,
@@ -137,6 +398,7 @@ class VideoMachine:
             return Failure(msg)
 
         file_path = None
+        memory_buffer = None
         if file_number is not None:
             try:
                 file_path = self._media.files_by_number[file_number]
@@ -144,8 +406,58 @@ class VideoMachine:
                 msg = f"No file with number {file_number} present. Available files are {[(k, str(v)) for k, v in self._media.files_by_number.items()]}"  # fmt: skip
                 logger.error(msg)
                 return Failure(msg)
+            memory_buffer = self._media.memory_cache.lookup(file_path)
+            file_path = self._slot_playback_path(output, slot_number, file_path)
+
+        return output.play_video(
+            slot_number, file_path, restart_if_already_playing, memory_buffer
+        )
 
-        return output.play_video(slot_number, file_path, restart_if_already_playing)
+    def preload_video(
+            self, output_number: int, slot_number: int, file_number: int
+    ) -> Result[None, str]:
+        """Prepare a slot to play the file, without starting playback. The file's head is prefetched as well."""
+        file_path = self._media.file_path(file_number)
+        if file_path is None:
+            return Failure(f"No file with number {file_number} present.")
+        self._media.prefetch(file_number)
+        memory_buffer = self._media.memory_cache.lookup(file_path)
+
+        return flow(
+            self._get_output(output_number),
+            bind(
+                lambda output: output.preload_video(
+                    slot_number, self._slot_playback_path(output, slot_number, file_path), memory_buffer
+                )
+            ),
+        )
+
+    def crossfade(
+            self,
+            output_number: int,
+            from_slot_number: int,
+            to_slot_number: int,
+            file_number: int,
+            seconds: float,
+    ) -> Result[None, str]:
+        file_path = self._media.file_path(file_number)
+        if file_path is None:
+            return Failure(f"No file with number {file_number} present.")
+        self._media.prefetch(file_number)
+        memory_buffer = self._media.memory_cache.lookup(file_path)
+
+        return flow(
+            self._get_output(output_number),
+            bind(
+                lambda output: output.crossfade(
+                    from_slot_number,
+                    to_slot_number,
+                    self._slot_playback_path(output, to_slot_number, file_path),
+                    seconds,
+                    memory_buffer,
+                )
+            ),
+        )
 
     def play_test(
             self,
@@ -206,8 +518,113 @@ class VideoMachine:
             bind(lambda output: output.set_slot_config(slot_number, slot_flag, *args)),
         )
 
+    def cue(
+            self,
+            ops: list[CueOp],
+            slot_config: dict[tuple[int, int], dict[SlotFlag, Any]] | None = None,
+            on_started: Callable[[], None] | None = None,
+    ) -> Result[None, str]:
+        """Apply several slot operations together. All operations are validated first, nothing is applied if any of
+        them is invalid.
+
+        Args:
+            slot_config: Flags to set on slots (by output and slot number) of the cue before it is applied
+            on_started: See CueBatch
+        """
+        steps = []
+        seen = set()
+        for op in ops:
+            match self._get_output(op.output):
+                case Failure(msg):
+                    return Failure(msg)
+                case Success(output):
+                    pass
+            if not 0 <= op.slot < len(output.video_slots):
+                return Failure(f"No video slot {op.slot} on output {op.output}")
+            if (op.output, op.slot) in seen:
+                return Failure(f"Slot {op.slot} on output {op.output} is used twice in the cue")
+            seen.add((op.output, op.slot))
+
+            step = CueStep(op, output.video_slots[op.slot])
+            if op.action is CueAction.PLAY:
+                file_path = self._media.file_path(op.value)
+                if file_path is None:
+                    return Failure(f"No file with number {op.value} present.")
+                self._media.prefetch(op.value)
+                step.memory_buffer = self._media.memory_cache.lookup(file_path)
+                step.file_path = self._slot_playback_path(output, op.slot, file_path)
+            steps.append(step)
+
+        for step in steps:
+            for flag, value in (slot_config or {}).get((step.op.output, step.op.slot), {}).items():
+                self.set_slot_config(step.op.output, step.op.slot, flag, value)
+        if self._output_processes is not None:
+            self._output_processes.cue(steps, on_started)
+        else:
+            CueBatch(steps, on_started).start()
+        return Success(None)
+
+    def prepare_slot(
+            self, output_number: int, slot_number: int, file_number: int
+    ) -> Result[bool, str]:
+        """Preload the file on the slot unless it is already preloaded with it. Success(False) if the slot is busy."""
+        file_path = self._media.file_path(file_number)
+        if file_path is None:
+            return Failure(f"No file with number {file_number} present.")
+        match self._get_output(output_number):
+            case Failure(msg):
+                return Failure(msg)
+            case Success(output):
+                pass
+        if not 0 <= slot_number < len(output.video_slots):
+            return Failure(f"No video slot {slot_number} on output {output_number}")
+
+        slot = output.video_slots[slot_number]
+        if slot.is_preloaded and slot.current_file_path == self._slot_playback_path(output, slot_number, file_path):
+            return Success(True)
+        if slot.is_active:
+            return Success(False)
+        return self.preload_video(output_number, slot_number, file_number).map(lambda _: True)
+
+    def _slot_playback_path(self, output: BaseOutput, slot_number: int, file_path: Path) -> Path:
+        """See MediaRegistry.playback_path(), given the path the slot has now"""
+        slots = output.video_slots
+        current = slots[slot_number].current_file_path if 0 <= slot_number < len(slots) else None
+        return self._media.playback_path(file_path, current)
+
+    def load_show(self, show_file: str) -> Result[None, str]:
+        """Load a show file into the cue list, relative paths are relative to the media directory"""
+        return self._cue_list.load(self._media_dir / show_file)
+
     def rescan_media(self) -> Result[None, str]:
-        self._media.rescan_files()
+        return self._apply_rescan(self._scan_media())
+
+    def rescan_media_in_background(
+            self, on_done: Callable[[Result[None, str]], None] | None = None
+    ):
+        """Like rescan_media(), but the media directory is scanned on a worker thread, so the main loop keeps running.
+        The registry is updated on the main loop when the scan finished."""
+
+        def apply(files_by_number: dict[int, Path] | None):
+            result = self._apply_rescan(files_by_number)
+            if on_done is not None:
+                on_done(result)
+
+        self._commands.run_in_background(
+            "rescan_media", self._scan_media, on_done=apply
+        )
+
+    def _scan_media(self) -> dict[int, Path] | None:
+        """See MediaRegistry.discover_files(), timed"""
+        started_at = time.monotonic()
+        files_by_number = self._media.discover_files()
+        media_scan_seconds.set(time.monotonic() - started_at)
+        return files_by_number
+
+    def _apply_rescan(self, files_by_number: dict[int, Path] | None) -> Result[None, str]:
+        self._media.apply_rescan(files_by_number)
+        media_files.set(len(self._media.files_by_number))
+        self._frame_ring_cache.retain(self._media.files_by_number.values())
         if not self._media.valid:
             msg = "Could not scan media files. Aborting."
             logger.fatal(msg)
@@ -215,6 +632,31 @@ class VideoMachine:
 
         return Success(True)
 
+    def set_memory_cache_pinned(
+            self, file_number: int, on_off: bool
+    ) -> Result[None, str]:
+        if not self._media.pin_in_memory(file_number, on_off):
+            return Failure(f"No file with number {file_number} present.")
+        return Success(None)
+
+    def prefetch_media(self, file_numbers: list[int]) -> Result[None, str]:
+        missing = [n for n in file_numbers if not self._media.prefetch(n)]
+        if missing:
+            return Failure(f"No files with numbers {missing} present.")
+        return Success(None)
+
+    def prefetch_status(self, file_numbers: list[int] | None = None) -> list[Any]:
+        """Flat list of file number and prefetch state name pairs"""
+        if not file_numbers:
+            file_numbers = list(self._media.files_by_number.keys())
+        status = []
+        for number in file_numbers:
+            status += [number, self._media.prefetch_state(number).name.lower()]
+        return status
+
+    def memory_cache_stats(self) -> list[int]:
+        return self._media.memory_cache.stats.as_list()
+
     def _get_output(self, output_number: int) -> Result[BaseOutput, str]:
         try:
             return Success(self.outputs[output_number])
@@ -223,11 +665,28 @@ class VideoMachine:
             logger.error(msg)
             return Failure(msg)
 
+    def main_loop_lag(self, reset: bool = False) -> list[float]:
+        """Number of updates and mean and max delay (ms) of the updates, since the last reset"""
+        lag = self._main_loop_lag
+        if reset:
+            self._main_loop_lag = CommandStats()
+        return [lag.count, lag.mean_seconds * 1000.0, lag.max_seconds * 1000.0]
+
     def _update(self):
         dt = 0.016
+        if self._update_due is not None:
+            lag = max(0.0, time.monotonic() - self._update_due)
+            self._main_loop_lag.add(lag)
+            main_loop_lag_seconds.observe(lag)
         for output in self.outputs.values():
             output.update(dt)
+        self._cue_list.update(dt)
+        if self._output_processes is not None:
+            self._output_processes.trace_cue(self._cue_list.current_number)
+        for interface in self._interfaces:
+            interface.update(dt)
 
+        self._update_due = time.monotonic() + dt
         GLib.timeout_add(int(dt * 1000.0), self._update)
 
     def _heartbeat(self, beat_state: bool = False):
@@ -235,11 +694,83 @@ class VideoMachine:
         for interface in self._interfaces:
             interface.send_heartbeat(beat_state)
         beat_state = not beat_state
+        if self._output_processes is None:
+            # The output processes sample their slots themselves
+            self._slot_sampler.sample(self._outputs)
 
         GLib.timeout_add(int(1.0 * 1000.0), self._heartbeat, beat_state)
 
-    def _play_start_file(self, file_number: int):
+    def _on_main_loop_running(self) -> bool:
+        startup_report.mark("main_loop_running")
+        return GLib.SOURCE_REMOVE
+
+    def _on_media_scanned(self, files_by_number: dict[int, Path] | None, started_at: float):
+        startup_report.record("media_scan", started_at)
+        match self._apply_rescan(files_by_number):
+            case Failure(_):
+                self._exit_code = 1
+                self.stop()
+                return
+
+        if config[Conf.WARM_UP] and self._output_processes is not None:
+            # The processes warm up their pipelines in the background
+            self._output_processes.warm_up(self._warm_up_files())
+            self._on_media_ready()
+        elif config[Conf.WARM_UP]:
+            self._commands.run_in_background(
+                "warm_up",
+                self._warm_pipelines,
+                self._warm_up_files(),
+                len(self._outputs),
+                on_done=lambda _: self._on_media_ready(),
+            )
+        else:
+            self._on_media_ready()
+
+    def _warm_up_files(self) -> list[Path]:
+        """One file per output for the warm-up pipelines, the start file first"""
+        numbers = sorted(self._media.files_by_number)
+        if self._start_number in numbers:
+            numbers.remove(self._start_number)
+            numbers.insert(0, self._start_number)
+        return [self._media.playback_path(self._media.files_by_number[n]) for n in numbers[: len(self._outputs)]]
+
+    @staticmethod
+    def _warm_pipelines(file_paths: list[Path], count: int) -> int:
+        with startup_report.phase("warm_pipelines"):
+            return warm_pipelines(file_paths, count)
+
+    def _on_media_ready(self):
+        self._ready = True
+        startup_report.mark("media_ready")
+        if config[Conf.SHOW_FILE]:
+            self.load_show(config[Conf.SHOW_FILE])
+        if self._start_number is None or not self._play_start_file(self._start_number):
+            startup_report.log()
+
+        callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _play_start_file(self, file_number: int) -> bool:
+        """Play the file looped on the first slot of the connected outputs, as soon as their pipelines are built.
+        True if its first frame will be reported."""
+        file_path = self._media.file_path(file_number)
+        if file_path is None:
+            return False
+        memory_buffer = self._media.memory_cache.lookup(file_path)
+        file_path = self._media.playback_path(file_path)
+        started = False
         for output in self.outputs.values():
             if output.is_connected:
                 output.set_slot_config(0, SlotFlag.LOOPING, True)
-                output.play_video(0, self._media.file_path(file_number))
+                match output.play_video(0, file_path, memory_buffer=memory_buffer):
+                    case Success(_) if not started and self._output_processes is None:
+                        started = True
+                        output.video_slots[0].on_next_frame(self._on_start_file_frame)
+        return started
+
+    @staticmethod
+    def _on_start_file_frame(frame_time: float):
+        startup_report.record("start_file_first_frame", frame_time, frame_time)
+        startup_report.log()
@@ -1,17 +1,21 @@
 import itertools
 import logging
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List
+from typing import TYPE_CHECKING, Any, Callable, List
 
-from kms import Connector, VideoMode
 from returns.pointfree import bind
 from returns.result import Result, Failure, Success
 from returns.pipeline import flow
 
+from theatris_rpo.crossfade import Crossfade
 from theatris_rpo.slot_state import SlotState
 from theatris_rpo.slot_flag import SlotFlag
 from theatris_rpo.video_slot import VideoSlot
 
+if TYPE_CHECKING:
+    from kms import Connector, VideoMode
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +28,15 @@ class BaseOutput:
         py_kms_resource_manager: Any | None,
         file_descriptor: Any | None,
         connector_name: str,
+        atomic_request: Callable[[], Any] | None = None,
     ):
+        """
+        Args:
+            atomic_request: Creates a (py)kms AtomicReq, used to commit deferred plane properties at once
+        """
         self._id = next(self.id_iterator)
+        self._atomic_request = atomic_request
+        self._deferred_props: list[tuple[Any, dict]] | None = None
 
         self._connector_name = connector_name
         self._res = py_kms_resource_manager
@@ -37,12 +48,12 @@ class BaseOutput:
         self._height = 0
 
         if self._res:
-            self._conn: Connector = self._res.reserve_connector(connector_name)
+            self._conn: "Connector" = self._res.reserve_connector(connector_name)
             self._crtc = self._res.reserve_crtc(self._conn)
             self._connected = self._conn.connected
 
             if self._connected:
-                m: VideoMode = self._crtc.mode
+                m: "VideoMode" = self._crtc.mode
                 self._width = m.hdisplay
                 self._height = m.vdisplay
 
@@ -54,6 +65,8 @@ class BaseOutput:
             self._fd = file_descriptor
 
         self._video_slots: List[VideoSlot] = []
+        self._crossfades: List[Crossfade] = []
+        self._reserved_planes: list = []
 
         self._slot_id_iterator = itertools.count()
 
@@ -101,14 +114,36 @@ class BaseOutput:
     def is_connected(self) -> bool:
         return self._connected
 
-    def add_video_slot(self, file_path: Path | None):
-        self._video_slots.append(VideoSlot(self, file_path, cfg_auto_fade_time=0.0))
+    def reserve_planes(self, count: int):
+        """Reserve the planes for count slots up front, e.g. before the output is handed to another process that has
+        its own copy of the resource manager"""
+        if self._res:
+            self._reserved_planes += [self._res.reserve_overlay_plane(self._crtc) for _ in range(count)]
+
+    def reserve_plane(self):
+        """A plane for a new slot, None without KMS"""
+        if self._reserved_planes:
+            return self._reserved_planes.pop(0)
+        if self._res:
+            return self._res.reserve_overlay_plane(self._crtc)
+        return None
+
+    def add_video_slot(self, file_path: Path | None, frame_ring_cache=None):
+        self._video_slots.append(
+            VideoSlot(
+                self,
+                file_path,
+                cfg_auto_fade_time=0.0,
+                frame_ring_cache=frame_ring_cache,
+            )
+        )
 
     def play_video(
         self,
         slot_number: int,
         file_path: Path | None = None,
         restart_if_already_playing: bool = False,
+        memory_buffer: Any | None = None,
     ) -> Result[None, str]:
         match self._get_slot(slot_number):  # type: ignore
             case Success(slot):
@@ -123,8 +158,12 @@ class BaseOutput:
                         logger.warning(msg)
                         return Failure(msg)
 
+                    if file_path == slot.current_file_path and slot.is_preloaded:
+                        # Pipeline is already prerolled with this file
+                        return slot.play()
+
                     if not slot.is_paused:
-                        match slot.set_file_path(file_path):
+                        match slot.set_file_path(file_path, memory_buffer):
                             case Success(_):
                                 return slot.play()
                             case Failure(msg):
@@ -137,6 +176,49 @@ class BaseOutput:
                 return Failure(msg)
         return None
 
+    def preload_video(
+        self,
+        slot_number: int,
+        file_path: Path,
+        memory_buffer: Any | None = None,
+    ) -> Result[None, str]:
+        return flow(
+            self._get_slot(slot_number),
+            bind(lambda slot: slot.preload(file_path, memory_buffer)),
+        )
+
+    def crossfade(
+        self,
+        from_slot_number: int,
+        to_slot_number: int,
+        file_path: Path,
+        seconds: float,
+        memory_buffer: Any | None = None,
+    ) -> Result[None, str]:
+        """Crossfade from the clip on one slot to the file on another one, see Crossfade"""
+        if from_slot_number == to_slot_number:
+            return Failure("Cannot crossfade a slot to itself")
+        if seconds < 0.0:
+            return Failure("Crossfade time must not be negative")
+        match self._get_slot(from_slot_number), self._get_slot(to_slot_number):
+            case Success(from_slot), Success(to_slot):
+                pass
+            case Failure(msg), _:
+                return Failure(msg)
+            case _, Failure(msg):
+                return Failure(msg)
+
+        for slot in (from_slot, to_slot):
+            if any(c.involves(slot) for c in self._crossfades):
+                return Failure(f"Slot {slot.id} on output {self.id} is already crossfading")
+
+        crossfade = Crossfade(from_slot, to_slot, file_path, memory_buffer, seconds)
+        match crossfade.start():
+            case Failure(msg):
+                return Failure(msg)
+        self._crossfades.append(crossfade)
+        return Success(None)
+
     def play_test(self, slot_number: int) -> Result[None, str]:
         return flow(
             self._get_slot(slot_number),
@@ -184,6 +266,51 @@ class BaseOutput:
     def update(self, dt):
         for slot in self._video_slots:
             slot.update(dt)
+        if self._crossfades:
+            now = time.monotonic()
+            for crossfade in self._crossfades:
+                crossfade.update(now)
+            self._crossfades = [c for c in self._crossfades if not c.is_done]
+
+    def set_plane_props(self, plane, props: dict):
+        """Commit properties of a plane, or collect them while commits are deferred"""
+        if self._deferred_props is not None:
+            self._deferred_props.append((plane, props))
+            return
+        plane.set_props(props)
+
+    @contextmanager
+    def deferred_plane_commits(self):
+        """Collect all plane property changes in this context and commit them in one atomic request, so they become
+        visible on the same vblank"""
+        if self._deferred_props is not None:
+            # Nested, the outermost context commits
+            yield
+            return
+
+        self._deferred_props = []
+        try:
+            yield
+        finally:
+            changes, self._deferred_props = self._deferred_props, None
+            self._commit_plane_props(changes)
+
+    def _commit_plane_props(self, changes: list[tuple[Any, dict]]):
+        merged: dict[int, tuple[Any, dict]] = {}
+        for plane, props in changes:
+            merged.setdefault(id(plane), (plane, {}))[1].update(props)
+        if not merged:
+            return
+
+        if self._atomic_request is None:
+            for plane, props in merged.values():
+                plane.set_props(props)
+            return
+
+        req = self._atomic_request()
+        for plane, props in merged.values():
+            req.add(plane, props)
+        req.commit_sync(allow_modeset=False)
 
     def _get_slot(self, slot_number: int) -> Result[VideoSlot, str]:
         try:
@@ -206,8 +333,16 @@ class TestOutput(BaseOutput):
 
 
 class HDMIOutput(BaseOutput):
-    def __init__(self, py_kms_resource_manager, file_descriptor, connector_name):
-        super().__init__(py_kms_resource_manager, file_descriptor, connector_name)
+    def __init__(
+        self,
+        py_kms_resource_manager,
+        file_descriptor,
+        connector_name,
+        atomic_request: Callable[[], Any] | None = None,
+    ):
+        super().__init__(
+            py_kms_resource_manager, file_descriptor, connector_name, atomic_request
+        )
 
         logger.debug(
             "Initialized output %s with connector ID %s", connector_name, self._conn.id
@@ -1,19 +1,31 @@
 import logging
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Callable
 
 from returns.result import Result, Success, Failure
 
-from theatris_rpo.gst_pipeline import BasePipeline
+from theatris_rpo.config import config, Conf
+from theatris_rpo.gst_pipeline import BasePipeline, StartClock
 from theatris_rpo.slot_state import SlotState
-from theatris_rpo.gst_pipeline import VideoPipelinePlaybin3
+from theatris_rpo.gst_pipeline import VideoPipelinePlaybin3, VideoPipelineFrameRing
+from theatris_rpo.metrics import cue_latency_seconds
+from theatris_rpo.pipeline_executor import pipeline_executor, run_abandoned
 from theatris_rpo.slot_flag import SlotFlag
+from theatris_rpo.trace_capture import trace_capture
+from theatris_rpo.warmup import cue_latency_stats
+from theatris_rpo.watchdog import StallAction, StallWatchdog
 
 if TYPE_CHECKING:
     from video_output import BaseOutput
+    from theatris_rpo.frame_ring import FrameRingCache
 
 logger = logging.getLogger(__name__)
 
+# A stalled pipeline may hang while it is set to NULL, its replacement is built without waiting for it
+STALLED_TEARDOWN_TIMEOUT_SECONDS = 5.0
+
 
 class VideoSlot:
     def __init__(
@@ -21,10 +33,27 @@ class VideoSlot:
             output: "BaseOutput",
             file_path: Path | None = None,
             cfg_auto_fade_time: float = 0.0,
+            frame_ring_cache: "FrameRingCache | None" = None,
     ):
         self._output = output
         self._id = output.next_slot_id
         self._state = SlotState.UNINITIALIZED
+        self._frame_ring_cache = frame_ring_cache
+
+        self._cfg = {
+            SlotFlag.FULL_ALPHA_AT_START: True,
+            SlotFlag.FADE_IN_TIME_SECONDS: cfg_auto_fade_time,
+            SlotFlag.FADE_OUT_TIME_SECONDS: cfg_auto_fade_time,
+            SlotFlag.LOOPING: False,
+            SlotFlag.DECODED_FRAME_CACHE: False,
+        }
+        self._watchdog = StallWatchdog(
+            output.id,
+            self._id,
+            config[Conf.STALL_TIMEOUT_MS] / 1000.0,
+            config[Conf.STALL_RETRIES],
+            config[Conf.STALL_BACKOFF_MS] / 1000.0,
+        )
 
         if file_path:
             if not self.set_file_path(file_path):
@@ -32,28 +61,30 @@ class VideoSlot:
 
         self._use_test_source = not file_path
         self._file_path = file_path
+        self._memory_buffer = None
+        self._preloaded = False
 
         self.blanked = True
 
         self._pipeline: BasePipeline | None = None
+        self._pipeline_task: Future | None = None  # last submitted work, to keep the order per slot
+        self._pipeline_pending = False
+        self._pipeline_generation = 0
+        self._pipeline_actions: list[Callable[[BasePipeline], None]] = []
+        self._cue_started_at: float | None = None
+        self._cue_generation = 0  # counts play() calls, so a late first frame callback is not taken for a later cue
+        self._last_cue_latency: float | None = None
         self._alpha = 1.0
-        self._plane = None
-        if output.res:
-            self._plane = output.res.reserve_overlay_plane(output.crtc)
+        self._crossfading = False  # alpha is driven by a Crossfade instead of the auto fade
+        self._plane = output.reserve_plane()
+        if self._plane is not None:
             # Make "fading" work by setting the correct blend mode
-            self._plane.set_props(
-                {"pixel blend mode": 1}
+            self._output.set_plane_props(
+                self._plane, {"pixel blend mode": 1}
             )  # mode: 0=Premultiplied, 1=Coverage, 2=Pixel
 
         self._reset_pipeline(use_test_source=self._use_test_source)
 
-        self._cfg = {
-            SlotFlag.FULL_ALPHA_AT_START: True,
-            SlotFlag.FADE_IN_TIME_SECONDS: cfg_auto_fade_time,
-            SlotFlag.FADE_OUT_TIME_SECONDS: cfg_auto_fade_time,
-            SlotFlag.LOOPING: False,
-        }
-
         if self.is_auto_faded:
             self._alpha = 0.0
 
@@ -98,41 +129,198 @@ class VideoSlot:
     def is_auto_faded(self) -> bool:
         return self._cfg[SlotFlag.FADE_IN_TIME_SECONDS] > 0.0
 
+    @property
+    def is_auto_faded_out(self) -> bool:
+        return self._cfg[SlotFlag.FADE_OUT_TIME_SECONDS] > 0.0
+
+    @property
+    def is_looping(self) -> bool:
+        return self._cfg[SlotFlag.LOOPING]
+
+    @property
+    def is_crossfading(self) -> bool:
+        return self._crossfading
+
+    @property
+    def is_preloaded(self) -> bool:
+        return self._preloaded
+
+    @property
+    def is_prerolled(self) -> bool:
+        return self._pipeline is not None and self._pipeline.is_prerolled
+
+    @property
+    def is_stalled(self) -> bool:
+        """No new frame arrived for too long while playing, the pipeline is being rebuilt"""
+        return self._watchdog.is_stalled
+
+    @property
+    def frame_stats(self) -> tuple[int, int, int]:
+        """Generation of the pipeline (counts restart with every new pipeline), frames that reached its sink and frames
+        the sink dropped"""
+        if self._pipeline is None:
+            return self._pipeline_generation, 0, 0
+        return self._pipeline_generation, self._pipeline.frame_count, self._pipeline.dropped_frames
+
+    @property
+    def last_cue_latency(self) -> float | None:
+        """Seconds from the last play() until a frame of the clip reached the sink"""
+        return self._last_cue_latency
+
+    @property
+    def alpha(self) -> float:
+        """Alpha currently shown, 0.0 while blanked"""
+        return 0.0 if self.blanked else self._alpha
+
+    @property
+    def position(self) -> float:
+        """Playback position in seconds"""
+        if self._pipeline is None or self.is_inactive:
+            return 0.0
+        return self._pipeline.position or 0.0
+
     @property
     def current_file_path(self) -> Path:
         return self._file_path
 
-    def _reset_pipeline(self, use_test_source: bool = False):
-        if self._pipeline is not None and not self.is_inactive:
-            self._pipeline.stop_immediately()
+    @property
+    def pipeline(self) -> BasePipeline | None:
+        """None while the pipeline is being built, or when playing the test source"""
+        return self._pipeline
+
+    @property
+    def is_pipeline_pending(self) -> bool:
+        """True while the pipeline is being (re-)built on a worker thread"""
+        return self._pipeline_pending
+
+    def _reset_pipeline(self, use_test_source: bool = False, abandon_old: bool = False):
+        """Replace the pipeline. Tearing down the old and building the new one happens on a worker thread. Actions on
+        the pipeline that are requested in the meantime are queued, see _with_pipeline().
+
+        abandon_old: Tear the old pipeline down on a thread of its own and build the new one right away, for a stalled
+        pipeline that may never reach NULL and would otherwise block a worker of the shared pipeline executor."""
+        old_pipeline = self._pipeline
         self._pipeline = None
-        del self._pipeline
+        self._pipeline_actions = []
+        self._pipeline_generation += 1
+
+        if old_pipeline is not None:
+            # Bus signals are handled on the main context, stop them before handing the pipeline over
+            old_pipeline.detach_bus()
+            if abandon_old:
+                run_abandoned(
+                    old_pipeline.teardown,
+                    timeout_seconds=STALLED_TEARDOWN_TIMEOUT_SECONDS,
+                    name=f"teardown {self!r}",
+                )
+                old_pipeline = None
+                self._pipeline_task = None
+
         if use_test_source:
-            self._pipeline = None  # VideoPipelineTestSrc(self)
+            self._pipeline_pending = False
+            if old_pipeline is not None:
+                self._pipeline_task = pipeline_executor.submit(
+                    old_pipeline.teardown, after=self._pipeline_task
+                )
+            return
+
+        frame_ring = None
+        if self._cfg[SlotFlag.DECODED_FRAME_CACHE] and self._frame_ring_cache:
+            # Falls back to regular decoding while the ring is decoded or if the clip is too large
+            frame_ring = self._frame_ring_cache.lookup(self._file_path)
+
+        self._pipeline_pending = True
+        self._pipeline_task = pipeline_executor.submit(
+            self._build_pipeline,
+            old_pipeline,
+            self._file_path,
+            self._memory_buffer,
+            frame_ring,
+            after=self._pipeline_task,
+            on_done=lambda p, gen=self._pipeline_generation: self._on_pipeline_built(
+                p, gen
+            ),
+        )
+
+    def _build_pipeline(
+            self, old_pipeline, file_path, memory_buffer, frame_ring
+    ) -> BasePipeline:
+        """Runs on a worker thread. The old pipeline must be NULL before the new one may use the same plane."""
+        if old_pipeline is not None:
+            old_pipeline.teardown()
+
+        if frame_ring is not None:
+            logger.debug("%s: Playing from decoded frame ring %s", self, frame_ring)
+            return VideoPipelineFrameRing(self, frame_ring)
+
+        pipeline = VideoPipelinePlaybin3(self)
+        pipeline.set_source_file(file_path, memory_buffer)
+        return pipeline
+
+    def _on_pipeline_built(self, pipeline: BasePipeline | None, generation: int):
+        """Called on the main context"""
+        if generation != self._pipeline_generation:
+            # The pipeline was reset again in the meantime, this one is not needed anymore
+            if pipeline is not None:
+                pipeline_executor.submit(pipeline.teardown)
+            return
+
+        self._pipeline_pending = False
+        if pipeline is None:
+            logger.error("%s: Could not build pipeline", self)
+            self._pipeline_actions = []
+            self._state = SlotState.DEACTIVATED
+            return
+
+        self._pipeline = pipeline
+        self._pipeline.attach_bus()
+        trace_capture.watch(self, pipeline)
+        # Building may take a while (e.g. opening the file over NFS), the stall timeout starts now
+        self._watchdog.arm(time.monotonic())
+
+        actions, self._pipeline_actions = self._pipeline_actions, []
+        for action in actions:
+            action(self._pipeline)
+
+    def _with_pipeline(self, action: Callable[[BasePipeline], None]):
+        """Run the action on the pipeline right away, or as soon as it has been built."""
+        if self._pipeline is not None:
+            action(self._pipeline)
+        elif self.is_pipeline_pending:
+            self._pipeline_actions.append(action)
         else:
-            self._pipeline = VideoPipelinePlaybin3(self)
-            self._pipeline.set_source_file(self._file_path)
+            logger.debug("%s: No pipeline present, ignoring action", self)
 
     def on_pipeline_eos_enter(self) -> bool:
+        # No more frames until rewound (or deactivated), that's no stall
+        self._watchdog.arm(time.monotonic())
         if not self._cfg[SlotFlag.LOOPING]:
             self.blank()
         else:
-            self._pipeline.rewind()
+            self._with_pipeline(lambda p: p.rewind())
             return False
         return True
 
     def on_pipeline_eos_done(self):
         if self._cfg[SlotFlag.LOOPING]:
-            logger.debug("%s Starting playback again due to active looping" % self)
-            self._pipeline.roll()
+            logger.debug("%s Starting playback again due to active looping", self)
+            self._with_pipeline(lambda p: p.roll())
             # self.unblank()
             return
         self._state = SlotState.DEACTIVATED
 
     def on_pipeline_error(self):
+        if self._is_watched:
+            # Rebuild the pipeline like after a stall, with the same retries
+            self._watchdog.on_error(time.monotonic(), self._pipeline.last_frame_time if self._pipeline else None)
+            return
         self._state = SlotState.DEACTIVATED
 
-    def set_file_path(self, file_path: Path) -> Result[None, str]:
+    def set_file_path(
+            self, file_path: Path, memory_buffer: Any | None = None
+    ) -> Result[None, str]:
+        """Set the file to be played. If the content of the file is given as memory_buffer, the file is played from
+        memory and the file system is not accessed during playback."""
         if not file_path.is_absolute():
             msg = f"File {file_path} is not absolute. Cannot create slot {self.id} on output {self.output.connector_name}"
             logger.error(msg)
@@ -147,26 +335,90 @@ class VideoSlot:
             f"Set {file_path} to be played out on slot {self.id} on output {self.output.connector_name}"
         )
         self._file_path = file_path
+        self._memory_buffer = memory_buffer
         self._use_test_source = False
+        self._preloaded = False
+        self._watchdog.disarm()
         self._reset_pipeline()
 
         self._state = SlotState.DEACTIVATED
 
         return Success(None)
 
-    def play(self) -> Result[None, str]:
+    def preload(
+            self,
+            file_path: Path,
+            memory_buffer: Any | None = None,
+            replace_active: bool = False,
+    ) -> Result[None, str]:
+        """Set the file and preroll the pipeline without showing it, so a following play() starts right away.
+
+        Args:
+            replace_active: Preload even if the slot is playing, which stops the current playback
+        """
+        if self.is_active and not replace_active:
+            return Failure(
+                f"Slot {self.id} on output {self.output.id} is active. Ignoring preload command."
+            )
+
+        match self.set_file_path(file_path, memory_buffer):
+            case Failure(msg):
+                return Failure(msg)
+
+        self._with_pipeline(lambda p: p.preroll())
+        self._preloaded = True
+        return Success(None)
+
+    def play(
+            self,
+            start_clock: StartClock | None = None,
+            on_rolling: Callable[[], None] | None = None,
+    ) -> Result[None, str]:
+        """
+        Args:
+            start_clock: Shared start time with other slots, see StartClock
+            on_rolling: Called instead of unblanking the slot once the pipeline plays, for callers that unblank
+                several slots at once
+        """
         if self.is_uninitialized:
             return Failure("Slot uninitialized. Ignoring play command.")
+        self._preloaded = False
         self.set_z_pos(2)
 
         if not self.is_auto_faded and self._cfg[SlotFlag.FULL_ALPHA_AT_START]:
             self._alpha = 1.0
 
         self._state = SlotState.ACTIVATING
-        self._pipeline.roll(self.unblank)
+        self._cue_started_at = time.monotonic()
+        self._cue_generation += 1
+        self._last_cue_latency = None
+        self._watchdog.arm(self._cue_started_at)
+        generation = self._cue_generation
+        self._with_pipeline(lambda p: p.on_next_frame(lambda t: self._on_cue_first_frame(t, generation)))
+        self._with_pipeline(
+            lambda p: p.roll(on_rolling or self.unblank, start_clock)
+        )
 
         return Success(None)
 
+    def on_next_frame(self, callback: Callable[[float], None]):
+        """See BasePipeline.on_next_frame()"""
+        self._with_pipeline(lambda p: p.on_next_frame(callback))
+
+    def set_crossfading(self, on_off: bool):
+        """While crossfading, the alpha is set from outside and the slot neither fades in nor out by itself"""
+        self._crossfading = on_off
+
+    def _on_cue_first_frame(self, frame_time: float, generation: int):
+        if self._cue_started_at is None or generation != self._cue_generation:
+            # Reported for an earlier cue, whose pipeline was replaced before its first frame
+            return
+        self._last_cue_latency = frame_time - self._cue_started_at
+        self._cue_started_at = None
+        cue_latency_stats.add(self._last_cue_latency)
+        cue_latency_seconds.observe(self._last_cue_latency)
+        logger.debug("%s: First frame after %.1f ms", self, self._last_cue_latency * 1000.0)
+
     def play_test(self) -> Result[None, str]:
         self.set_z_pos(2)
 
@@ -176,7 +428,7 @@ class VideoSlot:
         self._reset_pipeline(use_test_source=True)
 
         self._state = SlotState.ACTIVATING
-        self._pipeline.roll(self.unblank)
+        self._with_pipeline(lambda p: p.roll(self.unblank))
 
         return Success(None)
 
@@ -184,7 +436,7 @@ class VideoSlot:
         """Stop playback, but don't blank or rewind."""
         if self.is_uninitialized:
             return Failure("Slot uninitialized. Ignoring play command.")
-        self._pipeline.pause()
+        self._with_pipeline(lambda p: p.pause())
         self._state = SlotState.PAUSED
         return Success(None)
 
@@ -201,6 +453,7 @@ class VideoSlot:
             return Failure("Slot not active. Ignoring stop command.")
 
         self._state = SlotState.DEACTIVATING
+        self._watchdog.disarm()
 
         return Success(None)
 
@@ -210,17 +463,17 @@ class VideoSlot:
         if self._plane is None:
             return
 
-        logger.debug(f"{self}: Setting alpha to {alpha}")
+        logger.debug("%s: Setting alpha to %s", self, alpha)
 
         self._alpha = min(1.0, max(0.0, alpha))
         if self.blanked:
             # Only store desired alpha if blanked, but do not actually set the alpha on the plane
             return
         value = int(self._alpha * 65232.0)
-        self._plane.set_props({"alpha": value})
+        self._output.set_plane_props(self._plane, {"alpha": value})
 
     def set_config(self, slot_flag: SlotFlag, *args) -> Result[None, str]:
-        logger.debug(f"{self}: Setting flag {slot_flag.name} to {args}")
+        logger.debug("%s: Setting flag %s to %s", self, slot_flag.name, args)
 
         if slot_flag not in self._cfg:
             return Failure(
@@ -244,7 +497,7 @@ class VideoSlot:
             return
         if self._plane is None:
             return
-        self._plane.set_props({"alpha": 0})
+        self._output.set_plane_props(self._plane, {"alpha": 0})
         self.blanked = True
 
     def unblank(self):
@@ -252,7 +505,7 @@ class VideoSlot:
             return
         if self._plane is None:
             return
-        logger.debug(f"{self}: Unblank")
+        logger.debug("%s: Unblank", self)
         self.blanked = False
         self.set_alpha(self._alpha)
 
@@ -261,7 +514,7 @@ class VideoSlot:
             return
         if self._plane is None:
             return
-        self._plane.set_props({"zpos": zPos})
+        self._output.set_plane_props(self._plane, {"zpos": zPos})
 
     def update(self, dt):
         if self.is_uninitialized:
@@ -273,21 +526,18 @@ class VideoSlot:
                 self.blank()
 
             case SlotState.DEACTIVATING:
-                # TODO: Calculate slope by actual config value self.set_config(SlotFlag.FADE_OUT_TIME_SECONDS)
-                alpha = self._alpha - (dt * 4.0)
-                if self.is_auto_faded and alpha > 0.0:
+                alpha = self._alpha - self._fade_step(SlotFlag.FADE_OUT_TIME_SECONDS, dt)
+                if self.is_auto_faded_out and alpha > 0.0 and not self._crossfading:
                     self.set_alpha(alpha)
                     logger.debug("alpha DN: %s", self._alpha)
                 else:
                     self.blank()
-                    if self._pipeline is not None:
-                        self._pipeline.stop()
+                    self._with_pipeline(lambda p: p.stop())
                     self._state = SlotState.DEACTIVATED
 
             case SlotState.ACTIVATING:
-                if self.is_auto_faded:
-                    # TODO: Calculate slope by actual config value self.set_config(SlotFlag.FADE_IN_TIME_SECONDS)
-                    alpha = self._alpha + (dt * 4.0)
+                if self.is_auto_faded and not self._crossfading:
+                    alpha = self._alpha + self._fade_step(SlotFlag.FADE_IN_TIME_SECONDS, dt)
                     if alpha < 1.0:
                         self.set_alpha(alpha)
                     else:
@@ -300,9 +550,54 @@ class VideoSlot:
             case SlotState.ACTIVE:
                 pass
 
+        if self._is_watched:
+            self._check_stall()
+
         if self._state != old_state:
             logger.debug(self)
 
+    def _fade_step(self, slot_flag: SlotFlag, dt: float) -> float:
+        """Alpha change of an update dt seconds long, so a whole fade takes the configured seconds"""
+        seconds = self._cfg[slot_flag]
+        return dt / seconds if seconds > 0.0 else 1.0
+
+    @property
+    def _is_watched(self) -> bool:
+        """Frames are expected to arrive all the time"""
+        return (
+                config[Conf.STALL_TIMEOUT_MS] > 0
+                and not self._use_test_source
+                and self._state in (SlotState.ACTIVATING, SlotState.ACTIVE)
+        )
+
+    def _check_stall(self):
+        if self._pipeline is None and not self._watchdog.is_stalled:
+            # Still being built, the timeout starts once it is there
+            return
+        now = time.monotonic()
+        match self._watchdog.check(now, self._pipeline.last_frame_time if self._pipeline else None):
+            case StallAction.RECOVER:
+                self._recover_from_stall(now)
+            case StallAction.GIVE_UP:
+                self._state = SlotState.DEACTIVATED
+
+    def _recover_from_stall(self, now: float):
+        """Replace the pipeline and continue where the stall started"""
+        self._watchdog.attempt(now, self._pipeline.last_frame_position if self._pipeline else None)
+        position = self._watchdog.stall.position
+        self._reset_pipeline(abandon_old=True)
+        self._with_pipeline(
+            lambda p: p.preroll(lambda: self._resume_after_stall(p, position))
+        )
+
+    def _resume_after_stall(self, pipeline: BasePipeline, position: float | None):
+        if pipeline is not self._pipeline or not self._is_watched:
+            # Replaced or stopped in the meantime
+            return
+        if position:
+            pipeline.seek(position)
+        pipeline.roll()
+
     def __repr__(self):
         return (
             f"VideoSlot {self._output.connector_name}/{self._id} ({self._state.name})"
@@ -0,0 +1,128 @@
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import gi
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+
+from theatris_rpo.command_executor import CommandStats  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Elements the pipelines are built from (see gst_pipeline) and the usual demuxers, parsers and decoders of the media.
+# Features that are not installed (e.g. kmssink or the v4l2 decoders off the pi) are skipped.
+PLUGIN_FEATURES = (
+    "playbin3",
+    "uridecodebin3",
+    "urisourcebin",
+    "decodebin3",
+    "parsebin",
+    "multiqueue",
+    "filesrc",
+    "appsrc",
+    "videoconvert",
+    "videoscale",
+    "capsfilter",
+    "fakesink",
+    "autovideosink",
+    "kmssink",
+    "qtdemux",
+    "matroskademux",
+    "h264parse",
+    "h265parse",
+    "v4l2slh265dec",
+    "v4l2h264dec",
+    "avdec_h264",
+    "avdec_h265",
+)
+
+WARM_PIPELINE_TIMEOUT_SECONDS = 5.0
+
+
+def load_plugin_features(names: tuple[str, ...] = PLUGIN_FEATURES) -> list[str]:
+    """Load the shared objects of the plugin features now, so the first pipeline of the evening does not have to.
+    Returns the names of the loaded features."""
+    registry = Gst.Registry.get()
+    loaded = []
+    for name in names:
+        feature = registry.lookup_feature(name)
+        if feature is None:
+            logger.debug("Plugin feature %s not available", name)
+            continue
+        if feature.load() is None:
+            logger.warning("Could not load plugin feature %s", name)
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def warm_pipeline(file_path: Path, timeout_seconds: float = WARM_PIPELINE_TIMEOUT_SECONDS) -> bool:
+    """Preroll a throwaway playbin3 with the file and tear it down again, so the elements for the file are created and
+    initialized once (e.g. the decoder device is opened). Blocks until prerolled, run it on a worker thread."""
+    playbin = Gst.ElementFactory.make("playbin3")
+    if playbin is None:
+        return False
+    playbin.set_property("video-sink", Gst.ElementFactory.make("fakesink"))
+    playbin.set_property("audio-sink", Gst.ElementFactory.make("fakesink"))
+    playbin.set_property("uri", "file://" + str(file_path))
+    try:
+        if playbin.set_state(Gst.State.PAUSED) == Gst.StateChangeReturn.FAILURE:
+            return False
+        result, state, _ = playbin.get_state(int(timeout_seconds * Gst.SECOND))
+        return result != Gst.StateChangeReturn.FAILURE and state == Gst.State.PAUSED
+    finally:
+        playbin.set_state(Gst.State.NULL)
+
+
+def warm_pipelines(file_paths: list[Path], count: int) -> int:
+    """Build one throwaway pipeline each for count outputs, cycling through the files. Returns the number of pipelines
+    that prerolled."""
+    if not file_paths:
+        return 0
+    warmed = 0
+    for i in range(count):
+        file_path = file_paths[i % len(file_paths)]
+        if warm_pipeline(file_path):
+            warmed += 1
+        else:
+            logger.warning("Warm-up pipeline for %s did not preroll", file_path)
+    return warmed
+
+
+@dataclass
+class CueLatencyStats:
+    """Latency from play() until the first frame reached the sink: The first cue after boot, which pays for everything
+    that was not warmed up, and the ones after it"""
+
+    first_seconds: float | None = None
+    steady: CommandStats = field(default_factory=CommandStats)
+
+    def add(self, latency: float):
+        if self.first_seconds is None:
+            self.first_seconds = latency
+            logger.info("First cue after boot: %.1f ms to the first frame", latency * 1000.0)
+        else:
+            self.steady.add(latency)
+
+    def merge(self, other: "CueLatencyStats"):
+        """Add the latencies of another process, its first cue counts as a first cue as well (the slower one is kept)"""
+        if other.first_seconds is not None:
+            self.first_seconds = max(self.first_seconds or 0.0, other.first_seconds)
+        self.steady.count += other.steady.count
+        self.steady.total_seconds += other.steady.total_seconds
+        self.steady.max_seconds = max(self.steady.max_seconds, other.steady.max_seconds)
+
+    def as_list(self) -> list:
+        """First cue latency (ms, -1 if there was none yet), count, mean and max latency (ms) of the cues after it"""
+        first_ms = -1.0 if self.first_seconds is None else self.first_seconds * 1000.0
+        return [
+            first_ms,
+            self.steady.count,
+            self.steady.mean_seconds * 1000.0,
+            self.steady.max_seconds * 1000.0,
+        ]
+
+
+cue_latency_stats = CueLatencyStats()
@@ -0,0 +1,225 @@
+import enum
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_STALLS = 32
+
+
+class StallAction(enum.Enum):
+    NONE = enum.auto()
+    RECOVER = enum.auto()  # rebuild the pipeline and continue at the position the stall started
+    GIVE_UP = enum.auto()  # the retries are used up
+
+
+@dataclass
+class Stall:
+    """A slot that did not get a new frame for too long, from the last frame before it until it recovered"""
+
+    output_id: int
+    slot_id: int
+    frozen_since: float  # time.monotonic() of the last frame before the stall
+    detected_at: float
+    reason: str  # "stall" or "error"
+    position: float | None = None  # seconds, where playback continues after the pipeline was rebuilt
+    attempts: int = 0
+    attempted_at: float | None = None
+    next_attempt_at: float = 0.0
+    recovered_at: float | None = None
+    ended_at: float | None = None
+    gave_up: bool = False
+
+    @property
+    def frozen_seconds(self) -> float:
+        """How long no frame was shown, until the recovery (or until giving up)"""
+        end = self.ended_at if self.ended_at is not None else self.detected_at
+        return end - self.frozen_since
+
+    @property
+    def recovery_seconds(self) -> float | None:
+        """From the detection until the first frame of the rebuilt pipeline, None if it did not recover"""
+        if self.recovered_at is None:
+            return None
+        return self.recovered_at - self.detected_at
+
+    def as_list(self) -> list:
+        """Output, slot, reason, frozen (ms), recovery (ms, -1 if it did not recover) and the number of attempts"""
+        recovery = self.recovery_seconds
+        return [
+            self.output_id,
+            self.slot_id,
+            self.reason,
+            self.frozen_seconds * 1000.0,
+            -1.0 if recovery is None else recovery * 1000.0,
+            self.attempts,
+        ]
+
+
+class StallWatchdog:
+    """Detects that a playing slot got no new frame for timeout_seconds (e.g. a hanging decoder or NFS read) and
+    decides when to rebuild its pipeline.
+
+    After every attempt, the rebuilt pipeline gets timeout_seconds plus an exponentially growing backoff to show a
+    frame, before the next attempt is made. check() is called on every update of the slot with the arrival time of the
+    last frame, see BasePipeline.last_frame_time.
+    """
+
+    def __init__(
+            self,
+            output_id: int,
+            slot_id: int,
+            timeout_seconds: float,
+            max_attempts: int,
+            backoff_seconds: float,
+    ):
+        self._output_id = output_id
+        self._slot_id = slot_id
+        self._timeout_seconds = timeout_seconds
+        self._max_attempts = max_attempts
+        self._backoff_seconds = backoff_seconds
+        self._armed_at = 0.0
+        self._stall: Stall | None = None
+
+    @property
+    def stall(self) -> Stall | None:
+        """The stall that is being recovered from"""
+        return self._stall
+
+    @property
+    def is_stalled(self) -> bool:
+        return self._stall is not None
+
+    def arm(self, now: float):
+        """Start watching anew, e.g. when playback (re-)starts and the first frame may take a moment"""
+        self._armed_at = now
+
+    def disarm(self):
+        """Forget a stall that is being recovered from, e.g. because the slot was stopped or given another file"""
+        self._stall = None
+
+    def check(self, now: float, last_frame_time: float | None) -> StallAction:
+        last = max(self._armed_at, last_frame_time or 0.0)
+        stall = self._stall
+        if stall is None:
+            if now - last < self._timeout_seconds:
+                return StallAction.NONE
+            self._stall = Stall(self._output_id, self._slot_id, last, now, "stall", next_attempt_at=now)
+            logger.warning(
+                "Output %s slot %s: No frame for %.0f ms", self._output_id, self._slot_id, (now - last) * 1000.0
+            )
+            return StallAction.RECOVER
+
+        if stall.attempted_at is not None and last_frame_time is not None and last_frame_time > stall.attempted_at:
+            stall.recovered_at = last_frame_time
+            self._finish(last_frame_time)
+            return StallAction.NONE
+        if now < stall.next_attempt_at:
+            return StallAction.NONE
+        if stall.attempts >= self._max_attempts:
+            stall.gave_up = True
+            self._finish(now)
+            return StallAction.GIVE_UP
+        return StallAction.RECOVER
+
+    def on_error(self, now: float, last_frame_time: float | None):
+        """The pipeline failed, recover on the next check() (once the backoff of an earlier attempt is over)"""
+        if self._stall is None:
+            last = max(self._armed_at, last_frame_time or 0.0)
+            self._stall = Stall(self._output_id, self._slot_id, last, now, "error", next_attempt_at=now)
+
+    def attempt(self, now: float, position: float | None):
+        """Record that the pipeline is rebuilt now. The position is only kept from the first attempt, the rebuilt
+        pipelines of the following ones may not have played at all."""
+        stall = self._stall
+        if stall is None:
+            return
+        if stall.attempts == 0:
+            stall.position = position
+        stall.attempts += 1
+        stall.attempted_at = now
+        stall.next_attempt_at = now + self._timeout_seconds + self._backoff_seconds * 2 ** (stall.attempts - 1)
+        logger.info(
+            "Output %s slot %s: Rebuilding the pipeline (attempt %d of %d)",
+            self._output_id,
+            self._slot_id,
+            stall.attempts,
+            self._max_attempts,
+        )
+
+    def _finish(self, now: float):
+        stall, self._stall = self._stall, None
+        stall.ended_at = now
+        self._armed_at = now
+        stall_log.add(stall)
+
+
+class StallLog:
+    """The last stalls of all slots of the process, and how many there were in total"""
+
+    def __init__(self, max_logged: int = MAX_LOGGED_STALLS):
+        self._stalls: deque[Stall] = deque(maxlen=max_logged)
+        self._count = 0
+        self._recovered = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stalls(self) -> list[Stall]:
+        with self._lock:
+            return list(self._stalls)
+
+    def add(self, stall: Stall):
+        with self._lock:
+            self._stalls.append(stall)
+            self._count += 1
+            if stall.recovered_at is not None:
+                self._recovered += 1
+        if stall.recovered_at is not None:
+            logger.info(
+                "Output %s slot %s: Recovered from %s after %.0f ms frozen (%d attempts)",
+                stall.output_id,
+                stall.slot_id,
+                stall.reason,
+                stall.frozen_seconds * 1000.0,
+                stall.attempts,
+            )
+        else:
+            logger.error(
+                "Output %s slot %s: Giving up after %d attempts to recover from %s",
+                stall.output_id,
+                stall.slot_id,
+                stall.attempts,
+                stall.reason,
+            )
+
+    def merge(self, other: "StallLog"):
+        """Add the stalls of another process"""
+        with other._lock:
+            stalls, count, recovered = list(other._stalls), other._count, other._recovered
+        with self._lock:
+            self._stalls.extend(stalls)
+            self._count += count
+            self._recovered += recovered
+
+    def as_list(self) -> list:
+        """Number of stalls and how many of them recovered, followed by Stall.as_list() of the last ones, oldest
+        first"""
+        with self._lock:
+            result = [self._count, self._recovered]
+            for stall in sorted(self._stalls, key=lambda s: s.detected_at):
+                result += stall.as_list()
+        return result
+
+    def __getstate__(self):
+        # Sent to the coordinator as part of the snapshot of an output process
+        with self._lock:
+            return self._stalls, self._count, self._recovered
+
+    def __setstate__(self, state):
+        self._stalls, self._count, self._recovered = state
+        self._lock = threading.Lock()
+
+
+stall_log = StallLog()
@@ -0,0 +1,62 @@
+import gi
+
+gi.require_version("GLib", "2.0")
+from gi.repository import GLib  # noqa: E402
+
+from theatris_rpo.command_executor import CommandExecutor, Lane  # noqa: E402
+
+
+def run_main_loop(seconds: float):
+    loop = GLib.MainLoop()
+    GLib.timeout_add(int(seconds * 1000), loop.quit)
+    loop.run()
+
+
+class TestCommandExecutor:
+    def test_cue_commands_run_before_queued_ones(self):
+        # Arrange
+        calls = []
+        sut = CommandExecutor()
+
+        # Act
+        sut.submit(Lane.MAINTENANCE, "rescan", calls.append, "rescan")
+        sut.submit(Lane.NORMAL, "preload", calls.append, "preload")
+        result = sut.submit(Lane.CUE, "set_alpha", lambda: calls.append("set_alpha") or "done")
+        depths_before = sut.queue_depths()
+        run_main_loop(0.1)
+
+        # Assert
+        assert result == "done"
+        assert depths_before == [1, 1, 0]
+        assert calls == ["set_alpha", "preload", "rescan"]
+        assert sut.queue_depths() == [0, 0, 0]
+        assert set(sut.stats) == {"rescan", "preload", "set_alpha"}
+
+    def test_queued_commands_of_a_client_run_before_its_cue_command(self):
+        # Arrange
+        calls = []
+        sut = CommandExecutor()
+        desk, other = ("10.0.0.2", 8000), ("10.0.0.3", 8000)
+        sut.submit(Lane.MAINTENANCE, "cue_list/load", calls.append, "load", client=desk)
+        sut.submit(Lane.NORMAL, "preload", calls.append, "preload", client=desk)
+        sut.submit(Lane.NORMAL, "preload", calls.append, "other preload", client=other)
+
+        # Act
+        sut.submit(Lane.CUE, "play_by_number", calls.append, "play", client=desk)
+
+        # Assert
+        assert calls == ["load", "preload", "play"]
+        assert sut.queue_depths() == [1, 0, 0]
+
+    def test_background_result_is_delivered_on_the_main_loop(self):
+        # Arrange
+        results = []
+        sut = CommandExecutor()
+
+        # Act
+        sut.run_in_background("scan", lambda: {1: "a"}, on_done=results.append)
+        run_main_loop(0.2)
+
+        # Assert
+        assert results == [{1: "a"}]
+        assert sut.stats["scan"].count == 1
@@ -0,0 +1,133 @@
+import time
+from unittest.mock import patch
+
+from returns.result import Success
+
+from theatris_rpo.crossfade import Crossfade, FadeTimeline
+from theatris_rpo.slot_state import SlotState
+
+
+class FakeOutput:
+    id = 0
+
+    def deferred_plane_commits(self):
+        return _NoCommit()
+
+
+class _NoCommit:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeSlot:
+    def __init__(self, slot_id: int, state: SlotState, alpha: float):
+        self.id = slot_id
+        self.output = FakeOutput()
+        self.state = state
+        self.alpha = alpha
+        self.is_preloaded = False
+        self.is_prerolled = True
+        self.is_crossfading = False
+        self.current_file_path = None
+        self.frame_callbacks = []
+        self.z_pos = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in (SlotState.ACTIVATING, SlotState.ACTIVE, SlotState.DEACTIVATING, SlotState.PAUSED)
+
+    def preload(self, file_path, memory_buffer=None):
+        self.current_file_path = file_path
+        self.is_preloaded = True
+        return Success(None)
+
+    def play(self, on_rolling=None):
+        self.state = SlotState.ACTIVATING
+        on_rolling()
+        return Success(None)
+
+    def stop(self):
+        self.state = SlotState.DEACTIVATING
+        return Success(None)
+
+    def set_alpha(self, alpha: float):
+        self.alpha = alpha
+
+    def unblank(self):
+        pass
+
+    def set_z_pos(self, z_pos: int):
+        self.z_pos = z_pos
+
+    def set_crossfading(self, on_off: bool):
+        self.is_crossfading = on_off
+
+    def on_next_frame(self, callback):
+        self.frame_callbacks.append(callback)
+
+
+class TestFadeTimeline:
+    def test_progress_follows_the_clock_from_the_start(self):
+        # Arrange
+        sut = FadeTimeline(2.0)
+
+        # Act
+        before = sut.progress(5.0)
+        sut.start(10.0)
+
+        # Assert
+        assert before == 0.0
+        assert [sut.progress(t) for t in (9.0, 11.0, 12.0, 20.0)] == [0.0, 0.5, 1.0, 1.0]
+
+
+class TestCrossfade:
+    def test_incoming_ramp_starts_with_the_first_frame_and_outgoing_slot_stops_at_the_end(self):
+        # Arrange
+        outgoing = FakeSlot(0, SlotState.ACTIVE, 1.0)
+        incoming = FakeSlot(1, SlotState.DEACTIVATED, 1.0)
+        sut = Crossfade(outgoing, incoming, "/media/2_clip.mp4", None, 1.0)
+        sut.start()
+
+        # Act
+        sut._rolling_at = 100.0
+        sut.update(100.2)
+        alpha_before_first_frame = incoming.alpha
+        incoming.frame_callbacks[0](100.3)
+        sut.update(100.8)
+        alphas_halfway = (incoming.alpha, outgoing.alpha)
+        sut.update(101.3)
+
+        # Assert
+        assert alpha_before_first_frame == 0.0
+        assert alphas_halfway == (0.5, 1.0)
+        assert (incoming.alpha, outgoing.alpha) == (1.0, 0.0)
+        assert outgoing.state is SlotState.DEACTIVATING
+        assert incoming.z_pos > outgoing.z_pos
+        assert sut.is_done and not incoming.is_crossfading
+
+    def test_incoming_slot_that_never_rolls_or_was_stopped_ends_the_crossfade(self):
+        # Arrange
+        never_rolling = FakeSlot(1, SlotState.DEACTIVATED, 1.0)
+        never_rolling.play = lambda on_rolling=None: Success(setattr(never_rolling, "state", SlotState.ACTIVATING))
+        stopped = FakeSlot(2, SlotState.DEACTIVATED, 1.0)
+        stopped.is_prerolled = False
+        not_rolled = Crossfade(FakeSlot(0, SlotState.ACTIVE, 1.0), never_rolling, "/media/2_clip.mp4", None, 1.0)
+        not_prerolled = Crossfade(FakeSlot(0, SlotState.ACTIVE, 1.0), stopped, "/media/3_clip.mp4", None, 1.0)
+        not_rolled.start()
+        with patch("theatris_rpo.crossfade.GLib"):
+            not_prerolled.start()
+
+        # Act
+        not_rolled.update(time.monotonic())
+        still_waiting = not not_rolled.is_done
+        not_rolled.update(time.monotonic() + 10.0)
+        stopped.is_preloaded = False
+        not_prerolled.update(time.monotonic())
+
+        # Assert
+        assert still_waiting
+        assert not_rolled.is_done and not never_rolling.is_crossfading
+        assert not_prerolled.is_done and not stopped.is_crossfading
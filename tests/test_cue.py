@@ -0,0 +1,104 @@
+from contextlib import nullcontext
+from unittest.mock import patch
+
+from returns.result import Success, Failure
+
+from theatris_rpo import fake_kms
+from theatris_rpo.cue import CueAction, CueBatch, CueOp, CueStep, parse_cue_args
+from theatris_rpo.gst_pipeline import StartClock
+from theatris_rpo.video_output import HDMIOutput
+
+
+class TestParseCueArgs:
+    def test_parses_compact_argument_list(self):
+        # Arrange
+        args = ["stop", 0, 0, "play", 0, 1, 12, "alpha", 1, 1, 0.5, "play", 1, 0, 13]
+
+        # Act
+        result = parse_cue_args(args)
+
+        # Assert
+        assert result == Success(
+            [
+                CueOp(CueAction.STOP, 0, 0),
+                CueOp(CueAction.PLAY, 0, 1, 12),
+                CueOp(CueAction.ALPHA, 1, 1, 0.5),
+                CueOp(CueAction.PLAY, 1, 0, 13),
+            ]
+        )
+
+    def test_rejects_whole_cue_if_one_operation_is_invalid(self):
+        # Arrange
+        args = ["stop", 0, 0, "play", 0, 1]
+
+        # Act
+        result = parse_cue_args(args)
+
+        # Assert
+        assert isinstance(result, Failure)
+
+
+class TestDeferredPlaneCommits:
+    def test_plane_changes_are_committed_once_per_output(self):
+        # Arrange
+        card = fake_kms.Card(blocking_commits=False)
+        res = fake_kms.ResourceManager(card)
+        output = HDMIOutput(
+            res, card.fd, "HDMI-A-1", atomic_request=lambda: fake_kms.AtomicReq(card)
+        )
+        planes = [res.reserve_overlay_plane(output.crtc) for _ in range(2)]
+
+        # Act
+        with output.deferred_plane_commits():
+            output.set_plane_props(planes[0], {"alpha": 0})
+            output.set_plane_props(planes[1], {"zpos": 2})
+            output.set_plane_props(planes[1], {"alpha": 65232})
+            committed_inside = list(card.commits)
+
+        # Assert
+        assert committed_inside == []
+        assert len({c.requested_at for c in card.commits}) == 1
+        assert [c.props for c in card.commits] == [{"alpha": 0}, {"zpos": 2, "alpha": 65232}]
+
+
+class FakeOutput:
+    def deferred_plane_commits(self):
+        return nullcontext()
+
+
+class FakeSlot:
+    def __init__(self, output):
+        self.output = output
+        self.on_rolling = None
+        self.unblanked = 0
+
+    def play(self, start_clock=None, on_rolling=None):
+        self.on_rolling = on_rolling
+        return Success(None)
+
+    def unblank(self):
+        self.unblanked += 1
+
+
+class TestCueBatch:
+    def test_slots_that_rolled_are_shown_once_the_rolling_timeout_passed(self):
+        # Arrange
+        output = FakeOutput()
+        slots = [FakeSlot(output), FakeSlot(output)]
+        started = []
+        steps = [CueStep(CueOp(CueAction.PLAY, 0, i, 1), slot) for i, slot in enumerate(slots)]
+        sut = CueBatch(steps, lambda: started.append(True))
+
+        # Act
+        with patch("theatris_rpo.cue.GLib") as glib:
+            sut.go(StartClock(None, 0))
+            slots[0].on_rolling()
+            before_timeout = (slots[0].unblanked, started[:])
+            on_timeout = glib.timeout_add.call_args.args[1]
+            on_timeout()
+            slots[1].on_rolling()
+
+        # Assert
+        assert before_timeout == (0, [])
+        assert [s.unblanked for s in slots] == [1, 1]
+        assert started == [True]
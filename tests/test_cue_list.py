@@ -0,0 +1,190 @@
+import pytest
+from returns.result import Result, Success, Failure
+
+from theatris_rpo import video_output
+from theatris_rpo.cue import CueAction, CueOp
+from theatris_rpo.cue_list import CueListEngine, ShowStep, StepAction, parse_show
+from theatris_rpo.slot_flag import SlotFlag
+from theatris_rpo.slot_state import SlotState
+
+SHOW = {
+    "cues": [
+        {"number": 1, "name": "Preshow", "steps": [{"file": 1, "output": 0, "slot": 0, "loop": True}]},
+        {"number": 2, "steps": [
+            {"action": "stop", "output": 0, "slot": 0},
+            {"file": 2, "output": 0, "slot": 1, "fade_in": 0.5},
+        ]},
+        {"number": 2.5, "steps": [{"file": 3, "output": 0, "slot": 0}]},
+        {"number": 3, "steps": [{"file": 4, "output": 1, "slot": 0}]},
+    ]
+}
+
+
+class FakeMachine:
+    def __init__(self):
+        self.cues = []
+        self.prepared = []
+        self.prefetched = []
+        self.busy = set()
+
+    def cue(self, ops, slot_config, on_started) -> Result[None, str]:
+        self.cues.append((ops, slot_config))
+        on_started()
+        return Success(None)
+
+    def prepare_slot(self, output, slot, file) -> Result[bool, str]:
+        if (output, slot) in self.busy:
+            return Success(False)
+        self.prepared.append((output, slot, file))
+        return Success(True)
+
+    def prefetch_media(self, numbers) -> Result[None, str]:
+        self.prefetched.append(numbers)
+        return Success(None)
+
+
+class RecordingPlane:
+    def set_props(self, props: dict):
+        pass
+
+
+class SlotMachine(FakeMachine):
+    """Applies the cues to the slots of a test output, without pipelines"""
+
+    def __init__(self):
+        super().__init__()
+        self.output = video_output.TestOutput("Test Output")
+        for _ in range(2):
+            self.output.add_video_slot(None)
+        for slot in self.output.video_slots:
+            slot._plane = RecordingPlane()
+            slot.blanked = False
+
+    def cue(self, ops, slot_config, on_started) -> Result[None, str]:
+        for op in ops:
+            slot = self.output.video_slots[op.slot]
+            for flag, value in slot_config.get((op.output, op.slot), {}).items():
+                slot.set_config(flag, value)
+            if op.action is CueAction.PLAY:
+                slot._state = SlotState.ACTIVATING
+                slot._alpha = 0.0
+            else:
+                slot.stop()
+        return super().cue(ops, slot_config, on_started)
+
+    def tick(self, dt: float, count: int):
+        for _ in range(count):
+            self.output.update(dt)
+
+
+def engine_with_show(vm: FakeMachine, look_ahead: int = 2) -> CueListEngine:
+    sut = CueListEngine(vm, look_ahead)
+    sut._cues = parse_show(SHOW).unwrap()
+    sut._plan()
+    sut._prepare()
+    return sut
+
+
+class TestParseShow:
+    def test_parses_cues_with_defaults(self):
+        # Act
+        cues = parse_show(SHOW).unwrap()
+
+        # Assert
+        assert [c.number for c in cues] == [1.0, 2.0, 2.5, 3.0]
+        assert cues[1].steps == (
+            ShowStep(StepAction.STOP, 0, 0),
+            ShowStep(StepAction.PLAY, 0, 1, 2, fade_in=0.5),
+        )
+
+    def test_rejects_descending_cue_numbers_and_invalid_steps(self):
+        # Arrange
+        descending = {"cues": [{"number": 2, "steps": [{"file": 1, "output": 0, "slot": 0}]},
+                               {"number": 1, "steps": [{"file": 1, "output": 0, "slot": 0}]}]}
+        without_file = {"cues": [{"steps": [{"output": 0, "slot": 0}]}]}
+
+        # Act
+        results = [parse_show(descending), parse_show(without_file)]
+
+        # Assert
+        assert all(isinstance(r, Failure) for r in results)
+
+
+class TestCueListEngine:
+    def test_go_executes_cues_in_order_and_prepares_the_next_one(self):
+        # Arrange
+        vm = FakeMachine()
+        sut = engine_with_show(vm)
+
+        # Act
+        sut.go()
+        sut.go()
+
+        # Assert
+        ops, slot_config = vm.cues[1]
+        assert ops == [CueOp(CueAction.STOP, 0, 0), CueOp(CueAction.PLAY, 0, 1, 2)]
+        assert slot_config[(0, 1)][SlotFlag.FADE_IN_TIME_SECONDS] == 0.5
+        assert (sut.current_number, sut.standby_number) == (2.0, 2.5)
+        assert vm.prepared == [(0, 0, 1), (0, 1, 2), (0, 0, 3)]
+        assert vm.prefetched[-1] == [4]
+
+    def test_busy_reserved_slot_is_prepared_once_it_is_idle(self):
+        # Arrange
+        vm = FakeMachine()
+        sut = engine_with_show(vm)
+        sut.go()
+        # Still fading out after the stop in cue 2
+        vm.busy.add((0, 0))
+        sut.go()
+        vm.prepared.clear()
+
+        # Act
+        vm.busy.clear()
+        sut._prepare_after = 0.0
+        sut.update(0.016)
+
+        # Assert
+        assert vm.prepared == [(0, 0, 3)]
+        assert sut.status()[-2:] == [1, 1]
+
+    def test_back_and_goto_move_the_standby_cue(self):
+        # Arrange
+        vm = FakeMachine()
+        sut = engine_with_show(vm)
+
+        # Act
+        sut.goto(2.5)
+        at_goto = (sut.current_number, sut.standby_number)
+        sut.back()
+        missing = sut.goto(7)
+
+        # Assert
+        assert at_goto == (2.5, 3.0)
+        assert (sut.current_number, sut.standby_number) == (2.0, 2.5)
+        assert isinstance(missing, Failure)
+
+    def test_slots_fade_for_the_seconds_of_the_show_steps(self):
+        # Arrange
+        vm = SlotMachine()
+        sut = CueListEngine(vm)
+        sut._cues = parse_show({"cues": [
+            {"steps": [{"file": 1, "output": 0, "slot": 0, "fade_in": 0.5}]},
+            {"steps": [{"action": "stop", "output": 0, "slot": 0, "fade_out": 2.0}]},
+        ]}).unwrap()
+        slot = vm.output.video_slots[0]
+
+        # Act
+        sut.go()
+        vm.tick(0.05, 5)
+        halfway_in = slot._alpha
+        vm.tick(0.05, 6)  # rounding may leave the alpha just below 1.0 after the fifth
+        faded_in = (slot._alpha, slot.state)
+        sut.go()
+        vm.tick(0.1, 10)
+        halfway_out = (slot._alpha, slot.state)
+
+        # Assert
+        assert halfway_in == pytest.approx(0.5)
+        assert faded_in == (1.0, SlotState.ACTIVE)
+        assert halfway_out[0] == pytest.approx(0.5)
+        assert halfway_out[1] is SlotState.DEACTIVATING
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from theatris_rpo import fake_kms
+
+
+@pytest.fixture
+def card():
+    return fake_kms.Card(blocking_commits=False)
+
+
+class TestFakeKms:
+    def test_reserves_each_overlay_plane_only_once(self, card):
+        # Arrange
+        res = fake_kms.ResourceManager(card)
+        crtc = res.reserve_crtc(res.reserve_connector("HDMI-A-1"))
+
+        # Act
+        planes = [res.reserve_overlay_plane(crtc) for _ in range(fake_kms.OVERLAY_PLANES_PER_CRTC + 1)]
+
+        # Assert
+        assert len({p.id for p in planes[:-1]}) == fake_kms.OVERLAY_PLANES_PER_CRTC
+        assert planes[-1] is None
+
+    def test_records_property_commits_with_vblank(self, card):
+        # Arrange
+        res = fake_kms.ResourceManager(card)
+        plane = res.reserve_overlay_plane(res.reserve_crtc(res.reserve_connector("HDMI-A-2")))
+
+        # Act
+        plane.set_props({"alpha": 1234, "zpos": 2})
+
+        # Assert
+        (commit,) = card.commits
+        assert commit.object_id == plane.id
+        assert commit.props == {"alpha": 1234, "zpos": 2}
+        assert commit.requested_at < commit.vblank_at <= commit.requested_at + card.vblank_period()
+        assert plane.get_prop_value("alpha") == 1234
+
+    def test_atomic_request_latches_all_objects_on_the_same_vblank(self, card):
+        # Arrange
+        res = fake_kms.ResourceManager(card)
+        planes = [
+            res.reserve_overlay_plane(res.reserve_crtc(res.reserve_connector(name)))
+            for name in ("HDMI-A-1", "HDMI-A-2")
+        ]
+        req = fake_kms.AtomicReq(card)
+        for plane in planes:
+            req.add(plane, "alpha", 0)
+
+        # Act
+        req.commit()
+
+        # Assert
+        assert len({c.vblank for c in card.commits}) == 1
+        assert [c.object_id for c in card.commits] == [p.id for p in planes]
+
+    def test_blocking_commit_waits_for_vblank(self):
+        # Arrange
+        card = fake_kms.Card(blocking_commits=True)
+        plane = card.planes[1]
+
+        # Act
+        plane.set_props({"alpha": 0})
+        returned_at = time.monotonic()
+
+        # Assert
+        assert returned_at >= card.commits[0].vblank_at
+
+    def test_keeps_only_the_most_recent_commits(self):
+        # Arrange
+        card = fake_kms.Card(blocking_commits=False, max_recorded_commits=2)
+        res = fake_kms.ResourceManager(card)
+        plane = res.reserve_overlay_plane(res.reserve_crtc(res.reserve_connector("HDMI-A-1")))
+
+        # Act
+        for alpha in (1, 2, 3):
+            plane.set_props({"alpha": alpha})
+
+        # Assert
+        assert [c.props for c in card.commits] == [{"alpha": 2}, {"alpha": 3}]
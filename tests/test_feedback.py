@@ -0,0 +1,90 @@
+from pythonosc.osc_packet import OscPacket
+
+from theatris_rpo.feedback import FeedbackPublisher, FeedbackValue
+
+CLIENT_A = ("10.0.0.2", 9001)
+CLIENT_B = ("10.0.0.3", 9001)
+
+
+class FakeMachine:
+    def __init__(self):
+        self.state = "active"
+        self.position = 0.0
+
+    def feedback(self, include_continuous: bool):
+        yield FeedbackValue("/output0/slot0/state", self.state, False)
+        if include_continuous:
+            yield FeedbackValue("/output0/slot0/current_elapsed_time", self.position, True)
+
+
+def received(sent, client) -> list[tuple[str, list]]:
+    return [
+        (m.message.address, m.message.params)
+        for data, to in sent
+        if to == client
+        for m in OscPacket(data).messages
+    ]
+
+
+class TestFeedbackPublisher:
+    def test_new_subscriber_gets_full_state_then_only_changes(self):
+        # Arrange
+        machine = FakeMachine()
+        sent = []
+        sut = FeedbackPublisher(machine.feedback, lambda data, to: sent.append((data, to)), 0)
+        sut.subscribe(CLIENT_A)
+        sut.tick()
+        sent.clear()
+
+        # Act
+        sut.tick()
+        unchanged = list(sent)
+        machine.state = "paused"
+        sut.tick()
+
+        # Assert
+        assert unchanged == []
+        assert received(sent, CLIENT_A) == [("/output0/slot0/state", ["paused"])]
+
+    def test_continuous_values_are_coalesced_but_state_changes_are_not(self):
+        # Arrange
+        machine = FakeMachine()
+        sent = []
+        sut = FeedbackPublisher(machine.feedback, lambda data, to: sent.append((data, to)), 0.01)
+        sut.subscribe(CLIENT_A)
+        sut.tick()
+        sent.clear()
+
+        # Act
+        machine.position = 1.0
+        sut.tick()
+        machine.state = "deactivating"
+        machine.position = 2.0
+        sut.tick()
+
+        # Assert
+        assert received(sent, CLIENT_A) == [("/output0/slot0/state", ["deactivating"])]
+
+    def test_one_packet_per_tick_is_shared_by_all_subscribers(self):
+        # Arrange
+        machine = FakeMachine()
+        sent = []
+        sut = FeedbackPublisher(machine.feedback, lambda data, to: sent.append((data, to)), 0)
+        sut.subscribe(CLIENT_A)
+        sut.subscribe(CLIENT_B)
+        sut.tick()
+        sent.clear()
+
+        # Act
+        machine.state = "paused"
+        machine.position = 3.5
+        sut.tick()
+
+        # Assert
+        assert len(sent) == 2
+        (packet_a, _), (packet_b, _) = sent
+        assert packet_a is packet_b
+        assert received(sent, CLIENT_B) == [
+            ("/output0/slot0/state", ["paused"]),
+            ("/output0/slot0/current_elapsed_time", [3.5]),
+        ]
@@ -0,0 +1,197 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from gi.repository import Gst
+
+from theatris_rpo.frame_ring import FrameRing, FrameRingCache, FrameRingFeeder
+
+FRAME_NS = 40_000_000
+
+
+class FakeBuffer:
+    def __init__(self, pts: int, size: int = 100):
+        self.pts = pts
+        self.duration = FRAME_NS
+        self._size = size
+
+    def get_size(self) -> int:
+        return self._size
+
+    def copy(self) -> "FakeBuffer":
+        return FakeBuffer(self.pts, self._size)
+
+
+class FakeCaps:
+    """Caps with a single structure that has the framerate"""
+
+    def __init__(self, numerator: int, denominator: int):
+        self._framerate = (True, numerator, denominator)
+
+    def get_size(self) -> int:
+        return 1
+
+    def get_structure(self, index: int) -> "FakeCaps":
+        return self
+
+    def get_fraction(self, field: str) -> tuple[bool, int, int]:
+        return self._framerate
+
+
+class FakeDecoder:
+    started: list["FakeDecoder"] = []
+
+    def __init__(self, path: Path, clip_max_bytes: int, on_done):
+        self.path = path
+        self.clip_max_bytes = clip_max_bytes
+        self.on_done = on_done
+
+    def start(self):
+        FakeDecoder.started.append(self)
+
+
+class FakeAppSrc:
+    def __init__(self):
+        self.pushed: list[int] = []
+        self.eos = False
+
+    def emit(self, signal: str, *args):
+        if signal == "push-buffer":
+            self.pushed.append(args[0].pts)
+        elif signal == "end-of-stream":
+            self.eos = True
+
+
+def make_ring(frames: int, frame_size: int = 100) -> FrameRing:
+    return FrameRing("video/x-raw", [FakeBuffer(i * FRAME_NS, frame_size) for i in range(frames)])
+
+
+def decode(cache: FrameRingCache, path: Path, ring: FrameRing | None) -> FakeDecoder:
+    """Look the path up and let its decoder finish with the ring"""
+    FakeDecoder.started.clear()
+    with patch("theatris_rpo.frame_ring.FrameRingDecoder", FakeDecoder):
+        cache.lookup(path)
+    (decoder,) = FakeDecoder.started
+    decoder.on_done(path, ring)
+    return decoder
+
+
+class TestFrameRing:
+    def test_duration_and_frame_at_a_position(self):
+        # Arrange
+        sut = make_ring(4)
+
+        # Act
+        indexes = [sut.index_at(p) for p in (0, FRAME_NS - 1, FRAME_NS, 3 * FRAME_NS + 5)]
+
+        # Assert
+        assert sut.duration == 4 * FRAME_NS
+        assert sut.size_bytes == 400
+        assert indexes == [0, 0, 1, 3]
+
+    def test_single_frame_without_a_duration_lasts_a_frame_of_the_caps_framerate(self):
+        # Arrange
+        frame = FakeBuffer(0)
+        frame.duration = Gst.CLOCK_TIME_NONE
+        sut = FrameRing(FakeCaps(50, 1), [frame])
+        feeder = FrameRingFeeder(sut, lambda: True)
+        source = FakeAppSrc()
+
+        # Act
+        for _ in range(3):
+            feeder._on_need_data(source, 0)
+        feeder._on_seek_data(source, 50_000_000)
+        feeder._on_need_data(source, 0)
+
+        # Assert
+        assert sut.duration == 20_000_000
+        assert source.pushed == [0, 20_000_000, 40_000_000, 40_000_000]
+
+
+class TestFrameRingCache:
+    def test_decodes_on_the_first_lookup_and_serves_the_ring_afterwards(self):
+        # Arrange
+        sut = FrameRingCache(budget_bytes=1000)
+        ring = make_ring(3)
+
+        # Act
+        decode(sut, Path("1_loop.mp4"), ring)
+        found = sut.lookup(Path("1_loop.mp4"))
+
+        # Assert
+        assert found is ring
+        assert sut.used_bytes == 300
+
+    def test_least_recently_used_ring_is_evicted_when_the_budget_is_exceeded(self):
+        # Arrange
+        sut = FrameRingCache(budget_bytes=700)
+        decode(sut, Path("1_loop.mp4"), make_ring(3))
+        decode(sut, Path("2_loop.mp4"), make_ring(3))
+        sut.lookup(Path("1_loop.mp4"))  # now the most recently used
+
+        # Act
+        decode(sut, Path("3_loop.mp4"), make_ring(3))
+
+        # Assert
+        assert sut.lookup(Path("1_loop.mp4")) is not None
+        assert sut.used_bytes == 600
+        with patch("theatris_rpo.frame_ring.FrameRingDecoder", FakeDecoder):
+            FakeDecoder.started.clear()
+            assert sut.lookup(Path("2_loop.mp4")) is None
+            assert len(FakeDecoder.started) == 1
+
+    def test_clips_above_the_limit_are_remembered_and_not_decoded_again(self):
+        # Arrange
+        sut = FrameRingCache(budget_bytes=1000, clip_max_bytes=250)
+        decoder = decode(sut, Path("1_long.mp4"), None)
+
+        # Act
+        FakeDecoder.started.clear()
+        with patch("theatris_rpo.frame_ring.FrameRingDecoder", FakeDecoder):
+            again = sut.lookup(Path("1_long.mp4"))
+
+        # Assert
+        assert decoder.clip_max_bytes == 250
+        assert again is None
+        assert FakeDecoder.started == []
+
+    def test_clip_limit_is_at_most_the_budget(self):
+        # Arrange
+        sut = FrameRingCache(budget_bytes=1000, clip_max_bytes=5000)
+
+        # Act
+        decoder = decode(sut, Path("1_loop.mp4"), make_ring(3))
+
+        # Assert
+        assert decoder.clip_max_bytes == 1000
+
+
+class TestFrameRingFeeder:
+    def test_loops_with_continuous_timestamps_and_ends_when_not_looping(self):
+        # Arrange
+        looping = [True]
+        sut = FrameRingFeeder(make_ring(2), lambda: looping[0])
+        source = FakeAppSrc()
+
+        # Act
+        for _ in range(3):
+            sut._on_need_data(source, 0)
+        looping[0] = False
+        for _ in range(2):
+            sut._on_need_data(source, 0)
+
+        # Assert
+        assert source.pushed == [0, FRAME_NS, 2 * FRAME_NS, 3 * FRAME_NS]
+        assert source.eos
+
+    def test_seek_continues_at_the_frame_of_the_position(self):
+        # Arrange
+        sut = FrameRingFeeder(make_ring(4), lambda: True)
+        source = FakeAppSrc()
+
+        # Act
+        sut._on_seek_data(source, 9 * FRAME_NS)
+        sut._on_need_data(source, 0)
+        sut._on_need_data(source, 0)
+
+        # Assert
+        assert source.pushed == [9 * FRAME_NS, 10 * FRAME_NS]
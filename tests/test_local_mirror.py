@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from theatris_rpo.media_registry.local_mirror import LocalMirror, PRIORITY_CUED
+
+
+@pytest.fixture
+def base_dir(tmp_path):
+    d = tmp_path / "share"
+    (d / "subdir").mkdir(parents=True)
+    for name, size in (("1_a.mp4", 100), ("2_b.mp4", 200), ("subdir/3_c.mp4", 300)):
+        (d / name).write_bytes(b"v" * size)
+    return d
+
+
+@pytest.fixture
+def mirror_dir(tmp_path):
+    return tmp_path / "mirror"
+
+
+def make_mirror(base_dir, mirror_dir, budget_bytes=10000):
+    return LocalMirror(base_dir, mirror_dir, budget_bytes, bandwidth_bytes_per_second=0)
+
+
+class TestLocalMirror:
+    def test_resolve_returns_source_and_queues_copy(self, base_dir, mirror_dir):
+        # Arrange
+        sut = make_mirror(base_dir, mirror_dir)
+        source = base_dir / "subdir/3_c.mp4"
+
+        # Act
+        first = sut.resolve(source)
+        sut.wait_idle(timeout=2.0)
+        second = sut.resolve(source)
+
+        # Assert
+        assert first == source
+        assert second == mirror_dir / "subdir/3_c.mp4"
+        assert second.read_bytes() == source.read_bytes()
+
+    def test_changed_source_is_not_resolved_to_outdated_copy(
+            self, base_dir, mirror_dir
+    ):
+        # Arrange
+        sut = make_mirror(base_dir, mirror_dir)
+        source = base_dir / "1_a.mp4"
+        sut.resolve(source)
+        sut.wait_idle(timeout=2.0)
+
+        # Act
+        source.write_bytes(b"new content")
+        result = sut.resolve(source)
+
+        # Assert
+        assert result == source
+
+    def test_least_recently_cued_copy_is_evicted(self, base_dir, mirror_dir):
+        # Arrange
+        sut = make_mirror(base_dir, mirror_dir, budget_bytes=450)
+        a, b, c = base_dir / "1_a.mp4", base_dir / "2_b.mp4", base_dir / "subdir/3_c.mp4"
+        for source in (a, b):
+            sut.resolve(source)
+            sut.wait_idle(timeout=2.0)
+        sut.resolve(b)
+        sut.resolve(a)  # a is now cued more recently than b
+
+        # Act
+        sut.resolve(c)
+        sut.wait_idle(timeout=2.0)
+
+        # Assert
+        assert sut.is_mirrored(a)
+        assert not sut.is_mirrored(b)
+        assert sut.is_mirrored(c)
+        assert sut.used_bytes == 400
+
+    def test_background_sync_does_not_evict(self, base_dir, mirror_dir):
+        # Arrange
+        sut = make_mirror(base_dir, mirror_dir, budget_bytes=250)
+        a, b = base_dir / "1_a.mp4", base_dir / "2_b.mp4"
+        sut.sync(a)
+        sut.wait_idle(timeout=2.0)
+
+        # Act
+        sut.sync(b)
+        sut.wait_idle(timeout=2.0)
+
+        # Assert
+        assert sut.is_mirrored(a)
+        assert not sut.is_mirrored(b)
+
+    def test_existing_copies_are_adopted_after_checksum_verification(
+            self, base_dir, mirror_dir
+    ):
+        # Arrange
+        a, b = base_dir / "1_a.mp4", base_dir / "2_b.mp4"
+        previous_run = make_mirror(base_dir, mirror_dir)
+        for source in (a, b):
+            previous_run.sync(source, PRIORITY_CUED)
+        previous_run.wait_idle(timeout=2.0)
+        corrupted = mirror_dir / "2_b.mp4"
+        stat = corrupted.stat()
+        corrupted.write_bytes(b"x" * 200)
+        os.utime(corrupted, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        sut = make_mirror(base_dir, mirror_dir)
+
+        # Act
+        sut.adopt_existing([a, b])
+
+        # Assert
+        assert sut.is_mirrored(a)
+        assert not sut.is_mirrored(b)
+        assert not corrupted.exists()
+
+    def test_adopting_again_on_rescan_does_not_count_copies_twice(self, base_dir, mirror_dir):
+        # Arrange
+        a = base_dir / "1_a.mp4"
+        previous_run = make_mirror(base_dir, mirror_dir)
+        previous_run.sync(a, PRIORITY_CUED)
+        previous_run.wait_idle(timeout=2.0)
+        sut = make_mirror(base_dir, mirror_dir)
+
+        # Act
+        for _ in range(3):
+            sut.adopt_existing([a])
+
+        # Assert
+        assert sut.used_bytes == 100
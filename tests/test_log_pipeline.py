@@ -0,0 +1,58 @@
+import logging
+import threading
+from unittest.mock import patch
+
+from theatris_rpo.log_pipeline import LOGGING_THREAD_NAME, RateLimitFilter, configure_logging, stop_logging
+
+
+def make_record(lineno: int, level: int = logging.DEBUG) -> logging.LogRecord:
+    return logging.LogRecord("test", level, "video_slot.py", lineno, "alpha UP: %s", (0.5,), None)
+
+
+class TestRateLimitFilter:
+    def test_limits_each_call_site_and_reports_the_suppressed_records(self):
+        # Arrange
+        sut = RateLimitFilter(per_second=2.0, burst=2)
+        now = [100.0]
+
+        # Act
+        with patch("theatris_rpo.log_pipeline.time.monotonic", lambda: now[0]):
+            burst = [sut.filter(make_record(10)) for _ in range(5)]
+            other_site = sut.filter(make_record(11))
+            warning = sut.filter(make_record(10, logging.WARNING))
+            now[0] = 100.5
+            after_refill = make_record(10)
+            passed = sut.filter(after_refill)
+
+        # Assert
+        assert burst == [True, True, False, False, False]
+        assert other_site and warning and passed
+        assert after_refill.getMessage() == "alpha UP: 0.5 (3 similar suppressed)"
+
+
+class TestNonBlockingLogging:
+    def test_records_are_written_by_the_logging_thread(self):
+        # Arrange
+        callers = []
+
+        class RecordingHandler(logging.StreamHandler):
+            def emit(self, record):
+                callers.append(threading.current_thread().name)
+                super().emit(record)
+
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+
+        # Act
+        with patch("theatris_rpo.log_pipeline.logging.StreamHandler", RecordingHandler):
+            configure_logging(logging.DEBUG, non_blocking=True, rate_limit_per_second=1.0, rate_limit_burst=3)
+        try:
+            for i in range(10):
+                logging.getLogger("test").debug("step %d", i)
+        finally:
+            stop_logging()
+            root.handlers[:] = handlers
+            root.setLevel(level)
+
+        # Assert
+        assert callers == [LOGGING_THREAD_NAME] * 3
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import gi
+import pytest
+
+gi.require_version("GLib", "2.0")
+from gi.repository import GLib  # noqa: E402
+
+from theatris_rpo import video_output, video_slot  # noqa: E402
+from theatris_rpo.slot_flag import SlotFlag  # noqa: E402
+from theatris_rpo.slot_state import SlotState  # noqa: E402
+
+REBUILD_SECONDS = 0.5
+TICK_SECONDS = 0.016
+MAX_TICK_GAP_SECONDS = 0.05
+
+
+class SlowPipeline:
+    """Stands in for a pipeline whose construction blocks for a long time"""
+
+    def __init__(self, slot):
+        time.sleep(REBUILD_SECONDS)
+        self.built_on_main_thread = threading.current_thread() is threading.main_thread()
+        self.bus_attached = False
+
+    def set_source_file(self, file_path, memory_buffer=None):
+        pass
+
+    def attach_bus(self):
+        self.bus_attached = True
+
+    def detach_bus(self):
+        pass
+
+    def teardown(self):
+        time.sleep(REBUILD_SECONDS)
+
+
+class FakePlane:
+    def __init__(self):
+        self.alpha_commits: list[float] = []
+
+    def set_props(self, props: dict):
+        if "alpha" in props:
+            self.alpha_commits.append(time.monotonic())
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    f = tmp_path / "1_clip.mp4"
+    f.write_bytes(b"not decoded in this test")
+    return f
+
+
+@pytest.fixture
+def outputs(mocker):
+    mocker.patch.object(video_slot, "VideoPipelinePlaybin3", SlowPipeline)
+    outputs = [video_output.TestOutput("Test Output 1"), video_output.TestOutput("Test Output 2")]
+    for output in outputs:
+        output.add_video_slot(None)
+    return outputs
+
+
+class TestMainLoopLatency:
+    def test_fades_on_other_slots_stay_smooth_while_a_slot_is_rebuilt(
+            self, outputs, media_file
+    ):
+        # Arrange
+        rebuilt_slot = outputs[0].video_slots[0]
+        fading_slot = outputs[1].video_slots[0]
+        fading_slot._plane = FakePlane()
+        fading_slot.set_config(SlotFlag.FADE_IN_TIME_SECONDS, 0.25)
+        fading_slot._state = SlotState.ACTIVATING
+        fading_slot._alpha = 0.0
+        fading_slot.blanked = False
+
+        loop = GLib.MainLoop()
+        rebuild_done_at = []
+
+        def tick():
+            for output in outputs:
+                output.update(TICK_SECONDS)
+            if rebuilt_slot._pipeline is not None and not rebuild_done_at:
+                rebuild_done_at.append(time.monotonic())
+            return GLib.SOURCE_CONTINUE
+
+        def start_rebuild():
+            rebuilt_slot.set_file_path(media_file)
+            return GLib.SOURCE_REMOVE
+
+        GLib.timeout_add(int(TICK_SECONDS * 1000), tick)
+        GLib.idle_add(start_rebuild)
+        GLib.timeout_add(int(3 * REBUILD_SECONDS * 1000), loop.quit)
+
+        # Act
+        loop.run()
+
+        # Assert
+        commits = fading_slot.plane.alpha_commits
+        gaps = [b - a for a, b in zip(commits, commits[1:])]
+        assert rebuild_done_at, "pipeline was not rebuilt"
+        assert not rebuilt_slot._pipeline.built_on_main_thread
+        assert rebuilt_slot._pipeline.bus_attached
+        assert fading_slot.state is SlotState.ACTIVE
+        assert commits[-1] < rebuild_done_at[0], "fade did not finish during the rebuild"
+        assert max(gaps) < MAX_TICK_GAP_SECONDS
@@ -3,6 +3,7 @@ from pathlib import Path
 import pytest
 from pytest_mock import mocker
 
+from theatris_rpo.config import config, Conf
 from theatris_rpo.media_registry.media_registry import MediaRegistry, LOG_MESSAGES
 
 
@@ -152,3 +153,49 @@ class TestMediaRegistry:
         # Assert
         # assert media_registry.valid is True
         # assert len(media_registry.files_by_number) == number_of_valid_files
+
+
+@pytest.fixture
+def mirrored_registry(tmp_path):
+    share = tmp_path / "share"
+    share.mkdir()
+    (share / "1_a.mp4").write_bytes(b"v" * 100)
+    previous = config[Conf.MIRROR_DIR], config[Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND]
+    config[Conf.MIRROR_DIR], config[Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND] = tmp_path / "mirror", 0
+    try:
+        yield MediaRegistry(share), share / "1_a.mp4", tmp_path / "mirror" / "1_a.mp4"
+    finally:
+        config[Conf.MIRROR_DIR], config[Conf.MIRROR_BANDWIDTH_BYTES_PER_SECOND] = previous
+
+
+class TestPlaybackPath:
+    def test_slot_with_the_source_keeps_it_and_others_get_the_copy(self, mirrored_registry):
+        # Arrange
+        sut, source, copy = mirrored_registry
+        sut.playback_path(source)
+        sut._mirror.wait_idle(timeout=2.0)
+
+        # Act
+        kept = sut.playback_path(source, current=source)
+        fresh = sut.playback_path(source, current=None)
+        again = sut.playback_path(source, current=copy)
+
+        # Assert
+        assert (kept, fresh, again) == (source, copy, copy)
+
+    def test_slot_with_an_outdated_or_evicted_copy_goes_back_to_the_source(self, mirrored_registry):
+        # Arrange
+        sut, source, copy = mirrored_registry
+        sut.playback_path(source)
+        sut._mirror.wait_idle(timeout=2.0)
+
+        # Act
+        source.write_bytes(b"changed")
+        after_change = sut.playback_path(source, current=copy)
+        sut._mirror.wait_idle(timeout=2.0)
+        sut._mirror._evict(source)
+        after_eviction = sut.playback_path(source, current=copy)
+
+        # Assert
+        assert after_change == source
+        assert after_eviction == source
@@ -0,0 +1,152 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from theatris_rpo.media_registry.memory_cache import MediaMemoryCache
+
+
+def wait_until_cached(cache: MediaMemoryCache, path: Path, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not cache.is_cached(path):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{path} was not loaded into the cache")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def media_files(tmp_path):
+    files = []
+    for i, size in enumerate((100, 200, 300, 5000)):
+        f = tmp_path / f"{i}_clip.mp4"
+        f.write_bytes(bytes([i]) * size)
+        files.append(f)
+    return files
+
+
+class TestMediaMemoryCache:
+    def test_first_lookup_is_a_miss_and_loads_in_background(self, media_files):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=1000, size_threshold_bytes=500)
+
+        # Act
+        first = sut.lookup(media_files[0])
+        wait_until_cached(sut, media_files[0])
+        second = sut.lookup(media_files[0])
+
+        # Assert
+        assert first is None
+        assert second == media_files[0].read_bytes()
+        assert sut.stats.hits == 1
+        assert sut.stats.misses == 1
+
+    def test_files_above_threshold_are_not_cached(self, media_files):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=10000, size_threshold_bytes=500)
+
+        # Act
+        result = sut.lookup(media_files[3])
+
+        # Assert
+        assert result is None
+        assert sut.stats.misses == 0
+        assert not sut.is_cached(media_files[3])
+
+    def test_pinned_files_are_cached_regardless_of_threshold(self, media_files):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=10000, size_threshold_bytes=0)
+
+        # Act
+        sut.pin(media_files[3])
+        wait_until_cached(sut, media_files[3])
+
+        # Assert
+        assert sut.lookup(media_files[3]) == media_files[3].read_bytes()
+
+    def test_least_recently_used_file_is_evicted_when_budget_is_exceeded(
+            self, media_files
+    ):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=500, size_threshold_bytes=500)
+        sut.lookup(media_files[0])
+        wait_until_cached(sut, media_files[0])
+        sut.lookup(media_files[1])
+        wait_until_cached(sut, media_files[1])
+        sut.lookup(media_files[0])  # file 0 is now the most recently used
+
+        # Act
+        sut.lookup(media_files[2])
+        wait_until_cached(sut, media_files[2])
+
+        # Assert
+        assert sut.is_cached(media_files[0])
+        assert not sut.is_cached(media_files[1])
+        assert sut.stats.evictions == 1
+        assert sut.stats.used_bytes == 400
+
+    def test_retain_drops_removed_and_changed_files(self, media_files):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=1000, size_threshold_bytes=500)
+        for f in media_files[:2]:
+            sut.pin(f)
+            wait_until_cached(sut, f)
+        media_files[1].write_bytes(b"changed")
+
+        # Act
+        sut.retain(media_files[1:])
+
+        # Assert
+        assert not sut.is_cached(media_files[0])
+        assert not sut.is_cached(media_files[1])
+        assert sut.stats.used_bytes == 0
+
+    def test_disabled_cache_never_loads(self, media_files):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=0, size_threshold_bytes=500)
+
+        # Act
+        sut.lookup(media_files[0])
+
+        # Assert
+        assert sut.stats.misses == 0
+
+    def test_pinned_files_are_not_evicted(self, media_files):
+        # Arrange
+        sut = MediaMemoryCache(budget_bytes=500, size_threshold_bytes=500)
+        sut.pin(media_files[1])
+        wait_until_cached(sut, media_files[1])
+        sut.lookup(media_files[0])
+        wait_until_cached(sut, media_files[0])
+
+        # Act
+        sut.lookup(media_files[2])
+        wait_until_cached(sut, media_files[2])
+
+        # Assert
+        assert sut.is_cached(media_files[1])
+        assert not sut.is_cached(media_files[0])
+        assert sut.stats.used_bytes == 500
+
+    def test_file_unpinned_while_loading_is_not_cached(self, media_files):
+        # Arrange
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_loader(path: Path) -> bytes:
+            loading.set()
+            release.wait(2.0)
+            return path.read_bytes()
+
+        sut = MediaMemoryCache(budget_bytes=10000, size_threshold_bytes=0, loader=slow_loader)
+        sut.pin(media_files[3])
+        loading.wait(2.0)
+
+        # Act
+        sut.pin(media_files[3], False)
+        release.set()
+        time.sleep(0.1)
+
+        # Assert
+        assert not sut.is_cached(media_files[3])
+        assert sut.stats.used_bytes == 0
@@ -0,0 +1,110 @@
+import pickle
+import urllib.error
+import urllib.request
+
+import pytest
+
+from theatris_rpo.metrics import MetricsRegistry, MetricsServer, SlotSampler, slot_fps, slot_frames_total
+
+
+class FakeSlot:
+    def __init__(self, slot_id: int):
+        self.id = slot_id
+        self.frame_stats = (0, 0, 0)
+
+
+class FakeOutput:
+    def __init__(self, output_id: int):
+        self.id = output_id
+        self.video_slots = [FakeSlot(0)]
+
+
+class TestMetricsRegistry:
+    def test_renders_the_prometheus_text_format(self):
+        # Arrange
+        sut = MetricsRegistry()
+        messages = sut.counter("messages_total", "Received messages", ("command",))
+        lag = sut.histogram("lag_seconds", "Lag", buckets=(0.01, 0.1))
+
+        # Act
+        messages.labels("/go").inc()
+        messages.labels('/say "hi"').inc(2)
+        for value in (0.005, 0.01, 0.05, 1.5):
+            lag.observe(value)
+
+        # Assert
+        assert sut.render().splitlines() == [
+            "# HELP messages_total Received messages",
+            "# TYPE messages_total counter",
+            'messages_total{command="/go"} 1',
+            'messages_total{command="/say \\"hi\\""} 2',
+            "# HELP lag_seconds Lag",
+            "# TYPE lag_seconds histogram",
+            'lag_seconds_bucket{le="0.01"} 2',
+            'lag_seconds_bucket{le="0.1"} 3',
+            'lag_seconds_bucket{le="+Inf"} 4',
+            "lag_seconds_sum 1.565",
+            "lag_seconds_count 4",
+        ]
+
+    def test_metrics_of_other_processes_join_the_families_with_their_labels(self):
+        # Arrange
+        sut = MetricsRegistry()
+        sut.gauge("fps", "Frames per second", ("output",)).labels(0).set(25)
+        other = MetricsRegistry()
+        other.gauge("fps", "Frames per second", ("output",)).labels(1).set(50)
+        other.gauge("not_shared", "Left out")
+
+        # Act
+        text = sut.render([(pickle.loads(pickle.dumps(other.subset(["fps"]))), {"process": "output1"})])
+
+        # Assert
+        assert text.splitlines() == [
+            "# HELP fps Frames per second",
+            "# TYPE fps gauge",
+            'fps{output="0"} 25',
+            'fps{output="1",process="output1"} 50',
+        ]
+
+
+class TestSlotSampler:
+    def test_frames_and_fps_are_counted_across_pipeline_rebuilds(self):
+        # Arrange
+        output = FakeOutput(7)
+        slot = output.video_slots[0]
+        sut = SlotSampler()
+        sut.sample([output], 10.0)
+        frames = slot_frames_total.labels(7, 0)
+        before = frames.value
+
+        # Act
+        slot.frame_stats = (0, 50, 0)
+        sut.sample([output], 11.0)
+        slot.frame_stats = (1, 20, 0)
+        sut.sample([output], 12.0)
+
+        # Assert
+        assert frames.value - before == 70
+        assert slot_fps.labels(7, 0).value == pytest.approx(20.0)
+
+
+class TestMetricsServer:
+    def test_serves_the_metrics_on_a_thread_of_its_own(self):
+        # Arrange
+        sut = MetricsServer("127.0.0.1", 0, lambda: "up 1\n")
+        sut.start()
+
+        try:
+            # Act
+            with urllib.request.urlopen(f"http://127.0.0.1:{sut.port}/metrics", timeout=2) as response:
+                body = response.read().decode()
+                content_type = response.headers["Content-Type"]
+            with pytest.raises(urllib.error.HTTPError) as not_found:
+                urllib.request.urlopen(f"http://127.0.0.1:{sut.port}/other", timeout=2)
+        finally:
+            sut.stop()
+
+        # Assert
+        assert body == "up 1\n"
+        assert content_type.startswith("text/plain; version=0.0.4")
+        assert not_found.value.code == 404
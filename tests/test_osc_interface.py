@@ -0,0 +1,49 @@
+import socket
+from ipaddress import IPv4Address
+from types import SimpleNamespace
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+from returns.result import Success
+
+from theatris_rpo.cue_list import CueListEngine
+from theatris_rpo.osc_interface import OscInterface
+from theatris_rpo.output_process import RemoteOutput
+
+
+class FakeCommands:
+    def submit(self, lane, name, handler, *args, on_done=None, client=None):
+        return handler(*args)
+
+
+class FakeMachine:
+    def __init__(self, outputs):
+        self.outputs = {output.id: output for output in outputs}
+        self.cue_list = CueListEngine(self)
+        self.commands = FakeCommands()
+        self.stopped = []
+
+    def stop_playout(self, output, slot):
+        self.stopped.append((output, slot))
+        return Success(None)
+
+
+def make_remote_output(output_id: int) -> RemoteOutput:
+    output = SimpleNamespace(
+        id=output_id, connector_name=f"HDMI-A-{output_id + 1}", is_connected=True, width=1920, height=1080
+    )
+    coordinator_sock, _ = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    return RemoteOutput(output, SimpleNamespace(pid=0), coordinator_sock, lambda *args: None, slot_count=2)
+
+
+class TestOscInterface:
+    def test_slot_commands_reach_output_processes_before_their_first_snapshot(self):
+        # Arrange
+        vm = FakeMachine([make_remote_output(0), make_remote_output(1)])
+        sut = OscInterface(IPv4Address("127.0.0.1"), 0, vm)
+
+        # Act
+        message = OscMessageBuilder("/output1/slot1/stop").build()
+        sut.dispatcher.call_handlers_for_packet(message.dgram, ("127.0.0.1", 9000))
+
+        # Assert
+        assert vm.stopped == [(1, 1)]
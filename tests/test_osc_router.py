@@ -0,0 +1,99 @@
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonoscquery.shared.osc_access import OSCAccess
+from pythonoscquery.shared.osc_address_space import OSCAddressSpace
+
+from theatris_rpo.osc_router import RoutingDispatcher
+
+
+def message(address: str, *args) -> bytes:
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+
+def make_router(calls: list) -> RoutingDispatcher:
+    router = RoutingDispatcher()
+    router.map_slot_command(
+        "play_by_number",
+        lambda address, fixed, number, restart: calls.append((address, fixed, number, restart)),
+        OSCAccess.WRITEONLY_VALUE,
+        "Play on slot {slot} on output {output}",
+        [1, False],
+    )
+    router.add_slots((output, slot) for output in range(8) for slot in range(32))
+    return router
+
+
+class TestRoutingDispatcher:
+    def test_routes_slot_command_with_output_and_slot_as_fixed_args(self):
+        # Arrange
+        calls = []
+        sut = make_router(calls)
+
+        # Act
+        sut.call_handlers_for_packet(message("/output7/slot31/play_by_number", 12, 1), ("127.0.0.1", 9000))
+
+        # Assert
+        assert calls == [("/output7/slot31/play_by_number", [7, 31], 12, True)]
+
+    def test_ignores_unknown_slots_and_invalid_arguments(self):
+        # Arrange
+        calls = []
+        defaults = []
+        sut = make_router(calls)
+        sut.set_default_handler(lambda address, *args: defaults.append(address))
+
+        # Act
+        sut.call_handlers_for_packet(message("/output8/slot0/play_by_number", 12, True), ("127.0.0.1", 9000))
+        sut.call_handlers_for_packet(message("/output0/slot0/play_by_number", "x", True), ("127.0.0.1", 9000))
+
+        # Assert
+        assert calls == []
+        assert defaults == ["/output8/slot0/play_by_number"]
+
+    def test_wildcard_pattern_reaches_all_matching_slots(self):
+        # Arrange
+        calls = []
+        sut = make_router(calls)
+
+        # Act
+        sut.call_handlers_for_packet(message("/output1/slot*/play_by_number", 3, False), ("127.0.0.1", 9000))
+
+        # Assert
+        assert sorted(c[1][1] for c in calls) == list(range(32))
+
+    def test_advertises_every_slot_command_in_address_space(self):
+        # Arrange
+        address_space = OSCAddressSpace()
+        sut = make_router([])
+
+        # Act
+        sut.advertise_slot_commands(address_space)
+
+        # Assert
+        node = address_space.find_node("/output7/slot31/play_by_number")
+        assert node is not None
+        assert node.description == "Play on slot 31 on output 7"
+        assert address_space.number_of_nodes == 1 + 8 + 8 * 32 * 2
+
+    def test_reply_goes_to_the_sender_of_the_client_or_else_the_default_sender(self):
+        # Arrange
+        sut = RoutingDispatcher()
+        datagrams = []
+        written = []
+        sut.set_default_reply_sender(lambda data, client: datagrams.append((data, client)))
+        sut.set_reply_sender(("127.0.0.1", 9001), written.append)
+
+        # Act
+        sut.reply(("127.0.0.1", 9000), ("/preload", "No file 12"))
+        sut.reply(("127.0.0.1", 9001), ("/preload", "No file 13"))
+        sut.set_reply_sender(("127.0.0.1", 9001), None)
+        sut.reply(("127.0.0.1", 9001), ("/preload", "No file 14"))
+
+        # Assert
+        assert datagrams == [
+            (message("/preload", "No file 12"), ("127.0.0.1", 9000)),
+            (message("/preload", "No file 14"), ("127.0.0.1", 9001)),
+        ]
+        assert written == [message("/preload", "No file 13")]
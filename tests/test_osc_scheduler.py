@@ -0,0 +1,86 @@
+import time
+
+import gi
+
+gi.require_version("GLib", "2.0")
+from gi.repository import GLib  # noqa: E402
+from pythonosc.osc_bundle_builder import OscBundleBuilder  # noqa: E402
+from pythonosc.osc_message_builder import OscMessageBuilder  # noqa: E402
+from pythonoscquery.shared.osc_access import OSCAccess  # noqa: E402
+
+from theatris_rpo.metrics import osc_messages_total  # noqa: E402
+from theatris_rpo.osc_scheduler import ScheduledDispatcher  # noqa: E402
+
+MAX_LATENESS_SECONDS = 0.01
+
+
+def bundle(timetag: float, address: str, *args) -> bytes:
+    message = OscMessageBuilder(address)
+    for arg in args:
+        message.add_arg(arg)
+    builder = OscBundleBuilder(timetag)
+    builder.add_content(message.build())
+    return builder.build().dgram
+
+
+class TestScheduledDispatcher:
+    def test_future_bundle_runs_when_due_and_is_prepared_before(self):
+        # Arrange
+        calls = []
+        sut = ScheduledDispatcher(
+            prepare=lambda address, args: calls.append(("prepare", time.time(), args)),
+            preroll_lead_seconds=0.2,
+        )
+        sut.map("/cue", lambda address, *args: calls.append(("run", time.time(), args)))
+        due = time.time() + 0.3
+        loop = GLib.MainLoop()
+        GLib.timeout_add(500, loop.quit)
+
+        # Act
+        results = sut.call_handlers_for_packet(bundle(due, "/cue", 12), ("127.0.0.1", 9000))
+        dispatched_immediately = list(calls)
+        loop.run()
+
+        # Assert
+        assert results == []
+        assert dispatched_immediately == []
+        (prepare_call, run_call) = calls
+        assert prepare_call[0] == "prepare" and prepare_call[2] == [12]
+        assert prepare_call[1] < due - 0.15
+        assert run_call[0] == "run" and run_call[2] == (12,)
+        assert due <= run_call[1] < due + MAX_LATENESS_SECONDS
+        (report,) = sut.reports
+        assert report.address == "/cue"
+        assert 0.0 <= report.lateness < MAX_LATENESS_SECONDS
+
+    def test_message_without_timetag_runs_immediately(self):
+        # Arrange
+        calls = []
+        sut = ScheduledDispatcher()
+        sut.map("/cue", lambda address, *args: calls.append(args) or (address, "done"))
+
+        # Act
+        results = sut.call_handlers_for_packet(
+            OscMessageBuilder("/cue").build().dgram, ("127.0.0.1", 9000)
+        )
+
+        # Assert
+        assert calls == [()]
+        assert results == [("/cue", "done")]
+        assert sut.reports == []
+
+    def test_messages_are_counted_by_command_without_output_and_slot_numbers(self):
+        # Arrange
+        sut = ScheduledDispatcher()
+        sut.add_slots([(0, 0), (1, 1)])
+        sut.map_slot_command("stop", lambda address, fixed_args: None, OSCAccess.NO_VALUE, "Stop")
+        counted = osc_messages_total.labels("/outputX/slotX/stop")
+        unknown = osc_messages_total.labels("unknown")
+        before = counted.value, unknown.value
+
+        # Act
+        for address in ("/output0/slot0/stop", "/output1/slot1/stop", "/output0/slot0/stop", "/nothing"):
+            sut.call_handlers_for_packet(OscMessageBuilder(address).build().dgram, ("127.0.0.1", 9000))
+
+        # Assert
+        assert (counted.value - before[0], unknown.value - before[1]) == (3, 1)
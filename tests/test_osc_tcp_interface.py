@@ -0,0 +1,52 @@
+import asyncio
+
+from pythonosc import slip
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from theatris_rpo.osc_tcp_interface import OscTcpInterface
+
+
+def slip_message(address: str, *args) -> bytes:
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    return slip.encode(builder.build().dgram)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> tuple[str, list]:
+    frame = b""
+    while len(frame) <= 1:
+        frame = await reader.readuntil(slip.END)
+    message = OscMessage(slip.decode(frame))
+    return message.address, message.params
+
+
+class TestOscTcpInterface:
+    def test_pipelined_commands_are_answered_in_order(self):
+        dispatcher = Dispatcher()
+        dispatcher.map("/echo", lambda address, number: (address, number))
+        dispatcher.map("/long", lambda address: (address, "x" * 100_000))
+
+        async def scenario():
+            # Arrange
+            sut = OscTcpInterface("127.0.0.1", 0, None, dispatcher)
+            await sut.async_start()
+            port = sut._server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1024 * 1024)
+
+            # Act
+            writer.write(b"".join(slip_message("/echo", n) for n in range(50)) + slip_message("/long"))
+            await writer.drain()
+            replies = [await read_reply(reader) for _ in range(51)]
+
+            writer.close()
+            sut.stop()
+            return replies
+
+        replies = asyncio.run(scenario())
+
+        # Assert
+        assert replies[:50] == [("/echo", [n]) for n in range(50)]
+        assert replies[50] == ("/long", ["x" * 100_000])
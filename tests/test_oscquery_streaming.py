@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from theatris_rpo.oscquery_streaming import ListenClient, Opcode, accept_key
+
+
+def client_frame(opcode: Opcode, payload: bytes) -> bytes:
+    mask = os.urandom(4)
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return struct.pack("!BB", 0x80 | opcode, 0x80 | len(payload)) + mask + masked
+
+
+def command(name: str, path: str) -> bytes:
+    return client_frame(Opcode.TEXT, json.dumps({"COMMAND": name, "DATA": path}).encode())
+
+
+def osc(address: str, value) -> bytes:
+    builder = OscMessageBuilder(address)
+    builder.add_arg(value)
+    return builder.build().dgram
+
+
+async def received_messages(sock: socket.socket) -> list[tuple[str, list]]:
+    """Parse the server frames that arrived so far"""
+    await asyncio.sleep(0.05)
+    data = sock.recv(65536)
+    messages = []
+    while data:
+        length = data[1] & 0x7F
+        messages.append(OscMessage(data[2: 2 + length]))
+        data = data[2 + length:]
+    return [(m.address, m.params) for m in messages]
+
+
+class TestListenClient:
+    def test_handshake_key(self):
+        # Example from RFC 6455
+        assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+    def test_streams_only_listened_paths_and_coalesces_per_path(self):
+        async def scenario():
+            # Arrange
+            server_sock, peer = socket.socketpair()
+            reader, writer = await asyncio.open_connection(sock=server_sock)
+            sut = ListenClient(reader, writer)
+            task = asyncio.create_task(sut.run())
+            peer.sendall(command("LISTEN", "/output0/slot0/state"))
+            await asyncio.sleep(0.05)
+
+            # Act
+            sut.offer("/output0/slot0/state", osc("/output0/slot0/state", "activating"))
+            sut.offer("/output0/slot0/state", osc("/output0/slot0/state", "active"))
+            sut.offer("/heartbeat", osc("/heartbeat", True))
+            messages = await received_messages(peer)
+
+            peer.sendall(command("IGNORE", "/output0/slot0/state"))
+            await asyncio.sleep(0.05)
+            sut.offer("/output0/slot0/state", osc("/output0/slot0/state", "paused"))
+            peer.setblocking(False)
+            await asyncio.sleep(0.05)
+            try:
+                after_ignore = peer.recv(65536)
+            except BlockingIOError:
+                after_ignore = b""
+
+            peer.sendall(client_frame(Opcode.CLOSE, b""))
+            await asyncio.wait_for(task, 1.0)
+            peer.close()
+            return messages, after_ignore, sut.coalesced
+
+        messages, after_ignore, coalesced = asyncio.run(scenario())
+
+        # Assert
+        assert messages == [("/output0/slot0/state", ["active"])]
+        assert after_ignore == b""
+        assert coalesced == 1
@@ -0,0 +1,78 @@
+import socket
+from unittest.mock import patch
+
+from returns.result import Success, Failure
+
+from theatris_rpo.cue import CueAction, CueOp
+from theatris_rpo.output_process import OutputWorker, receive, send
+
+
+class FakeOutput:
+    def __init__(self):
+        self.alpha = {}
+        self.video_slots = []
+
+    def set_alpha(self, slot_number, factor):
+        self.alpha[slot_number] = factor
+        return Success(None)
+
+    def stop_video(self, slot_number):
+        return Failure(f"No video slot found for slot number {slot_number}")
+
+
+class TestOutputWorker:
+    def test_runs_output_commands_and_returns_their_result(self):
+        # Arrange
+        output = FakeOutput()
+        sut = OutputWorker(None, output)
+
+        # Act
+        alpha = sut._call("set_alpha", (1, 0.5))
+        stop = sut._call("stop_video", (7,))
+
+        # Assert
+        assert alpha == (True, None)
+        assert output.alpha == {1: 0.5}
+        assert stop == (False, "No video slot found for slot number 7")
+
+    def test_only_output_commands_are_accepted(self):
+        # Arrange
+        sut = OutputWorker(None, FakeOutput())
+
+        # Act
+        ok, msg = sut._call("__init__", ())
+
+        # Assert
+        assert not ok
+        assert "Unknown output command" in msg
+
+    def test_trace_records_the_cue_number_the_coordinator_sends_later(self):
+        # Arrange
+        sut = OutputWorker(None, FakeOutput())
+        with patch("theatris_rpo.output_process.trace_capture") as capture:
+            capture.start.return_value = Success("trace.jsonl.gz")
+            sut._call("start_trace", ("trace.jsonl.gz", 10.0, 1000, 1))
+        cue_number = capture.start.call_args.args[4]
+        at_start = cue_number()
+
+        # Act
+        sut._handle(("trace_cue", 2.5))
+
+        # Assert
+        assert (at_start, cue_number()) == (1, 2.5)
+
+
+class TestMessages:
+    def test_messages_keep_their_boundaries_until_the_socket_is_closed(self):
+        # Arrange
+        coordinator, process = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        op = CueOp(CueAction.PLAY, 1, 0, 12)
+
+        # Act
+        send(coordinator, ("call", 0, "cue", (3, [(op, None)])))
+        send(coordinator, ("quit",))
+        coordinator.close()
+        messages = [receive(process), receive(process), receive(process)]
+
+        # Assert
+        assert messages == [("call", 0, "cue", (3, [(op, None)])), ("quit",), None]
@@ -0,0 +1,25 @@
+import threading
+from unittest.mock import patch
+
+from theatris_rpo.pipeline_executor import run_abandoned
+
+
+class TestRunAbandoned:
+    def test_returns_at_once_and_logs_when_the_work_hangs_beyond_the_timeout(self):
+        # Arrange
+        release = threading.Event()
+
+        # Act
+        with patch("theatris_rpo.pipeline_executor.GLib") as glib, \
+                patch("theatris_rpo.pipeline_executor.logger") as logger:
+            thread = run_abandoned(release.wait, timeout_seconds=0.5, name="teardown slot 1")
+            interval, check = glib.timeout_add.call_args.args
+            check()
+        release.set()
+        thread.join(1.0)
+
+        # Assert
+        assert interval == 500
+        assert thread.daemon
+        assert logger.error.call_args.args[1:] == ("teardown slot 1", 0.5)
+        assert not thread.is_alive()
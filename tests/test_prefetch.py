@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from theatris_rpo.media_registry.prefetch import MediaPrefetcher, PrefetchState
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    f = tmp_path / "1_clip.mp4"
+    f.write_bytes(b"x" * (3 * 1024 * 1024))
+    return f
+
+
+class TestMediaPrefetcher:
+    def test_unknown_file_is_cold(self, tmp_path):
+        # Arrange
+        sut = MediaPrefetcher(head_bytes=1024, bandwidth_bytes_per_second=0)
+
+        # Act
+        state = sut.state(tmp_path / "2_unknown.mp4")
+
+        # Assert
+        assert state is PrefetchState.COLD
+
+    def test_prefetched_file_becomes_warm(self, media_file):
+        # Arrange
+        sut = MediaPrefetcher(head_bytes=1024 * 1024, bandwidth_bytes_per_second=0)
+
+        # Act
+        sut.prefetch(media_file)
+
+        # Assert
+        assert sut.wait_idle(timeout=2.0)
+        assert sut.state(media_file) is PrefetchState.WARM
+
+    def test_read_rate_is_limited_to_bandwidth_budget(self, media_file):
+        # Arrange
+        bandwidth = 10 * 1024 * 1024
+        head_bytes = 3 * 1024 * 1024
+        sut = MediaPrefetcher(head_bytes, bandwidth_bytes_per_second=bandwidth)
+
+        # Act
+        started = time.monotonic()
+        sut.prefetch(media_file)
+        sut.wait_idle(timeout=5.0)
+        duration = time.monotonic() - started
+
+        # Assert
+        assert duration >= 0.9 * head_bytes / bandwidth
+
+    def test_missing_file_stays_cold(self, tmp_path):
+        # Arrange
+        sut = MediaPrefetcher(head_bytes=1024, bandwidth_bytes_per_second=0)
+        missing = tmp_path / "3_missing.mp4"
+
+        # Act
+        sut.prefetch(missing)
+        sut.wait_idle(timeout=2.0)
+
+        # Assert
+        assert sut.state(missing) is PrefetchState.COLD
+
+    def test_invalidate_makes_warm_files_cold(self, media_file):
+        # Arrange
+        sut = MediaPrefetcher(head_bytes=1024, bandwidth_bytes_per_second=0)
+        sut.prefetch(media_file)
+        sut.wait_idle(timeout=2.0)
+
+        # Act
+        sut.invalidate()
+
+        # Assert
+        assert sut.state(media_file) is PrefetchState.COLD
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from theatris_rpo.startup import StartupReport
+
+
+class TestStartupReport:
+    def test_phases_are_reported_relative_to_the_origin_in_order_of_completion(self):
+        # Arrange
+        sut = StartupReport()
+        origin = sut.origin
+
+        # Act
+        sut.record("outputs", origin + 0.010, origin + 0.030)
+        sut.record("media_scan", origin + 0.005, origin + 0.105)
+        sut.mark("media_ready")
+
+        # Assert
+        phases = sut.as_list()
+        assert phases[0::3] == ["outputs", "media_scan", "media_ready"]
+        assert phases[1:3] == [pytest.approx(10.0), pytest.approx(20.0)]
+        assert phases[4:6] == [pytest.approx(5.0), pytest.approx(100.0)]
+        assert phases[8] == 0.0
+        assert sut.has("media_ready") and not sut.has("start_file_first_frame")
+
+    def test_phases_can_be_recorded_from_several_threads(self):
+        # Arrange
+        sut = StartupReport()
+
+        def import_interfaces():
+            with sut.phase("import_interfaces"):
+                pass
+
+        # Act
+        thread = threading.Thread(target=import_interfaces)
+        thread.start()
+        with sut.phase("gst_init"):
+            pass
+        thread.join()
+
+        # Assert
+        assert sorted(sut.as_list()[0::3]) == ["gst_init", "import_interfaces"]
+
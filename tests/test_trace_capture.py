@@ -0,0 +1,41 @@
+import gzip
+import json
+import os
+
+from theatris_rpo.trace_capture import TraceWriter, prune_traces
+
+
+class TestTraceWriter:
+    def test_stops_recording_once_the_byte_limit_is_reached(self, tmp_path):
+        # Arrange
+        path = tmp_path / "trace-1.jsonl.gz"
+        sut = TraceWriter(path, max_bytes=100)
+
+        # Act
+        for i in range(20):
+            sut.write(["b", i, "0/0", "sink.sink", i * 40_000, 1024])
+        sut.close()
+
+        # Assert
+        with gzip.open(path, "rt") as f:
+            records = [json.loads(line) for line in f]
+        assert sut.is_full
+        assert len(records) == sut.records < 20
+        assert records[0] == ["b", 0, "0/0", "sink.sink", 0, 1024]
+        assert sut.bytes_written <= 100
+
+
+class TestPruneTraces:
+    def test_keeps_the_newest_traces_only(self, tmp_path):
+        # Arrange
+        for i in range(5):
+            path = tmp_path / f"trace-{i}.jsonl.gz"
+            path.write_bytes(b"")
+            os.utime(path, (1000 + i, 1000 + i))
+        (tmp_path / "other.txt").write_bytes(b"")
+
+        # Act
+        prune_traces(tmp_path, 2)
+
+        # Assert
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["other.txt", "trace-3.jsonl.gz", "trace-4.jsonl.gz"]
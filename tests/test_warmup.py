@@ -0,0 +1,18 @@
+from theatris_rpo.warmup import CueLatencyStats
+
+
+class TestCueLatencyStats:
+    def test_first_cue_is_kept_apart_from_the_steady_state(self):
+        # Arrange
+        sut = CueLatencyStats()
+        before = sut.as_list()
+
+        # Act
+        for latency in (0.250, 0.040, 0.060):
+            sut.add(latency)
+
+        # Assert
+        assert before == [-1.0, 0, 0.0, 0.0]
+        first_ms, count, mean_ms, max_ms = sut.as_list()
+        assert round(first_ms) == 250
+        assert (count, round(mean_ms), round(max_ms)) == (2, 50, 60)
@@ -0,0 +1,79 @@
+import pickle
+
+import pytest
+
+from theatris_rpo.watchdog import Stall, StallAction, StallLog, StallWatchdog, stall_log
+
+
+def make_watchdog() -> StallWatchdog:
+    return StallWatchdog(0, 1, timeout_seconds=2.0, max_attempts=2, backoff_seconds=0.5)
+
+
+class TestStallWatchdog:
+    def test_rebuilds_once_no_frame_arrived_for_the_timeout_and_reports_the_recovery(self):
+        # Arrange
+        sut = make_watchdog()
+        sut.arm(100.0)
+        count = len(stall_log.stalls)
+
+        # Act
+        playing = sut.check(101.9, 101.0)
+        stalled = sut.check(103.0, 101.0)
+        sut.attempt(103.0, 12.5)
+        waiting = sut.check(103.5, 101.0)
+        recovered = sut.check(103.7, 103.6)
+
+        # Assert
+        assert (playing, stalled, waiting, recovered) == (
+            StallAction.NONE,
+            StallAction.RECOVER,
+            StallAction.NONE,
+            StallAction.NONE,
+        )
+        assert not sut.is_stalled
+        stall = stall_log.stalls[-1]
+        assert len(stall_log.stalls) == count + 1
+        assert stall.position == 12.5
+        assert stall.as_list() == [0, 1, "stall", pytest.approx(2600.0), pytest.approx(600.0), 1]
+
+    def test_backs_off_exponentially_and_gives_up_after_the_last_attempt(self):
+        # Arrange
+        sut = make_watchdog()
+        sut.arm(100.0)
+
+        # Act
+        sut.on_error(100.5, None)
+        first = sut.check(100.5, None)
+        sut.attempt(100.5, None)
+        too_early = sut.check(102.9, None)
+        second = sut.check(103.0, None)
+        sut.attempt(103.0, None)
+        still_too_early = sut.check(105.9, None)
+        given_up = sut.check(106.0, None)
+
+        # Assert
+        assert (first, too_early, second) == (StallAction.RECOVER, StallAction.NONE, StallAction.RECOVER)
+        assert (still_too_early, given_up) == (StallAction.NONE, StallAction.GIVE_UP)
+        stall = stall_log.stalls[-1]
+        assert stall.gave_up and stall.reason == "error"
+        assert stall.as_list()[3:] == [pytest.approx(6000.0), -1.0, 2]
+
+
+class TestStallLog:
+    def test_stalls_of_other_processes_are_merged_in_order(self):
+        # Arrange
+        output0 = StallLog()
+        output0.add(Stall(0, 0, 10.0, 12.0, "stall", attempts=1, recovered_at=12.5, ended_at=12.5))
+        output1 = StallLog()
+        output1.add(Stall(1, 0, 5.0, 6.0, "error", attempts=3, ended_at=20.0, gave_up=True))
+        sut = StallLog()
+
+        # Act
+        for log in (output0, output1):
+            sut.merge(pickle.loads(pickle.dumps(log)))
+
+        # Assert
+        result = sut.as_list()
+        assert result[:2] == [2, 1]
+        assert result[2::6] == [1, 0]
+        assert result[3:8] == [0, "error", pytest.approx(15000.0), -1.0, 3]